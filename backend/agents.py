@@ -1,30 +1,59 @@
 """
-Crimetryx AI - AI Agents using GROQ API
+Crimetryx AI - AI Agents
 Simple LLM function calls styled as autonomous agents in the UI.
+
+Each agent's completion goes through the provider and model that
+llm_providers.router assigns to it (Groq by default), hedged against slow
+responses when HEDGE_ENABLED is set (see hedging.py). Completions request
+JSON mode with the agent's schema and are validated, repaired and, for
+invalid fields only, re-asked (see structured_output.py).
 """
 
-import os
 import json
 import time
-from groq import Groq
-from dotenv import load_dotenv
 
-load_dotenv()
+from metrics import record_llm_call
+from llm_providers import router
+from hedging import hedger
+from structured_output import SCHEMAS, structure
+
+
+def model_for(agent: str) -> str:
+    """'provider:model' an agent is routed to."""
+    return '%s:%s' % router.route(agent)
 
-# Initialize GROQ client lazily to allow app to start without API key
-client = None
 
-def get_groq_client():
-    global client
-    if client is None:
-        api_key = os.getenv('GROQ_API_KEY')
-        if not api_key:
-            return None
-        client = Groq(api_key=api_key)
-    return client
+def create_completion(agent: str, schema: dict = None, **kwargs):
+    """
+    Chat completion from the agent's routed provider, with latency, token and error metrics recorded.
+    
+    JSON mode uses the given schema, or the agent's own schema by default.
+    """
+    provider_name, model = router.route(agent)
+    provider = router.provider(provider_name)
+    schema = schema or SCHEMAS.get(agent)
+    
+    def attempt():
+        started = time.perf_counter()
+        try:
+            response = provider.complete(agent, model, schema=schema, **kwargs)
+        except Exception:
+            record_llm_call(agent, provider_name, model, started, error=True)
+            raise
+        record_llm_call(agent, provider_name, model, started, response)
+        return response
+    
+    return hedger.call(agent, (agent, provider_name, model), attempt)
 
-# Default model - Updated to current active model
-MODEL = "llama-3.3-70b-versatile"
+
+def structure_output(agent: str, response, messages: list):
+    """Validated output and validation report for a completion, re-asking for invalid fields."""
+    def reask(reask_messages, fragment, max_tokens):
+        reply = create_completion(agent, schema=fragment, messages=reask_messages,
+                                  temperature=0.2, max_tokens=max_tokens)
+        return reply.choices[0].message.content
+    
+    return structure(agent, response.choices[0].message.content, messages, reask)
 
 
 def scene_interpreter(scene_data: dict, evidence_list: list) -> dict:
@@ -61,36 +90,25 @@ Provide your analysis in the following JSON format:
 Respond ONLY with valid JSON."""
 
     start_time = time.time()
-    groq_client = get_groq_client()
-    
-    if not groq_client:
-        return {"status": "error", "error": "GROQ API key not configured", "execution_time": 0}
     
     try:
-        response = groq_client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        messages = [{"role": "user", "content": prompt}]
+        response = create_completion(
+            "scene_interpreter",
+            messages=messages,
             temperature=0.3,
             max_tokens=2000
         )
         
-        result = response.choices[0].message.content
+        output, validation = structure_output("scene_interpreter", response, messages)
         execution_time = time.time() - start_time
         
-        # Try to parse as JSON
-        try:
-            parsed = json.loads(result)
-            return {
-                "status": "completed",
-                "output": parsed,
-                "execution_time": execution_time
-            }
-        except json.JSONDecodeError:
-            return {
-                "status": "completed",
-                "output": {"reasoning": result},
-                "execution_time": execution_time
-            }
+        return {
+            "status": "completed",
+            "output": output,
+            "validation": validation,
+            "execution_time": execution_time
+        }
             
     except Exception as e:
         return {
@@ -100,11 +118,22 @@ Respond ONLY with valid JSON."""
         }
 
 
-def evidence_reasoner(scene_analysis: dict, evidence_list: list) -> dict:
+def evidence_reasoner(scene_analysis: dict, evidence_list: list, spatter_analysis: dict = None) -> dict:
     """
     Evidence Reasoning Agent
     Analyzes evidence patterns, bloodstain analysis, weapon trajectories.
+    
+    spatter_analysis, if given, holds bloodstain trajectories solved
+    numerically from stain measurements (see spatter.facts) and is passed
+    to the model as established facts.
     """
+    spatter_section = ""
+    if spatter_analysis:
+        spatter_section = f"""
+MEASURED BLOODSTAIN TRAJECTORIES (computed numerically from stain measurements; treat as established facts, do not re-derive impact angles or the area of origin):
+{json.dumps(spatter_analysis, indent=2)}
+"""
+    
     prompt = f"""You are a forensic evidence reasoning AI agent. Analyze the evidence in context of the scene.
 
 SCENE ANALYSIS:
@@ -112,7 +141,7 @@ SCENE ANALYSIS:
 
 EVIDENCE LIST:
 {json.dumps(evidence_list, indent=2)}
-
+{spatter_section}
 Provide your analysis in the following JSON format:
 {{
     "evidence_analysis": [
@@ -140,35 +169,25 @@ Provide your analysis in the following JSON format:
 Respond ONLY with valid JSON."""
 
     start_time = time.time()
-    groq_client = get_groq_client()
-    
-    if not groq_client:
-        return {"status": "error", "error": "GROQ API key not configured", "execution_time": 0}
     
     try:
-        response = groq_client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        messages = [{"role": "user", "content": prompt}]
+        response = create_completion(
+            "evidence_reasoner",
+            messages=messages,
             temperature=0.3,
             max_tokens=2000
         )
         
-        result = response.choices[0].message.content
+        output, validation = structure_output("evidence_reasoner", response, messages)
         execution_time = time.time() - start_time
         
-        try:
-            parsed = json.loads(result)
-            return {
-                "status": "completed",
-                "output": parsed,
-                "execution_time": execution_time
-            }
-        except json.JSONDecodeError:
-            return {
-                "status": "completed",
-                "output": {"reasoning": result},
-                "execution_time": execution_time
-            }
+        return {
+            "status": "completed",
+            "output": output,
+            "validation": validation,
+            "execution_time": execution_time
+        }
             
     except Exception as e:
         return {
@@ -213,35 +232,25 @@ Generate 2-3 distinct scenarios with different interpretations. Provide in JSON
 Respond ONLY with valid JSON."""
 
     start_time = time.time()
-    groq_client = get_groq_client()
-    
-    if not groq_client:
-        return {"status": "error", "error": "GROQ API key not configured", "execution_time": 0}
     
     try:
-        response = groq_client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        messages = [{"role": "user", "content": prompt}]
+        response = create_completion(
+            "timeline_builder",
+            messages=messages,
             temperature=0.5,
             max_tokens=3000
         )
         
-        result = response.choices[0].message.content
+        output, validation = structure_output("timeline_builder", response, messages)
         execution_time = time.time() - start_time
         
-        try:
-            parsed = json.loads(result)
-            return {
-                "status": "completed",
-                "output": parsed,
-                "execution_time": execution_time
-            }
-        except json.JSONDecodeError:
-            return {
-                "status": "completed",
-                "output": {"reasoning": result},
-                "execution_time": execution_time
-            }
+        return {
+            "status": "completed",
+            "output": output,
+            "validation": validation,
+            "execution_time": execution_time
+        }
             
     except Exception as e:
         return {
@@ -295,35 +304,25 @@ Critically analyze each scenario and identify contradictions. Provide in JSON fo
 Be critical and thorough. Respond ONLY with valid JSON."""
 
     start_time = time.time()
-    groq_client = get_groq_client()
-    
-    if not groq_client:
-        return {"status": "error", "error": "GROQ API key not configured", "execution_time": 0}
     
     try:
-        response = groq_client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        messages = [{"role": "user", "content": prompt}]
+        response = create_completion(
+            "hypothesis_challenger",
+            messages=messages,
             temperature=0.3,
             max_tokens=2500
         )
         
-        result = response.choices[0].message.content
+        output, validation = structure_output("hypothesis_challenger", response, messages)
         execution_time = time.time() - start_time
         
-        try:
-            parsed = json.loads(result)
-            return {
-                "status": "completed",
-                "output": parsed,
-                "execution_time": execution_time
-            }
-        except json.JSONDecodeError:
-            return {
-                "status": "completed",
-                "output": {"reasoning": result},
-                "execution_time": execution_time
-            }
+        return {
+            "status": "completed",
+            "output": output,
+            "validation": validation,
+            "execution_time": execution_time
+        }
             
     except Exception as e:
         return {
@@ -333,11 +332,44 @@ Be critical and thorough. Respond ONLY with valid JSON."""
         }
 
 
-def run_full_analysis(case_data: dict, evidence_list: list) -> dict:
+def final_hypotheses(scenarios: list, challenger_result: dict) -> list:
+    """
+    Timeline scenarios with the challenger's revised confidence and contradictions.
+    Empty unless the challenger completed.
+    """
+    hypotheses = []
+    if challenger_result.get("status") == "completed":
+        challenges = challenger_result.get("output", {}).get("challenges", [])
+        for scenario in scenarios:
+            final_confidence = scenario.get("confidence", 0.5)
+            contradictions = []
+            
+            # Find challenges for this scenario
+            for challenge in challenges:
+                if challenge.get("scenario_id") == scenario.get("scenario_id"):
+                    final_confidence = challenge.get("revised_confidence", final_confidence)
+                    contradictions = challenge.get("contradictions", [])
+            
+            hypotheses.append({
+                "scenario_id": scenario.get("scenario_id"),
+                "title": scenario.get("title"),
+                "timeline": scenario.get("timeline", []),
+                "confidence": final_confidence,
+                "supporting_evidence": scenario.get("supporting_evidence", []),
+                "contradictions": contradictions
+            })
+    return hypotheses
+
+
+def run_full_analysis(case_data: dict, evidence_list: list, on_stage=None) -> dict:
     """
     Run the complete agent pipeline.
     Returns all agent outputs and final hypotheses.
+    
+    on_stage, if given, is called as on_stage(agent_type, None) before each
+    agent runs and on_stage(agent_type, result) after it finishes.
     """
+    notify = on_stage or (lambda agent_type, result: None)
     results = {
         "agents": {},
         "hypotheses": [],
@@ -347,30 +379,37 @@ def run_full_analysis(case_data: dict, evidence_list: list) -> dict:
     start_total = time.time()
     
     # Step 1: Scene Interpreter
+    notify("scene_interpreter", None)
     scene_result = scene_interpreter(case_data, evidence_list)
     results["agents"]["scene_interpreter"] = scene_result
+    notify("scene_interpreter", scene_result)
     
     if scene_result["status"] == "error":
         results["error"] = "Scene interpretation failed"
         return results
     
     # Step 2: Evidence Reasoner
+    notify("evidence_reasoner", None)
     evidence_result = evidence_reasoner(
         scene_result.get("output", {}),
-        evidence_list
+        evidence_list,
+        case_data.get("spatter_analysis")
     )
     results["agents"]["evidence_reasoner"] = evidence_result
+    notify("evidence_reasoner", evidence_result)
     
     if evidence_result["status"] == "error":
         results["error"] = "Evidence reasoning failed"
         return results
     
     # Step 3: Timeline Builder
+    notify("timeline_builder", None)
     timeline_result = timeline_builder(
         scene_result.get("output", {}),
         evidence_result.get("output", {})
     )
     results["agents"]["timeline_builder"] = timeline_result
+    notify("timeline_builder", timeline_result)
     
     if timeline_result["status"] == "error":
         results["error"] = "Timeline building failed"
@@ -379,34 +418,15 @@ def run_full_analysis(case_data: dict, evidence_list: list) -> dict:
     scenarios = timeline_result.get("output", {}).get("scenarios", [])
     
     # Step 4: Hypothesis Challenger
+    notify("hypothesis_challenger", None)
     challenger_result = hypothesis_challenger(
         scenarios,
         scene_result.get("output", {}),
         evidence_result.get("output", {})
     )
     results["agents"]["hypothesis_challenger"] = challenger_result
+    notify("hypothesis_challenger", challenger_result)
     
-    # Compile final hypotheses with adjusted confidence
-    if challenger_result["status"] == "completed":
-        challenges = challenger_result.get("output", {}).get("challenges", [])
-        for scenario in scenarios:
-            final_confidence = scenario.get("confidence", 0.5)
-            contradictions = []
-            
-            # Find challenges for this scenario
-            for challenge in challenges:
-                if challenge.get("scenario_id") == scenario.get("scenario_id"):
-                    final_confidence = challenge.get("revised_confidence", final_confidence)
-                    contradictions = challenge.get("contradictions", [])
-            
-            results["hypotheses"].append({
-                "scenario_id": scenario.get("scenario_id"),
-                "title": scenario.get("title"),
-                "timeline": scenario.get("timeline", []),
-                "confidence": final_confidence,
-                "supporting_evidence": scenario.get("supporting_evidence", []),
-                "contradictions": contradictions
-            })
-    
+    results["hypotheses"] = final_hypotheses(scenarios, challenger_result)
     results["total_execution_time"] = time.time() - start_total
     return results
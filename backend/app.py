@@ -5,17 +5,44 @@ Main API server for case management, evidence, and AI agent orchestration.
 
 import os
 import json
+import time
 import hashlib
 from datetime import datetime
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
-from models import db, Case, Evidence, AgentLog, Hypothesis, User
-from agents import scene_interpreter, evidence_reasoner, timeline_builder, hypothesis_challenger, run_full_analysis
+from models import (db, Case, Evidence, AgentLog, User, CaseLedger, Suspect, PipelineRun,
+                    SpatterAnalysis, EvidencePhoto)
+from agents import final_hypotheses
 from kiri_service import KiriEngineService
+from db_config import normalize_database_url, build_engine_options
+from id_allocator import next_case_id, next_evidence_id, release_scope
+from ledger import record_entry, get_inclusion_proof, audit_ledgers
+from blob_store import case_blob_digests, sweep_blobs
+from network_graph import graph as network_graph, get_graph, RELATIONS
+from network_layout import layout_cache, tile as layout_tile, MORTON_BITS
+from risk_scoring import rescore_suspects, risk_level_bounds
+from case_similarity import index as similarity_index, get_index as get_similarity_index
+from search_index import (ensure_search_schema, search, index_evidence,
+                          remove_document, remove_case_documents)
+from change_feed import feed, build_broker
+from scene_watcher import SceneWatcher
+from http_cache import cache as response_cache, cached_json, cases_version, case_version, MODEL_MAX_AGE
+from evidence_spatial import (indexes as spatial_indexes, query as spatial_query, Region, DEFAULT_LOD,
+                              DEFAULT_LEVEL, DEFAULT_LIMIT, OCTREE_BITS)
+from serializers import cases_json, case_detail_json, evidence_json, agent_logs_json, suspects_json
+from pipeline import (runner as pipeline_runner, build_inputs, stored_outputs, run_stage, run_fingerprint,
+                      active_run, insert_run, AGENT_TYPES)
+from run_control import (SingleFlight, QuotaExceeded, RunInProgress, WaitTimeout, check_quota,
+                         ANALYSIS_WAIT_TIMEOUT)
+from spatter import parse_measurements, latest_analysis as latest_spatter_analysis
+from photo_ingest import processor as photo_processor, near_duplicates, stored_file, PHOTO_MAX_AGE
+from storage import store as file_store
+import metrics
 kiri_service = KiriEngineService()
+scene_watcher = SceneWatcher(kiri_service)
 
 load_dotenv()
 
@@ -24,7 +51,8 @@ CORS(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'crimetryx-dev-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///crimetryx.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(os.getenv('DATABASE_URL', 'sqlite:///crimetryx.db'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
 app.config['MODELS_FOLDER'] = os.path.join(os.path.dirname(__file__), 'models_3d')
@@ -36,9 +64,11 @@ os.makedirs(app.config['MODELS_FOLDER'], exist_ok=True)
 
 # Initialize database
 db.init_app(app)
+metrics.init_app(app)
 
 with app.app_context():
     db.create_all()
+    ensure_search_schema(db.engine)
     # Create demo user if not exists
     if not User.query.filter_by(investigator_id='demo').first():
         demo_user = User(
@@ -50,17 +80,47 @@ with app.app_context():
         db.session.add(demo_user)
         db.session.commit()
 
+feed.configure(build_broker(app.config['SQLALCHEMY_DATABASE_URI']))
+feed.add_listener(response_cache.on_event)
+file_store.init_app(app)
+scene_watcher.start(app)
+pipeline_runner.init_app(app)
+photo_processor.init_app(app)
+analysis_flight = SingleFlight()
+
 
 def generate_case_id():
     """Generate unique case ID."""
-    count = Case.query.count()
-    return f"CRX-{datetime.now().year}-{count + 1:04d}"
+    return next_case_id()
 
 
 def generate_evidence_id(case_id):
     """Generate unique evidence ID for a case."""
-    count = Evidence.query.filter_by(case_id=case_id).count()
-    return f"E-{count + 1:03d}"
+    return next_evidence_id(case_id)
+
+
+def link_suspects(case, suspect_ids):
+    """Link a case to suspects by suspect ID, creating unknown suspects."""
+    existing = {s.suspect_id: s for s in Suspect.query.filter(Suspect.suspect_id.in_(suspect_ids)).all()}
+    suspects = []
+    for suspect_id in suspect_ids:
+        if suspect_id not in existing:
+            existing[suspect_id] = Suspect(suspect_id=suspect_id)
+            db.session.add(existing[suspect_id])
+        suspects.append(existing[suspect_id])
+    case.suspects = suspects
+
+
+def requesting_investigator(data=None):
+    """Investigator behind a request, for per-investigator quotas."""
+    return request.headers.get('X-Investigator-Id') or (data or {}).get('requested_by')
+
+
+def quota_exceeded(error):
+    """429 response for a used-up analysis quota."""
+    response = jsonify({'error': str(error), 'scope': error.scope, 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
 
 
 # =============================================================================
@@ -97,8 +157,7 @@ def login():
 @app.route('/api/cases', methods=['GET'])
 def get_cases():
     """Get all cases."""
-    cases = Case.query.order_by(Case.created_at.desc()).all()
-    return jsonify([case.to_dict() for case in cases])
+    return cached_json('cases', cases_version(), cases_json)
 
 
 @app.route('/api/cases', methods=['POST'])
@@ -111,11 +170,19 @@ def create_case():
         location=data.get('location', ''),
         date=datetime.strptime(data.get('date'), '%Y-%m-%d').date() if data.get('date') else datetime.now().date(),
         investigator=data.get('investigator', ''),
-        status='active'
+        status='active',
+        crime_type=data.get('crime_type'),
+        mo_patterns=json.dumps(data.get('mo_patterns', []))
     )
+    if data.get('suspects'):
+        link_suspects(case, data['suspects'])
     
     db.session.add(case)
     db.session.commit()
+    network_graph.refresh_case(case.id)
+    similarity_index.refresh_case(case.id)
+    rescore_suspects([s.id for s in case.suspects])
+    feed.publish(case.id, 'case.created', case.to_dict())
     
     return jsonify(case.to_dict()), 201
 
@@ -123,12 +190,10 @@ def create_case():
 @app.route('/api/cases/<int:case_id>', methods=['GET'])
 def get_case(case_id):
     """Get a specific case with all details."""
-    case = Case.query.get_or_404(case_id)
-    case_data = case.to_dict()
-    case_data['evidence'] = [e.to_dict() for e in case.evidence]
-    case_data['agent_logs'] = [log.to_dict() for log in case.agent_logs]
-    case_data['hypotheses'] = [h.to_dict() for h in case.hypotheses]
-    return jsonify(case_data)
+    version = case_version(case_id)
+    if version is None:
+        return jsonify({'error': 'Case not found'}), 404
+    return cached_json('case', version, lambda: case_detail_json(case_id), case_id)
 
 
 @app.route('/api/cases/<int:case_id>', methods=['PUT'])
@@ -136,6 +201,7 @@ def update_case(case_id):
     """Update a case."""
     case = Case.query.get_or_404(case_id)
     data = request.get_json()
+    affected_suspects = {s.id for s in case.suspects}
     
     if 'location' in data:
         case.location = data['location']
@@ -143,8 +209,18 @@ def update_case(case_id):
         case.investigator = data['investigator']
     if 'status' in data:
         case.status = data['status']
+    if 'crime_type' in data:
+        case.crime_type = data['crime_type']
+    if 'mo_patterns' in data:
+        case.mo_patterns = json.dumps(data['mo_patterns'])
+    if 'suspects' in data:
+        link_suspects(case, data['suspects'])
     
     db.session.commit()
+    network_graph.refresh_case(case.id)
+    similarity_index.refresh_case(case.id)
+    rescore_suspects(list(affected_suspects | {s.id for s in case.suspects}))
+    feed.publish(case.id, 'case.updated', case.to_dict())
     return jsonify(case.to_dict())
 
 
@@ -152,11 +228,41 @@ def update_case(case_id):
 def delete_case(case_id):
     """Delete a case."""
     case = Case.query.get_or_404(case_id)
+    affected_suspects = [s.id for s in case.suspects]
+    payloads = case_blob_digests(case.id)
+    remove_case_documents(case.id)
+    file_store.release_case(case.id)
     db.session.delete(case)
+    release_scope(f'evidence:{case.id}')
     db.session.commit()
+    sweep_blobs(payloads)  # Agent log payloads no other case shares
+    network_graph.remove_case(case_id)
+    similarity_index.remove_case(case_id)
+    rescore_suspects(affected_suspects)
+    feed.publish(case_id, 'case.deleted', {'id': case_id})
     return jsonify({'success': True})
 
 
+@app.route('/api/cases/<int:case_id>/similar', methods=['GET'])
+def get_similar_cases(case_id):
+    """Find cases with similar evidence, layout and hypotheses."""
+    case = Case.query.get_or_404(case_id)
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    
+    result = get_similarity_index().similar(case.id, k)
+    if result is None:
+        return jsonify({'error': 'Case is not indexed yet'}), 404
+    
+    cases = {c.id: c for c in Case.query.filter(Case.id.in_([r['case_id'] for r in result['results']])).all()}
+    for r in result['results']:
+        match = cases.get(r['case_id'])
+        if match:
+            r.update(case_code=match.case_id, location=match.location,
+                     crime_type=match.crime_type, status=match.status)
+    result['case_id'] = case.id
+    return jsonify(result)
+
+
 # =============================================================================
 # Scene Upload & 3D Model Routes
 # =============================================================================
@@ -173,10 +279,17 @@ def upload_scene(case_id):
     if video.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    # Save video
-    filename = secure_filename(f"case_{case_id}_{video.filename}")
+    # Save video; raw scene videos are evidentiary originals, kept once reconstruction is done
+    filename = secure_filename(f"case_{case_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{video.filename}")
     video_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     video.save(video_path)
+    try:
+        file_store.put('uploads', filename, video_path, case_id=case.id, original=True,
+                       content_type=video.mimetype)
+    except ValueError as e:
+        os.remove(video_path)
+        return jsonify({'error': str(e)}), 409
+    video_path = file_store.path('uploads', filename)
     
     # Upload to KIRI Engine
     result = kiri_service.upload_video(video_path)
@@ -185,6 +298,8 @@ def upload_scene(case_id):
         case.scene_task_id = result['task_id']
         case.status = 'processing'
         db.session.commit()
+        feed.publish(case.id, 'scene.status', {'task_id': case.scene_task_id, 'status': 'queued'})
+        scene_watcher.watch(case.id)
         
         return jsonify({
             'success': True,
@@ -197,28 +312,9 @@ def upload_scene(case_id):
 
 @app.route('/api/cases/<int:case_id>/scene-status', methods=['GET'])
 def get_scene_status(case_id):
-    """Check scene processing status."""
+    """Check scene processing status once (live updates arrive on the case event stream)."""
     case = Case.query.get_or_404(case_id)
-    
-    if not case.scene_task_id:
-        return jsonify({'status': 'not_started'})
-    
-    result = kiri_service.check_status(case.scene_task_id)
-    
-    if result['success'] and result.get('status') == 'completed':
-        # Download and save model if ready
-        if result.get('download_url') and not case.scene_model_path:
-            model_filename = f"case_{case_id}_scene.gltf"
-            model_path = os.path.join(app.config['MODELS_FOLDER'], model_filename)
-            
-            download_result = kiri_service.download_model(result['download_url'], model_path)
-            
-            if download_result['success']:
-                case.scene_model_path = model_filename
-                case.status = 'ready'
-                db.session.commit()
-    
-    return jsonify(result)
+    return jsonify(scene_watcher.sync(case))
 
 
 @app.route('/api/cases/<int:case_id>/model', methods=['GET'])
@@ -229,11 +325,18 @@ def get_model(case_id):
     if not case.scene_model_path:
         return jsonify({'error': 'No model available'}), 404
     
-    return send_from_directory(
-        app.config['MODELS_FOLDER'],
-        case.scene_model_path,
-        mimetype='model/gltf+json'
-    )
+    # Same URL across re-uploads, so revalidate (send_file sets an ETag) rather than cache outright
+    path = file_store.path('models', case.scene_model_path)
+    if path is not None:
+        response = send_file(path, mimetype='model/gltf+json')
+    else:
+        response = send_from_directory(
+            app.config['MODELS_FOLDER'],
+            case.scene_model_path,
+            mimetype='model/gltf+json'
+        )
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 # =============================================================================
@@ -243,8 +346,52 @@ def get_model(case_id):
 @app.route('/api/cases/<int:case_id>/evidence', methods=['GET'])
 def get_evidence(case_id):
     """Get all evidence for a case."""
-    evidence = Evidence.query.filter_by(case_id=case_id).all()
-    return jsonify([e.to_dict() for e in evidence])
+    version = case_version(case_id)
+    if version is None:
+        return jsonify([])
+    return cached_json('evidence', version, lambda: evidence_json(case_id), case_id)
+
+
+def float_list_arg(name, count):
+    """Comma-separated floats from a query parameter, or None if absent."""
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    values = [float(v) for v in raw.split(',')]
+    if len(values) != count:
+        raise ValueError(f'{name} must have {count} comma-separated numbers')
+    return values
+
+
+@app.route('/api/cases/<int:case_id>/evidence/spatial', methods=['GET'])
+def get_evidence_spatial(case_id):
+    """
+    Evidence inside a view volume, clustered by distance for the 3D viewer.
+    
+    Query params: bbox (minx,miny,minz,maxx,maxy,maxz), frustum (6 planes as
+    24 numbers a,b,c,d with a*x+b*y+c*z+d >= 0 inside), camera (x,y,z), lod,
+    level (octree level to cluster at without a camera), type (comma list),
+    limit (most individual items).
+    """
+    version = case_version(case_id)
+    if version is None:
+        return jsonify({'error': 'Case not found'}), 404
+    try:
+        bbox = float_list_arg('bbox', 6)
+        frustum = float_list_arg('frustum', 24)
+        camera = float_list_arg('camera', 3)
+        lod = request.args.get('lod', DEFAULT_LOD, type=float)
+        level = min(max(request.args.get('level', DEFAULT_LEVEL, type=int), 0), OCTREE_BITS)
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 0), 10000)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    types = [t for t in request.args.get('type', '').split(',') if t]
+    
+    index = spatial_indexes.get(case_id, version)
+    result = spatial_query(index, Region(bbox, frustum), camera=camera, lod=lod, level=level,
+                           types=types, limit=limit)
+    result['case_id'] = case_id
+    return jsonify(result)
 
 
 @app.route('/api/cases/<int:case_id>/evidence', methods=['POST'])
@@ -252,21 +399,33 @@ def add_evidence(case_id):
     """Add evidence to a case."""
     Case.query.get_or_404(case_id)  # Verify case exists
     data = request.get_json()
+    try:
+        measurements = parse_measurements(data['measurements']) if data.get('measurements') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     evidence = Evidence(
         evidence_id=generate_evidence_id(case_id),
         case_id=case_id,
         evidence_type=data.get('type', 'unknown'),
-        x=data.get('x', 0),
-        y=data.get('y', 0),
-        z=data.get('z', 0),
+        x=float(data.get('x', 0)),
+        y=float(data.get('y', 0)),
+        z=float(data.get('z', 0)),
         notes=data.get('notes', ''),
-        created_by=data.get('created_by', 'unknown')
+        measurements=json.dumps(measurements) if measurements else None,
+        created_by=data.get('created_by', 'unknown'),
+        created_at=datetime.utcnow()  # Set before hashing so the hash covers it
     )
     evidence.generate_hash()
     
     db.session.add(evidence)
+    db.session.flush()
+    record_entry(case_id, 'evidence', evidence.id, evidence.hash, 'created')
+    index_evidence(evidence)
     db.session.commit()
+    network_graph.refresh_case(case_id)
+    similarity_index.refresh_case(case_id)
+    feed.publish(case_id, 'evidence.created', evidence.to_dict())
     
     return jsonify(evidence.to_dict()), 201
 
@@ -274,7 +433,7 @@ def add_evidence(case_id):
 @app.route('/api/cases/<int:case_id>/evidence/<int:evidence_db_id>', methods=['PUT'])
 def update_evidence(case_id, evidence_db_id):
     """Update evidence."""
-    evidence = Evidence.query.get_or_404(evidence_db_id)
+    evidence = Evidence.query.filter_by(id=evidence_db_id, case_id=case_id).first_or_404()
     data = request.get_json()
     
     if 'type' in data:
@@ -282,14 +441,25 @@ def update_evidence(case_id, evidence_db_id):
     if 'notes' in data:
         evidence.notes = data['notes']
     if 'x' in data:
-        evidence.x = data['x']
+        evidence.x = float(data['x'])
     if 'y' in data:
-        evidence.y = data['y']
+        evidence.y = float(data['y'])
     if 'z' in data:
-        evidence.z = data['z']
+        evidence.z = float(data['z'])
+    if 'measurements' in data:
+        try:
+            measurements = parse_measurements(data['measurements']) if data['measurements'] else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        evidence.measurements = json.dumps(measurements) if measurements else None
     
     evidence.generate_hash()  # Regenerate hash
+    record_entry(evidence.case_id, 'evidence', evidence.id, evidence.hash, 'updated')
+    index_evidence(evidence)
     db.session.commit()
+    network_graph.refresh_case(evidence.case_id)
+    similarity_index.refresh_case(evidence.case_id)
+    feed.publish(evidence.case_id, 'evidence.updated', evidence.to_dict())
     
     return jsonify(evidence.to_dict())
 
@@ -297,193 +467,477 @@ def update_evidence(case_id, evidence_db_id):
 @app.route('/api/cases/<int:case_id>/evidence/<int:evidence_db_id>', methods=['DELETE'])
 def delete_evidence(case_id, evidence_db_id):
     """Delete evidence."""
-    evidence = Evidence.query.get_or_404(evidence_db_id)
+    evidence = Evidence.query.filter_by(id=evidence_db_id, case_id=case_id).first_or_404()
+    record_entry(evidence.case_id, 'evidence', evidence.id, evidence.hash or '', 'deleted')
+    remove_document('evidence', evidence.id)
     db.session.delete(evidence)
     db.session.commit()
+    network_graph.refresh_case(case_id)
+    similarity_index.refresh_case(case_id)
+    feed.publish(case_id, 'evidence.deleted', {'id': evidence_db_id, 'evidence_id': evidence.evidence_id})
     return jsonify({'success': True})
 
 
+@app.route('/api/cases/<int:case_id>/spatter-analysis', methods=['GET'])
+def get_spatter_analysis(case_id):
+    """Latest stored bloodstain trajectory analysis for a case."""
+    Case.query.get_or_404(case_id)
+    analysis = SpatterAnalysis.query.filter_by(case_id=case_id).order_by(SpatterAnalysis.id.desc()).first()
+    if analysis is None:
+        return jsonify({'error': 'No spatter analysis yet'}), 404
+    return jsonify(analysis.to_dict())
+
+
+@app.route('/api/cases/<int:case_id>/spatter-analysis', methods=['POST'])
+def run_spatter_analysis(case_id):
+    """
+    Solve impact angles, area of convergence and area of origin from the
+    case's measured bloodstains. The stored result is returned (200) when
+    the measurements have not changed since it was computed.
+    """
+    case = Case.query.get_or_404(case_id)
+    latest_id = db.session.query(db.func.max(SpatterAnalysis.id)).filter_by(case_id=case_id).scalar()
+    analysis = latest_spatter_analysis(case)
+    if analysis is None:
+        return jsonify({'error': 'No evidence with stain measurements'}), 400
+    db.session.commit()
+    return jsonify(analysis.to_dict()), 200 if latest_id is not None and analysis.id <= latest_id else 201
+
+
+@app.route('/api/cases/<int:case_id>/photos', methods=['POST'])
+def upload_photos(case_id):
+    """
+    Upload a batch of evidence photos (multipart field `photos`, repeated).
+    
+    Optional form fields: evidence_id (database id of the evidence item the
+    photos show) and created_by. Originals are stored and hashed at once;
+    thumbnails and perceptual hashes follow in the background (photo.ready).
+    Files the case already has are returned with duplicate: true.
+    """
+    Case.query.get_or_404(case_id)
+    files = [f for f in request.files.getlist('photos') if f.filename]
+    if not files:
+        return jsonify({'error': 'No photos uploaded'}), 400
+    
+    evidence = None
+    if request.form.get('evidence_id'):
+        evidence = Evidence.query.filter_by(id=request.form.get('evidence_id', type=int), case_id=case_id).first()
+        if evidence is None:
+            return jsonify({'error': 'Evidence not found in this case'}), 400
+    
+    try:
+        results = photo_processor.ingest(case_id, files, evidence=evidence,
+                                         created_by=request.form.get('created_by'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify([dict(photo.to_dict(), duplicate=duplicate) for photo, duplicate in results]), 202
+
+
+@app.route('/api/cases/<int:case_id>/photos', methods=['GET'])
+def get_photos(case_id):
+    """Photos of a case, optionally only those of one evidence item (?evidence_id=)."""
+    Case.query.get_or_404(case_id)
+    query = EvidencePhoto.query.filter_by(case_id=case_id)
+    evidence_id = request.args.get('evidence_id', type=int)
+    if evidence_id is not None:
+        query = query.filter_by(evidence_db_id=evidence_id)
+    return jsonify([photo.to_dict() for photo in query.order_by(EvidencePhoto.id).all()])
+
+
+@app.route('/api/photos/<int:photo_id>', methods=['GET'])
+def get_photo(photo_id):
+    """A photo and its near-duplicates in the case (or every case with ?scope=all)."""
+    photo = EvidencePhoto.query.get_or_404(photo_id)
+    result = photo.to_dict()
+    result['near_duplicates'] = near_duplicates(photo, all_cases=request.args.get('scope') == 'all')
+    return jsonify(result)
+
+
 # =============================================================================
 # AI Agent Routes
 # =============================================================================
 
 @app.route('/api/cases/<int:case_id>/analyze', methods=['POST'])
 def run_analysis(case_id):
-    """Run full AI agent analysis on a case."""
+    """
+    Run full AI agent analysis on a case.
+    
+    Identical analyses requested while one is running share its result
+    (coalesced: true) instead of calling the agents again. An identical
+    analysis running in another process is answered with 409 and its run.
+    """
     case = Case.query.get_or_404(case_id)
-    evidence_list = [e.to_dict() for e in case.evidence]
-    
-    case_data = {
-        'case_id': case.case_id,
-        'location': case.location,
-        'date': case.date.isoformat() if case.date else None,
-        'has_3d_model': bool(case.scene_model_path)
-    }
-    
-    # Run full analysis
-    results = run_full_analysis(case_data, evidence_list)
-    
-    # Save agent logs
-    for agent_name, agent_result in results.get('agents', {}).items():
-        log = AgentLog(
-            case_id=case.id,
-            agent_type=agent_name,
-            status=agent_result.get('status', 'unknown'),
-            inputs=json.dumps(case_data),
-            reasoning=json.dumps(agent_result.get('output', {})),
-            outputs=json.dumps(agent_result.get('output', {})),
-            execution_time=agent_result.get('execution_time', 0)
-        )
-        log.generate_hash()
-        db.session.add(log)
-    
-    # Save hypotheses
-    for hypothesis in results.get('hypotheses', []):
-        h = Hypothesis(
-            case_id=case.id,
-            scenario_id=hypothesis.get('scenario_id', 'X'),
-            description=hypothesis.get('title', ''),
-            timeline=json.dumps(hypothesis.get('timeline', [])),
-            confidence=hypothesis.get('confidence', 0),
-            supporting_agents=json.dumps(hypothesis.get('supporting_evidence', [])),
-            contradictions=json.dumps(hypothesis.get('contradictions', []))
-        )
-        db.session.add(h)
+    investigator = requesting_investigator()
+    fingerprint = run_fingerprint(case, AGENT_TYPES, force=True)
+    try:
+        results, shared = analysis_flight.do((case.id, fingerprint),
+                                             lambda: analyze_case(case, investigator, fingerprint),
+                                             timeout=ANALYSIS_WAIT_TIMEOUT)
+    except QuotaExceeded as e:
+        return quota_exceeded(e)
+    except RunInProgress as e:
+        return jsonify({'error': str(e), 'run': e.run.to_dict()}), 409
+    except WaitTimeout as e:
+        response = jsonify({'error': f'Identical analysis still running: {e}'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    return jsonify(dict(results, coalesced=shared))
+
+
+def analyze_case(case, investigator=None, fingerprint=None):
+    """
+    Run every agent on a case, store the logs and hypotheses, and record the run for quotas.
     
-    case.status = 'analyzed'
+    Stages go through run_stage without reuse, so every log carries its
+    input fingerprint and decision like those of pipeline runs.
+    """
+    active = active_run(case.id, fingerprint) if fingerprint else None
+    if active is not None:
+        raise RunInProgress(active)
+    check_quota(case.id, investigator)
+    case_data, evidence_list = build_inputs(case)
+    run = PipelineRun(
+        case_id=case.id,
+        agents=json.dumps(AGENT_TYPES),
+        status='running',
+        stages=json.dumps([{'agent_type': agent_type, 'status': 'pending'} for agent_type in AGENT_TYPES]),
+        input_fingerprint=fingerprint,
+        requested_by=investigator,
+        created_at=datetime.utcnow(),
+        started_at=datetime.utcnow()
+    )
+    insert_run(run)
+    pipeline_runner.claim(run)
     db.session.commit()
     
-    return jsonify(results)
+    results = {'agents': {}, 'hypotheses': [], 'total_execution_time': 0}
+    started = time.time()
+    try:
+        feed.publish(case.id, 'analysis.started', {'agents': AGENT_TYPES})
+        
+        # Each stage stores its log and hypotheses; a failed timeline keeps the previous hypotheses
+        outputs, stages = {}, []
+        for agent_type in AGENT_TYPES:
+            result = run_stage(case, agent_type, case_data, evidence_list, outputs, run_id=run.id)
+            stages.append({'agent_type': agent_type, 'status': result.get('status'), 'decision': result['decision'],
+                           'agent_log_id': result.pop('agent_log_id'),
+                           'execution_time': result.get('execution_time', 0)})
+            results['agents'][agent_type] = result
+            if result.get('status') == 'error':
+                results['error'] = f'{agent_type} failed: {result.get("error")}'
+                break
+        if 'hypothesis_challenger' in results['agents']:
+            results['hypotheses'] = final_hypotheses(outputs.get('timeline_builder', {}).get('scenarios', []),
+                                                     results['agents']['hypothesis_challenger'])
+        results['total_execution_time'] = time.time() - started
+        
+        case.status = 'analyzed'
+        run.status = 'failed' if results.get('error') else 'completed'
+        run.error = results.get('error')
+        run.stages = json.dumps(stages)
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+        feed.publish(case.id, 'analysis.completed', {
+            'hypotheses': len(results.get('hypotheses', [])),
+            'error': results.get('error')
+        })
+        
+        return results
+    except Exception as e:
+        db.session.rollback()
+        run.status = 'failed'
+        run.error = str(e)
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+        raise
+    finally:
+        pipeline_runner.release(run.id)
 
 
 @app.route('/api/cases/<int:case_id>/agents/<agent_type>/run', methods=['POST'])
 def run_single_agent(case_id, agent_type):
     """Run a single agent on a case."""
     case = Case.query.get_or_404(case_id)
-    evidence_list = [e.to_dict() for e in case.evidence]
-    
-    # If no evidence in database, use demo evidence for analysis
-    if not evidence_list:
-        evidence_list = [
-            {
-                'evidence_id': 'E-001',
-                'type': 'bloodstain_spatter',
-                'x': 2.5, 'y': 0.1, 'z': -1.2,
-                'description': 'Impact spatter pattern on wall, 4ft height',
-                'notes': 'Medium velocity impact spatter consistent with blunt force'
-            },
-            {
-                'evidence_id': 'E-002',
-                'type': 'weapon_knife',
-                'x': -1.8, 'y': 0, 'z': 0.5,
-                'description': 'Kitchen knife, 6-inch blade, found on floor',
-                'notes': 'Partial fingerprints recovered, blood trace on blade'
-            },
-            {
-                'evidence_id': 'E-003',
-                'type': 'footprint',
-                'x': 0, 'y': 0, 'z': 2.1,
-                'description': 'Size 10 boot print in blood',
-                'notes': 'Pattern consistent with work boots, leading to exit'
-            },
-            {
-                'evidence_id': 'E-004',
-                'type': 'bloodstain_pool',
-                'x': 1.5, 'y': 0, 'z': -0.5,
-                'description': 'Blood pool, approximately 2ft diameter',
-                'notes': 'Primary scene, victim location at time of injury'
-            },
-            {
-                'evidence_id': 'E-005',
-                'type': 'fingerprint',
-                'x': -2.5, 'y': 1.2, 'z': -2.0,
-                'description': 'Latent fingerprint on window frame',
-                'notes': 'Clear ridge detail, possible suspect print'
-            }
-        ]
-    
-    case_data = {
-        'case_id': case.case_id,
-        'location': case.location or 'Residential Property - Master Bedroom',
-        'date': case.date.isoformat() if case.date else None,
-        'dimensions': {'width': 12, 'length': 10, 'height': 3}
-    }
-    
-    # Get previous agent outputs if needed
-    prev_logs = {log.agent_type: json.loads(log.outputs) if log.outputs else {} 
-                 for log in case.agent_logs}
-    
-    # Run appropriate agent
-    if agent_type == 'scene_interpreter':
-        result = scene_interpreter(case_data, evidence_list)
-    elif agent_type == 'evidence_reasoner':
-        scene_output = prev_logs.get('scene_interpreter', {})
-        result = evidence_reasoner(scene_output, evidence_list)
-    elif agent_type == 'timeline_builder':
-        scene_output = prev_logs.get('scene_interpreter', {})
-        evidence_output = prev_logs.get('evidence_reasoner', {})
-        result = timeline_builder(scene_output, evidence_output)
-        
-        # Save hypotheses/scenarios from timeline output
-        output = result.get('output', {})
-        scenarios = output.get('scenarios', [])
-        
-        # Clear previous hypotheses for this case
-        Hypothesis.query.filter_by(case_id=case.id).delete()
-        
-        for scenario in scenarios:
-            h = Hypothesis(
-                case_id=case.id,
-                scenario_id=scenario.get('scenario_id', 'X'),
-                description=scenario.get('title', scenario.get('description', 'Unknown scenario')),
-                timeline=json.dumps(scenario.get('timeline', [])),
-                confidence=scenario.get('confidence', 0.5),
-                supporting_agents=json.dumps(scenario.get('supporting_evidence', [])),
-                contradictions=json.dumps(scenario.get('contradictions', []))
-            )
-            db.session.add(h)
-        
-    elif agent_type == 'hypothesis_challenger':
-        scene_output = prev_logs.get('scene_interpreter', {})
-        evidence_output = prev_logs.get('evidence_reasoner', {})
-        timeline_output = prev_logs.get('timeline_builder', {})
-        scenarios = timeline_output.get('scenarios', [])
-        result = hypothesis_challenger(scenarios, scene_output, evidence_output)
-        
-        # Update hypothesis confidence based on challenger output
-        challenges = result.get('output', {}).get('challenges', [])
-        for challenge in challenges:
-            scenario_id = challenge.get('scenario_id')
-            if scenario_id:
-                h = Hypothesis.query.filter_by(case_id=case.id, scenario_id=scenario_id).first()
-                if h:
-                    h.confidence = challenge.get('revised_confidence', h.confidence)
-                    h.contradictions = json.dumps(challenge.get('contradictions', []))
-    else:
+    if agent_type not in AGENT_TYPES:
         return jsonify({'error': 'Unknown agent type'}), 400
+    case_data, evidence_list = build_inputs(case, demo=True)
+    result = run_stage(case, agent_type, case_data, evidence_list, stored_outputs(case))
+    result.pop('agent_log_id', None)
     
-    # Save log
-    log = AgentLog(
-        case_id=case.id,
-        agent_type=agent_type,
-        status=result.get('status', 'unknown'),
-        inputs=json.dumps(case_data),
-        reasoning=json.dumps(result.get('output', {})),
-        outputs=json.dumps(result.get('output', {})),
-        execution_time=result.get('execution_time', 0)
-    )
-    log.generate_hash()
-    db.session.add(log)
-    db.session.commit()
+    return jsonify(result)
+
+
+@app.route('/api/cases/<int:case_id>/pipeline-runs', methods=['POST'])
+def create_pipeline_run(case_id):
+    """
+    Start a server-side run of an ordered list of agents (all agents by default).
+    
+    Agents whose inputs are unchanged since their last completed run are
+    reused rather than run again, unless force is set. If an identical run
+    is already queued or running, it is returned with 200 instead of 202.
+    """
+    case = Case.query.get_or_404(case_id)
+    data = request.get_json(silent=True) or {}
+    agents = data.get('agents') or AGENT_TYPES
     
+    if not isinstance(agents, list) or any(agent_type not in AGENT_TYPES for agent_type in agents):
+        return jsonify({'error': f'agents must be a list of: {", ".join(AGENT_TYPES)}'}), 400
+    if len(set(agents)) != len(agents):
+        return jsonify({'error': 'Each agent may only appear once per run'}), 400
+    
+    try:
+        run, coalesced = pipeline_runner.start(case, agents, requested_by=requesting_investigator(data),
+                                               force=bool(data.get('force')))
+    except QuotaExceeded as e:
+        return quota_exceeded(e)
+    return jsonify(dict(run.to_dict(), coalesced=coalesced)), 200 if coalesced else 202
+
+
+@app.route('/api/cases/<int:case_id>/pipeline-runs', methods=['GET'])
+def get_pipeline_runs(case_id):
+    """Recent pipeline runs for a case, newest first."""
+    Case.query.get_or_404(case_id)
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    runs = PipelineRun.query.filter_by(case_id=case_id).order_by(PipelineRun.id.desc()).limit(limit).all()
+    return jsonify([run.to_dict() for run in runs])
+
+
+@app.route('/api/pipeline-runs/<int:run_id>', methods=['GET'])
+def get_pipeline_run(run_id):
+    """A pipeline run with the output of every finished stage."""
+    run = PipelineRun.query.get_or_404(run_id)
+    result = run.to_dict()
+    log_ids = [stage['agent_log_id'] for stage in result['stages'] if stage.get('agent_log_id')]
+    logs = {log.id: log for log in AgentLog.query.filter(AgentLog.id.in_(log_ids)).all()} if log_ids else {}
+    for stage in result['stages']:
+        log = logs.get(stage.get('agent_log_id'))
+        if log is not None:
+            stage['output'] = json.loads(log.payload('outputs') or '{}')
     return jsonify(result)
 
 
 @app.route('/api/cases/<int:case_id>/agent-logs', methods=['GET'])
 def get_agent_logs(case_id):
     """Get all agent logs for a case."""
-    logs = AgentLog.query.filter_by(case_id=case_id).order_by(AgentLog.created_at).all()
-    return jsonify([log.to_dict() for log in logs])
+    version = case_version(case_id)
+    if version is None:
+        return jsonify([])
+    return cached_json('agent_logs', version, lambda: agent_logs_json(case_id), case_id)
+
+
+# =============================================================================
+# Search
+# =============================================================================
+
+@app.route('/api/search', methods=['GET'])
+def search_documents():
+    """
+    Full-text search over evidence notes, hypotheses and agent findings.
+    
+    Query params: q (words, "phrases", prefix*), status, evidence_type,
+    type (evidence/hypothesis/agent_log), case_id, offset, limit.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    
+    result = search(
+        query,
+        case_status=request.args.get('status'),
+        evidence_type=request.args.get('evidence_type'),
+        doc_type=request.args.get('type'),
+        case_id=request.args.get('case_id', type=int),
+        offset=max(request.args.get('offset', 0, type=int), 0),
+        limit=min(max(request.args.get('limit', 20, type=int), 1), 100)
+    )
+    return jsonify(result)
+
+
+# =============================================================================
+# Chain of Custody Ledger
+# =============================================================================
+
+@app.route('/api/cases/<int:case_id>/ledger', methods=['GET'])
+def get_case_ledger(case_id):
+    """Get the current Merkle root of a case ledger."""
+    Case.query.get_or_404(case_id)
+    ledger = CaseLedger.query.filter_by(case_id=case_id).first()
+    if not ledger:
+        return jsonify({'case_id': case_id, 'size': 0, 'root': None, 'updated_at': None})
+    return jsonify(ledger.to_dict())
+
+
+@app.route('/api/cases/<int:case_id>/ledger/proof/<int:leaf_index>', methods=['GET'])
+def get_ledger_proof(case_id, leaf_index):
+    """Get an inclusion proof for a ledger entry."""
+    proof = get_inclusion_proof(case_id, leaf_index)
+    if proof is None:
+        return jsonify({'error': 'Ledger entry not found'}), 404
+    return jsonify(proof)
+
+
+@app.route('/api/ledger/verify', methods=['POST'])
+def verify_ledgers():
+    """Audit ledgers for the given cases, or all cases if none are given."""
+    data = request.get_json(silent=True) or {}
+    return jsonify(audit_ledgers(data.get('case_ids')))
+
+
+# =============================================================================
+# Suspects & Link Analysis Network
+# =============================================================================
+
+@app.route('/api/suspects', methods=['GET'])
+def get_suspects():
+    """Get all suspects (streamed; the list can be large)."""
+    return Response(stream_with_context(suspects_json()), mimetype='application/json')
+
+
+@app.route('/api/suspects', methods=['POST'])
+def create_suspect():
+    """Create a suspect."""
+    data = request.get_json()
+    
+    if not data.get('suspect_id'):
+        return jsonify({'error': 'suspect_id is required'}), 400
+    if Suspect.query.filter_by(suspect_id=data['suspect_id']).first():
+        return jsonify({'error': 'Suspect already exists'}), 409
+    
+    suspect = Suspect(
+        suspect_id=data['suspect_id'],
+        name=data.get('name'),
+        location=data.get('location'),
+        likely_weapon=data.get('likely_weapon'),
+        gang_affiliated=bool(data.get('gang_affiliated', False))
+    )
+    db.session.add(suspect)
+    db.session.commit()
+    rescore_suspects([suspect.id])
+    
+    return jsonify(suspect.to_dict()), 201
+
+
+@app.route('/api/predictions', methods=['GET'])
+def get_predictions():
+    """
+    Get suspects ranked by precomputed risk score.
+    
+    Query params: crime_type, risk_level (Low/Medium/High), q (suspect ID or
+    location substring), offset, limit.
+    """
+    query = Suspect.query.filter(Suspect.risk_score.isnot(None))
+    
+    crime_type = request.args.get('crime_type')
+    if crime_type:
+        query = query.filter(Suspect.crime_type == crime_type)
+    
+    risk_level = request.args.get('risk_level')
+    if risk_level:
+        try:
+            lower, upper = risk_level_bounds(risk_level)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(Suspect.risk_score >= lower)
+        if upper is not None:
+            query = query.filter(Suspect.risk_score < upper)
+    
+    search = request.args.get('q')
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(db.or_(Suspect.suspect_id.ilike(pattern), Suspect.location.ilike(pattern)))
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    total = query.count()
+    suspects = query.order_by(Suspect.risk_score.desc(), Suspect.id).offset(offset).limit(limit).all()
+    
+    return jsonify({
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'items': [s.to_dict() for s in suspects]
+    })
+
+
+@app.route('/api/network/stats', methods=['GET'])
+def get_network_stats():
+    """Get node/edge counts and the graph version."""
+    return jsonify(dict(get_graph().stats(), relations=RELATIONS))
+
+
+@app.route('/api/network/nodes', methods=['GET'])
+def get_network_nodes():
+    """List or search network nodes."""
+    result = get_graph().search_nodes(
+        node_type=request.args.get('type'),
+        query=request.args.get('q'),
+        offset=request.args.get('offset', 0, type=int),
+        limit=min(request.args.get('limit', 50, type=int), 1000)
+    )
+    return jsonify(result)
+
+
+@app.route('/api/network/neighbors', methods=['GET'])
+def get_network_neighbors():
+    """Paginated neighbourhood of a node, strongest links first."""
+    result = get_graph().neighbors(
+        request.args.get('node', ''),
+        relation=request.args.get('relation'),
+        offset=request.args.get('offset', 0, type=int),
+        limit=min(request.args.get('limit', 50, type=int), 1000)
+    )
+    if result is None:
+        return jsonify({'error': 'Node not found'}), 404
+    return jsonify(result)
+
+
+@app.route('/api/network/khop', methods=['GET'])
+def get_network_khop():
+    """Nodes within k hops of a node."""
+    result = get_graph().k_hop(
+        request.args.get('node', ''),
+        k=min(request.args.get('k', 2, type=int), 6),
+        limit=min(request.args.get('limit', 500, type=int), 10000)
+    )
+    if result is None:
+        return jsonify({'error': 'Node not found'}), 404
+    return jsonify(result)
+
+
+@app.route('/api/network/path', methods=['GET'])
+def get_network_path():
+    """Shortest path between two nodes."""
+    result = get_graph().shortest_path(
+        request.args.get('from', ''),
+        request.args.get('to', ''),
+        max_depth=min(request.args.get('max_depth', 6, type=int), 12)
+    )
+    if result is None:
+        return jsonify({'error': 'Node not found'}), 404
+    return jsonify(result)
+
+
+@app.route('/api/network/layout', methods=['GET'])
+def get_network_layout():
+    """Layout status; starts a background recompute if the graph changed."""
+    return jsonify(layout_cache.status())
+
+
+@app.route('/api/network/layout/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_network_tile(z, x, y):
+    """Nodes or clusters inside one layout tile."""
+    if z > MORTON_BITS or x >= (1 << z) or y >= (1 << z):
+        return jsonify({'error': 'Tile out of range'}), 400
+    
+    snapshot = layout_cache.refresh()
+    if snapshot is None:
+        return jsonify({'status': 'computing'}), 202
+    
+    return jsonify(layout_tile(
+        snapshot, z, x, y,
+        node_type=request.args.get('type'),
+        max_nodes=min(request.args.get('max_nodes', 1500, type=int), 5000)
+    ))
 
 
 # =============================================================================
@@ -496,16 +950,50 @@ def generate_report(case_id):
     from report_generator import generate_case_report
     
     case = Case.query.get_or_404(case_id)
-    report_path = generate_case_report(case)
+    with metrics.REPORT_RENDER_SECONDS.time():
+        report_path = generate_case_report(case)
+    filename = os.path.basename(report_path)
+    file_store.put('reports', filename, report_path, case_id=case.id, content_type='application/pdf')
+    feed.publish(case.id, 'report.ready', {'filename': filename})
     
     return send_file(
-        report_path,
+        file_store.path('reports', filename),
         mimetype='application/pdf',
         as_attachment=True,
         download_name=f'CrimetryxAI_Report_{case.case_id}.pdf'
     )
 
 
+# =============================================================================
+# Change Feed (Server-Sent Events)
+# =============================================================================
+
+def event_stream(case_id=None):
+    """SSE response for a case (or all cases), resuming after Last-Event-ID."""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscription = feed.subscribe(case_id, int(last_event_id) if str(last_event_id or '').isdigit() else None)
+    return Response(
+        stream_with_context(feed.stream(subscription)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/cases/<int:case_id>/events', methods=['GET'])
+def get_case_events(case_id):
+    """Stream evidence, agent, scene and report events for a case."""
+    case = Case.query.get_or_404(case_id)
+    if case.status == 'processing' and case.scene_task_id:
+        scene_watcher.watch(case.id)
+    return event_stream(case.id)
+
+
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    """Stream events for all cases."""
+    return event_stream()
+
+
 # =============================================================================
 # Static Files (for serving 3D models and uploads)
 # =============================================================================
@@ -517,7 +1005,51 @@ def serve_upload(filename):
 
 @app.route('/models/<path:filename>')
 def serve_model(filename):
-    return send_from_directory(app.config['MODELS_FOLDER'], filename)
+    # Model files are never rewritten in place, so browsers may keep them indefinitely
+    path = file_store.path('models', filename)
+    if path is not None:
+        response = send_file(path, max_age=MODEL_MAX_AGE, download_name=filename)
+    else:
+        response = send_from_directory(app.config['MODELS_FOLDER'], filename, max_age=MODEL_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={MODEL_MAX_AGE}, immutable'
+    return response
+
+
+@app.route('/photos/<sha256>/<variant>')
+def serve_photo(sha256, variant):
+    # Photo files are addressed by content hash, so they never change
+    location = stored_file(sha256, variant)
+    if location is None:
+        return jsonify({'error': 'Not found'}), 404
+    response = send_from_directory(location[0], location[1], max_age=PHOTO_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={PHOTO_MAX_AGE}, immutable'
+    return response
+
+
+# =============================================================================
+# Storage
+# =============================================================================
+
+@app.route('/api/storage', methods=['GET'])
+def get_storage_usage():
+    """Stored bytes per tier and per namespace."""
+    return jsonify(file_store.usage())
+
+
+@app.route('/api/storage/sweep', methods=['POST'])
+def sweep_storage():
+    """Apply retention and tiering now instead of waiting for the background sweep."""
+    return jsonify(file_store.sweep())
+
+
+# =============================================================================
+# Metrics
+# =============================================================================
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this worker."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 # =============================================================================
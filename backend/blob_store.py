@@ -0,0 +1,236 @@
+"""
+Crimetryx AI - Blob Store
+Content-addressed, compressed storage for agent log payloads.
+
+Payloads are keyed by the SHA-256 of their text, so identical inputs across
+runs (and the identical reasoning/outputs of a single run) are stored once.
+Blobs are compressed with zstd when the zstandard package is available and
+zlib otherwise; the codec is recorded per blob so either can be read back.
+
+Decoded payloads are cached in memory only once the transaction that wrote
+them has committed, so a rolled-back write is never served from the cache.
+Deleting a case deletes its agent logs; sweep_blobs then removes payloads no
+log refers to any more.
+
+Usage:
+    python blob_store.py backfill [--batch-size 500]   Move legacy text columns into blobs
+    python blob_store.py sweep                         Delete blobs no agent log refers to
+"""
+
+import os
+import sys
+import zlib
+import hashlib
+import argparse
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Blob, AgentLog
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback keeps the store usable without the extra
+    zstandard = None
+
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+MIN_COMPRESS_SIZE = 64  # Bytes; smaller payloads are stored raw
+CACHE_SIZE = 1024  # Decoded blobs kept in memory (blobs are immutable)
+SWEEP_GRACE = int(os.getenv('BLOB_SWEEP_GRACE', '3600'))  # Seconds; younger blobs may belong to an open transaction
+REF_COLUMNS = (AgentLog.inputs_ref, AgentLog.reasoning_ref, AgentLog.outputs_ref)
+
+_cache = OrderedDict()
+_cache_lock = Lock()
+
+
+def blob_digest(text: str) -> str:
+    """Content address of a payload."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def encode(raw: bytes) -> tuple:
+    """Compress raw bytes, returning (codec, data)."""
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return 'raw', raw
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return 'zlib', zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decode(codec: str, data: bytes) -> str:
+    """Decompress blob data back to text."""
+    if codec == 'raw':
+        raw = data
+    elif codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd blobs')
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f'Unknown blob codec: {codec}')
+    return bytes(raw).decode()
+
+
+def _remember(digest: str, text: str):
+    with _cache_lock:
+        _cache[digest] = text
+        _cache.move_to_end(digest)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _pending(session) -> dict:
+    """Payloads written in the session's open transaction, cached once it commits."""
+    return session.info.setdefault('pending_blobs', {})
+
+
+@event.listens_for(db.session, 'after_commit')
+def _cache_committed(session):
+    for digest, text in session.info.pop('pending_blobs', {}).items():
+        _remember(digest, text)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_rolled_back(session, previous_transaction):
+    session.info.pop('pending_blobs', None)
+
+
+def _insert_ignore(values: dict):
+    """INSERT ... ON CONFLICT DO NOTHING so concurrent writers can race safely."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        if db.session.get(Blob, values['digest']) is None:
+            db.session.add(Blob(**values))
+        return
+    db.session.execute(insert(Blob).values(**values).on_conflict_do_nothing(index_elements=['digest']))
+
+
+def put_blob(text: str) -> str:
+    """
+    Store a payload if it isn't already present.
+
+    Returns:
+        The payload's digest, or None for a None payload
+    """
+    if text is None:
+        return None
+    raw = text.encode()
+    digest = hashlib.sha256(raw).hexdigest()
+    codec, data = encode(raw)
+    _insert_ignore({'digest': digest, 'codec': codec, 'size': len(raw), 'data': data})
+    _pending(db.session)[digest] = text
+    return digest
+
+
+def get_blob(digest: str) -> str:
+    """Load and decode a payload by digest."""
+    if digest is None:
+        return None
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+    blob = db.session.get(Blob, digest)
+    if blob is None:
+        raise KeyError(f'Blob {digest} not found')
+    text = decode(blob.codec, blob.data)
+    if digest not in _pending(db.session):
+        _remember(digest, text)
+    return text
+
+
+def case_blob_digests(case_id: int) -> set:
+    """Digests of the payloads of a case's agent logs (collect before deleting the case)."""
+    digests = set()
+    for refs in db.session.query(*REF_COLUMNS).filter(AgentLog.case_id == case_id):
+        digests.update(ref for ref in refs if ref)
+    return digests
+
+
+def sweep_blobs(digests=None, now: datetime = None, batch_size: int = 1000) -> dict:
+    """
+    Delete blobs that no agent log refers to, committing per batch.
+
+    With digests, only those are considered, whatever their age (the
+    payloads of logs just deleted). Otherwise every blob older than
+    SWEEP_GRACE is, so payloads of logs not yet committed are left alone.
+    A blob that a concurrent write starts referring to is kept: the delete
+    re-checks the references and the foreign keys reject it.
+
+    Returns:
+        dict with the number of blobs and bytes deleted
+    """
+    now = now or datetime.utcnow()
+    unreferenced = [~db.exists().where(column == Blob.digest) for column in REF_COLUMNS]
+    if digests is not None:
+        candidates = sorted(digests)
+    else:
+        candidates = db.session.execute(
+            db.select(Blob.digest).where(Blob.created_at < now - timedelta(seconds=SWEEP_GRACE), *unreferenced)
+            .order_by(Blob.digest)
+        ).scalars().all()
+
+    summary = {'deleted': 0, 'deleted_bytes': 0}
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        condition = db.and_(Blob.digest.in_(batch), *unreferenced)
+        try:
+            deleted = db.session.execute(db.select(Blob.digest, Blob.size).where(condition)).all()
+            db.session.execute(db.delete(Blob).where(condition).execution_options(synchronize_session=False))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            continue
+        with _cache_lock:
+            for digest, _ in deleted:
+                _cache.pop(digest, None)
+        summary['deleted'] += len(deleted)
+        summary['deleted_bytes'] += sum(size for _, size in deleted)
+    return summary
+
+
+def backfill_agent_logs(batch_size: int = 500) -> int:
+    """Move legacy inline agent log payloads into the blob store."""
+    moved = 0
+    while True:
+        logs = AgentLog.query.filter(
+            db.or_(AgentLog.inputs.isnot(None), AgentLog.reasoning.isnot(None), AgentLog.outputs.isnot(None))
+        ).order_by(AgentLog.id).limit(batch_size).all()
+        if not logs:
+            return moved
+        for log in logs:
+            # Hash is over the text, so it is unchanged by the move
+            log.store_payloads(log.inputs, log.reasoning, log.outputs)
+        db.session.commit()
+        moved += len(logs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Agent log blob store maintenance.')
+    parser.add_argument('command', choices=['backfill', 'sweep'])
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        if args.command == 'sweep':
+            summary = sweep_blobs(batch_size=args.batch_size)
+            print(f"Deleted {summary['deleted']} unreferenced blobs ({summary['deleted_bytes']} bytes)")
+            return 0
+        moved = backfill_agent_logs(args.batch_size)
+    print(f'Moved {moved} agent logs into the blob store')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
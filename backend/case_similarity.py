@@ -0,0 +1,393 @@
+"""
+Crimetryx AI - Case Similarity Index
+"Find cases like this one" over local case features, without the LLM.
+
+Each case becomes one vector built from three L2-normalized blocks:
+  - evidence-type histogram (what was found)
+  - spatial signature: radial and pairwise distance histograms of the
+    evidence layout (how it was arranged; translation/rotation invariant)
+  - hashed text embedding of hypotheses, crime type and MO patterns
+Blocks are scaled by the square root of their weight, so the cosine of two
+case vectors with all three blocks present is the weighted sum of the
+per-block cosines.
+
+Vectors live in memory with a random-hyperplane LSH index (several tables of
+short signatures, probed with one-bit flips). Candidates are re-ranked by the
+exact cosine. Case writes update one row and its buckets in place.
+
+Each process holds its own index. Like the link graph, get_index() checks
+the case count and latest cases.updated_at at most every
+CASE_SIMILARITY_SYNC_INTERVAL seconds and recomputes the cases other
+processes changed or deleted since its last check.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+import numpy as np
+
+from models import db, Case, Evidence, Hypothesis
+
+EVIDENCE_TYPES = [
+    'bloodstain_spatter', 'bloodstain_pool', 'bloodstain_transfer', 'bloodstain_cast_off',
+    'weapon_knife', 'weapon_firearm', 'weapon_blunt', 'shell_casing',
+    'fingerprint', 'footprint', 'fiber', 'document', 'drug_paraphernalia',
+    'cigarette', 'photo_marker', 'other'
+]
+EVIDENCE_INDEX = {name: i for i, name in enumerate(EVIDENCE_TYPES)}
+DISTANCE_BINS = np.array([0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0])  # Metres; 8 bins incl. overflow
+MAX_PAIRWISE_POINTS = 200  # Evidence items sampled for the pairwise histogram
+TEXT_DIM = 128
+
+BLOCK_WEIGHTS = {'evidence': 0.40, 'spatial': 0.25, 'text': 0.35}
+EVIDENCE_DIM = len(EVIDENCE_TYPES) + 1  # + item count
+SPATIAL_DIM = 2 * (len(DISTANCE_BINS) + 1)
+BLOCKS = {
+    'evidence': slice(0, EVIDENCE_DIM),
+    'spatial': slice(EVIDENCE_DIM, EVIDENCE_DIM + SPATIAL_DIM),
+    'text': slice(EVIDENCE_DIM + SPATIAL_DIM, EVIDENCE_DIM + SPATIAL_DIM + TEXT_DIM),
+}
+DIM = EVIDENCE_DIM + SPATIAL_DIM + TEXT_DIM
+
+LSH_TABLES = 8
+LSH_BITS = 12
+BRUTE_FORCE_MAX = 4096  # Below this many cases an exact scan is faster than probing
+LSH_SEED = 20240601
+SYNC_INTERVAL = float(os.getenv('CASE_SIMILARITY_SYNC_INTERVAL', '2'))  # Seconds between database version checks
+
+_TOKEN_RE = re.compile(r'[a-z0-9]{3,}')
+
+
+# =============================================================================
+# Feature extraction
+# =============================================================================
+
+def _normalize(block: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(block)
+    return block / norm if norm > 0 else block
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / denominator) if denominator > 0 else 0.0
+
+
+def evidence_histogram(evidence_types: list) -> np.ndarray:
+    """Evidence-type proportions plus a log item count."""
+    counts = np.zeros(EVIDENCE_DIM, dtype=np.float32)
+    for evidence_type in evidence_types:
+        counts[EVIDENCE_INDEX.get(evidence_type, EVIDENCE_INDEX['other'])] += 1
+    if evidence_types:
+        counts[:-1] /= len(evidence_types)
+        counts[-1] = np.log1p(len(evidence_types)) / 4.0
+    return counts
+
+
+def spatial_signature(points: np.ndarray) -> np.ndarray:
+    """Histograms of distances from the centroid and between items."""
+    signature = np.zeros(SPATIAL_DIM, dtype=np.float32)
+    if len(points) == 0:
+        return signature
+    n_bins = len(DISTANCE_BINS) + 1
+    radial = np.linalg.norm(points - points.mean(axis=0), axis=1)
+    signature[:n_bins] = np.bincount(np.digitize(radial, DISTANCE_BINS), minlength=n_bins) / len(points)
+    if len(points) > 1:
+        sample = points[:MAX_PAIRWISE_POINTS]
+        i, j = np.triu_indices(len(sample), k=1)
+        pairwise = np.linalg.norm(sample[i] - sample[j], axis=1)
+        signature[n_bins:] = np.bincount(np.digitize(pairwise, DISTANCE_BINS), minlength=n_bins) / len(pairwise)
+    return signature
+
+
+def text_embedding(texts: list) -> np.ndarray:
+    """
+    Signed feature-hashing embedding of unigrams and bigrams.
+
+    Deterministic and dependency-free; similar wording lands on the same
+    dimensions across cases and processes.
+    """
+    vector = np.zeros(TEXT_DIM, dtype=np.float32)
+    counts = {}
+    for text in texts:
+        tokens = _TOKEN_RE.findall((text or '').lower())
+        for term in tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]:
+            counts[term] = counts.get(term, 0) + 1
+    for term, count in counts.items():
+        digest = hashlib.md5(term.encode()).digest()
+        index = int.from_bytes(digest[:4], 'little') % TEXT_DIM
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign * (1.0 + np.log(count))
+    return vector
+
+
+def case_vector(evidence_types: list, points, texts: list) -> np.ndarray:
+    """Combined, weighted case vector (unit length unless the case is empty)."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    vector = np.empty(DIM, dtype=np.float32)
+    vector[BLOCKS['evidence']] = _normalize(evidence_histogram(evidence_types)) * np.sqrt(BLOCK_WEIGHTS['evidence'])
+    vector[BLOCKS['spatial']] = _normalize(spatial_signature(points)) * np.sqrt(BLOCK_WEIGHTS['spatial'])
+    vector[BLOCKS['text']] = _normalize(text_embedding(texts)) * np.sqrt(BLOCK_WEIGHTS['text'])
+    return _normalize(vector)
+
+
+def case_texts(crime_type: str, mo_patterns: str, hypotheses: list) -> list:
+    """Text fed to the embedding: crime type, MO patterns and hypothesis descriptions."""
+    texts = [crime_type or '']
+    texts.extend(json.loads(mo_patterns) if mo_patterns else [])
+    texts.extend(hypotheses)
+    return texts
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+class SimilarityIndex:
+    """In-memory case vectors with a multi-table LSH index."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.version = 0
+        planes = np.random.default_rng(LSH_SEED).standard_normal((LSH_TABLES * LSH_BITS, DIM))
+        self._planes = planes.astype(np.float32)
+        self._bit_weights = (1 << np.arange(LSH_BITS)).astype(np.int64)
+        self._db_version = None
+        self._synced_at = None  # Latest cases.updated_at already applied
+        self._checked_at = 0.0
+        self._sync_lock = threading.Lock()
+        self._reset(0)
+
+    def _reset(self, capacity: int):
+        self._vectors = np.zeros((max(capacity, 64), DIM), dtype=np.float32)
+        self._case_ids = np.full(len(self._vectors), -1, dtype=np.int64)
+        self._signatures = np.zeros((len(self._vectors), LSH_TABLES), dtype=np.int64)
+        self._row_of = {}
+        self._free_rows = []
+        self._next_row = 0
+        self._buckets = [{} for _ in range(LSH_TABLES)]
+
+    def _signature(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH bucket per table for each vector, shape (n, tables)."""
+        bits = (vectors @ self._planes.T > 0).reshape(len(vectors), LSH_TABLES, LSH_BITS)
+        return bits @ self._bit_weights
+
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._next_row == len(self._vectors):
+            grow = len(self._vectors)
+            self._vectors = np.vstack([self._vectors, np.zeros((grow, DIM), dtype=np.float32)])
+            self._case_ids = np.concatenate([self._case_ids, np.full(grow, -1, dtype=np.int64)])
+            self._signatures = np.vstack([self._signatures, np.zeros((grow, LSH_TABLES), dtype=np.int64)])
+        self._next_row += 1
+        return self._next_row - 1
+
+    def _unbucket(self, row: int):
+        for table, signature in enumerate(self._signatures[row].tolist()):
+            bucket = self._buckets[table].get(signature)
+            if bucket is not None:
+                bucket.discard(row)
+                if not bucket:
+                    del self._buckets[table][signature]
+
+    def _bucket(self, row: int, signature: np.ndarray):
+        self._signatures[row] = signature
+        for table, value in enumerate(signature.tolist()):
+            self._buckets[table].setdefault(value, set()).add(row)
+
+    def set_case(self, case_id: int, vector: np.ndarray):
+        """Insert or replace one case's vector."""
+        with self._lock:
+            row = self._row_of.get(case_id)
+            if row is None:
+                row = self._allocate_row()
+                self._row_of[case_id] = row
+                self._case_ids[row] = case_id
+            else:
+                self._unbucket(row)
+            self._vectors[row] = vector
+            self._bucket(row, self._signature(vector[None, :])[0])
+            self.version += 1
+
+    def remove_case(self, case_id: int):
+        with self._lock:
+            row = self._row_of.pop(case_id, None)
+            if row is None:
+                return
+            self._unbucket(row)
+            self._vectors[row] = 0
+            self._case_ids[row] = -1
+            self._free_rows.append(row)
+            self.version += 1
+
+    def _db_state(self) -> tuple:
+        return db.session.execute(db.select(db.func.count(Case.id), db.func.max(Case.updated_at))).one()
+
+    def load(self):
+        """Build vectors for every case with a few bulk queries."""
+        state = tuple(self._db_state())
+        evidence_by_case = {}
+        for case_pk, evidence_type, x, y, z in db.session.query(
+                Evidence.case_id, Evidence.evidence_type, Evidence.x, Evidence.y, Evidence.z
+        ).order_by(Evidence.case_id, Evidence.id).yield_per(10000):
+            types, points = evidence_by_case.setdefault(case_pk, ([], []))
+            types.append(evidence_type)
+            points.append((x, y, z))
+
+        hypotheses_by_case = {}
+        for case_pk, description in db.session.query(Hypothesis.case_id, Hypothesis.description).yield_per(10000):
+            hypotheses_by_case.setdefault(case_pk, []).append(description)
+
+        case_ids, vectors = [], []
+        for case_pk, crime_type, mo_patterns in db.session.query(
+                Case.id, Case.crime_type, Case.mo_patterns).yield_per(5000):
+            types, points = evidence_by_case.get(case_pk, ([], []))
+            case_ids.append(case_pk)
+            vectors.append(case_vector(types, points, case_texts(
+                crime_type, mo_patterns, hypotheses_by_case.get(case_pk, []))))
+
+        with self._lock:
+            self._reset(len(case_ids) * 2)
+            if case_ids:
+                matrix = np.vstack(vectors)
+                signatures = self._signature(matrix)
+                for row, case_pk in enumerate(case_ids):
+                    self._vectors[row] = matrix[row]
+                    self._case_ids[row] = case_pk
+                    self._row_of[case_pk] = row
+                    self._bucket(row, signatures[row])
+                self._next_row = len(case_ids)
+            self.loaded = True
+            self.version += 1
+            self._db_version, self._synced_at = state, state[1]
+            self._checked_at = time.monotonic()
+
+    def refresh_case(self, case_id: int):
+        """Recompute one case's vector from the database."""
+        if not self.loaded:
+            return
+        case = db.session.get(Case, case_id)
+        if case is None:
+            self.remove_case(case_id)
+            return
+        evidence = db.session.query(Evidence.evidence_type, Evidence.x, Evidence.y, Evidence.z).filter(
+            Evidence.case_id == case_id).order_by(Evidence.id).all()
+        hypotheses = [row[0] for row in db.session.query(Hypothesis.description).filter(
+            Hypothesis.case_id == case_id)]
+        self.set_case(case_id, case_vector(
+            [row[0] for row in evidence], [row[1:] for row in evidence],
+            case_texts(case.crime_type, case.mo_patterns, hypotheses)
+        ))
+
+    def sync(self, force: bool = False):
+        """
+        Apply case changes committed by any process since the last check.
+
+        Cases updated since then are recomputed and deleted cases removed.
+        Checks run at most every SYNC_INTERVAL seconds unless forced; a check
+        already running in another thread is not waited for.
+        """
+        if not self.loaded or (not force and time.monotonic() - self._checked_at < SYNC_INTERVAL):
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            state = tuple(self._db_state())
+            if state == self._db_version:
+                return
+            query = db.select(Case.id)
+            if self._synced_at is not None:
+                query = query.where(Case.updated_at >= self._synced_at)
+            for case_id in db.session.execute(query).scalars().all():
+                self.refresh_case(case_id)
+            with self._lock:
+                indexed = set(self._row_of)
+            if state[0] != len(indexed):
+                existing = set(db.session.execute(db.select(Case.id)).scalars())
+                for case_id in indexed - existing:
+                    self.remove_case(case_id)
+            self._db_version, self._synced_at = state, state[1]
+        finally:
+            self._sync_lock.release()
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def _candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Rows sharing a bucket, or one bit away, in any table."""
+        rows = set()
+        flips = [0] + [1 << bit for bit in range(LSH_BITS)]
+        for table, value in enumerate(signature.tolist()):
+            buckets = self._buckets[table]
+            for flip in flips:
+                bucket = buckets.get(value ^ flip)
+                if bucket:
+                    rows.update(bucket)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def similar(self, case_id: int, k: int = 10) -> dict:
+        """
+        Top-k most similar cases to a case.
+
+        Returns:
+            Dict with results (case_id, similarity, per-block similarities),
+            whether the search was exact, and how many candidates were scored
+        """
+        with self._lock:
+            row = self._row_of.get(case_id)
+            if row is None:
+                return None
+            query = self._vectors[row]
+            exact = len(self._row_of) <= BRUTE_FORCE_MAX
+            if not exact:
+                rows = self._candidates(self._signatures[row])
+                if len(rows) <= k:
+                    exact = True
+            if exact:
+                rows = np.flatnonzero(self._case_ids[:self._next_row] >= 0)
+            rows = rows[rows != row]
+
+            scores = self._vectors[rows] @ query
+            top = np.argsort(-scores)[:k] if len(rows) > k else np.argsort(-scores)
+            results = []
+            for index in top.tolist():
+                other = self._vectors[rows[index]]
+                results.append({
+                    'case_id': int(self._case_ids[rows[index]]),
+                    'similarity': round(float(scores[index]), 4),
+                    'components': {
+                        name: round(_cosine(other[block], query[block]), 4) for name, block in BLOCKS.items()
+                    }
+                })
+            return {'results': results, 'exact': exact, 'candidates': int(len(rows)), 'version': self.version}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'cases': len(self._row_of),
+                'dimensions': DIM,
+                'tables': LSH_TABLES,
+                'bits': LSH_BITS,
+                'version': self.version
+            }
+
+
+index = SimilarityIndex()
+
+
+def get_index() -> SimilarityIndex:
+    """Return the process-wide index, loading it on first use and catching up with other processes after."""
+    if not index.loaded:
+        with index._lock:
+            if not index.loaded:
+                index.load()
+    else:
+        index.sync()
+    return index
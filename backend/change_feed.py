@@ -0,0 +1,244 @@
+"""
+Crimetryx AI - Change Feed
+Typed per-case events pushed to the frontend over Server-Sent Events.
+
+Writers publish events such as evidence.created or scene.status after they
+commit. The process-wide bus fans each event out to the subscribers of that
+case and to subscribers of all cases. It also keeps a short history per
+topic, so reconnecting clients can resume from their Last-Event-ID.
+
+Publishing goes through a broker. MemoryBroker delivers within the process,
+which is enough for a single worker. PostgresBroker relays events between
+workers with LISTEN/NOTIFY on the application database.
+Select it with CHANGE_FEED_BROKER=postgres.
+
+Event IDs are assigned by each worker's bus as it receives the event. If a
+client resumes on a worker that no longer has its Last-Event-ID in history,
+it gets a resync event and refetches.
+"""
+
+import os
+import json
+import time
+import queue
+import select
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = [
+    'case.created', 'case.updated', 'case.deleted',
+    'evidence.created', 'evidence.updated', 'evidence.deleted',
+    'analysis.started', 'analysis.completed',
+    'agent.started', 'agent.completed',
+    'pipeline.started', 'pipeline.completed',
+    'scene.status', 'scene.ready',
+    'report.ready',
+    'photo.ready',
+]
+ALL_CASES = '*'
+HISTORY_SIZE = 256  # Events kept per case for resuming
+GLOBAL_HISTORY_SIZE = 1024  # Events kept for all-case subscribers
+SUBSCRIBER_QUEUE_SIZE = 1000  # A subscriber this far behind is told to resync
+HEARTBEAT_SECONDS = 15
+NOTIFY_PAYLOAD_LIMIT = 7900  # PostgreSQL NOTIFY payloads must stay under 8000 bytes
+
+
+class MemoryBroker:
+    """Delivers published events to this process only."""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, message: dict):
+        self._deliver(message)
+
+
+class PostgresBroker:
+    """Relays published events to every worker through LISTEN/NOTIFY."""
+
+    CHANNEL = 'crimetryx_events'
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._publish_conn = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self):
+        import psycopg2
+        import psycopg2.extensions
+        connection = psycopg2.connect(self.dsn)
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return connection
+
+    def start(self, deliver):
+        threading.Thread(target=self._listen, args=(deliver,), name='change-feed-listener', daemon=True).start()
+
+    def _listen(self, deliver):
+        backoff = 1
+        while True:
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.CHANNEL}')
+                backoff = 1
+                while True:
+                    if select.select([connection], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        deliver(json.loads(connection.notifies.pop(0).payload))
+            except Exception as e:
+                logger.warning('Change feed listener disconnected: %s', e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def publish(self, message: dict):
+        payload = json.dumps(message, default=str)
+        if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+            # Too large to relay; subscribers refetch the resource instead
+            payload = json.dumps(dict(message, data=None, truncated=True), default=str)
+        with self._publish_lock:
+            try:
+                if self._publish_conn is None or self._publish_conn.closed:
+                    self._publish_conn = self._connect()
+                with self._publish_conn.cursor() as cursor:
+                    cursor.execute('SELECT pg_notify(%s, %s)', (self.CHANNEL, payload))
+            except Exception as e:
+                logger.warning('Change feed publish failed: %s', e)
+                self._publish_conn = None
+
+
+def build_broker(database_url: str):
+    """Broker selected by CHANGE_FEED_BROKER (memory or postgres)."""
+    kind = os.getenv('CHANGE_FEED_BROKER', 'memory').lower()
+    if kind == 'memory':
+        return MemoryBroker()
+    if kind == 'postgres':
+        from sqlalchemy.engine import make_url
+        url = make_url(database_url)
+        if url.get_backend_name() != 'postgresql':
+            raise ValueError('CHANGE_FEED_BROKER=postgres requires a PostgreSQL DATABASE_URL')
+        return PostgresBroker(url.set(drivername='postgresql').render_as_string(hide_password=False))
+    raise ValueError(f'Unknown CHANGE_FEED_BROKER: {kind}')
+
+
+class Subscription:
+    """One client's queue of pending events."""
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """In-process pub/sub bus with per-topic history."""
+
+    def __init__(self, broker=None):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._history = {}
+        self._listeners = []
+        self._next_id = 1
+        self.broker = None
+        self.configure(broker or MemoryBroker())
+
+    def configure(self, broker):
+        self.broker = broker
+        broker.start(self._deliver)
+
+    def add_listener(self, callback):
+        """Call callback(event) for every delivered event, in the delivering thread."""
+        self._listeners.append(callback)
+
+    def publish(self, case_id: int, event_type: str, data=None):
+        """Publish an event for a case. Call after the change has committed."""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f'Unknown event type: {event_type}')
+        self.broker.publish({
+            'case_id': case_id,
+            'type': event_type,
+            'data': data,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    def _deliver(self, message: dict):
+        with self._lock:
+            event = dict(message, id=self._next_id)
+            self._next_id += 1
+            for topic, size in ((event['case_id'], HISTORY_SIZE), (ALL_CASES, GLOBAL_HISTORY_SIZE)):
+                self._history.setdefault(topic, deque(maxlen=size)).append(event)
+            targets = list(self._subscribers.get(event['case_id'], ())) + list(self._subscribers.get(ALL_CASES, ()))
+        for callback in self._listeners:
+            callback(event)
+        for subscription in targets:
+            subscription.put(event)
+
+    def subscribe(self, case_id: int = None, last_event_id: int = None) -> Subscription:
+        """
+        Register a subscriber for one case (or all cases if case_id is None).
+
+        Events after last_event_id are replayed from history; if they have
+        already been dropped, a resync event is queued first.
+        """
+        topic = ALL_CASES if case_id is None else case_id
+        subscription = Subscription(topic)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+            if last_event_id is not None:
+                history = self._history.get(topic, deque())
+                # IDs are shared across topics, so only a full history can have dropped events
+                dropped = len(history) == history.maxlen and last_event_id < history[0]['id']
+                if dropped or last_event_id >= self._next_id:
+                    subscription.put({'id': self._next_id - 1, 'case_id': case_id, 'type': 'resync', 'data': None})
+                else:
+                    for event in history:
+                        if event['id'] > last_event_id:
+                            subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def stream(self, subscription: Subscription, heartbeat: float = HEARTBEAT_SECONDS):
+        """Yield Server-Sent Events for a subscription until the client goes away."""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                if subscription.overflowed:
+                    yield 'event: resync\ndata: null\n\n'
+                    return
+                try:
+                    event = subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'subscribers': sum(len(s) for s in self._subscribers.values()),
+                'last_event_id': self._next_id - 1,
+                'broker': type(self.broker).__name__
+            }
+
+
+feed = ChangeFeed()
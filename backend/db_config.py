@@ -0,0 +1,73 @@
+"""
+Crimetryx AI - Database Configuration
+Engine options and connection setup for the SQLite and Postgres profiles.
+"""
+
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def normalize_database_url(url: str) -> str:
+    """Accept the legacy postgres:// scheme used by some hosting providers."""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith('sqlite')
+
+
+def build_engine_options(url: str) -> dict:
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the environment.
+
+    Environment:
+        DB_POOL_SIZE: Persistent connections per worker (default 10)
+        DB_MAX_OVERFLOW: Extra connections allowed under burst (default 20)
+        DB_POOL_TIMEOUT: Seconds to wait for a free connection (default 30)
+        DB_POOL_RECYCLE: Seconds before a connection is recycled (default 1800)
+        DB_POOL_PRE_PING: Test connections before use (default true)
+        SQLITE_BUSY_TIMEOUT: Seconds SQLite waits on the writer lock (default 30)
+    """
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+
+    if is_sqlite(url):
+        options['connect_args'] = {
+            'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 30)),
+            'check_same_thread': False
+        }
+    else:
+        options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        })
+
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Enable WAL so readers don't block the single writer, and wait on locks."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    busy_timeout_ms = int(float(os.getenv('SQLITE_BUSY_TIMEOUT', 30)) * 1000)
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+    cursor.close()
@@ -0,0 +1,243 @@
+"""
+Crimetryx AI - Spatial Evidence Index
+Level-of-detail evidence queries for the 3D viewer.
+
+Each case's evidence positions are indexed as a sparse octree over the
+case's bounding cube: points are sorted by their 3D Z-order (Morton) code,
+so every octree cell is a contiguous slice found with two binary searches.
+Indexes are built on first use and cached against the case version
+(cases.updated_at), so any evidence change rebuilds them.
+
+A query walks the octree inside a bounding box and/or camera frustum. With
+a camera position, a cell whose size seen from the camera is below `lod`
+(cell size / distance) is returned as one cluster, so distant evidence
+collapses into aggregates and nearby evidence is returned item by item.
+Without a camera, cells are clustered at a fixed octree `level`. Cells with
+only a few items are never clustered, and once `limit` items have been
+returned the remaining cells are clustered, nearest cells first.
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import select
+
+from models import db, Evidence
+from serializers import EVIDENCE_COLUMNS, encode_evidence
+
+OCTREE_BITS = 10  # Finest cell is 1/1024 of the case's bounding cube per axis
+MIN_CLUSTER = 4  # Cells with this many items or fewer are returned item by item
+DEFAULT_LOD = 0.1  # Cluster cells smaller than this fraction of their distance to the camera
+DEFAULT_LEVEL = 3  # Octree level clustered at when no camera is given
+DEFAULT_LIMIT = 2000  # Most individual items per response
+MAX_CACHED_CASES = int(os.getenv('SPATIAL_INDEX_CASES', '64'))
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert two zero bits between each of the low 10 bits."""
+    v = values.astype(np.uint64) & np.uint64(0x3FF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x030000FF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x0300F00F)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x030C30C3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x09249249)
+    return v
+
+
+def morton_codes_3d(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Interleave integer cell coordinates (x in bit 0, y in bit 1, z in bit 2 of each triple)."""
+    return _spread_bits(x) | (_spread_bits(y) << np.uint64(1)) | (_spread_bits(z) << np.uint64(2))
+
+
+class SpatialIndex:
+    """Octree over one case's evidence positions."""
+
+    def __init__(self, version: str, rows: list):
+        self.version = version
+        self.rows = rows
+        n = len(rows)
+        positions = np.array([(row[4], row[5], row[6]) for row in rows], dtype=np.float64).reshape(n, 3)
+        types = [row[3] for row in rows]
+        self.type_names = sorted(set(types))
+        type_codes = np.array([self.type_names.index(t) for t in types], dtype=np.int32)
+
+        if n:
+            low, high = positions.min(axis=0), positions.max(axis=0)
+        else:
+            low = high = np.zeros(3)
+        self.size = max(float((high - low).max()), 1e-3) * 1.001
+        self.origin = (low + high) / 2 - self.size / 2
+
+        scale = (1 << OCTREE_BITS) - 1
+        cells = np.clip(((positions - self.origin) / self.size * scale).astype(np.int64), 0, scale)
+        codes = morton_codes_3d(cells[:, 0], cells[:, 1], cells[:, 2])
+        order = np.argsort(codes, kind='stable')
+        self.codes = codes[order]
+        self.order = order
+        self.positions = positions[order]
+        self.type_codes = type_codes[order]
+
+    def cell_bounds(self, depth: int, cell: tuple):
+        size = self.size / (1 << depth)
+        low = self.origin + np.array(cell, dtype=np.float64) * size
+        return low, low + size
+
+    def cell_slice(self, depth: int, prefix: int):
+        shift = np.uint64(3 * (OCTREE_BITS - depth))
+        lo = np.uint64(prefix) << shift
+        hi = np.uint64(prefix + 1) << shift
+        start, end = np.searchsorted(self.codes, [lo, hi])
+        return int(start), int(end)
+
+
+class Region:
+    """Query volume: an optional axis-aligned box and an optional frustum (planes facing inwards)."""
+
+    def __init__(self, bbox=None, planes=None):
+        self.bbox = None if bbox is None else (np.array(bbox[:3], dtype=np.float64), np.array(bbox[3:], dtype=np.float64))
+        self.planes = None if planes is None else np.array(planes, dtype=np.float64).reshape(-1, 4)
+
+    def intersects(self, low: np.ndarray, high: np.ndarray) -> bool:
+        if self.bbox is not None and (np.any(high < self.bbox[0]) or np.any(low > self.bbox[1])):
+            return False
+        if self.planes is not None:
+            # The box is outside if its corner furthest along a plane's normal is behind that plane
+            corners = np.where(self.planes[:, :3] >= 0, high, low)
+            if np.any(np.einsum('ij,ij->i', self.planes[:, :3], corners) + self.planes[:, 3] < 0):
+                return False
+        return True
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(points), dtype=bool)
+        if self.bbox is not None:
+            mask &= np.all((points >= self.bbox[0]) & (points <= self.bbox[1]), axis=1)
+        if self.planes is not None:
+            mask &= np.all(points @ self.planes[:, :3].T + self.planes[:, 3] >= 0, axis=1)
+        return mask
+
+
+def distance_to_box(point: np.ndarray, low: np.ndarray, high: np.ndarray) -> float:
+    return float(np.linalg.norm(point - np.clip(point, low, high)))
+
+
+def query(index: SpatialIndex, region: Region = None, camera=None, lod: float = DEFAULT_LOD,
+          level: int = DEFAULT_LEVEL, types: list = None, limit: int = DEFAULT_LIMIT) -> dict:
+    """
+    Evidence inside a region, as individual items and clusters.
+
+    Args:
+        index: The case's SpatialIndex
+        region: Query volume (everything if None)
+        camera: Optional (x, y, z) camera position for distance-based detail
+        lod: Cluster a cell when its size divided by its distance to the camera is below this
+        level: Octree level to cluster at when there is no camera
+        types: Optional evidence types to include
+        limit: Most individual items to return; further cells are clustered
+    """
+    region = region or Region()
+    camera = None if camera is None else np.array(camera, dtype=np.float64)
+    type_filter = None
+    if types:
+        type_filter = np.isin(index.type_codes, [index.type_names.index(t) for t in types if t in index.type_names])
+
+    items, clusters = [], []
+    matched = 0
+
+    def selected(start: int, end: int) -> np.ndarray:
+        mask = region.contains(index.positions[start:end])
+        if type_filter is not None:
+            mask &= type_filter[start:end]
+        return np.nonzero(mask)[0] + start
+
+    def add_cluster(depth: int, prefix: int, members: np.ndarray):
+        points = index.positions[members]
+        counts = np.bincount(index.type_codes[members], minlength=len(index.type_names))
+        low, high = points.min(axis=0), points.max(axis=0)
+        center = points.mean(axis=0)
+        clusters.append({
+            'cell': f'{depth}/{prefix}',
+            'count': int(len(members)),
+            'center': {'x': float(center[0]), 'y': float(center[1]), 'z': float(center[2])},
+            'bounds': {'min': {'x': float(low[0]), 'y': float(low[1]), 'z': float(low[2])},
+                       'max': {'x': float(high[0]), 'y': float(high[1]), 'z': float(high[2])}},
+            'types': {index.type_names[t]: int(c) for t, c in enumerate(counts) if c}
+        })
+
+    def visit(depth: int, prefix: int, cell: tuple):
+        nonlocal matched
+        start, end = index.cell_slice(depth, prefix)
+        if start == end:
+            return
+        low, high = index.cell_bounds(depth, cell)
+        if not region.intersects(low, high):
+            return
+
+        leaf = depth == OCTREE_BITS or end - start <= MIN_CLUSTER
+        if camera is not None:
+            far = (high[0] - low[0]) < lod * distance_to_box(camera, low, high)
+        else:
+            far = depth >= level
+        if leaf or far or len(items) >= limit:
+            members = selected(start, end)
+            if not len(members):
+                return
+            matched += len(members)
+            if (far and len(members) > MIN_CLUSTER) or len(items) + len(members) > limit:
+                add_cluster(depth, prefix, members)
+            else:
+                items.extend(json.loads(encode_evidence(index.rows[index.order[i]])) for i in members.tolist())
+            return
+
+        children = []
+        for octant in range(8):
+            child = (cell[0] * 2 + (octant & 1), cell[1] * 2 + (octant >> 1 & 1), cell[2] * 2 + (octant >> 2 & 1))
+            children.append((child, prefix * 8 + octant))
+        if camera is not None:
+            # Nearest cells first, so they get the item budget
+            children.sort(key=lambda c: distance_to_box(camera, *index.cell_bounds(depth + 1, c[0])))
+        for child, child_prefix in children:
+            visit(depth + 1, child_prefix, child)
+
+    if len(index.rows):
+        visit(0, 0, (0, 0, 0))
+
+    high = index.origin + index.size
+    return {
+        'version': index.version,
+        'total': len(index.rows),
+        'matched': matched,
+        'bounds': {'min': dict(zip('xyz', map(float, index.origin))), 'max': dict(zip('xyz', map(float, high)))},
+        'items': items,
+        'clusters': clusters
+    }
+
+
+class SpatialIndexCache:
+    """Per-case indexes, rebuilt when the case version changes; least recently used cases are dropped."""
+
+    def __init__(self, max_cases: int = MAX_CACHED_CASES):
+        self.max_cases = max_cases
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, case_id: int, version: str) -> SpatialIndex:
+        with self._lock:
+            index = self._indexes.get(case_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(case_id)
+                return index
+        rows = db.session.execute(
+            select(*EVIDENCE_COLUMNS).where(Evidence.case_id == case_id).order_by(Evidence.id)
+        ).all()
+        index = SpatialIndex(version, rows)
+        with self._lock:
+            self._indexes[case_id] = index
+            self._indexes.move_to_end(case_id)
+            while len(self._indexes) > self.max_cases:
+                self._indexes.popitem(last=False)
+        return index
+
+
+indexes = SpatialIndexCache()
@@ -0,0 +1,178 @@
+"""
+Crimetryx AI - Hedged LLM Requests
+Duplicate slow LLM calls to cut tail latency, within a spend budget.
+
+Opt in with HEDGE_ENABLED=1. Latencies are tracked per agent, provider and
+model over the last HEDGE_WINDOW calls. Once HEDGE_MIN_SAMPLES are known, a
+call that is still running at the HEDGE_PERCENTILE latency gets a second,
+identical request. The first response that is valid JSON wins; if neither
+is valid, the first response to arrive is used as before. The loser keeps
+running in the background, since the providers have no way to cancel.
+
+Hedges spend tokens, so they are budgeted: every call earns HEDGE_BUDGET
+credits (0.1 allows roughly one hedge per ten calls), up to HEDGE_BURST,
+and a hedge costs one. When the budget is spent, slow calls simply wait.
+
+Metrics: crimetryx_llm_hedges_total counts hedges by outcome (hedge_won,
+primary_won, failed) and skips; crimetryx_llm_call_seconds has the latency
+callers saw, next to crimetryx_llm_primary_seconds, the latency of the
+first request alone, so the p99 of the two shows what hedging saved.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from metrics import REGISTRY, Counter, Histogram
+
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', '0').lower() in ('1', 'true', 'yes')
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '0.95'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_WINDOW = int(os.getenv('HEDGE_WINDOW', '200'))  # Recent latencies kept per agent/provider/model
+HEDGE_BUDGET = float(os.getenv('HEDGE_BUDGET', '0.1'))  # Hedge credits earned per call
+HEDGE_BURST = float(os.getenv('HEDGE_BURST', '5'))  # Most credits that can be saved up
+HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', '32'))
+
+HEDGES = REGISTRY.register(Counter(
+    'crimetryx_llm_hedges', 'Hedged LLM calls by outcome (hedge_won/primary_won/failed/skipped_budget).',
+    ['agent', 'outcome']))
+CALL_SECONDS = REGISTRY.register(Histogram(
+    'crimetryx_llm_call_seconds', 'LLM latency seen by callers, including hedging.', ['agent']))
+PRIMARY_SECONDS = REGISTRY.register(Histogram(
+    'crimetryx_llm_primary_seconds', 'LLM latency of the first request alone, as without hedging.', ['agent']))
+
+
+def is_valid_json(response) -> bool:
+    try:
+        json.loads(response.choices[0].message.content)
+        return True
+    except (ValueError, TypeError, AttributeError, IndexError):
+        return False
+
+
+class LatencyTracker:
+    """Recent latencies for one agent/provider/model, with percentiles."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = HEDGE_MIN_SAMPLES):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Hedger:
+    """Runs calls with a percentile-triggered hedge, under a token-bucket budget."""
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED, percentile: float = HEDGE_PERCENTILE,
+                 budget: float = HEDGE_BUDGET, burst: float = HEDGE_BURST, workers: int = HEDGE_WORKERS):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.workers = workers
+        self._credits = burst
+        self._trackers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def tracker(self, key) -> LatencyTracker:
+        with self._lock:
+            if key not in self._trackers:
+                self._trackers[key] = LatencyTracker()
+            return self._trackers[key]
+
+    def _earn(self):
+        with self._lock:
+            self._credits = min(self.burst, self._credits + self.budget)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._credits < 1:
+                return False
+            self._credits -= 1
+            return True
+
+    def _timed(self, tracker: LatencyTracker, fn):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        tracker.record(elapsed)
+        return result, elapsed
+
+    def call(self, agent: str, key, fn, valid=is_valid_json):
+        """
+        Call fn(), hedging with a second fn() if it is slower than usual.
+
+        Args:
+            agent: Agent name for metrics
+            key: Latency history key, e.g. (agent, provider, model)
+            fn: The request; must be safe to run twice
+            valid: Whether a response is good enough to win
+        """
+        tracker = self.tracker(key)
+        started = time.perf_counter()
+        if not self.enabled:
+            response, elapsed = self._timed(tracker, fn)
+            CALL_SECONDS.observe(elapsed, agent=agent)
+            PRIMARY_SECONDS.observe(elapsed, agent=agent)
+            return response
+
+        self._earn()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='llm-hedge')
+        primary = self._executor.submit(self._timed, tracker, fn)
+
+        def record_primary(future):
+            if future.exception() is None:
+                PRIMARY_SECONDS.observe(future.result()[1], agent=agent)
+        primary.add_done_callback(record_primary)
+
+        delay = tracker.percentile(self.percentile)
+        if delay is None or wait([primary], timeout=delay).done:
+            response = primary.result()[0]
+            CALL_SECONDS.observe(time.perf_counter() - started, agent=agent)
+            return response
+        if not self._spend():
+            HEDGES.inc(agent=agent, outcome='skipped_budget')
+            response = primary.result()[0]
+            CALL_SECONDS.observe(time.perf_counter() - started, agent=agent)
+            return response
+
+        hedge = self._executor.submit(self._timed, tracker, fn)
+        pending = {primary, hedge}
+        fallback = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    continue
+                response = future.result()[0]
+                if valid(response):
+                    HEDGES.inc(agent=agent, outcome='hedge_won' if future is hedge else 'primary_won')
+                    CALL_SECONDS.observe(time.perf_counter() - started, agent=agent)
+                    return response
+                if fallback is None:
+                    fallback = response
+
+        HEDGES.inc(agent=agent, outcome='failed')
+        CALL_SECONDS.observe(time.perf_counter() - started, agent=agent)
+        if fallback is not None:
+            return fallback
+        return primary.result()[0]  # Both failed: raise the primary's error
+
+
+hedger = Hedger()
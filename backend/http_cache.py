@@ -0,0 +1,133 @@
+"""
+Crimetryx AI - HTTP Cache
+Conditional GETs and an in-process cache of serialized JSON responses.
+
+Read endpoints are versioned by cases.updated_at, which models.touch_cases
+bumps whenever a case or anything under it changes. The ETag is a hash of
+the resource name and that version. A revalidating client costs one indexed
+lookup and gets a 304 without anything being serialized. On a miss the
+serialized body is kept in an LRU keyed by (resource, version). Stale
+entries can never match, and writes evict them early through the change
+feed.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request, current_app, jsonify
+from sqlalchemy import select, func
+
+from models import db, Case
+
+CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '512'))
+CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_BYTES', str(64 * 1024 * 1024)))
+MODEL_MAX_AGE = 365 * 24 * 3600  # Model files are named by KIRI task ID and never rewritten
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized response bodies, bounded by entries and bytes."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (name, case_id) -> (version, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, version: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, version: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = (version, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, case_id=None):
+        """Drop entries for a case and the case list (everything if case_id is None)."""
+        with self._lock:
+            for key in [k for k in self._entries if case_id is None or k[1] in (case_id, None)]:
+                self._bytes -= len(self._entries.pop(key)[1])
+
+    def on_event(self, event: dict):
+        """Change feed listener: evict what the write touched."""
+        self.invalidate(event.get('case_id'))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+cache = ResponseCache()
+
+
+def cases_version() -> str:
+    """Version of the case list: case count plus the latest update."""
+    count, latest = db.session.execute(select(func.count(Case.id), func.max(Case.updated_at))).one()
+    return f'{count}:{latest.isoformat() if latest else ""}'
+
+
+def case_version(case_id: int):
+    """Version of one case and its children, or None if the case does not exist."""
+    row = db.session.execute(select(Case.id, Case.updated_at).where(Case.id == case_id)).first()
+    if row is None:
+        return None
+    return row.updated_at.isoformat() if row.updated_at else ''
+
+
+def make_etag(name: str, case_id, version: str) -> str:
+    return hashlib.sha256(f'{name}:{case_id}:{version}'.encode()).hexdigest()[:32]
+
+
+def cached_json(name: str, version: str, build, case_id=None):
+    """
+    JSON response for a versioned resource, answering If-None-Match with 304.
+
+    Args:
+        name: Resource name (part of the cache key and ETag)
+        version: Current version from cases_version() / case_version()
+        build: Callable returning the JSON body as an iterable of byte chunks
+            (see serializers), run on a cache miss; None means the resource
+            was deleted after its version was read, answered with 404
+        case_id: Case the resource belongs to (None for the case list)
+    """
+    etag = make_etag(name, case_id, version)
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        key = (name, case_id)
+        body = cache.get(key, version)
+        if body is None:
+            chunks = build()
+            if chunks is None:
+                return jsonify({'error': 'Not found'}), 404
+            # Joined rather than streamed: the body is cached, and the read finishes before responding
+            body = b''.join(chunks)
+            cache.put(key, version, body)
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate; the 304 is the cheap path
+    return response
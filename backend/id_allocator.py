@@ -0,0 +1,84 @@
+"""
+Crimetryx AI - ID Allocation
+Sequence-backed allocation of human-readable case and evidence IDs.
+
+Each scope (a year for case IDs, a case for evidence IDs) has one counter row
+that is bumped with a single UPDATE ... RETURNING, so allocation is constant
+time and two concurrent creators can never receive the same number. Counters
+are bumped in their own short transaction so the row lock is not held for the
+rest of the request; a failed insert leaves a gap rather than a duplicate.
+"""
+
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db
+
+_INCREMENT = text('UPDATE id_sequences SET value = value + 1 WHERE scope = :scope RETURNING value')
+_SEED = text('INSERT INTO id_sequences (scope, value) VALUES (:scope, :value) ON CONFLICT (scope) DO NOTHING')
+
+
+def _max_suffix(values, prefix: str) -> int:
+    """Highest numeric suffix among IDs with the given prefix."""
+    pattern = re.compile(rf'^{re.escape(prefix)}(\d+)$')
+    highest = 0
+    for value in values:
+        match = pattern.match(value or '')
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
+
+
+def allocate(scope: str, seed_fn=None) -> int:
+    """
+    Return the next value for a scope.
+
+    Args:
+        scope: Counter name, e.g. 'case:2026' or 'evidence:42'
+        seed_fn: Called once with the connection when the scope has no row yet,
+                 returning the highest value already in use
+
+    Returns:
+        The allocated value (1-based)
+    """
+    with db.engine.begin() as connection:
+        value = connection.execute(_INCREMENT, {'scope': scope}).scalar()
+        if value is None:
+            seed = seed_fn(connection) if seed_fn else 0
+            connection.execute(_SEED, {'scope': scope, 'value': seed})
+            value = connection.execute(_INCREMENT, {'scope': scope}).scalar()
+    return value
+
+
+def release_scope(scope: str):
+    """Drop a counter, e.g. when its case is deleted."""
+    db.session.execute(text('DELETE FROM id_sequences WHERE scope = :scope'), {'scope': scope})
+
+
+def next_case_id(year: int = None) -> str:
+    """Allocate the next CRX-YYYY-NNNN case ID for a year."""
+    year = year or datetime.now().year
+    prefix = f'CRX-{year}-'
+
+    def seed(connection):
+        rows = connection.execute(
+            text('SELECT case_id FROM cases WHERE case_id LIKE :pattern'),
+            {'pattern': prefix + '%'}
+        )
+        return _max_suffix((row[0] for row in rows), prefix)
+
+    return f"{prefix}{allocate(f'case:{year}', seed):04d}"
+
+
+def next_evidence_id(case_id: int) -> str:
+    """Allocate the next E-NNN evidence ID within a case."""
+    def seed(connection):
+        rows = connection.execute(
+            text('SELECT evidence_id FROM evidence WHERE case_id = :case_id'),
+            {'case_id': case_id}
+        )
+        return _max_suffix((row[0] for row in rows), 'E-')
+
+    return f"E-{allocate(f'evidence:{case_id}', seed):03d}"
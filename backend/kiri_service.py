@@ -7,8 +7,11 @@ API Documentation: https://docs.kiriengine.app/
 import os
 import requests
 import time
+import functools
 from dotenv import load_dotenv
 
+from metrics import KIRI_REQUEST_SECONDS
+
 load_dotenv()
 
 KIRI_API_KEY = os.getenv('KIRI_API_KEY', '')
@@ -25,6 +28,20 @@ STATUS_CODES = {
 }
 
 
+def timed(operation: str):
+    """Record the latency and outcome of a KIRI API call."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = method(*args, **kwargs)
+            outcome = 'ok' if result.get('success') else 'error'
+            KIRI_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
+            return result
+        return wrapper
+    return decorator
+
+
 class KiriEngineService:
     """Service for interacting with KIRI Engine API for 3D reconstruction."""
     
@@ -34,6 +51,7 @@ class KiriEngineService:
             "Authorization": f"Bearer {self.api_key}"
         }
     
+    @timed('upload_video')
     def upload_video(self, video_path: str, model_quality: int = 1, 
                      texture_quality: int = 1, file_format: str = "GLTF") -> dict:
         """
@@ -92,6 +110,7 @@ class KiriEngineService:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @timed('get_status')
     def get_status(self, task_id: str) -> dict:
         """
         Get the processing status of a task.
@@ -126,6 +145,7 @@ class KiriEngineService:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @timed('download_model')
     def download_model(self, task_id: str, output_dir: str = "models") -> dict:
         """
         Download the completed 3D model (zipped).
@@ -0,0 +1,331 @@
+"""
+Crimetryx AI - Chain-of-Custody Ledger
+Append-only Merkle ledger per case covering evidence and agent log hashes.
+
+Leaves are appended as a Merkle mountain range: each write adds one leaf and
+merges equal-height subtrees, so an append touches O(log n) nodes, the root is
+kept on the case's ledger row for O(1) lookup, and inclusion proofs need only
+the O(log n) siblings on the path to a peak plus the other peaks.
+
+Rows written before a case had a ledger are appended once by
+backfill_ledgers (migration 0016), so existing databases audit clean.
+"""
+
+import json
+import hashlib
+from datetime import datetime
+from itertools import groupby
+from collections import defaultdict
+
+from models import db, Evidence, AgentLog, SpatterAnalysis, EvidencePhoto, StoredFile, CaseLedger, LedgerEntry, LedgerNode
+
+# Domain separation so a leaf can never be passed off as an interior node
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def hash_leaf(record_hash: str) -> str:
+    """Hash a row hash into a ledger leaf."""
+    return hashlib.sha256(LEAF_PREFIX + record_hash.encode()).hexdigest()
+
+
+def hash_node(left: str, right: str) -> str:
+    """Hash two child nodes into their parent."""
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def bag_peaks(peak_hashes: list) -> str:
+    """Fold subtree peaks (left to right) into a single root, right to left."""
+    if not peak_hashes:
+        return None
+    root = peak_hashes[-1]
+    for peak in reversed(peak_hashes[:-1]):
+        root = hash_node(peak, root)
+    return root
+
+
+def push_leaf(peaks: list, leaf: str, leaf_index: int) -> list:
+    """
+    Append a leaf to a list of [level, hash] peaks in place.
+
+    Returns:
+        List of (level, position, hash) nodes created by the append
+    """
+    created = [(0, leaf_index, leaf)]
+    peaks.append([0, leaf])
+    while len(peaks) >= 2 and peaks[-1][0] == peaks[-2][0]:
+        level, right = peaks.pop()
+        _, left = peaks.pop()
+        parent = hash_node(left, right)
+        created.append((level + 1, leaf_index >> (level + 1), parent))
+        peaks.append([level + 1, parent])
+    return created
+
+
+def get_ledger(case_id: int, lock: bool = False) -> CaseLedger:
+    """Get (or create) the ledger row for a case."""
+    query = CaseLedger.query.filter_by(case_id=case_id)
+    if lock:
+        query = query.with_for_update()
+    ledger = query.first()
+    if ledger is None:
+        ledger = CaseLedger(case_id=case_id, size=0, root=None, peaks='[]')
+        db.session.add(ledger)
+    return ledger
+
+
+def record_entry(case_id: int, entry_type: str, ref_id: int, record_hash: str,
+                 action: str = 'created') -> LedgerEntry:
+    """
+    Append a custody event to the case ledger.
+
+    Must be called inside the same session as the row write so the ledger and
+    the row commit together. The caller is responsible for committing.
+    """
+    ledger = get_ledger(case_id, lock=True)
+    peaks = json.loads(ledger.peaks or '[]')
+    leaf_index = ledger.size or 0
+
+    entry = LedgerEntry(
+        case_id=case_id,
+        leaf_index=leaf_index,
+        entry_type=entry_type,
+        action=action,
+        ref_id=ref_id,
+        record_hash=record_hash
+    )
+    db.session.add(entry)
+
+    for level, position, node_hash in push_leaf(peaks, hash_leaf(record_hash), leaf_index):
+        db.session.add(LedgerNode(case_id=case_id, level=level, position=position, hash=node_hash))
+
+    ledger.size = leaf_index + 1
+    ledger.peaks = json.dumps(peaks)
+    ledger.root = bag_peaks([h for _, h in peaks])
+    return entry
+
+
+def backfill_ledgers(connection, batch_size: int = 5000) -> int:
+    """
+    Append every audited row that is not yet in its case's ledger.
+
+    Rows are recorded per case as 'created' entries with their current
+    hash, type by type in the order audit_ledgers checks them and in id
+    order within a type. Recorded rows are skipped, so running it again
+    adds nothing. Works on a plain connection so a migration can call it.
+
+    Returns:
+        Number of entries added
+    """
+    recorded = set(connection.execute(db.select(LedgerEntry.case_id, LedgerEntry.entry_type, LedgerEntry.ref_id)))
+    sources = [
+        ('evidence', db.select(Evidence.case_id, Evidence.id, Evidence.hash).order_by(Evidence.id)),
+        ('agent_log', db.select(AgentLog.case_id, AgentLog.id, AgentLog.hash).order_by(AgentLog.id)),
+        ('spatter_analysis', db.select(SpatterAnalysis.case_id, SpatterAnalysis.id, SpatterAnalysis.hash)
+         .order_by(SpatterAnalysis.id)),
+        ('photo', db.select(EvidencePhoto.case_id, EvidencePhoto.id, EvidencePhoto.sha256).order_by(EvidencePhoto.id)),
+        ('stored_file', db.select(StoredFile.case_id, StoredFile.id, StoredFile.sha256)
+         .where(StoredFile.original.is_(True), StoredFile.case_id.isnot(None)).order_by(StoredFile.id)),
+    ]
+    pending = defaultdict(list)
+    for entry_type, query in sources:
+        for case_id, row_id, row_hash in connection.execute(query):
+            if row_hash and (case_id, entry_type, row_id) not in recorded:
+                pending[case_id].append((entry_type, row_id, row_hash))
+    if not pending:
+        return 0
+
+    ledgers = {case_id: (size, json.loads(peaks or '[]')) for case_id, size, peaks in connection.execute(
+        db.select(CaseLedger.case_id, CaseLedger.size, CaseLedger.peaks).where(CaseLedger.case_id.in_(list(pending)))
+    )}
+    now = datetime.utcnow()
+    entries, nodes = [], []
+    for case_id, rows in pending.items():
+        size, peaks = ledgers.get(case_id, (0, []))
+        for entry_type, row_id, row_hash in rows:
+            entries.append({'case_id': case_id, 'leaf_index': size, 'entry_type': entry_type, 'action': 'created',
+                            'ref_id': row_id, 'record_hash': row_hash, 'created_at': now})
+            for level, position, node_hash in push_leaf(peaks, hash_leaf(row_hash), size):
+                nodes.append({'case_id': case_id, 'level': level, 'position': position, 'hash': node_hash})
+            size += 1
+        values = {'size': size, 'peaks': json.dumps(peaks), 'root': bag_peaks([h for _, h in peaks]), 'updated_at': now}
+        if case_id in ledgers:
+            connection.execute(db.update(CaseLedger).where(CaseLedger.case_id == case_id).values(**values))
+        else:
+            connection.execute(db.insert(CaseLedger).values(case_id=case_id, **values))
+
+    for start in range(0, len(entries), batch_size):
+        connection.execute(db.insert(LedgerEntry), entries[start:start + batch_size])
+    for start in range(0, len(nodes), batch_size):
+        connection.execute(db.insert(LedgerNode), nodes[start:start + batch_size])
+    return len(entries)
+
+
+def get_inclusion_proof(case_id: int, leaf_index: int) -> dict:
+    """
+    Build an inclusion proof for a leaf against the current root.
+
+    Returns:
+        dict with the entry, sibling path, peaks and root, or None if out of range
+    """
+    ledger = CaseLedger.query.filter_by(case_id=case_id).first()
+    if ledger is None or leaf_index < 0 or leaf_index >= ledger.size:
+        return None
+
+    peaks = json.loads(ledger.peaks)
+
+    # Locate the perfect subtree (peak) that contains the leaf
+    start = 0
+    for peak_index, (peak_level, _) in enumerate(peaks):
+        width = 1 << peak_level
+        if leaf_index < start + width:
+            break
+        start += width
+
+    wanted = [(level, (leaf_index >> level) ^ 1) for level in range(peak_level)]
+    siblings = {}
+    if wanted:
+        rows = LedgerNode.query.filter(
+            LedgerNode.case_id == case_id,
+            db.or_(*[db.and_(LedgerNode.level == level, LedgerNode.position == position)
+                     for level, position in wanted])
+        ).all()
+        siblings = {(row.level, row.position): row.hash for row in rows}
+
+    path = []
+    for level, position in wanted:
+        path.append({
+            'hash': siblings.get((level, position)),
+            'side': 'left' if position < (leaf_index >> level) else 'right'
+        })
+
+    entry = LedgerEntry.query.filter_by(case_id=case_id, leaf_index=leaf_index).first()
+    return {
+        'entry': entry.to_dict() if entry else None,
+        'leaf_index': leaf_index,
+        'path': path,
+        'peak_index': peak_index,
+        'peaks': [h for _, h in peaks],
+        'root': ledger.root,
+        'size': ledger.size
+    }
+
+
+def verify_inclusion_proof(record_hash: str, proof: dict) -> bool:
+    """Check that a row hash is included under the proof's root."""
+    node = hash_leaf(record_hash)
+    for step in proof.get('path', []):
+        if not step.get('hash'):
+            return False
+        if step['side'] == 'left':
+            node = hash_node(step['hash'], node)
+        else:
+            node = hash_node(node, step['hash'])
+
+    peaks = list(proof.get('peaks', []))
+    peak_index = proof.get('peak_index', -1)
+    if not 0 <= peak_index < len(peaks) or peaks[peak_index] != node:
+        return False
+    return bag_peaks(peaks) == proof.get('root')
+
+
+def audit_ledgers(case_ids: list = None, batch_size: int = 5000) -> dict:
+    """
+    Audit ledgers for many cases in a handful of bulk queries.
+
+    For each case the root is rebuilt from the recorded entries and compared
+    with the stored root, and the latest entry for every live evidence item,
+    agent log, spatter analysis, photo and stored original is compared with
+    the row's current hash (for files, the SHA-256 of their content).
+
+    Returns:
+        dict with per-case results and a summary
+    """
+    ledger_query = db.session.query(CaseLedger.case_id, CaseLedger.size, CaseLedger.root)
+    entry_query = db.session.query(
+        LedgerEntry.case_id, LedgerEntry.leaf_index, LedgerEntry.entry_type,
+        LedgerEntry.action, LedgerEntry.ref_id, LedgerEntry.record_hash
+    )
+    evidence_query = db.session.query(Evidence.case_id, Evidence.id, Evidence.hash)
+    log_query = db.session.query(AgentLog.case_id, AgentLog.id, AgentLog.hash)
+    spatter_query = db.session.query(SpatterAnalysis.case_id, SpatterAnalysis.id, SpatterAnalysis.hash)
+    photo_query = db.session.query(EvidencePhoto.case_id, EvidencePhoto.id, EvidencePhoto.sha256)
+    file_query = db.session.query(StoredFile.case_id, StoredFile.id, StoredFile.sha256).filter(
+        StoredFile.original.is_(True), StoredFile.case_id.isnot(None)
+    )
+
+    if case_ids:
+        ledger_query = ledger_query.filter(CaseLedger.case_id.in_(case_ids))
+        entry_query = entry_query.filter(LedgerEntry.case_id.in_(case_ids))
+        evidence_query = evidence_query.filter(Evidence.case_id.in_(case_ids))
+        log_query = log_query.filter(AgentLog.case_id.in_(case_ids))
+        spatter_query = spatter_query.filter(SpatterAnalysis.case_id.in_(case_ids))
+        photo_query = photo_query.filter(EvidencePhoto.case_id.in_(case_ids))
+        file_query = file_query.filter(StoredFile.case_id.in_(case_ids))
+
+    stored = {case_id: (size, root) for case_id, size, root in ledger_query}
+
+    # Current row hashes keyed by (case, type, id)
+    current = {}
+    for case_id, row_id, row_hash in evidence_query.yield_per(batch_size):
+        current[(case_id, 'evidence', row_id)] = row_hash
+    for case_id, row_id, row_hash in log_query.yield_per(batch_size):
+        current[(case_id, 'agent_log', row_id)] = row_hash
+    for case_id, row_id, row_hash in spatter_query.yield_per(batch_size):
+        current[(case_id, 'spatter_analysis', row_id)] = row_hash
+    for case_id, row_id, row_hash in photo_query.yield_per(batch_size):
+        current[(case_id, 'photo', row_id)] = row_hash
+    for case_id, row_id, row_hash in file_query.yield_per(batch_size):
+        current[(case_id, 'stored_file', row_id)] = row_hash
+
+    results = {}
+    rows = entry_query.order_by(LedgerEntry.case_id, LedgerEntry.leaf_index).yield_per(batch_size)
+    for case_id, entries in groupby(rows, key=lambda row: row[0]):
+        peaks = []
+        latest = {}
+        size = 0
+        gaps = False
+        for _, leaf_index, entry_type, action, ref_id, record_hash in entries:
+            if leaf_index != size:
+                gaps = True
+            push_leaf(peaks, hash_leaf(record_hash), size)
+            latest[(entry_type, ref_id)] = (action, record_hash)
+            size += 1
+
+        stored_size, stored_root = stored.pop(case_id, (0, None))
+        problems = []
+        if gaps:
+            problems.append('leaf sequence has gaps')
+        if size != stored_size:
+            problems.append(f'size mismatch: {size} entries, ledger says {stored_size}')
+        if bag_peaks([h for _, h in peaks]) != stored_root:
+            problems.append('root mismatch')
+
+        for (entry_type, ref_id), (action, record_hash) in latest.items():
+            row_hash = current.pop((case_id, entry_type, ref_id), None)
+            if action == 'deleted':
+                if row_hash is not None:
+                    problems.append(f'{entry_type} {ref_id} recorded as deleted but still present')
+            elif row_hash is None:
+                problems.append(f'{entry_type} {ref_id} missing without a deletion entry')
+            elif row_hash != record_hash:
+                problems.append(f'{entry_type} {ref_id} hash differs from ledger')
+
+        results[case_id] = {'valid': not problems, 'size': size, 'root': stored_root, 'problems': problems}
+
+    # Ledgers with no entries, and rows that were never recorded
+    for case_id, (stored_size, stored_root) in stored.items():
+        problems = [] if stored_size == 0 else ['ledger has no entries']
+        results[case_id] = {'valid': not problems, 'size': 0, 'root': stored_root, 'problems': problems}
+    for (case_id, entry_type, ref_id) in current:
+        result = results.setdefault(case_id, {'valid': True, 'size': 0, 'root': None, 'problems': []})
+        result['problems'].append(f'{entry_type} {ref_id} not recorded in ledger')
+        result['valid'] = False
+
+    invalid = [case_id for case_id, result in results.items() if not result['valid']]
+    return {
+        'cases_checked': len(results),
+        'cases_invalid': len(invalid),
+        'invalid_case_ids': sorted(invalid),
+        'results': results
+    }
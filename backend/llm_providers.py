@@ -0,0 +1,268 @@
+"""
+Crimetryx AI - LLM Providers
+Chat completion backends for the agents, with per-agent model routing.
+
+Providers:
+- groq: the Groq API (needs GROQ_API_KEY).
+- local: any OpenAI-compatible server, such as llama.cpp's llama-server,
+  Ollama or vLLM, at LOCAL_LLM_URL. llama-server runs quantized GGUF models
+  on CPU.
+- llama_cpp: a GGUF model loaded in-process through llama-cpp-python, from
+  LLAMA_MODEL_PATH (CPU by default).
+- fixture: deterministic canned outputs that satisfy every agent's prompt,
+  for tests and load runs without a model. FIXTURE_PATH can point at a JSON
+  file of outputs keyed by agent type.
+
+LLM_PROVIDER and LLM_MODEL choose the default. LLM_AGENT_ROUTES overrides
+them per agent, so cheap agents can use a smaller, faster model:
+
+    LLM_AGENT_ROUTES=scene_interpreter=local:qwen2.5-3b-instruct,evidence_reasoner=groq:llama-3.1-8b-instant
+
+Every provider returns responses shaped like the OpenAI client's
+(choices[0].message.content, usage.prompt_tokens/completion_tokens). When
+given a JSON schema, providers request JSON mode: Groq's json_object mode,
+and schema-constrained decoding on llama.cpp.
+"""
+
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+
+import requests
+from dotenv import load_dotenv
+
+try:
+    import llama_cpp
+except ImportError:  # Only needed for the in-process llama_cpp provider
+    llama_cpp = None
+
+load_dotenv()
+
+DEFAULT_PROVIDER = os.getenv('LLM_PROVIDER', 'groq')
+DEFAULT_MODELS = {
+    'groq': 'llama-3.3-70b-versatile',
+    'local': os.getenv('LOCAL_LLM_MODEL', 'local-model'),
+    'llama_cpp': os.path.splitext(os.path.basename(os.getenv('LLAMA_MODEL_PATH', 'llama.gguf')))[0],
+    'fixture': 'fixture',
+}
+
+
+def make_response(content: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+    """OpenAI-shaped chat completion response."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    )
+
+
+class ProviderUnavailable(Exception):
+    """The provider is not configured or its dependency is missing."""
+
+
+class GroqProvider:
+    """Groq API. A Groq-compatible client can be passed in, e.g. a benchmark stub."""
+
+    name = 'groq'
+
+    def __init__(self, client=None):
+        self._client = client
+
+    def _get_client(self):
+        if self._client is None:
+            api_key = os.getenv('GROQ_API_KEY')
+            if not api_key:
+                raise ProviderUnavailable('GROQ API key not configured')
+            from groq import Groq
+            self._client = Groq(api_key=api_key)
+        return self._client
+
+    def complete(self, agent: str, model: str, messages: list, schema: dict = None, **options):
+        if schema is not None:
+            options['response_format'] = {'type': 'json_object'}
+        return self._get_client().chat.completions.create(model=model, messages=messages, **options)
+
+
+class LocalProvider:
+    """OpenAI-compatible chat completions endpoint (llama.cpp server, Ollama, vLLM)."""
+
+    name = 'local'
+
+    def __init__(self, base_url: str = None, api_key: str = None, timeout: float = None):
+        self.base_url = (base_url or os.getenv('LOCAL_LLM_URL', 'http://localhost:8080/v1')).rstrip('/')
+        self.api_key = api_key or os.getenv('LOCAL_LLM_API_KEY')
+        self.timeout = timeout or float(os.getenv('LOCAL_LLM_TIMEOUT', '300'))  # CPU inference is slow
+        self._session = requests.Session()
+
+    def complete(self, agent: str, model: str, messages: list, schema: dict = None, **options):
+        if schema is not None:
+            # llama.cpp's server constrains decoding to the schema; other servers fall back to JSON mode
+            options['response_format'] = {'type': 'json_object', 'schema': schema}
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        response = self._session.post(
+            f'{self.base_url}/chat/completions',
+            json=dict(options, model=model, messages=messages),
+            headers=headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get('usage') or {}
+        return make_response(data['choices'][0]['message']['content'] or '',
+                             usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+
+
+class LlamaCppProvider:
+    """GGUF model run in-process by llama-cpp-python; calls are serialized on one model instance."""
+
+    name = 'llama_cpp'
+
+    def __init__(self, model_path: str = None, n_ctx: int = None, n_threads: int = None):
+        self.model_path = model_path or os.getenv('LLAMA_MODEL_PATH')
+        self.n_ctx = n_ctx or int(os.getenv('LLAMA_N_CTX', '8192'))
+        self.n_threads = n_threads or int(os.getenv('LLAMA_N_THREADS', str(os.cpu_count() or 4)))
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            if llama_cpp is None:
+                raise ProviderUnavailable('llama-cpp-python is not installed')
+            if not self.model_path or not os.path.exists(self.model_path):
+                raise ProviderUnavailable('LLAMA_MODEL_PATH does not point at a model file')
+            self._model = llama_cpp.Llama(model_path=self.model_path, n_ctx=self.n_ctx,
+                                          n_threads=self.n_threads, verbose=False)
+        return self._model
+
+    def complete(self, agent: str, model: str, messages: list, schema: dict = None, **options):
+        if schema is not None:
+            options['response_format'] = {'type': 'json_object', 'schema': schema}
+        with self._lock:
+            data = self._get_model().create_chat_completion(messages=messages, **options)
+        usage = data.get('usage') or {}
+        return make_response(data['choices'][0]['message']['content'] or '',
+                             usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+
+
+FIXTURE_OUTPUTS = {
+    'scene_interpreter': {
+        'entry_exit_points': [
+            {'location': 'Front door', 'coordinates': {'x': 0, 'y': 0, 'z': 4}, 'type': 'entry'},
+            {'location': 'Rear window', 'coordinates': {'x': -5, 'y': 1, 'z': -3}, 'type': 'exit'}
+        ],
+        'visibility_analysis': [{'from': 'Front door', 'to': 'Bedroom', 'visible': False, 'obstructions': ['Wall']}],
+        'distance_constraints': [],
+        'spatial_observations': ['Evidence is concentrated between the entry point and the bed'],
+        'reasoning': 'Fixture scene analysis.'
+    },
+    'evidence_reasoner': {
+        'evidence_analysis': [
+            {'evidence_id': 'E-001', 'type': 'bloodstain', 'findings': ['Impact pattern'],
+             'inferred_direction': 'Towards the exit', 'consistency_score': 0.8}
+        ],
+        'pattern_correlations': [],
+        'anomalies': [],
+        'reasoning': 'Fixture evidence analysis.'
+    },
+    'timeline_builder': {
+        'scenarios': [
+            {'scenario_id': 'A', 'title': 'Forced entry and struggle', 'confidence': 0.6,
+             'timeline': [{'sequence': 1, 'estimated_time': 'T+0', 'event': 'Entry through the front door'},
+                          {'sequence': 2, 'estimated_time': 'T+5', 'event': 'Exit through the rear window'}],
+             'supporting_evidence': ['E-001'], 'contradicting_evidence': []},
+            {'scenario_id': 'B', 'title': 'Known visitor', 'confidence': 0.4,
+             'timeline': [{'sequence': 1, 'estimated_time': 'T+0', 'event': 'Admitted through the front door'}],
+             'supporting_evidence': [], 'contradicting_evidence': ['E-001']}
+        ],
+        'reasoning': 'Fixture timeline.'
+    },
+    'hypothesis_challenger': {
+        'challenges': [
+            {'scenario_id': 'A', 'revised_confidence': 0.55, 'contradictions': []},
+            {'scenario_id': 'B', 'revised_confidence': 0.3,
+             'contradictions': [{'description': 'No sign of a struggle at the door', 'severity': 'medium'}]}
+        ],
+        'ranking': ['A', 'B'],
+        'reasoning': 'Fixture challenge.'
+    },
+}
+
+
+class FixtureProvider:
+    """Deterministic canned outputs per agent, with optional simulated latency."""
+
+    name = 'fixture'
+
+    def __init__(self, path: str = None, latency_ms: float = None):
+        path = path or os.getenv('FIXTURE_PATH')
+        self.outputs = dict(FIXTURE_OUTPUTS)
+        if path:
+            with open(path) as f:
+                self.outputs.update(json.load(f))
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv('FIXTURE_LATENCY_MS', '0'))
+
+    def complete(self, agent: str, model: str, messages: list, schema: dict = None, **options):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        content = json.dumps(self.outputs.get(agent, {'reasoning': f'No fixture for {agent}'}))
+        prompt = ' '.join(m.get('content', '') for m in messages)
+        return make_response(content, len(prompt.split()), len(content.split()))
+
+
+PROVIDERS = {
+    'groq': GroqProvider,
+    'local': LocalProvider,
+    'llama_cpp': LlamaCppProvider,
+    'fixture': FixtureProvider,
+}
+
+
+def parse_routes(spec: str) -> dict:
+    """Parse 'agent=provider:model,agent=provider' into {agent: (provider, model or None)}."""
+    routes = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        agent, _, target = item.partition('=')
+        provider, _, model = target.strip().partition(':')
+        if provider not in PROVIDERS:
+            raise ValueError(f'Unknown LLM provider in LLM_AGENT_ROUTES: {provider}')
+        routes[agent.strip()] = (provider, model or None)
+    return routes
+
+
+class Router:
+    """Resolves each agent to a provider and model, creating providers on first use."""
+
+    def __init__(self, default_provider: str = DEFAULT_PROVIDER, default_model: str = None, routes: dict = None):
+        if default_provider not in PROVIDERS:
+            raise ValueError(f'Unknown LLM_PROVIDER: {default_provider}')
+        self.default_provider = default_provider
+        self.default_model = default_model
+        self.routes = routes or {}
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(DEFAULT_PROVIDER, os.getenv('LLM_MODEL') or None, parse_routes(os.getenv('LLM_AGENT_ROUTES')))
+
+    def route(self, agent: str) -> tuple:
+        """(provider name, model) for an agent."""
+        provider, model = self.routes.get(agent, (self.default_provider, None))
+        if model is None:
+            model = self.default_model if provider == self.default_provider and self.default_model else DEFAULT_MODELS[provider]
+        return provider, model
+
+    def provider(self, name: str):
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = PROVIDERS[name]()
+            return self._providers[name]
+
+    def set_provider(self, name: str, provider):
+        """Replace a provider instance, e.g. GroqProvider(client=stub) in benchmarks."""
+        with self._lock:
+            self._providers[name] = provider
+
+
+router = Router.from_env()
@@ -0,0 +1,229 @@
+"""
+Crimetryx AI - Metrics
+Prometheus-style counters and histograms exported at /metrics.
+
+The metrics cover request latency per route, database queries per request,
+LLM calls per agent, provider and model, KIRI Engine calls and report
+rendering. Each worker
+process keeps its own series, so scrape each worker or run a single one.
+
+init_app installs the request hooks and, when PROFILE_SLOW_MS is set, the
+sampling profiler for slow requests (see profiler.py).
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import request, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(labelnames, values, extra=None) -> str:
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @property
+    def family(self) -> str:
+        return f'{self.name}_total'
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}_total{_format_labels(self.labelnames, key)} {value}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    @property
+    def family(self) -> str:
+        return self.name
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labelnames, key, [('le', repr(float(bound)))])
+                yield f'{self.name}_bucket{labels} {count}'
+            yield f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", "+Inf")])} {series[-2]}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, key)} {series[-2]}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.family} {metric.documentation}')
+            lines.append(f'# TYPE {metric.family} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'crimetryx_http_request_duration_seconds', 'Request latency by route.', ['method', 'route', 'status']))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    'crimetryx_db_queries_per_request', 'Database queries issued per request.', ['route'], COUNT_BUCKETS))
+DB_SECONDS_PER_REQUEST = REGISTRY.register(Histogram(
+    'crimetryx_db_query_seconds_per_request', 'Time spent in database queries per request.', ['route']))
+DB_QUERIES = REGISTRY.register(Counter(
+    'crimetryx_db_queries', 'Database queries, including those outside requests.'))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'crimetryx_llm_request_duration_seconds', 'LLM chat completion latency by agent, provider and model.',
+    ['agent', 'provider', 'model']))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    'crimetryx_llm_requests', 'LLM chat completions by agent, provider, model and outcome (ok/error).',
+    ['agent', 'provider', 'model', 'outcome']))
+LLM_TOKENS = REGISTRY.register(Counter(
+    'crimetryx_llm_tokens', 'LLM tokens used by agent, provider, model and kind (prompt/completion).',
+    ['agent', 'provider', 'model', 'kind']))
+KIRI_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'crimetryx_kiri_request_duration_seconds', 'KIRI Engine API latency by operation and outcome.',
+    ['operation', 'outcome']))
+REPORT_RENDER_SECONDS = REGISTRY.register(Histogram(
+    'crimetryx_report_render_seconds', 'PDF report render time.'))
+
+
+# =============================================================================
+# Database query accounting
+# =============================================================================
+
+_query_stats = ContextVar('crimetryx_query_stats', default=None)  # [count, seconds] for the current request
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('crimetryx_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('crimetryx_query_started')
+    if not stack:
+        return
+    started = stack.pop()
+    DB_QUERIES.inc()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+# =============================================================================
+# External calls
+# =============================================================================
+
+def record_llm_call(agent: str, provider: str, model: str, started: float, response=None, error: bool = False):
+    """Record one LLM call: latency, outcome and token usage when the response reports it."""
+    labels = {'agent': agent, 'provider': provider, 'model': model}
+    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+    LLM_REQUESTS.inc(outcome='error' if error else 'ok', **labels)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, 'prompt_tokens', 0) or 0, kind='prompt', **labels)
+        LLM_TOKENS.inc(getattr(usage, 'completion_tokens', 0) or 0, kind='completion', **labels)
+
+
+# =============================================================================
+# Flask integration
+# =============================================================================
+
+def init_app(app):
+    """Install request timing, per-request query accounting and the slow-request profiler."""
+    from profiler import profiler
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_query_token = _query_stats.set([0, 0.0])
+        profiler.begin()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=response.status_code)
+
+        token = g.pop('metrics_query_token', None)
+        stats = _query_stats.get()
+        if stats is not None:
+            DB_QUERIES_PER_REQUEST.observe(stats[0], route=route)
+            DB_SECONDS_PER_REQUEST.observe(stats[1], route=route)
+        if token is not None:
+            _query_stats.reset(token)
+
+        profiler.end(f'{request.method} {route}', elapsed)
+        return response
@@ -0,0 +1,116 @@
+"""
+Crimetryx AI - Migration Runner
+Applies the revisions in migrations/ in order and records them in schema_migrations.
+
+Usage:
+    python migrate.py upgrade      Apply all pending revisions
+    python migrate.py downgrade    Revert the most recent revision
+    python migrate.py status       List applied and pending revisions
+"""
+
+import os
+import sys
+import importlib.util
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+
+def load_revisions() -> list:
+    """Load revision modules ordered by their down_revision chain."""
+    modules = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not filename.endswith('.py') or filename.startswith('__'):
+            continue
+        path = os.path.join(MIGRATIONS_DIR, filename)
+        spec = importlib.util.spec_from_file_location(f'migrations.{filename[:-3]}', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules[module.revision] = module
+
+    ordered = []
+    current = None
+    while True:
+        following = [m for m in modules.values() if m.down_revision == current]
+        if not following:
+            break
+        if len(following) > 1:
+            raise RuntimeError(f'Multiple revisions follow {current}: {[m.revision for m in following]}')
+        current = following[0].revision
+        ordered.append(following[0])
+
+    if len(ordered) != len(modules):
+        raise RuntimeError('Migration chain is broken; some revisions are unreachable')
+    return ordered
+
+
+def applied_revisions(connection) -> list:
+    connection.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'revision VARCHAR(32) PRIMARY KEY, '
+        'applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+    )
+    rows = connection.execute(text('SELECT revision FROM schema_migrations'))
+    return [row[0] for row in rows]
+
+
+def upgrade(engine) -> list:
+    """Apply pending revisions; each one runs in its own transaction."""
+    applied = []
+    for module in load_revisions():
+        with engine.begin() as connection:
+            if module.revision in applied_revisions(connection):
+                continue
+            module.upgrade(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (revision) VALUES (:revision)'),
+                {'revision': module.revision}
+            )
+            applied.append(module.revision)
+    return applied
+
+
+def downgrade(engine) -> str:
+    """Revert the most recently applied revision."""
+    with engine.begin() as connection:
+        done = applied_revisions(connection)
+        for module in reversed(load_revisions()):
+            if module.revision in done:
+                module.downgrade(connection)
+                connection.execute(
+                    text('DELETE FROM schema_migrations WHERE revision = :revision'),
+                    {'revision': module.revision}
+                )
+                return module.revision
+    return None
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        engine = db.engine
+        if command == 'upgrade':
+            applied = upgrade(engine)
+            print(f"Applied: {', '.join(applied) if applied else 'nothing to do'}")
+        elif command == 'downgrade':
+            reverted = downgrade(engine)
+            print(f"Reverted: {reverted or 'nothing to do'}")
+        elif command == 'status':
+            with engine.begin() as connection:
+                done = applied_revisions(connection)
+            for module in load_revisions():
+                state = 'applied' if module.revision in done else 'pending'
+                print(f"{module.revision}  {state:8}  {(module.__doc__ or '').strip().splitlines()[0]}")
+        else:
+            print(__doc__)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
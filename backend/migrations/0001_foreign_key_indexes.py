@@ -0,0 +1,25 @@
+"""
+Add indexes on the foreign keys used by case, evidence and agent log lookups.
+
+Revision: 0001
+"""
+
+revision = '0001'
+down_revision = None
+
+INDEXES = [
+    ('ix_evidence_case_id', 'evidence', 'case_id'),
+    ('ix_agent_logs_case_id_created_at', 'agent_logs', 'case_id, created_at'),
+    ('ix_agent_logs_case_id_agent_type_created_at', 'agent_logs', 'case_id, agent_type, created_at'),
+    ('ix_hypotheses_case_id', 'hypotheses', 'case_id'),
+]
+
+
+def upgrade(connection):
+    for name, table, columns in INDEXES:
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def downgrade(connection):
+    for name, _, _ in INDEXES:
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
@@ -0,0 +1,83 @@
+"""
+Make evidence IDs unique per case instead of globally.
+
+Revision: 0002
+"""
+
+revision = '0002'
+down_revision = '0001'
+
+EVIDENCE_COLUMNS = (
+    'id, evidence_id, case_id, evidence_type, x, y, z, '
+    'notes, photo_path, hash, created_at, created_by'
+)
+
+
+def _create_sqlite_evidence(connection, table, unique_clause):
+    connection.exec_driver_sql(f'''
+        CREATE TABLE {table} (
+            id INTEGER NOT NULL PRIMARY KEY,
+            evidence_id VARCHAR(20) NOT NULL,
+            case_id INTEGER NOT NULL REFERENCES cases (id),
+            evidence_type VARCHAR(50) NOT NULL,
+            x FLOAT NOT NULL,
+            y FLOAT NOT NULL,
+            z FLOAT NOT NULL,
+            notes TEXT,
+            photo_path VARCHAR(500),
+            hash VARCHAR(64),
+            created_at DATETIME,
+            created_by VARCHAR(100),
+            {unique_clause}
+        )
+    ''')
+
+
+def _rebuild_sqlite(connection, unique_clause):
+    """SQLite cannot drop an inline UNIQUE constraint, so copy into a new table."""
+    _create_sqlite_evidence(connection, 'evidence_migrating', unique_clause)
+    connection.exec_driver_sql(
+        f'INSERT INTO evidence_migrating ({EVIDENCE_COLUMNS}) SELECT {EVIDENCE_COLUMNS} FROM evidence'
+    )
+    connection.exec_driver_sql('DROP TABLE evidence')
+    connection.exec_driver_sql('ALTER TABLE evidence_migrating RENAME TO evidence')
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_evidence_case_id ON evidence (case_id)')
+
+
+def _sqlite_has_global_unique(connection):
+    for index in connection.exec_driver_sql('PRAGMA index_list(evidence)').fetchall():
+        name, unique = index[1], index[2]
+        if not unique:
+            continue
+        columns = [row[2] for row in connection.exec_driver_sql(f'PRAGMA index_info("{name}")')]
+        if columns == ['evidence_id']:
+            return True
+    return False
+
+
+def _postgres_constraint_exists(connection, name):
+    return connection.exec_driver_sql(
+        f"SELECT 1 FROM pg_constraint WHERE conname = '{name}'"
+    ).first() is not None
+
+
+def upgrade(connection):
+    if connection.dialect.name == 'sqlite':
+        if _sqlite_has_global_unique(connection):
+            _rebuild_sqlite(connection, 'CONSTRAINT uq_evidence_case_evidence_id UNIQUE (case_id, evidence_id)')
+        return
+
+    connection.exec_driver_sql('ALTER TABLE evidence DROP CONSTRAINT IF EXISTS evidence_evidence_id_key')
+    if not _postgres_constraint_exists(connection, 'uq_evidence_case_evidence_id'):
+        connection.exec_driver_sql(
+            'ALTER TABLE evidence ADD CONSTRAINT uq_evidence_case_evidence_id UNIQUE (case_id, evidence_id)'
+        )
+
+
+def downgrade(connection):
+    if connection.dialect.name == 'sqlite':
+        _rebuild_sqlite(connection, 'UNIQUE (evidence_id)')
+        return
+
+    connection.exec_driver_sql('ALTER TABLE evidence DROP CONSTRAINT IF EXISTS uq_evidence_case_evidence_id')
+    connection.exec_driver_sql('ALTER TABLE evidence ADD CONSTRAINT evidence_evidence_id_key UNIQUE (evidence_id)')
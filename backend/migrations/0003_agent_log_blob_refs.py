@@ -0,0 +1,27 @@
+"""
+Reference agent log payloads from the content-addressed blob store.
+
+Revision: 0003
+"""
+
+from sqlalchemy import inspect
+
+revision = '0003'
+down_revision = '0002'
+
+COLUMNS = ['inputs_ref', 'reasoning_ref', 'outputs_ref']
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('agent_logs')}
+    for column in COLUMNS:
+        if column not in existing:
+            connection.exec_driver_sql(
+                f'ALTER TABLE agent_logs ADD COLUMN {column} VARCHAR(64) REFERENCES blobs (digest)'
+            )
+
+
+def downgrade(connection):
+    # Rows written after this revision keep their payloads only in blobs;
+    # dropping the references would lose them, so refuse instead.
+    raise RuntimeError('Downgrading 0003 would orphan blob-only agent log payloads')
@@ -0,0 +1,27 @@
+"""
+Add crime type and modus operandi columns to cases.
+
+Revision: 0004
+"""
+
+from sqlalchemy import inspect
+
+revision = '0004'
+down_revision = '0003'
+
+COLUMNS = [
+    ('crime_type', 'VARCHAR(50)'),
+    ('mo_patterns', 'TEXT'),
+]
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('cases')}
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE cases ADD COLUMN {name} {column_type}')
+
+
+def downgrade(connection):
+    for name, _ in COLUMNS:
+        connection.exec_driver_sql(f'ALTER TABLE cases DROP COLUMN {name}')
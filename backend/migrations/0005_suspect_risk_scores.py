@@ -0,0 +1,41 @@
+"""
+Add precomputed risk score columns to suspects.
+
+Revision: 0005
+"""
+
+from sqlalchemy import inspect
+
+revision = '0005'
+down_revision = '0004'
+
+COLUMNS = [
+    ('crime_type', 'VARCHAR(50)'),
+    ('risk_score', 'FLOAT'),
+    ('severity', 'FLOAT'),
+    ('fir_count', 'INTEGER DEFAULT 0'),
+    ('matched_mo', 'TEXT'),
+    ('last_active', 'TIMESTAMP'),
+    ('scored_at', 'TIMESTAMP'),
+]
+
+INDEXES = [
+    ('ix_suspects_crime_type_risk_score', 'crime_type, risk_score'),
+    ('ix_suspects_risk_score', 'risk_score'),
+]
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('suspects')}
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE suspects ADD COLUMN {name} {column_type}')
+    for name, columns in INDEXES:
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {name} ON suspects ({columns})')
+
+
+def downgrade(connection):
+    for name, _ in INDEXES:
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+    for name, _ in COLUMNS:
+        connection.exec_driver_sql(f'ALTER TABLE suspects DROP COLUMN {name}')
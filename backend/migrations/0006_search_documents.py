@@ -0,0 +1,46 @@
+"""
+Add the full-text search document table and its index, and index existing rows.
+
+The index structures and the rebuild come from search_index, which reads
+only columns that exist at this revision.
+
+Revision: 0006
+"""
+
+revision = '0006'
+down_revision = '0005'
+
+
+def upgrade(connection):
+    primary_key = 'SERIAL PRIMARY KEY' if connection.dialect.name == 'postgresql' else 'INTEGER NOT NULL PRIMARY KEY'
+    connection.exec_driver_sql(f'''
+        CREATE TABLE IF NOT EXISTS search_documents (
+            id {primary_key},
+            doc_type VARCHAR(20) NOT NULL,
+            ref_id INTEGER NOT NULL,
+            case_id INTEGER NOT NULL REFERENCES cases (id),
+            evidence_type VARCHAR(50),
+            title VARCHAR(100),
+            body TEXT NOT NULL,
+            updated_at TIMESTAMP,
+            CONSTRAINT uq_search_documents_doc UNIQUE (doc_type, ref_id)
+        )
+    ''')
+    connection.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_search_documents_case_id ON search_documents (case_id)'
+    )
+    connection.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_search_documents_evidence_type ON search_documents (evidence_type)'
+    )
+
+    from search_index import create_search_schema, rebuild
+    create_search_schema(connection)
+    rebuild(connection)
+
+
+def downgrade(connection):
+    if connection.dialect.name == 'sqlite':
+        for trigger in ('search_documents_ai', 'search_documents_ad', 'search_documents_au'):
+            connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {trigger}')
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_fts')
+    connection.exec_driver_sql('DROP TABLE IF EXISTS search_documents')
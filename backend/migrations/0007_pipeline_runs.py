@@ -0,0 +1,34 @@
+"""
+Add the pipeline run table for server-side agent pipelines.
+
+Revision: 0007
+"""
+
+revision = '0007'
+down_revision = '0006'
+
+
+def upgrade(connection):
+    primary_key = 'SERIAL PRIMARY KEY' if connection.dialect.name == 'postgresql' else 'INTEGER NOT NULL PRIMARY KEY'
+    connection.exec_driver_sql(f'''
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            id {primary_key},
+            case_id INTEGER NOT NULL REFERENCES cases (id),
+            agents TEXT NOT NULL,
+            status VARCHAR(20),
+            current_agent VARCHAR(50),
+            stages TEXT,
+            error TEXT,
+            requested_by VARCHAR(100),
+            created_at TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    connection.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_pipeline_runs_case_id ON pipeline_runs (case_id)'
+    )
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP TABLE IF EXISTS pipeline_runs')
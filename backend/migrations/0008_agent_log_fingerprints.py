@@ -0,0 +1,28 @@
+"""
+Record agent input fingerprints and reuse decisions for incremental re-analysis.
+
+Revision: 0008
+"""
+
+from sqlalchemy import inspect
+
+revision = '0008'
+down_revision = '0007'
+
+COLUMNS = {
+    'input_fingerprint': 'VARCHAR(64)',
+    'decision': 'VARCHAR(20)',
+    'reused_log_id': 'INTEGER',
+}
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('agent_logs')}
+    for column, column_type in COLUMNS.items():
+        if column not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE agent_logs ADD COLUMN {column} {column_type}')
+
+
+def downgrade(connection):
+    for column in COLUMNS:
+        connection.exec_driver_sql(f'ALTER TABLE agent_logs DROP COLUMN {column}')
@@ -0,0 +1,43 @@
+"""
+Coalesce identical pipeline runs and make hypotheses unique per scenario.
+
+Hypotheses used to be appended on every full analysis, so duplicates per
+(case_id, scenario_id) are removed first, keeping the newest row.
+
+Revision: 0009
+"""
+
+from sqlalchemy import inspect
+
+revision = '0009'
+down_revision = '0008'
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('pipeline_runs')}
+    if 'input_fingerprint' not in existing:
+        connection.exec_driver_sql('ALTER TABLE pipeline_runs ADD COLUMN input_fingerprint VARCHAR(64)')
+    connection.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_pipeline_runs_requested_by_created_at '
+        'ON pipeline_runs (requested_by, created_at)'
+    )
+
+    connection.exec_driver_sql('''
+        DELETE FROM hypotheses WHERE id NOT IN (
+            SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM hypotheses GROUP BY case_id, scenario_id) AS newest
+        )
+    ''')
+    if 'search_documents' in inspect(connection).get_table_names():
+        connection.exec_driver_sql('''
+            DELETE FROM search_documents
+            WHERE doc_type = 'hypothesis' AND ref_id NOT IN (SELECT id FROM hypotheses)
+        ''')
+    connection.exec_driver_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_hypotheses_case_id_scenario_id ON hypotheses (case_id, scenario_id)'
+    )
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP INDEX IF EXISTS ix_hypotheses_case_id_scenario_id')
+    connection.exec_driver_sql('DROP INDEX IF EXISTS ix_pipeline_runs_requested_by_created_at')
+    connection.exec_driver_sql('ALTER TABLE pipeline_runs DROP COLUMN input_fingerprint')
@@ -0,0 +1,36 @@
+"""
+Store bloodstain measurements on evidence and solved spatter analyses.
+
+Revision: 0010
+"""
+
+from sqlalchemy import inspect
+
+revision = '0010'
+down_revision = '0009'
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('evidence')}
+    if 'measurements' not in existing:
+        connection.exec_driver_sql('ALTER TABLE evidence ADD COLUMN measurements TEXT')
+    primary_key = 'SERIAL PRIMARY KEY' if connection.dialect.name == 'postgresql' else 'INTEGER NOT NULL PRIMARY KEY'
+    connection.exec_driver_sql(f'''
+        CREATE TABLE IF NOT EXISTS spatter_analyses (
+            id {primary_key},
+            case_id INTEGER NOT NULL REFERENCES cases (id),
+            input_hash VARCHAR(64) NOT NULL,
+            stain_count INTEGER,
+            result TEXT NOT NULL,
+            hash VARCHAR(64),
+            created_at TIMESTAMP
+        )
+    ''')
+    connection.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_spatter_analyses_case_id ON spatter_analyses (case_id)'
+    )
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP TABLE IF EXISTS spatter_analyses')
+    connection.exec_driver_sql('ALTER TABLE evidence DROP COLUMN measurements')
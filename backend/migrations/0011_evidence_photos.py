@@ -0,0 +1,45 @@
+"""
+Add evidence photos, stored by content hash with derivatives and perceptual hashes.
+
+Revision: 0011
+"""
+
+revision = '0011'
+down_revision = '0010'
+
+
+def upgrade(connection):
+    primary_key = 'SERIAL PRIMARY KEY' if connection.dialect.name == 'postgresql' else 'INTEGER NOT NULL PRIMARY KEY'
+    connection.exec_driver_sql(f'''
+        CREATE TABLE IF NOT EXISTS evidence_photos (
+            id {primary_key},
+            case_id INTEGER NOT NULL REFERENCES cases (id),
+            evidence_db_id INTEGER REFERENCES evidence (id),
+            sha256 VARCHAR(64) NOT NULL,
+            extension VARCHAR(10) NOT NULL,
+            original_name VARCHAR(255),
+            content_type VARCHAR(100),
+            size_bytes BIGINT,
+            status VARCHAR(20),
+            error TEXT,
+            image_format VARCHAR(20),
+            width INTEGER,
+            height INTEGER,
+            phash VARCHAR(16),
+            derivatives TEXT,
+            created_by VARCHAR(100),
+            created_at TIMESTAMP,
+            processed_at TIMESTAMP
+        )
+    ''')
+    connection.exec_driver_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_evidence_photos_case_sha256 ON evidence_photos (case_id, sha256)'
+    )
+    for column in ('case_id', 'evidence_db_id', 'phash'):
+        connection.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS ix_evidence_photos_{column} ON evidence_photos ({column})'
+        )
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP TABLE IF EXISTS evidence_photos')
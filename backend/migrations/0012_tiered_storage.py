@@ -0,0 +1,47 @@
+"""
+Add content-addressed, tiered file storage for scene videos, 3D models and reports.
+
+Existing files can then be adopted with `python storage.py import`.
+
+Revision: 0012
+"""
+
+revision = '0012'
+down_revision = '0011'
+
+
+def upgrade(connection):
+    primary_key = 'SERIAL PRIMARY KEY' if connection.dialect.name == 'postgresql' else 'INTEGER NOT NULL PRIMARY KEY'
+    connection.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS stored_objects (
+            sha256 VARCHAR(64) NOT NULL PRIMARY KEY,
+            size_bytes BIGINT NOT NULL,
+            hot BOOLEAN NOT NULL DEFAULT TRUE,
+            cold BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP,
+            last_accessed_at TIMESTAMP
+        )
+    ''')
+    connection.exec_driver_sql(f'''
+        CREATE TABLE IF NOT EXISTS stored_files (
+            id {primary_key},
+            namespace VARCHAR(20) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            sha256 VARCHAR(64) NOT NULL REFERENCES stored_objects (sha256),
+            case_id INTEGER REFERENCES cases (id),
+            original BOOLEAN NOT NULL DEFAULT FALSE,
+            content_type VARCHAR(100),
+            created_at TIMESTAMP
+        )
+    ''')
+    connection.exec_driver_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_stored_files_namespace_name ON stored_files (namespace, name)'
+    )
+    for table, column in (('stored_objects', 'last_accessed_at'), ('stored_files', 'sha256'),
+                          ('stored_files', 'case_id')):
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})')
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP TABLE IF EXISTS stored_files')
+    connection.exec_driver_sql('DROP TABLE IF EXISTS stored_objects')
@@ -0,0 +1,23 @@
+"""
+Record which process executes a pipeline run and when it last reported in.
+
+Revision: 0013
+"""
+
+from sqlalchemy import inspect
+
+revision = '0013'
+down_revision = '0012'
+
+
+def upgrade(connection):
+    existing = {column['name'] for column in inspect(connection).get_columns('pipeline_runs')}
+    if 'worker_id' not in existing:
+        connection.exec_driver_sql('ALTER TABLE pipeline_runs ADD COLUMN worker_id VARCHAR(100)')
+    if 'heartbeat_at' not in existing:
+        connection.exec_driver_sql('ALTER TABLE pipeline_runs ADD COLUMN heartbeat_at TIMESTAMP')
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('ALTER TABLE pipeline_runs DROP COLUMN heartbeat_at')
+    connection.exec_driver_sql('ALTER TABLE pipeline_runs DROP COLUMN worker_id')
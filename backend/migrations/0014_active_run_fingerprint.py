@@ -0,0 +1,33 @@
+"""
+Allow only one active pipeline run per case and input fingerprint.
+
+Coalescing used to check for an active run and insert in two steps, so two
+processes could both start the same run. Older duplicates among active runs
+are marked interrupted before the partial unique index is created.
+
+Revision: 0014
+"""
+
+revision = '0014'
+down_revision = '0013'
+
+
+def upgrade(connection):
+    connection.exec_driver_sql('''
+        UPDATE pipeline_runs SET status = 'interrupted', current_agent = NULL
+        WHERE status IN ('queued', 'running') AND input_fingerprint IS NOT NULL AND id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MAX(id) AS keep_id FROM pipeline_runs
+                WHERE status IN ('queued', 'running') AND input_fingerprint IS NOT NULL
+                GROUP BY case_id, input_fingerprint
+            ) AS newest
+        )
+    ''')
+    connection.exec_driver_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ux_pipeline_runs_active_fingerprint '
+        "ON pipeline_runs (case_id, input_fingerprint) WHERE status IN ('queued', 'running')"
+    )
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP INDEX IF EXISTS ux_pipeline_runs_active_fingerprint')
@@ -0,0 +1,16 @@
+"""
+Index cases.updated_at, which the link-analysis graph polls for changes made by other workers.
+
+Revision: 0015
+"""
+
+revision = '0015'
+down_revision = '0014'
+
+
+def upgrade(connection):
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_cases_updated_at ON cases (updated_at)')
+
+
+def downgrade(connection):
+    connection.exec_driver_sql('DROP INDEX IF EXISTS ix_cases_updated_at')
@@ -0,0 +1,21 @@
+"""
+Record rows written before case ledgers existed, so the ledger audit passes on existing databases.
+
+Evidence, agent logs, spatter analyses, photos and stored originals without
+a ledger entry are appended to their case's ledger in id order (see
+ledger.backfill_ledgers). Entries are custody records and stay on downgrade.
+
+Revision: 0016
+"""
+
+revision = '0016'
+down_revision = '0015'
+
+
+def upgrade(connection):
+    from ledger import backfill_ledgers
+    backfill_ledgers(connection)
+
+
+def downgrade(connection):
+    pass
@@ -0,0 +1,20 @@
+"""
+Index the agent log blob references, used by the blob sweep and by foreign key checks when blobs are deleted.
+
+Revision: 0017
+"""
+
+revision = '0017'
+down_revision = '0016'
+
+COLUMNS = ['inputs_ref', 'reasoning_ref', 'outputs_ref']
+
+
+def upgrade(connection):
+    for column in COLUMNS:
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS ix_agent_logs_{column} ON agent_logs ({column})')
+
+
+def downgrade(connection):
+    for column in COLUMNS:
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS ix_agent_logs_{column}')
@@ -0,0 +1,4 @@
+"""
+Crimetryx AI - Schema Migrations
+Ordered revisions applied by migrate.py on top of the tables from db.create_all().
+"""
@@ -4,6 +4,8 @@ SQLAlchemy models for cases, evidence, agent logs, and hypotheses.
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
 from datetime import datetime
 import hashlib
 import json
@@ -11,6 +13,33 @@ import json
 db = SQLAlchemy()
 
 
+def evidence_hash(evidence_id, case_id, evidence_type, x, y, z, notes, created_at, measurements=None):
+    """SHA-256 over the evidence fields covered by chain of custody."""
+    data = f"{evidence_id}{case_id}{evidence_type}{x}{y}{z}{notes}{created_at}"
+    if measurements:  # Only hashed when present, so hashes of evidence without measurements are unchanged
+        data += measurements
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def spatter_analysis_hash(case_id, input_hash, result, created_at):
+    """SHA-256 over a stored spatter analysis."""
+    data = f"{case_id}{input_hash}{result}{created_at}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def agent_log_hash(agent_type, inputs, reasoning, outputs, created_at):
+    """SHA-256 over the agent log fields covered by immutability checks."""
+    data = f"{agent_type}{inputs}{reasoning}{outputs}{created_at}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+case_suspects = db.Table(
+    'case_suspects',
+    db.Column('case_id', db.Integer, db.ForeignKey('cases.id'), primary_key=True),
+    db.Column('suspect_id', db.Integer, db.ForeignKey('suspects.id'), primary_key=True, index=True)
+)
+
+
 class Case(db.Model):
     """Case model representing a crime scene investigation."""
     __tablename__ = 'cases'
@@ -21,15 +50,25 @@ class Case(db.Model):
     date = db.Column(db.Date, nullable=False)
     investigator = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), default='active')  # active, processing, analyzed, closed
+    crime_type = db.Column(db.String(50))  # Robbery, Fraud, Murder, etc.
+    mo_patterns = db.Column(db.Text)  # JSON array of modus operandi descriptors
     scene_model_path = db.Column(db.String(500))
     scene_task_id = db.Column(db.String(100))  # KIRI Engine task ID
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     evidence = db.relationship('Evidence', backref='case', lazy=True, cascade='all, delete-orphan')
     agent_logs = db.relationship('AgentLog', backref='case', lazy=True, cascade='all, delete-orphan')
     hypotheses = db.relationship('Hypothesis', backref='case', lazy=True, cascade='all, delete-orphan')
+    ledger = db.relationship('CaseLedger', backref='case', uselist=False, cascade='all, delete-orphan')
+    ledger_entries = db.relationship('LedgerEntry', lazy=True, cascade='all, delete-orphan')
+    ledger_nodes = db.relationship('LedgerNode', lazy=True, cascade='all, delete-orphan')
+    pipeline_runs = db.relationship('PipelineRun', lazy=True, cascade='all, delete-orphan')
+    spatter_analyses = db.relationship('SpatterAnalysis', lazy=True, cascade='all, delete-orphan')
+    photos = db.relationship('EvidencePhoto', lazy=True, cascade='all, delete-orphan')
+    stored_files = db.relationship('StoredFile', lazy=True)  # Originals outlive the case (see storage.release_case)
+    suspects = db.relationship('Suspect', secondary=case_suspects, lazy=True, backref='cases')
     
     def to_dict(self):
         return {
@@ -39,19 +78,63 @@ class Case(db.Model):
             'date': self.date.isoformat() if self.date else None,
             'investigator': self.investigator,
             'status': self.status,
+            'crime_type': self.crime_type,
+            'mo_patterns': json.loads(self.mo_patterns) if self.mo_patterns else [],
             'scene_model_path': self.scene_model_path,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 
+class Suspect(db.Model):
+    """Person of interest linked to one or more cases."""
+    __tablename__ = 'suspects'
+    __table_args__ = (db.Index('ix_suspects_crime_type_risk_score', 'crime_type', 'risk_score'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    suspect_id = db.Column(db.String(20), unique=True, nullable=False)  # S0001
+    name = db.Column(db.String(100))
+    location = db.Column(db.String(200))  # Primary area of activity
+    likely_weapon = db.Column(db.String(50))
+    gang_affiliated = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Precomputed by risk_scoring
+    crime_type = db.Column(db.String(50))  # Most frequent across linked cases
+    risk_score = db.Column(db.Float, index=True)  # 0-1
+    severity = db.Column(db.Float)  # 0-5
+    fir_count = db.Column(db.Integer, default=0)
+    matched_mo = db.Column(db.Text)  # JSON list of MO patterns
+    last_active = db.Column(db.DateTime)
+    scored_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'suspect_id': self.suspect_id,
+            'name': self.name,
+            'location': self.location,
+            'likely_weapon': self.likely_weapon,
+            'gang_affiliated': self.gang_affiliated,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'crime_type': self.crime_type,
+            'risk_score': self.risk_score,
+            'severity': self.severity,
+            'fir_count': self.fir_count,
+            'matched_mo': json.loads(self.matched_mo) if self.matched_mo else [],
+            'last_active': self.last_active.isoformat() if self.last_active else None,
+            'scored_at': self.scored_at.isoformat() if self.scored_at else None
+        }
+
+
 class Evidence(db.Model):
     """Evidence model for items placed in 3D scene."""
     __tablename__ = 'evidence'
+    __table_args__ = (db.UniqueConstraint('case_id', 'evidence_id', name='uq_evidence_case_evidence_id'),)
     
     id = db.Column(db.Integer, primary_key=True)
-    evidence_id = db.Column(db.String(20), unique=True, nullable=False)
-    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    evidence_id = db.Column(db.String(20), nullable=False)  # Numbered per case
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False, index=True)
     evidence_type = db.Column(db.String(50), nullable=False)  # weapon, bloodstain, footprint, etc.
     
     # 3D coordinates
@@ -61,6 +144,10 @@ class Evidence(db.Model):
     
     notes = db.Column(db.Text)
     photo_path = db.Column(db.String(500))
+    measurements = db.Column(db.Text)  # JSON stain ellipse measurements, see spatter.parse_measurements
+    
+    # Deleting the evidence item keeps its photos in the case, unattached
+    photos = db.relationship('EvidencePhoto', backref='evidence', lazy=True)
     
     # Chain of custody
     hash = db.Column(db.String(64))  # SHA-256 hash
@@ -69,8 +156,8 @@ class Evidence(db.Model):
     
     def generate_hash(self):
         """Generate SHA-256 hash for chain of custody."""
-        data = f"{self.evidence_id}{self.case_id}{self.evidence_type}{self.x}{self.y}{self.z}{self.notes}{self.created_at}"
-        self.hash = hashlib.sha256(data.encode()).hexdigest()
+        self.hash = evidence_hash(self.evidence_id, self.case_id, self.evidence_type,
+                                  self.x, self.y, self.z, self.notes, self.created_at, self.measurements)
         return self.hash
     
     def to_dict(self):
@@ -82,6 +169,7 @@ class Evidence(db.Model):
             'coordinates': {'x': self.x, 'y': self.y, 'z': self.z},
             'notes': self.notes,
             'photo_path': self.photo_path,
+            'measurements': json.loads(self.measurements) if self.measurements else None,
             'hash': self.hash,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'created_by': self.created_by
@@ -91,39 +179,72 @@ class Evidence(db.Model):
 class AgentLog(db.Model):
     """Agent execution logs for transparency and auditability."""
     __tablename__ = 'agent_logs'
+    __table_args__ = (
+        db.Index('ix_agent_logs_case_id_created_at', 'case_id', 'created_at'),
+        db.Index('ix_agent_logs_case_id_agent_type_created_at', 'case_id', 'agent_type', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
     agent_type = db.Column(db.String(50), nullable=False)  # scene_interpreter, evidence_reasoner, etc.
     status = db.Column(db.String(20), default='idle')  # idle, running, completed, error
     
-    # Input/Output
+    # Input/Output (legacy inline text; new rows reference blobs instead)
     inputs = db.Column(db.Text)  # JSON string
     reasoning = db.Column(db.Text)  # Agent's reasoning output
     outputs = db.Column(db.Text)  # JSON string
+    inputs_ref = db.Column(db.String(64), db.ForeignKey('blobs.digest'), index=True)
+    reasoning_ref = db.Column(db.String(64), db.ForeignKey('blobs.digest'), index=True)
+    outputs_ref = db.Column(db.String(64), db.ForeignKey('blobs.digest'), index=True)
     
     # Metadata
     execution_time = db.Column(db.Float)  # seconds
     hash = db.Column(db.String(64))  # For immutability verification
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Incremental re-analysis
+    input_fingerprint = db.Column(db.String(64))  # SHA-256 over everything the agent was given
+    decision = db.Column(db.String(20))  # computed, reused
+    reused_log_id = db.Column(db.Integer)  # Log whose output was reused
+    
+    def store_payloads(self, inputs, reasoning, outputs):
+        """Store payload text in the blob store and reference it by digest."""
+        from blob_store import put_blob
+        self.inputs_ref = put_blob(inputs)
+        self.reasoning_ref = put_blob(reasoning)
+        self.outputs_ref = put_blob(outputs)
+        self.inputs = self.reasoning = self.outputs = None
+    
+    def payload(self, field):
+        """Get payload text ('inputs', 'reasoning' or 'outputs') from blob or legacy column."""
+        ref = getattr(self, f'{field}_ref')
+        if ref:
+            from blob_store import get_blob
+            return get_blob(ref)
+        return getattr(self, field)
+    
     def generate_hash(self):
         """Generate hash of agent output for immutability."""
-        data = f"{self.agent_type}{self.inputs}{self.reasoning}{self.outputs}{self.created_at}"
-        self.hash = hashlib.sha256(data.encode()).hexdigest()
+        self.hash = agent_log_hash(self.agent_type, self.payload('inputs'), self.payload('reasoning'),
+                                   self.payload('outputs'), self.created_at)
         return self.hash
     
     def to_dict(self):
+        inputs = self.payload('inputs')
+        outputs = self.payload('outputs')
         return {
             'id': self.id,
             'case_id': self.case_id,
             'agent_type': self.agent_type,
             'status': self.status,
-            'inputs': json.loads(self.inputs) if self.inputs else None,
-            'reasoning': self.reasoning,
-            'outputs': json.loads(self.outputs) if self.outputs else None,
+            'inputs': json.loads(inputs) if inputs else None,
+            'reasoning': self.payload('reasoning'),
+            'outputs': json.loads(outputs) if outputs else None,
             'execution_time': self.execution_time,
             'hash': self.hash,
+            'input_fingerprint': self.input_fingerprint,
+            'decision': self.decision,
+            'reused_log_id': self.reused_log_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -131,9 +252,12 @@ class AgentLog(db.Model):
 class Hypothesis(db.Model):
     """Hypothesis/scenario generated by timeline agent."""
     __tablename__ = 'hypotheses'
+    __table_args__ = (
+        db.Index('ix_hypotheses_case_id_scenario_id', 'case_id', 'scenario_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False, index=True)
     scenario_id = db.Column(db.String(10), nullable=False)  # A, B, C, etc.
     
     description = db.Column(db.Text, nullable=False)
@@ -159,6 +283,247 @@ class Hypothesis(db.Model):
         }
 
 
+class PipelineRun(db.Model):
+    """Server-side execution of an ordered list of agents for a case."""
+    __tablename__ = 'pipeline_runs'
+    __table_args__ = (
+        db.Index('ix_pipeline_runs_requested_by_created_at', 'requested_by', 'created_at'),
+        # One active run per identical request, across processes
+        db.Index('ux_pipeline_runs_active_fingerprint', 'case_id', 'input_fingerprint', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"),
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False, index=True)
+    agents = db.Column(db.Text, nullable=False)  # JSON array of agent types, in run order
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed, interrupted
+    current_agent = db.Column(db.String(50))
+    stages = db.Column(db.Text)  # JSON array of per-stage results
+    error = db.Column(db.Text)
+    input_fingerprint = db.Column(db.String(64))  # Identity of the request, for coalescing duplicates
+    requested_by = db.Column(db.String(100))
+    worker_id = db.Column(db.String(100))  # Process executing the run
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed by that process while the run is active
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'case_id': self.case_id,
+            'agents': json.loads(self.agents) if self.agents else [],
+            'status': self.status,
+            'current_agent': self.current_agent,
+            'stages': json.loads(self.stages) if self.stages else [],
+            'error': self.error,
+            'input_fingerprint': self.input_fingerprint,
+            'requested_by': self.requested_by,
+            'worker_id': self.worker_id,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class EvidencePhoto(db.Model):
+    """An uploaded evidence photo, stored by content hash, with derivatives (see photo_ingest.py)."""
+    __tablename__ = 'evidence_photos'
+    __table_args__ = (db.UniqueConstraint('case_id', 'sha256', name='uq_evidence_photos_case_sha256'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False, index=True)
+    evidence_db_id = db.Column(db.Integer, db.ForeignKey('evidence.id'), index=True)
+    sha256 = db.Column(db.String(64), nullable=False)  # Of the original, recorded in the case ledger
+    extension = db.Column(db.String(10), nullable=False)
+    original_name = db.Column(db.String(255))
+    content_type = db.Column(db.String(100))
+    size_bytes = db.Column(db.BigInteger)
+    status = db.Column(db.String(20), default='processing')  # processing, ready, failed
+    error = db.Column(db.Text)
+    image_format = db.Column(db.String(20))
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    phash = db.Column(db.String(16), index=True)  # 64-bit perceptual hash, hex
+    derivatives = db.Column(db.Text)  # JSON {name: {width, height, bytes}}
+    created_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        derivatives = json.loads(self.derivatives) if self.derivatives else {}
+        urls = {'original': f'/photos/{self.sha256}/original{self.extension}'}
+        urls.update({name: f'/photos/{self.sha256}/{name}.jpg' for name in derivatives})
+        return {
+            'id': self.id,
+            'case_id': self.case_id,
+            'evidence_db_id': self.evidence_db_id,
+            'sha256': self.sha256,
+            'original_name': self.original_name,
+            'content_type': self.content_type,
+            'size_bytes': self.size_bytes,
+            'status': self.status,
+            'error': self.error,
+            'format': self.image_format,
+            'width': self.width,
+            'height': self.height,
+            'phash': self.phash,
+            'derivatives': derivatives,
+            'urls': urls,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+
+
+class SpatterAnalysis(db.Model):
+    """Bloodstain trajectory solution for a case's measured stains (see spatter.py)."""
+    __tablename__ = 'spatter_analyses'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False, index=True)
+    input_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the stain measurements solved
+    stain_count = db.Column(db.Integer, default=0)
+    result = db.Column(db.Text, nullable=False)  # JSON, see spatter.solve_case
+    hash = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def generate_hash(self):
+        self.hash = spatter_analysis_hash(self.case_id, self.input_hash, self.result, self.created_at)
+        return self.hash
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'case_id': self.case_id,
+            'input_hash': self.input_hash,
+            'stain_count': self.stain_count,
+            'result': json.loads(self.result) if self.result else {},
+            'hash': self.hash,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class Blob(db.Model):
+    """Content-addressed, compressed payload shared by agent logs."""
+    __tablename__ = 'blobs'
+    
+    digest = db.Column(db.String(64), primary_key=True)  # SHA-256 of the uncompressed text
+    codec = db.Column(db.String(10), nullable=False)  # zstd, zlib, raw
+    size = db.Column(db.Integer, nullable=False)  # Uncompressed bytes
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StoredObject(db.Model):
+    """Content of a stored file, kept once however many names refer to it (see storage.py)."""
+    __tablename__ = 'stored_objects'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    hot = db.Column(db.Boolean, default=True, nullable=False)  # A copy is on local disk
+    cold = db.Column(db.Boolean, default=False, nullable=False)  # A copy is in the cold backend
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class StoredFile(db.Model):
+    """A name for stored content, e.g. a case's scene video, 3D model or report."""
+    __tablename__ = 'stored_files'
+    __table_args__ = (db.UniqueConstraint('namespace', 'name', name='uq_stored_files_namespace_name'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    namespace = db.Column(db.String(20), nullable=False)  # uploads, models, reports
+    name = db.Column(db.String(255), nullable=False)
+    sha256 = db.Column(db.String(64), db.ForeignKey('stored_objects.sha256'), nullable=False, index=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), index=True)
+    original = db.Column(db.Boolean, default=False, nullable=False)  # Evidentiary; never expires or changes
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class CaseLedger(db.Model):
+    """Current state of a case's append-only Merkle ledger."""
+    __tablename__ = 'case_ledgers'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), unique=True, nullable=False)
+    size = db.Column(db.Integer, default=0, nullable=False)  # Number of leaves
+    root = db.Column(db.String(64))  # Current Merkle root
+    peaks = db.Column(db.Text, default='[]')  # JSON array of [level, hash] subtree peaks
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'case_id': self.case_id,
+            'size': self.size,
+            'root': self.root,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class LedgerEntry(db.Model):
+    """A single custody event appended to a case ledger."""
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (db.UniqueConstraint('case_id', 'leaf_index'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    leaf_index = db.Column(db.Integer, nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)  # evidence, agent_log
+    action = db.Column(db.String(20), nullable=False)  # created, updated, deleted
+    ref_id = db.Column(db.Integer, nullable=False)  # Evidence.id or AgentLog.id
+    record_hash = db.Column(db.String(64), nullable=False)  # Row hash at time of write
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'leaf_index': self.leaf_index,
+            'entry_type': self.entry_type,
+            'action': self.action,
+            'ref_id': self.ref_id,
+            'record_hash': self.record_hash,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class LedgerNode(db.Model):
+    """Merkle tree node; level 0 holds leaves, higher levels hold parents."""
+    __tablename__ = 'ledger_nodes'
+    __table_args__ = (db.UniqueConstraint('case_id', 'level', 'position'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    hash = db.Column(db.String(64), nullable=False)
+
+
+class IdSequence(db.Model):
+    """Counter backing case and evidence ID allocation."""
+    __tablename__ = 'id_sequences'
+    
+    scope = db.Column(db.String(50), primary_key=True)  # case:<year>, evidence:<case pk>
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SearchDocument(db.Model):
+    """Searchable text for one evidence item, hypothesis or agent log (see search_index)."""
+    __tablename__ = 'search_documents'
+    __table_args__ = (db.UniqueConstraint('doc_type', 'ref_id', name='uq_search_documents_doc'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    doc_type = db.Column(db.String(20), nullable=False)  # evidence, hypothesis, agent_log
+    ref_id = db.Column(db.Integer, nullable=False)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False, index=True)
+    evidence_type = db.Column(db.String(50), index=True)  # Evidence documents only
+    title = db.Column(db.String(100))
+    body = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class User(db.Model):
     """User model for authentication."""
     __tablename__ = 'users'
@@ -177,3 +542,21 @@ class User(db.Model):
             'name': self.name,
             'role': self.role
         }
+
+
+@event.listens_for(Session, 'after_flush')
+def touch_cases(session, flush_context):
+    """
+    Bump cases.updated_at whenever a case or its evidence, agent logs or
+    hypotheses change, so it works as a version for the whole case (HTTP
+    ETags are derived from it).
+    """
+    changed = set(session.new) | set(session.dirty) | set(session.deleted)
+    deleted_cases = {obj.id for obj in session.deleted if isinstance(obj, Case)}
+    case_ids = {obj.id for obj in changed if isinstance(obj, Case)}
+    case_ids |= {obj.case_id for obj in changed if isinstance(obj, (Evidence, AgentLog, Hypothesis))}
+    case_ids -= deleted_cases | {None}
+    if case_ids:
+        session.connection().execute(
+            update(Case).where(Case.id.in_(case_ids)).values(updated_at=datetime.utcnow())
+        )
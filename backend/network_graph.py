@@ -0,0 +1,565 @@
+"""
+Crimetryx AI - Link Analysis Graph
+Suspect / location / crime type / MO network built from cases and evidence.
+
+The graph is held in memory as a CSR snapshot (NumPy index arrays) plus an
+authoritative edge-weight map. Case changes update the weight map at once and
+mark the touched nodes; queries read the CSR slice directly for untouched
+nodes and patch in the current weights for touched ones. The snapshot is
+rebuilt once the pending changes grow past a fraction of the graph, so
+updates stay cheap and queries stay vectorized.
+
+Edges carry a weight equal to the number of cases that produce them.
+
+Every process holds its own graph, so writes in one worker are not seen by
+the others through refresh_case alone. Before answering, get_graph() checks
+a cheap database version (case count, latest cases.updated_at, suspect count)
+at most every NETWORK_GRAPH_SYNC_INTERVAL seconds and re-derives the cases
+changed or deleted since its last check. Nodes left without edges (a
+deleted case's location, an unlinked suspect) are hidden from queries at
+once and dropped from the node table when the snapshot is next rebuilt or
+exported, so they do not reach search or layout tiles.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from models import db, Case, Evidence, Suspect, case_suspects
+
+NODE_TYPES = ['suspect', 'location', 'crimeType', 'moPattern']
+
+RELATIONS = [
+    'ACTIVE_IN',        # suspect -> location
+    'COMMITTED',        # suspect -> crime type
+    'MATCHED_WITH',     # suspect -> MO pattern
+    'LIKELY_TO_USE',    # suspect -> weapon MO (from weapon evidence)
+    'HOTSPOT_FOR',      # location -> crime type
+    'RELATED_TO',       # MO pattern -> MO pattern (seen in the same case)
+]
+RELATION_CODES = {name: code for code, name in enumerate(RELATIONS)}
+
+# Packed edge key: source (28 bits) | target (28 bits) | relation (3 bits)
+_NODE_BITS = 28
+_REL_BITS = 3
+_REL_MASK = (1 << _REL_BITS) - 1
+_NODE_MASK = (1 << _NODE_BITS) - 1
+
+COMPACT_MIN_CHANGES = 1000
+COMPACT_RATIO = 0.05
+SYNC_INTERVAL = float(os.getenv('NETWORK_GRAPH_SYNC_INTERVAL', '2'))  # Seconds between database version checks
+
+
+def pack_edge(src: int, dst: int, rel: int) -> int:
+    return (src << (_NODE_BITS + _REL_BITS)) | (dst << _REL_BITS) | rel
+
+
+def unpack_edges(keys: np.ndarray) -> tuple:
+    """Vectorized inverse of pack_edge."""
+    keys = keys.astype(np.int64)
+    return (keys >> (_NODE_BITS + _REL_BITS), (keys >> _REL_BITS) & _NODE_MASK, keys & _REL_MASK)
+
+
+def node_key(node_type: str, label: str) -> str:
+    return f"{node_type}:{label}"
+
+
+def case_edges(location, crime_type, mo_patterns, suspect_ids, weapon_types) -> list:
+    """
+    Derive (source key, target key, relation) triples for a single case.
+    """
+    location_key = node_key('location', location) if location else None
+    crime_key = node_key('crimeType', crime_type) if crime_type else None
+    mo_keys = sorted({node_key('moPattern', mo) for mo in mo_patterns if mo})
+    weapon_keys = sorted({node_key('moPattern', weapon) for weapon in weapon_types if weapon})
+
+    edges = []
+    for suspect_id in suspect_ids:
+        suspect_key = node_key('suspect', suspect_id)
+        if location_key:
+            edges.append((suspect_key, location_key, 'ACTIVE_IN'))
+        if crime_key:
+            edges.append((suspect_key, crime_key, 'COMMITTED'))
+        for mo_key in mo_keys:
+            edges.append((suspect_key, mo_key, 'MATCHED_WITH'))
+        for weapon_key in weapon_keys:
+            edges.append((suspect_key, weapon_key, 'LIKELY_TO_USE'))
+    if location_key and crime_key:
+        edges.append((location_key, crime_key, 'HOTSPOT_FOR'))
+    for i, left in enumerate(mo_keys):
+        for right in mo_keys[i + 1:]:
+            edges.append((left, right, 'RELATED_TO'))
+    return edges
+
+
+class NetworkGraph:
+    """In-memory link-analysis graph with a CSR snapshot and incremental overlay."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.version = 0
+        self.node_index = {}
+        self.node_keys = []
+        self.edge_weights = {}  # packed key -> number of contributing cases
+        self.case_contributions = {}  # case pk -> list of packed keys
+        self.case_ids = set()  # Every case pk the graph reflects, with or without edges
+        self._degree = []  # node -> number of live edges
+        self._orphans = set()  # Nodes whose last edge is gone, dropped at the next snapshot
+        self._touched = defaultdict(set)  # node -> packed keys changed since snapshot
+        self._touched_count = 0
+        self._db_version = None
+        self._synced_at = None  # Latest cases.updated_at already applied
+        self._checked_at = 0.0
+        self._sync_lock = threading.Lock()
+        self._build_snapshot()
+
+    # -------------------------------------------------------------------------
+    # Construction and updates
+    # -------------------------------------------------------------------------
+
+    def _node_id(self, key: str) -> int:
+        node = self.node_index.get(key)
+        if node is None:
+            node = len(self.node_keys)
+            self.node_index[key] = node
+            self.node_keys.append(key)
+            self._degree.append(0)
+        return node
+
+    def _prune(self):
+        """Drop orphaned nodes and renumber the rest, remapping every packed edge key."""
+        keep = np.array([node for node in range(len(self.node_keys)) if node not in self._orphans], dtype=np.int64)
+        remap = np.full(len(self.node_keys), -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+
+        old_keys = np.fromiter(self.edge_weights.keys(), dtype=np.int64, count=len(self.edge_weights))
+        src, dst, rel = unpack_edges(old_keys)
+        new_keys = (remap[src] << (_NODE_BITS + _REL_BITS)) | (remap[dst] << _REL_BITS) | rel
+        translate = dict(zip(old_keys.tolist(), new_keys.tolist()))
+
+        self.edge_weights = {translate[key]: weight for key, weight in self.edge_weights.items()}
+        self.case_contributions = {case_pk: [translate[key] for key in keys]
+                                   for case_pk, keys in self.case_contributions.items()}
+        self.node_keys = [self.node_keys[node] for node in keep.tolist()]
+        self.node_index = {key: node for node, key in enumerate(self.node_keys)}
+        self._degree = [self._degree[node] for node in keep.tolist()]
+        self._orphans = set()
+
+    def _build_snapshot(self):
+        """Rebuild the CSR arrays from the edge-weight map (both directions), dropping orphaned nodes."""
+        if self._orphans:
+            self._prune()
+        count = len(self.edge_weights)
+        keys = np.fromiter(self.edge_weights.keys(), dtype=np.int64, count=count)
+        weights = np.fromiter(self.edge_weights.values(), dtype=np.int32, count=count)
+        src, dst, rel = unpack_edges(keys)
+
+        rows = np.concatenate([src, dst])
+        order = np.argsort(rows, kind='stable')
+        self._indices = np.concatenate([dst, src])[order].astype(np.int32)
+        self._relations = np.concatenate([rel, rel])[order].astype(np.int8)
+        self._weights = np.concatenate([weights, weights])[order]
+        self._outgoing = np.concatenate([np.ones(count, bool), np.zeros(count, bool)])[order]
+        self._keys = np.concatenate([keys, keys])[order]
+
+        snapshot_nodes = len(self.node_keys)
+        self._indptr = np.zeros(snapshot_nodes + 1, dtype=np.int64)
+        if count:
+            np.cumsum(np.bincount(rows, minlength=snapshot_nodes), out=self._indptr[1:])
+        self._snapshot_nodes = snapshot_nodes
+        self._touched = defaultdict(set)
+        self._touched_count = 0
+
+    def _apply(self, keys: list, sign: int):
+        for key in keys:
+            previous = self.edge_weights.get(key, 0)
+            weight = previous + sign
+            if weight > 0:
+                self.edge_weights[key] = weight
+            else:
+                self.edge_weights.pop(key, None)
+            src, dst = key >> (_NODE_BITS + _REL_BITS), (key >> _REL_BITS) & _NODE_MASK
+            if (previous > 0) != (weight > 0):
+                for node in (src, dst):
+                    self._degree[node] += 1 if weight > 0 else -1
+                    if self._degree[node]:
+                        self._orphans.discard(node)
+                    else:
+                        self._orphans.add(node)
+            for node in (src, dst):
+                if key not in self._touched[node]:
+                    self._touched[node].add(key)
+                    self._touched_count += 1
+
+    def set_case(self, case_id: int, edges: list):
+        """Replace one case's contribution to the graph."""
+        with self._lock:
+            old = self.case_contributions.get(case_id, [])
+            new = [pack_edge(self._node_id(s), self._node_id(d), RELATION_CODES[r]) for s, d, r in edges]
+            if sorted(new) == sorted(old):
+                return
+            self.case_contributions.pop(case_id, None)
+            self._apply(old, -1)
+            if new:
+                self.case_contributions[case_id] = new
+                self._apply(new, 1)
+            self.version += 1
+            if self._touched_count > max(COMPACT_MIN_CHANGES, COMPACT_RATIO * len(self.edge_weights)):
+                self._build_snapshot()
+
+    def remove_case(self, case_id: int):
+        self.set_case(case_id, [])
+        with self._lock:
+            self.case_ids.discard(case_id)
+
+    def _db_state(self) -> tuple:
+        count, latest = db.session.execute(db.select(db.func.count(Case.id), db.func.max(Case.updated_at))).one()
+        return count, latest, db.session.execute(db.select(db.func.count(Suspect.id))).scalar()
+
+    def load(self):
+        """Build the whole graph from the database with a few bulk queries."""
+        state = self._db_state()
+        suspects_by_case = defaultdict(list)
+        for case_pk, suspect_id in db.session.query(case_suspects.c.case_id, Suspect.suspect_id).join(
+                Suspect, Suspect.id == case_suspects.c.suspect_id):
+            suspects_by_case[case_pk].append(suspect_id)
+
+        weapons_by_case = defaultdict(set)
+        for case_pk, evidence_type in db.session.query(Evidence.case_id, Evidence.evidence_type).filter(
+                Evidence.evidence_type.like('weapon%')).distinct():
+            weapons_by_case[case_pk].add(evidence_type)
+
+        with self._lock:
+            self.node_index, self.node_keys, self._degree, self._orphans = {}, [], [], set()
+            self.edge_weights, self.case_contributions, self.case_ids = {}, {}, set()
+            for case_pk, location, crime_type, mo_patterns in db.session.query(
+                    Case.id, Case.location, Case.crime_type, Case.mo_patterns).yield_per(5000):
+                self.case_ids.add(case_pk)
+                edges = case_edges(location, crime_type, json.loads(mo_patterns) if mo_patterns else [],
+                                   suspects_by_case.get(case_pk, []), weapons_by_case.get(case_pk, ()))
+                keys = [pack_edge(self._node_id(s), self._node_id(d), RELATION_CODES[r]) for s, d, r in edges]
+                if keys:
+                    self.case_contributions[case_pk] = keys
+                    for key in keys:
+                        self.edge_weights[key] = self.edge_weights.get(key, 0) + 1
+            keys = np.fromiter(self.edge_weights.keys(), dtype=np.int64, count=len(self.edge_weights))
+            src, dst, _ = unpack_edges(keys)
+            self._degree = np.bincount(np.concatenate([src, dst]), minlength=len(self.node_keys)).tolist()
+            self._build_snapshot()
+            self.loaded = True
+            self.version += 1
+            self._db_version, self._synced_at = state, state[1]
+            self._checked_at = time.monotonic()
+
+    def refresh_case(self, case_id: int):
+        """Re-derive one case's edges from the database."""
+        if not self.loaded:
+            return
+        case = db.session.get(Case, case_id)
+        if case is None:
+            self.remove_case(case_id)
+            return
+        weapons = [row[0] for row in db.session.query(Evidence.evidence_type).filter(
+            Evidence.case_id == case_id, Evidence.evidence_type.like('weapon%')).distinct()]
+        self.set_case(case_id, case_edges(
+            case.location, case.crime_type, json.loads(case.mo_patterns) if case.mo_patterns else [],
+            [s.suspect_id for s in case.suspects], weapons
+        ))
+        with self._lock:
+            self.case_ids.add(case_id)
+
+    def sync(self, force: bool = False):
+        """
+        Apply case changes committed by any process since the last check.
+
+        Cases updated since then are re-derived and deleted cases removed. A
+        drop in the suspect count reloads the graph, as deleting a suspect
+        does not touch its cases. Checks run at most every SYNC_INTERVAL
+        seconds unless forced; a check already running in another thread is
+        not waited for.
+        """
+        if not self.loaded or (not force and time.monotonic() - self._checked_at < SYNC_INTERVAL):
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            state = self._db_state()
+            if state == self._db_version:
+                return
+            if self._db_version is not None and state[2] < self._db_version[2]:
+                self.load()
+                return
+            query = db.select(Case.id)
+            if self._synced_at is not None:
+                query = query.where(Case.updated_at >= self._synced_at)
+            for case_id in db.session.execute(query).scalars().all():
+                self.refresh_case(case_id)
+            if state[0] != len(self.case_ids):
+                existing = set(db.session.execute(db.select(Case.id)).scalars())
+                for case_id in self.case_ids - existing:
+                    self.remove_case(case_id)
+            self._db_version, self._synced_at = state, state[1]
+        finally:
+            self._sync_lock.release()
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def _adjacency(self, node: int) -> tuple:
+        """Neighbour arrays (nodes, relations, weights, outgoing) for one node."""
+        if node < self._snapshot_nodes:
+            start, end = self._indptr[node], self._indptr[node + 1]
+            nbrs, rels = self._indices[start:end], self._relations[start:end]
+            weights, outgoing = self._weights[start:end], self._outgoing[start:end]
+        else:
+            nbrs = np.empty(0, np.int32)
+            rels = np.empty(0, np.int8)
+            weights = np.empty(0, np.int32)
+            outgoing = np.empty(0, bool)
+
+        touched = self._touched.get(node)
+        if not touched:
+            return nbrs, rels, weights, outgoing
+
+        # Drop stale snapshot entries and patch in current weights
+        touched_keys = np.fromiter(touched, dtype=np.int64, count=len(touched))
+        if len(nbrs):
+            keep = ~np.isin(self._keys[start:end], touched_keys)
+            nbrs, rels, weights, outgoing = nbrs[keep], rels[keep], weights[keep], outgoing[keep]
+        live = [key for key in touched if key in self.edge_weights]
+        if live:
+            live_keys = np.array(live, dtype=np.int64)
+            src, dst, rel = unpack_edges(live_keys)
+            is_out = src == node
+            nbrs = np.concatenate([nbrs, np.where(is_out, dst, src).astype(np.int32)])
+            rels = np.concatenate([rels, rel.astype(np.int8)])
+            weights = np.concatenate([weights, np.array([self.edge_weights[k] for k in live], np.int32)])
+            outgoing = np.concatenate([outgoing, is_out])
+        return nbrs, rels, weights, outgoing
+
+    def _expand(self, frontier: np.ndarray) -> tuple:
+        """All (source, neighbour) pairs for a frontier, gathered in bulk."""
+        in_snapshot = frontier[frontier < self._snapshot_nodes]
+        clean = in_snapshot[[node not in self._touched for node in in_snapshot.tolist()]] \
+            if self._touched else in_snapshot
+
+        starts = self._indptr[clean]
+        lengths = self._indptr[clean + 1] - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        sources = [np.repeat(clean, lengths)]
+        targets = [self._indices[offsets + np.arange(total)]]
+
+        dirty = np.setdiff1d(frontier, clean, assume_unique=True)
+        for node in dirty.tolist():
+            nbrs = self._adjacency(node)[0]
+            sources.append(np.full(len(nbrs), node, dtype=np.int64))
+            targets.append(nbrs)
+
+        return np.concatenate(sources).astype(np.int64), np.concatenate(targets).astype(np.int64)
+
+    def _node_dict(self, node: int) -> dict:
+        key = self.node_keys[node]
+        node_type, label = key.split(':', 1)
+        return {'id': key, 'type': node_type, 'label': label}
+
+    def resolve(self, key: str):
+        node = self.node_index.get(key)
+        return None if node in self._orphans else node
+
+    def search_nodes(self, node_type: str = None, query: str = None, offset: int = 0, limit: int = 50) -> dict:
+        """List nodes, optionally filtered by type and label substring."""
+        with self._lock:
+            prefix = f"{node_type}:" if node_type else ''
+            needle = (query or '').lower()
+            matches = [key for node, key in enumerate(self.node_keys)
+                       if key.startswith(prefix) and needle in key.split(':', 1)[1].lower()
+                       and node not in self._orphans]
+            page = matches[offset:offset + limit]
+            return {
+                'total': len(matches),
+                'offset': offset,
+                'limit': limit,
+                'nodes': [self._node_dict(self.node_index[key]) for key in page]
+            }
+
+    def neighbors(self, key: str, relation: str = None, offset: int = 0, limit: int = 50) -> dict:
+        """Paginated direct neighbours ordered by edge weight."""
+        with self._lock:
+            node = self.resolve(key)
+            if node is None:
+                return None
+            nbrs, rels, weights, outgoing = self._adjacency(node)
+            if relation:
+                mask = rels == RELATION_CODES.get(relation, -1)
+                nbrs, rels, weights, outgoing = nbrs[mask], rels[mask], weights[mask], outgoing[mask]
+
+            order = np.lexsort((nbrs, -weights.astype(np.int64)))
+            page = order[offset:offset + limit]
+            edges = []
+            for i in page.tolist():
+                other = self.node_keys[nbrs[i]]
+                edges.append({
+                    'from': key if outgoing[i] else other,
+                    'to': other if outgoing[i] else key,
+                    'label': RELATIONS[rels[i]],
+                    'weight': int(weights[i])
+                })
+            return {
+                'node': self._node_dict(node),
+                'total': int(len(nbrs)),
+                'offset': offset,
+                'limit': limit,
+                'nodes': [self._node_dict(int(nbrs[i])) for i in page.tolist()],
+                'edges': edges,
+                'version': self.version
+            }
+
+    def k_hop(self, key: str, k: int = 2, limit: int = 500) -> dict:
+        """Nodes within k hops, breadth first, truncated at `limit` nodes."""
+        with self._lock:
+            start = self.resolve(key)
+            if start is None:
+                return None
+            node_count = len(self.node_keys)
+            depth = np.full(node_count, -1, dtype=np.int16)
+            depth[start] = 0
+            frontier = np.array([start], dtype=np.int64)
+            found = [frontier]
+            found_count = 1
+            truncated = False
+
+            for hop in range(1, k + 1):
+                if not len(frontier) or found_count >= limit:
+                    break
+                _, targets = self._expand(frontier)
+                targets = np.unique(targets)
+                targets = targets[depth[targets] < 0]
+                if found_count + len(targets) > limit:
+                    targets = targets[:limit - found_count]
+                    truncated = True
+                depth[targets] = hop
+                found.append(targets)
+                found_count += len(targets)
+                frontier = targets
+
+            nodes = np.concatenate(found)
+            return {
+                'node': self._node_dict(start),
+                'k': k,
+                'truncated': truncated,
+                'nodes': [dict(self._node_dict(n), hop=int(depth[n])) for n in nodes.tolist()],
+                'version': self.version
+            }
+
+    def shortest_path(self, source_key: str, target_key: str, max_depth: int = 6) -> dict:
+        """Unweighted shortest path via bidirectional breadth-first search."""
+        with self._lock:
+            source, target = self.resolve(source_key), self.resolve(target_key)
+            if source is None or target is None:
+                return None
+            if source == target:
+                return {'found': True, 'length': 0, 'path': [self._node_dict(source)]}
+
+            node_count = len(self.node_keys)
+            parents = [np.full(node_count, -2, dtype=np.int64), np.full(node_count, -2, dtype=np.int64)]
+            depths = [np.zeros(node_count, dtype=np.int16), np.zeros(node_count, dtype=np.int16)]
+            parents[0][source] = -1
+            parents[1][target] = -1
+            frontiers = [np.array([source], np.int64), np.array([target], np.int64)]
+            levels = [0, 0]
+
+            meeting = None
+            for _ in range(max_depth):
+                # Expand the smaller side one full level
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                if not len(frontiers[side]):
+                    break
+                sources, targets = self._expand(frontiers[side])
+                fresh = parents[side][targets] == -2
+                targets, sources = targets[fresh], sources[fresh]
+                targets, first = np.unique(targets, return_index=True)
+                levels[side] += 1
+                parents[side][targets] = sources[first]
+                depths[side][targets] = levels[side]
+                frontiers[side] = targets
+
+                hits = targets[parents[1 - side][targets] != -2]
+                if len(hits):
+                    # Every hit is at the same depth on this side; minimise the other
+                    meeting = int(hits[np.argmin(depths[1 - side][hits])])
+                    break
+
+            if meeting is None:
+                return {'found': False, 'length': None, 'path': []}
+
+            forward = []
+            node = meeting
+            while node != -1:
+                forward.append(node)
+                node = int(parents[0][node])
+            backward = []
+            node = int(parents[1][meeting])
+            while node != -1:
+                backward.append(node)
+                node = int(parents[1][node])
+            path = list(reversed(forward)) + backward
+            return {
+                'found': True,
+                'length': len(path) - 1,
+                'path': [self._node_dict(n) for n in path],
+                'version': self.version
+            }
+
+    def export(self) -> dict:
+        """Copy of the current edges and node metadata for offline jobs (layout), without orphaned nodes."""
+        with self._lock:
+            if self._orphans:
+                self._build_snapshot()
+            count = len(self.edge_weights)
+            keys = np.fromiter(self.edge_weights.keys(), dtype=np.int64, count=count)
+            weights = np.fromiter(self.edge_weights.values(), dtype=np.int32, count=count)
+            type_codes = {name: code for code, name in enumerate(NODE_TYPES)}
+            node_types = np.fromiter((type_codes.get(key.split(':', 1)[0], 0) for key in self.node_keys),
+                                     dtype=np.int8, count=len(self.node_keys))
+            src, dst, rel = unpack_edges(keys)
+            return {
+                'version': self.version,
+                'node_keys': list(self.node_keys),
+                'node_types': node_types,
+                'src': src,
+                'dst': dst,
+                'relations': rel.astype(np.int8),
+                'weights': weights
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'nodes': len(self.node_keys) - len(self._orphans),
+                'edges': len(self.edge_weights),
+                'cases': len(self.case_contributions),
+                'pending_changes': self._touched_count,
+                'version': self.version
+            }
+
+
+graph = NetworkGraph()
+
+
+def get_graph() -> NetworkGraph:
+    """Return the process-wide graph, loading it on first use and catching up with other processes after."""
+    if not graph.loaded:
+        with graph._lock:
+            if not graph.loaded:
+                graph.load()
+    else:
+        graph.sync()
+    return graph
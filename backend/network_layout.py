@@ -0,0 +1,321 @@
+"""
+Crimetryx AI - Network Layout & Tiles
+Server-side force-directed layout of the link-analysis graph, served as tiles.
+
+Layouts are computed in a background thread with vectorized NumPy
+(Fruchterman-Reingold, with repulsion approximated through a grid of cell
+centroids so each iteration is O(n * cells) rather than O(n^2)). Each layout
+is cached against the graph version it was built from and warm-starts the
+next one, so small graph changes settle in a few iterations.
+
+Positions live in the unit square. Nodes are sorted by their Z-order
+(Morton) code, which makes every quadtree tile a contiguous slice: a tile
+request is two binary searches. Tiles holding more than `max_nodes` nodes are
+returned as clusters instead of individual nodes.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from network_graph import RELATIONS, NODE_TYPES, get_graph
+
+MORTON_BITS = 16  # Finest tile zoom level
+CLUSTER_BITS = 4  # Each clustered tile is split into 16 x 16 cells
+GRID_SIZE = 32  # Repulsion grid for the force layout
+CHUNK_ELEMENTS = 4_000_000  # Node x cell pairs evaluated per NumPy chunk
+MAX_TILE_EDGES = 5000
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 16 bits."""
+    v = values.astype(np.uint64) & np.uint64(0xFFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+
+def morton_codes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Interleave integer tile coordinates (x in even bits, y in odd bits)."""
+    return _spread_bits(x) | (_spread_bits(y) << np.uint64(1))
+
+
+def force_layout(n: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray,
+                 init: np.ndarray = None, iterations: int = 50, seed: int = 0) -> np.ndarray:
+    """
+    Fruchterman-Reingold layout in the unit square.
+
+    Args:
+        n: Number of nodes
+        src, dst: Edge endpoints
+        weights: Edge weights (scale attraction)
+        init: Optional starting positions (n x 2); warm starts cool faster
+        iterations: Number of iterations
+        seed: Seed for the random initial positions
+
+    Returns:
+        (n x 2) float32 array of positions in [0, 1]
+    """
+    if n == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    pos = init.astype(np.float64) if init is not None else rng.random((n, 2))
+    k = 1.0 / np.sqrt(n)
+    temperature = 0.02 if init is not None else 0.1
+    cooling = (0.002 / temperature) ** (1.0 / max(iterations, 1))
+    w = np.log1p(weights.astype(np.float64))
+    cells = GRID_SIZE * GRID_SIZE
+    chunk = max(1, CHUNK_ELEMENTS // cells)
+
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+
+        # Attraction along edges: magnitude d^2 / k
+        delta = pos[src] - pos[dst]
+        dist = np.sqrt((delta ** 2).sum(axis=1)) + 1e-9
+        pull = delta * (dist * w / k)[:, None]
+        for axis in (0, 1):
+            disp[:, axis] -= np.bincount(src, pull[:, axis], minlength=n)
+            disp[:, axis] += np.bincount(dst, pull[:, axis], minlength=n)
+
+        # Repulsion from grid cell centroids: magnitude mass * k^2 / d
+        cell = (np.clip((pos * GRID_SIZE).astype(np.int64), 0, GRID_SIZE - 1) * [GRID_SIZE, 1]).sum(axis=1)
+        mass = np.bincount(cell, minlength=cells).astype(np.float64)
+        sums = np.stack([np.bincount(cell, pos[:, axis], minlength=cells) for axis in (0, 1)], axis=1)
+        occupied = mass > 0
+        centroids = sums[occupied] / mass[occupied][:, None]
+        masses = mass[occupied]
+        own_slot = np.cumsum(occupied) - 1
+
+        cx, cy = centroids[:, 0], centroids[:, 1]
+        weighted = masses * (k * k)
+        for start in range(0, n, chunk):
+            block = pos[start:start + chunk]
+            dx = block[:, 0, None] - cx[None, :]
+            dy = block[:, 1, None] - cy[None, :]
+            push = weighted / (dx * dx + dy * dy + 1e-9)
+            # Own cell is handled below, excluding the node itself
+            push[np.arange(len(block)), own_slot[cell[start:start + chunk]]] = 0.0
+            disp[start:start + chunk, 0] += (dx * push).sum(axis=1)
+            disp[start:start + chunk, 1] += (dy * push).sum(axis=1)
+
+        own_mass = mass[cell]
+        others = own_mass > 1
+        local_centroid = (sums[cell[others]] - pos[others]) / (own_mass[others] - 1)[:, None]
+        delta = pos[others] - local_centroid
+        d2 = (delta ** 2).sum(axis=1) + 1e-9
+        disp[others] += delta * ((own_mass[others] - 1) * k * k / d2)[:, None]
+
+        # Move, capped by the temperature
+        length = np.sqrt((disp ** 2).sum(axis=1)) + 1e-12
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        pos = np.clip(pos, -1.0, 2.0)
+        temperature *= cooling
+
+    # Normalise into the unit square with a small margin
+    lo, hi = pos.min(axis=0), pos.max(axis=0)
+    span = np.where(hi - lo > 1e-9, hi - lo, 1.0)
+    return (0.02 + 0.96 * (pos - lo) / span).astype(np.float32)
+
+
+def warm_start(previous: dict, node_keys: list, src: np.ndarray, dst: np.ndarray, seed: int = 0) -> np.ndarray:
+    """
+    Reuse a previous layout, matching nodes by key (pruning renumbers them);
+    place new nodes at the mean of placed neighbours.
+    """
+    n = len(node_keys)
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    placed = np.zeros(n, dtype=bool)
+    if previous is not None:
+        index = {key: node for node, key in enumerate(previous['node_keys'])}
+        old = np.fromiter((index.get(key, -1) for key in node_keys), dtype=np.int64, count=n)
+        placed = old >= 0
+        pos[placed] = previous['positions'][old[placed]]
+
+    # Both directions: an edge from a placed node pulls the new node toward it
+    both_src = np.concatenate([src, dst])
+    both_dst = np.concatenate([dst, src])
+    mask = placed[both_src] & ~placed[both_dst]
+    counts = np.bincount(both_dst[mask], minlength=n)
+    has = counts > 0
+    for axis in (0, 1):
+        sums = np.bincount(both_dst[mask], pos[both_src[mask], axis], minlength=n)
+        pos[has, axis] = sums[has] / counts[has]
+    pos[~placed] += rng.normal(0, 0.01, ((~placed).sum(), 2))
+    return pos
+
+
+def build_snapshot(export: dict, positions: np.ndarray) -> dict:
+    """Index positions by Morton code and keep a CSR copy for tile edges."""
+    n = len(positions)
+    scale = (1 << MORTON_BITS) - 1
+    ix = np.clip((positions[:, 0] * scale).astype(np.int64), 0, scale)
+    iy = np.clip((positions[:, 1] * scale).astype(np.int64), 0, scale)
+    codes = morton_codes(ix, iy)
+    order = np.argsort(codes, kind='stable')
+
+    src, dst = export['src'], export['dst']
+    rows = np.concatenate([src, dst])
+    edge_order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    if len(rows):
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    return {
+        'version': export['version'],
+        'computed_at': time.time(),
+        'positions': positions,
+        'node_keys': export['node_keys'],
+        'node_types': export['node_types'],
+        'order': order,
+        'codes': codes[order],
+        'indptr': indptr,
+        'neighbors': np.concatenate([dst, src])[edge_order],
+        'edge_relations': np.concatenate([export['relations'], export['relations']])[edge_order],
+        'edge_weights': np.concatenate([export['weights'], export['weights']])[edge_order],
+        'edge_outgoing': np.concatenate([np.ones(len(src), bool), np.zeros(len(src), bool)])[edge_order],
+    }
+
+
+class LayoutCache:
+    """Latest layout snapshot plus the background job that refreshes it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshot = None
+        self._job = None
+        self.last_error = None
+
+    def _compute(self, export: dict, previous: dict):
+        try:
+            n = len(export['node_keys'])
+            iterations = 50 if n < 50_000 else 25
+            init = None
+            if previous is not None:
+                init = warm_start(previous, export['node_keys'], export['src'], export['dst'])
+                iterations = max(10, iterations // 3)
+            positions = force_layout(n, export['src'], export['dst'], export['weights'],
+                                     init=init, iterations=iterations)
+            snapshot = build_snapshot(export, positions)
+            with self._lock:
+                self.snapshot = snapshot
+                self.last_error = None
+        except Exception as e:
+            with self._lock:
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                self._job = None
+
+    def refresh(self, graph=None) -> dict:
+        """
+        Return the cached snapshot, starting a background recompute if the
+        graph has moved on. The previous layout is served until it finishes.
+        """
+        graph = graph or get_graph()
+        with self._lock:
+            current = self.snapshot
+            stale = current is None or current['version'] != graph.version
+            if stale and self._job is None:
+                self._job = threading.Thread(
+                    target=self._compute, args=(graph.export(), current), daemon=True
+                )
+                self._job.start()
+            return current
+
+    def status(self) -> dict:
+        graph = get_graph()
+        snapshot = self.refresh(graph)
+        with self._lock:
+            return {
+                'version': snapshot['version'] if snapshot else None,
+                'graph_version': graph.version,
+                'computing': self._job is not None,
+                'node_count': len(snapshot['positions']) if snapshot else 0,
+                'max_zoom': MORTON_BITS,
+                'error': self.last_error
+            }
+
+
+def tile(snapshot: dict, z: int, x: int, y: int, node_type: str = None, max_nodes: int = 1500) -> dict:
+    """
+    Nodes (or clusters) inside quadtree tile (z, x, y) of the unit square.
+    """
+    shift = np.uint64(2 * (MORTON_BITS - z))
+    prefix = int(morton_codes(np.array([x]), np.array([y]))[0])
+    lo = np.uint64(prefix) << shift
+    hi = np.uint64(prefix + 1) << shift
+    start, end = np.searchsorted(snapshot['codes'], [lo, hi])
+    nodes = snapshot['order'][start:end]
+    codes = snapshot['codes'][start:end]
+    if node_type in NODE_TYPES:
+        mask = snapshot['node_types'][nodes] == NODE_TYPES.index(node_type)
+        nodes, codes = nodes[mask], codes[mask]
+
+    positions = snapshot['positions']
+    result = {'z': z, 'x': x, 'y': y, 'version': snapshot['version'], 'count': int(len(nodes))}
+
+    if len(nodes) > max_nodes and z + CLUSTER_BITS <= MORTON_BITS:
+        # Aggregate into a 16 x 16 grid of clusters within the tile
+        sub_shift = np.uint64(2 * (MORTON_BITS - z - CLUSTER_BITS))
+        base = prefix << (2 * CLUSTER_BITS)
+        cell = (codes >> sub_shift).astype(np.int64) - base
+        slots = 1 << (2 * CLUSTER_BITS)
+        counts = np.bincount(cell, minlength=slots)
+        sum_x = np.bincount(cell, positions[nodes, 0], minlength=slots)
+        sum_y = np.bincount(cell, positions[nodes, 1], minlength=slots)
+        by_type = np.bincount(cell * len(NODE_TYPES) + snapshot['node_types'][nodes],
+                              minlength=slots * len(NODE_TYPES)).reshape(slots, len(NODE_TYPES))
+        clusters = []
+        for slot in np.nonzero(counts)[0].tolist():
+            clusters.append({
+                'x': float(sum_x[slot] / counts[slot]),
+                'y': float(sum_y[slot] / counts[slot]),
+                'count': int(counts[slot]),
+                'types': {NODE_TYPES[t]: int(c) for t, c in enumerate(by_type[slot]) if c}
+            })
+        result['clusters'] = clusters
+        return result
+
+    keys = snapshot['node_keys']
+    in_tile = np.zeros(len(positions), dtype=bool)
+    in_tile[nodes] = True
+    result['nodes'] = []
+    for node in nodes.tolist():
+        node_type_name, label = keys[node].split(':', 1)
+        result['nodes'].append({
+            'id': keys[node], 'type': node_type_name, 'label': label,
+            'x': float(positions[node, 0]), 'y': float(positions[node, 1])
+        })
+
+    # Edges touching the tile; an edge inside the tile is listed once
+    edges = []
+    indptr, neighbors = snapshot['indptr'], snapshot['neighbors']
+    for node in nodes.tolist():
+        for i in range(indptr[node], indptr[node + 1]):
+            other = int(neighbors[i])
+            if in_tile[other] and other < node:
+                continue
+            outgoing = bool(snapshot['edge_outgoing'][i])
+            a, b = (node, other) if outgoing else (other, node)
+            edges.append({
+                'from': keys[a], 'to': keys[b],
+                'label': RELATIONS[snapshot['edge_relations'][i]],
+                'weight': int(snapshot['edge_weights'][i]),
+                'points': [float(positions[a, 0]), float(positions[a, 1]),
+                           float(positions[b, 0]), float(positions[b, 1])]
+            })
+            if len(edges) >= MAX_TILE_EDGES:
+                break
+        if len(edges) >= MAX_TILE_EDGES:
+            result['edges_truncated'] = True
+            break
+    result['edges'] = edges
+    return result
+
+
+layout_cache = LayoutCache()
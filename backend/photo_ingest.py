@@ -0,0 +1,227 @@
+"""
+Crimetryx AI - Evidence Photo Ingestion
+Batch photo uploads with custody hashing, background derivatives and near-duplicate search.
+
+Each uploaded file is streamed to disk in CHUNK_SIZE pieces while its
+SHA-256 is computed, so the custody hash never needs a second read and large
+images are never held in memory. Originals are stored by hash:
+
+    <UPLOAD_FOLDER>/photos/originals/ab/abcdef....jpg
+    <UPLOAD_FOLDER>/photos/derived/ab/abcdef.../{preview,small,thumb}.jpg
+
+The same file uploaded twice to a case is stored once and returns the
+existing photo. New photos are recorded in the case ledger and their
+thumbnails, previews and perceptual hash are made in a process pool
+(photo_processing), so a batch uses every core without blocking requests.
+photo.ready is published on the change feed when each one finishes.
+
+Stored files are content-addressed and never rewritten, so they are served
+with long-lived immutable cache headers.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from models import db, EvidencePhoto
+from ledger import record_entry
+from change_feed import feed
+from photo_processing import render_derivatives, hamming_distances, DERIVATIVES
+
+PHOTO_WORKERS = int(os.getenv('PHOTO_WORKERS', str(min(4, os.cpu_count() or 1))))
+NEAR_DUPLICATE_DISTANCE = int(os.getenv('PHOTO_NEAR_DUPLICATE_DISTANCE', '10'))  # Differing pHash bits
+CHUNK_SIZE = 1024 * 1024
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp', '.bmp', '.gif'}
+PHOTO_MAX_AGE = 365 * 24 * 3600  # Content-addressed files never change
+
+
+class PhotoProcessor:
+    """Stores uploaded photos and renders their derivatives in a process pool."""
+
+    def __init__(self, workers: int = PHOTO_WORKERS):
+        self.workers = workers
+        self.root = None
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Attach to the app and resubmit photos a previous process left unprocessed.
+
+        Their originals are already on disk, so they can still be finished.
+        """
+        self._app = app
+        self.root = os.path.join(app.config['UPLOAD_FOLDER'], 'photos')
+        for directory in ('incoming', 'originals', 'derived'):
+            os.makedirs(os.path.join(self.root, directory), exist_ok=True)
+        with app.app_context():
+            for photo in EvidencePhoto.query.filter_by(status='processing').all():
+                self.submit(photo)
+
+    def original_path(self, sha256: str, extension: str) -> str:
+        return os.path.join(self.root, 'originals', sha256[:2], sha256 + extension)
+
+    def derived_dir(self, sha256: str) -> str:
+        return os.path.join(self.root, 'derived', sha256[:2], sha256)
+
+    def store_original(self, stream, extension: str) -> tuple:
+        """
+        Stream an upload to its content-addressed path, hashing as it is written.
+
+        Returns:
+            (sha256, size in bytes)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, 'incoming'))
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            path = self.original_path(sha256, extension)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256, size
+
+    def ingest(self, case_id: int, files: list, evidence=None, created_by: str = None) -> list:
+        """
+        Store a batch of uploaded files and queue their derivatives.
+
+        Args:
+            case_id: Case the photos belong to
+            files: werkzeug FileStorage objects
+            evidence: Optional Evidence item the photos show
+            created_by: Uploader, for the custody record
+
+        Returns:
+            list of (EvidencePhoto, duplicate) in upload order; duplicate is
+            True when the case already had the same file
+
+        Raises:
+            ValueError: A file has an unsupported extension (nothing is stored)
+        """
+        extensions = []
+        for upload in files:
+            extension = os.path.splitext(upload.filename or '')[1].lower()
+            if extension not in ALLOWED_EXTENSIONS:
+                raise ValueError(f'Unsupported photo type: {upload.filename!r}')
+            extensions.append('.jpg' if extension == '.jpeg' else extension)
+
+        results = []
+        new_photos = []
+        for upload, extension in zip(files, extensions):
+            sha256, size = self.store_original(upload.stream, extension)
+            photo = EvidencePhoto.query.filter_by(case_id=case_id, sha256=sha256).first()
+            if photo is not None:
+                results.append((photo, True))
+                continue
+            photo = EvidencePhoto(
+                case_id=case_id,
+                evidence_db_id=evidence.id if evidence is not None else None,
+                sha256=sha256,
+                extension=extension,
+                original_name=(upload.filename or '')[:255],
+                content_type=upload.mimetype,
+                size_bytes=size,
+                status='processing',
+                created_by=created_by,
+                created_at=datetime.utcnow()
+            )
+            db.session.add(photo)
+            db.session.flush()
+            record_entry(case_id, 'photo', photo.id, sha256)
+            if evidence is not None and not evidence.photo_path:
+                evidence.photo_path = os.path.relpath(self.original_path(sha256, extension),
+                                                      self._app.config['UPLOAD_FOLDER'])
+            results.append((photo, False))
+            new_photos.append(photo)
+        db.session.commit()
+
+        for photo in new_photos:
+            self.submit(photo)
+        return results
+
+    def submit(self, photo: EvidencePhoto):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        future = self._executor.submit(render_derivatives, self.original_path(photo.sha256, photo.extension),
+                                       self.derived_dir(photo.sha256))
+        future.add_done_callback(lambda done, photo_id=photo.id: self._finish(photo_id, done))
+
+    def _finish(self, photo_id: int, future):
+        with self._app.app_context():
+            photo = db.session.get(EvidencePhoto, photo_id)
+            if photo is None:
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                photo.status = 'failed'
+                photo.error = str(e) or type(e).__name__
+            else:
+                photo.status = 'ready'
+                photo.image_format = result['format']
+                photo.width = result['width']
+                photo.height = result['height']
+                photo.phash = result['phash']
+                photo.derivatives = json.dumps(result['derivatives'])
+            photo.processed_at = datetime.utcnow()
+            db.session.commit()
+            feed.publish(photo.case_id, 'photo.ready', photo.to_dict())
+
+
+def near_duplicates(photo: EvidencePhoto, all_cases: bool = False,
+                    max_distance: int = NEAR_DUPLICATE_DISTANCE) -> list:
+    """
+    Other photos whose perceptual hash is within max_distance bits, closest first.
+
+    Searches the photo's case unless all_cases is set.
+    """
+    if not photo.phash:
+        return []
+    query = db.session.query(EvidencePhoto.id, EvidencePhoto.phash).filter(
+        EvidencePhoto.id != photo.id, EvidencePhoto.phash.isnot(None)
+    )
+    if not all_cases:
+        query = query.filter(EvidencePhoto.case_id == photo.case_id)
+    rows = query.all()
+    distances = hamming_distances(photo.phash, [phash for _, phash in rows])
+    matches = sorted((int(distance), row[0]) for row, distance in zip(rows, distances) if distance <= max_distance)
+    if not matches:
+        return []
+    photos = {p.id: p for p in EvidencePhoto.query.filter(EvidencePhoto.id.in_([i for _, i in matches])).all()}
+    return [dict(photos[photo_id].to_dict(), distance=distance) for distance, photo_id in matches]
+
+
+def stored_file(sha256: str, variant: str):
+    """(directory, filename) of a stored original or derivative, or None for an unknown variant."""
+    if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+        return None
+    name, extension = os.path.splitext(variant)
+    if name == 'original' and extension in ALLOWED_EXTENSIONS:
+        return os.path.join(processor.root, 'originals', sha256[:2]), sha256 + extension
+    if name in DERIVATIVES and extension == '.jpg':
+        return processor.derived_dir(sha256), variant
+    return None
+
+
+processor = PhotoProcessor()
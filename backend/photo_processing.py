@@ -0,0 +1,108 @@
+"""
+Crimetryx AI - Photo Derivatives
+Thumbnails, previews and perceptual hashes for evidence photos.
+
+These functions run in worker processes (see photo_ingest), so this module
+only depends on Pillow and NumPy. Derivatives are made from the largest
+down, each from the previous one, and JPEG originals are decoded at reduced
+scale (Pillow's draft mode) when the largest derivative allows it, which
+avoids decoding full-resolution camera images more than needed.
+
+The perceptual hash is a 64-bit DCT hash (pHash): the image is reduced to
+32 x 32 grey levels, and each bit says whether one of the 8 x 8
+lowest-frequency DCT coefficients is above their median. Near-duplicate
+photos (recompressed, resized, slightly cropped or re-exposed) differ in only
+a few bits.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image, ImageOps
+
+DERIVATIVES = {'preview': 1600, 'small': 640, 'thumb': 256}  # Longest side in pixels, largest first
+JPEG_QUALITY = 85
+HASH_SIZE = 8
+HASH_SAMPLE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+DCT = _dct_matrix(HASH_SAMPLE)
+
+
+def perceptual_hash(image: Image.Image) -> str:
+    """64-bit DCT perceptual hash as 16 hex digits."""
+    grey = np.asarray(image.convert('L').resize((HASH_SAMPLE, HASH_SAMPLE), Image.LANCZOS), dtype=np.float64)
+    low = (DCT @ grey @ DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    bits = low > np.median(low[1:])  # The DC term only reflects overall brightness
+    return np.packbits(bits).tobytes().hex()
+
+
+def hamming_distances(target: str, hashes: list) -> np.ndarray:
+    """Bit differences between one perceptual hash and a list of them."""
+    if not hashes:
+        return np.zeros(0, dtype=np.int64)
+    values = np.array([int(h, 16) for h in hashes], dtype=np.uint64) ^ np.uint64(int(target, 16))
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def _save_jpeg(image: Image.Image, path: str) -> int:
+    """Write a JPEG atomically and return its size in bytes."""
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(handle, 'wb') as f:
+        image.save(f, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def render_derivatives(original_path: str, output_dir: str) -> dict:
+    """
+    Make every derivative of an original and compute its perceptual hash.
+
+    Args:
+        original_path: The stored original
+        output_dir: Directory receiving <name>.jpg per entry in DERIVATIVES
+
+    Returns:
+        dict with the original's format, width and height (upright), phash and
+        per-derivative width, height and bytes
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with Image.open(original_path) as image:
+        image_format = image.format
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientations that swap the axes
+            width, height = height, width
+        largest = max(DERIVATIVES.values())
+        image.draft('RGB', (largest, largest))
+        current = ImageOps.exif_transpose(image)
+        if current.mode not in ('RGB', 'L'):
+            current = current.convert('RGB')
+
+        derivatives = {}
+        for name, size in sorted(DERIVATIVES.items(), key=lambda item: -item[1]):
+            current = current.copy()
+            current.thumbnail((size, size), Image.LANCZOS)
+            derivatives[name] = {
+                'width': current.width,
+                'height': current.height,
+                'bytes': _save_jpeg(current, os.path.join(output_dir, f'{name}.jpg'))
+            }
+        phash = perceptual_hash(current)
+
+    return {
+        'format': image_format,
+        'width': width,
+        'height': height,
+        'phash': phash,
+        'derivatives': derivatives
+    }
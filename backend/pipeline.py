@@ -0,0 +1,572 @@
+"""
+Crimetryx AI - Pipeline Runs
+Server-side execution of agent pipelines for a case.
+
+A pipeline run takes an ordered list of agents (the full pipeline or any
+subset) and runs them in a background worker, so a run carries on when the
+client disconnects. Each stage gets its inputs from the stages before it in
+memory. Agents that are not part of the run fall back to the case's latest
+stored output. Progress is published on the change feed as agent.started and
+agent.completed per stage, between pipeline.started and pipeline.completed,
+and the run's row records the status of every stage.
+
+Runs are incremental unless forced. Every agent log stores a fingerprint of
+the agent's inputs: case details, the evidence as the agent sees it (which
+carries each item's chain-of-custody hash), the scene model, the solved
+bloodstain trajectories (see spatter.py) and the digests
+of the upstream outputs it reads (see AGENT_INPUTS). When a stage's
+fingerprint matches the agent's latest completed log, that output is reused
+and logged with decision 'reused' instead of calling the model again. A new
+upstream output changes the digests downstream, so exactly the stages that
+depend on a change are recomputed.
+
+Several processes can execute runs against one database. Each active run
+records the process executing it (worker_id), which refreshes its
+heartbeat_at every HEARTBEAT_INTERVAL seconds. Runs whose heartbeat is older
+than STALE_AFTER belong to a process that is gone and are marked
+interrupted; runs of live processes are left alone.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Case, AgentLog, Hypothesis, PipelineRun
+from agents import scene_interpreter, evidence_reasoner, timeline_builder, hypothesis_challenger, model_for
+from ledger import record_entry
+from case_similarity import index as similarity_index
+from search_index import index_hypothesis, index_agent_log, remove_document
+from change_feed import feed
+from run_control import check_quota, RunInProgress
+from spatter import latest_analysis, facts, case_stains, stains_hash
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '4'))  # Runs executing at the same time
+AGENT_TYPES = ['scene_interpreter', 'evidence_reasoner', 'timeline_builder', 'hypothesis_challenger']
+ACTIVE_STATUSES = ('queued', 'running')
+HEARTBEAT_INTERVAL = float(os.getenv('PIPELINE_HEARTBEAT_INTERVAL', '15'))  # Seconds
+STALE_AFTER = timedelta(seconds=4 * HEARTBEAT_INTERVAL)  # Active runs not heard from this long are interrupted
+
+# What each agent reads: case details, evidence, the scene model, and upstream agent outputs
+AGENT_INPUTS = {
+    'scene_interpreter': ('case', 'evidence', 'scene_model'),
+    'evidence_reasoner': ('evidence', 'spatter', 'scene_interpreter'),
+    'timeline_builder': ('scene_interpreter', 'evidence_reasoner'),
+    'hypothesis_challenger': ('timeline_builder', 'scene_interpreter', 'evidence_reasoner'),
+}
+
+# Used by single-agent runs when a case has no evidence yet, so agents can still be demonstrated
+DEMO_EVIDENCE = [
+    {
+        'evidence_id': 'E-001',
+        'type': 'bloodstain_spatter',
+        'x': 2.5, 'y': 0.1, 'z': -1.2,
+        'description': 'Impact spatter pattern on wall, 4ft height',
+        'notes': 'Medium velocity impact spatter consistent with blunt force'
+    },
+    {
+        'evidence_id': 'E-002',
+        'type': 'weapon_knife',
+        'x': -1.8, 'y': 0, 'z': 0.5,
+        'description': 'Kitchen knife, 6-inch blade, found on floor',
+        'notes': 'Partial fingerprints recovered, blood trace on blade'
+    },
+    {
+        'evidence_id': 'E-003',
+        'type': 'footprint',
+        'x': 0, 'y': 0, 'z': 2.1,
+        'description': 'Size 10 boot print in blood',
+        'notes': 'Pattern consistent with work boots, leading to exit'
+    },
+    {
+        'evidence_id': 'E-004',
+        'type': 'bloodstain_pool',
+        'x': 1.5, 'y': 0, 'z': -0.5,
+        'description': 'Blood pool, approximately 2ft diameter',
+        'notes': 'Primary scene, victim location at time of injury'
+    },
+    {
+        'evidence_id': 'E-005',
+        'type': 'fingerprint',
+        'x': -2.5, 'y': 1.2, 'z': -2.0,
+        'description': 'Latent fingerprint on window frame',
+        'notes': 'Clear ridge detail, possible suspect print'
+    }
+]
+
+
+def case_details(case: Case) -> dict:
+    """Case fields the agents read, without the spatter analysis."""
+    return {
+        'case_id': case.case_id,
+        'location': case.location or 'Residential Property - Master Bedroom',
+        'date': case.date.isoformat() if case.date else None,
+        'dimensions': {'width': 12, 'length': 10, 'height': 3}
+    }
+
+
+def build_inputs(case: Case, demo: bool = False):
+    """
+    Case data and evidence list passed to the agents.
+
+    Measured bloodstains are solved (or their stored solution reused) here,
+    so case_data carries the spatter analysis as facts for the agents; the
+    caller commits. A case without evidence gets DEMO_EVIDENCE only when
+    demo is set (single-agent runs); analyses see the empty list.
+    """
+    evidence_list = [e.to_dict() for e in case.evidence]
+    if not evidence_list and demo:
+        evidence_list = DEMO_EVIDENCE
+    case_data = case_details(case)
+    spatter_facts = facts(latest_analysis(case))
+    if spatter_facts:
+        case_data['spatter_analysis'] = spatter_facts
+    return case_data, evidence_list
+
+
+def save_agent_log(case_id: int, agent_type: str, result: dict, inputs: str, **fields) -> AgentLog:
+    """
+    Store an agent result as a log: payloads in the blob store, hash in the case ledger, output in search.
+
+    Extra fields (input_fingerprint, decision) are set on the log. The caller commits.
+    """
+    output = result.get('output', {})
+    log = AgentLog(
+        case_id=case_id,
+        agent_type=agent_type,
+        status=result.get('status', 'unknown'),
+        execution_time=result.get('execution_time', 0),
+        created_at=datetime.utcnow(),
+        **fields
+    )
+    output_json = json.dumps(output)
+    log.store_payloads(inputs, output_json, output_json)
+    log.generate_hash()
+    db.session.add(log)
+    db.session.flush()
+    record_entry(case_id, 'agent_log', log.id, log.hash)
+    index_agent_log(log, output)
+    return log
+
+
+def stored_outputs(case: Case) -> dict:
+    """Latest stored output per agent type."""
+    logs = AgentLog.query.filter_by(case_id=case.id).order_by(AgentLog.created_at, AgentLog.id).all()
+    return {log.agent_type: json.loads(log.payload('outputs') or '{}') for log in logs}
+
+
+def input_fingerprint(agent_type: str, case: Case, case_data: dict, evidence_list: list, outputs: dict) -> str:
+    """SHA-256 over everything an agent reads, with upstream outputs reduced to their digests."""
+    inputs = {'agent_type': agent_type, 'model': model_for(agent_type)}
+    for name in AGENT_INPUTS[agent_type]:
+        if name == 'case':
+            inputs['case'] = case_data
+        elif name == 'evidence':
+            inputs['evidence'] = evidence_list
+        elif name == 'scene_model':
+            inputs['scene_model'] = case.scene_model_path
+        elif name == 'spatter':
+            inputs['spatter'] = case_data.get('spatter_analysis')
+        else:
+            output = outputs.get(name)
+            inputs[name] = hashlib.sha256(json.dumps(output).encode()).hexdigest() if output is not None else None
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def run_fingerprint(case: Case, agents: list, force: bool = False) -> str:
+    """
+    Identity of a run request: its agents, their models and the case inputs, used to coalesce duplicates.
+
+    Read-only: the stains are identified by their hash instead of being solved.
+    """
+    stains = case_stains(case)
+    inputs = {
+        'agents': agents,
+        'models': [model_for(agent_type) for agent_type in agents],
+        'force': force,
+        'case': case_details(case),
+        'evidence': [e.to_dict() for e in case.evidence],
+        'spatter': stains_hash(stains) if stains else None,
+        'scene_model': case.scene_model_path
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def active_run(case_id: int, fingerprint: str):
+    """The queued or running run with this input fingerprint, if any."""
+    return PipelineRun.query.filter(
+        PipelineRun.case_id == case_id,
+        PipelineRun.input_fingerprint == fingerprint,
+        PipelineRun.status.in_(ACTIVE_STATUSES)
+    ).order_by(PipelineRun.id.desc()).first()
+
+
+def insert_run(run: PipelineRun):
+    """
+    Add and flush a new active run.
+
+    The unique index on active fingerprints rejects the insert when another
+    process started an identical run after the caller checked active_run;
+    the session is rolled back and RunInProgress carries that run.
+    """
+    db.session.add(run)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        raise RunInProgress(active_run(run.case_id, run.input_fingerprint))
+
+
+def upsert_hypotheses(case: Case, scenarios: list):
+    """
+    Make the case's hypotheses match scenarios, keyed by scenario ID.
+
+    Existing hypotheses are updated in place, new scenarios are added and
+    hypotheses for scenarios that are gone are deleted. An empty list (a
+    failed or empty run) leaves the hypotheses as they are.
+    """
+    if not scenarios:
+        return
+    existing = {h.scenario_id: h for h in Hypothesis.query.filter_by(case_id=case.id).all()}
+    seen = set()
+    for scenario in scenarios:
+        scenario_id = str(scenario.get('scenario_id', 'X'))[:10]
+        if scenario_id in seen:
+            continue
+        seen.add(scenario_id)
+        h = existing.pop(scenario_id, None) or Hypothesis(case_id=case.id, scenario_id=scenario_id)
+        h.description = scenario.get('title') or scenario.get('description') or 'Unknown scenario'
+        h.timeline = json.dumps(scenario.get('timeline', []))
+        h.confidence = scenario.get('confidence', 0.5)
+        h.supporting_agents = json.dumps(scenario.get('supporting_evidence', []))
+        h.contradictions = json.dumps(scenario.get('contradictions', []))
+        db.session.add(h)
+        db.session.flush()
+        index_hypothesis(h)
+    for h in existing.values():
+        remove_document('hypothesis', h.id)
+        db.session.delete(h)
+
+
+def apply_challenges(case: Case, output: dict):
+    """Revise hypothesis confidence and contradictions from challenger output."""
+    for challenge in output.get('challenges', []):
+        scenario_id = challenge.get('scenario_id')
+        if scenario_id:
+            h = Hypothesis.query.filter_by(case_id=case.id, scenario_id=scenario_id).first()
+            if h:
+                h.confidence = challenge.get('revised_confidence', h.confidence)
+                h.contradictions = json.dumps(challenge.get('contradictions', []))
+
+
+def reusable_log(case: Case, agent_type: str, fingerprint: str):
+    """The agent's latest log, if it completed with the same inputs."""
+    latest = (AgentLog.query.filter_by(case_id=case.id, agent_type=agent_type)
+              .order_by(AgentLog.created_at.desc(), AgentLog.id.desc()).first())
+    if latest is not None and latest.status == 'completed' and latest.input_fingerprint == fingerprint:
+        return latest
+    return None
+
+
+def reuse_stage(case: Case, agent_type: str, previous: AgentLog, outputs: dict, run_id: int = None) -> dict:
+    """
+    Log a stage whose inputs are unchanged, pointing at the output it reuses.
+
+    The previous log is the agent's latest one, so the hypotheses it produced
+    are still the case's current hypotheses. Challenges are applied again in
+    case a recomputed timeline produced identical scenarios and reset them.
+    """
+    output = json.loads(previous.payload('outputs') or '{}')
+    outputs[agent_type] = output
+    if agent_type == 'hypothesis_challenger':
+        apply_challenges(case, output)
+
+    log = AgentLog(
+        case_id=case.id,
+        agent_type=agent_type,
+        status='completed',
+        execution_time=0,
+        created_at=datetime.utcnow(),
+        input_fingerprint=previous.input_fingerprint,
+        decision='reused',
+        reused_log_id=previous.id
+    )
+    # Payloads are content-addressed, so the copy only adds references
+    log.inputs_ref, log.reasoning_ref, log.outputs_ref = previous.inputs_ref, previous.reasoning_ref, previous.outputs_ref
+    if not log.outputs_ref:
+        log.store_payloads(previous.payload('inputs'), previous.payload('reasoning'), previous.payload('outputs'))
+    log.generate_hash()
+    db.session.add(log)
+    db.session.flush()
+    record_entry(case.id, 'agent_log', log.id, log.hash)
+    db.session.commit()
+
+    completed = {'agent_type': agent_type, 'status': log.status, 'execution_time': 0, 'decision': 'reused'}
+    if run_id is not None:
+        completed['run_id'] = run_id
+    feed.publish(case.id, 'agent.completed', completed)
+    return {'status': 'completed', 'output': output, 'execution_time': 0, 'decision': 'reused',
+            'reused_log_id': previous.id, 'agent_log_id': log.id}
+
+
+def run_stage(case: Case, agent_type: str, case_data: dict, evidence_list: list, outputs: dict,
+              run_id: int = None, reuse: bool = False) -> dict:
+    """
+    Run one agent, store its log and apply its effect on the case's hypotheses.
+
+    Inputs from earlier agents are read from outputs, and this agent's output
+    is written back to it, so a sequence of calls sharing one dict passes
+    results along without reloading them. With reuse, an agent whose input
+    fingerprint matches its latest completed log is not run again.
+
+    Returns:
+        The agent result, plus decision and agent_log_id
+    """
+    fingerprint = input_fingerprint(agent_type, case, case_data, evidence_list, outputs)
+    previous = reusable_log(case, agent_type, fingerprint) if reuse else None
+    if previous is not None:
+        return reuse_stage(case, agent_type, previous, outputs, run_id)
+
+    started = {'agent_type': agent_type}
+    if run_id is not None:
+        started['run_id'] = run_id
+    feed.publish(case.id, 'agent.started', started)
+
+    scene_output = outputs.get('scene_interpreter', {})
+    evidence_output = outputs.get('evidence_reasoner', {})
+    if agent_type == 'scene_interpreter':
+        result = scene_interpreter(case_data, evidence_list)
+    elif agent_type == 'evidence_reasoner':
+        result = evidence_reasoner(scene_output, evidence_list, case_data.get('spatter_analysis'))
+    elif agent_type == 'timeline_builder':
+        result = timeline_builder(scene_output, evidence_output)
+
+        # Timeline scenarios of a successful run replace the case's hypotheses
+        if result.get('status') == 'completed':
+            upsert_hypotheses(case, result.get('output', {}).get('scenarios', []))
+    elif agent_type == 'hypothesis_challenger':
+        scenarios = outputs.get('timeline_builder', {}).get('scenarios', [])
+        result = hypothesis_challenger(scenarios, scene_output, evidence_output)
+
+        apply_challenges(case, result.get('output', {}))
+    else:
+        raise ValueError(f'Unknown agent type: {agent_type}')
+
+    output = result.get('output', {})
+    outputs[agent_type] = output
+
+    log = save_agent_log(case.id, agent_type, result, json.dumps(case_data),
+                         input_fingerprint=fingerprint, decision='computed')
+    db.session.commit()
+    similarity_index.refresh_case(case.id)
+
+    completed = {'agent_type': agent_type, 'status': log.status, 'execution_time': log.execution_time,
+                 'decision': 'computed'}
+    if run_id is not None:
+        completed['run_id'] = run_id
+    feed.publish(case.id, 'agent.completed', completed)
+    return dict(result, decision='computed', agent_log_id=log.id)
+
+
+class PipelineRunner:
+    """Executes pipeline runs on a thread pool, one app context per run."""
+
+    def __init__(self, workers: int = PIPELINE_WORKERS, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.workers = workers
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = None
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = set()
+        self._heartbeat = None
+
+    def init_app(self, app):
+        """
+        Attach to the app, start the worker pool and the heartbeat thread.
+
+        Runs whose process stopped reporting are marked interrupted, now and
+        on every heartbeat.
+        """
+        self._app = app
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pipeline')
+        with app.app_context():
+            self.reap_stale()
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._run_heartbeat, name='pipeline-heartbeat', daemon=True)
+            self._heartbeat.start()
+
+    def claim(self, run: PipelineRun):
+        """Mark a flushed run as executed by this process, so its heartbeat is kept fresh."""
+        run.worker_id = self.worker_id
+        run.heartbeat_at = datetime.utcnow()
+        with self._lock:
+            self._active.add(run.id)
+
+    def release(self, run_id: int):
+        with self._lock:
+            self._active.discard(run_id)
+
+    def beat(self):
+        """Refresh the heartbeat of this process' active runs. Must run inside an app context."""
+        with self._lock:
+            run_ids = list(self._active)
+        if run_ids:
+            db.session.execute(
+                db.update(PipelineRun)
+                .where(PipelineRun.id.in_(run_ids), PipelineRun.status.in_(ACTIVE_STATUSES))
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.session.commit()
+
+    def reap_stale(self, now: datetime = None) -> int:
+        """
+        Mark active runs whose process stopped reporting as interrupted.
+
+        Runs from before heartbeats were recorded are judged by when they
+        were created. Must run inside an app context.
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - STALE_AFTER
+        result = db.session.execute(
+            db.update(PipelineRun)
+            .where(
+                PipelineRun.status.in_(ACTIVE_STATUSES),
+                db.or_(PipelineRun.heartbeat_at < cutoff,
+                       db.and_(PipelineRun.heartbeat_at.is_(None), PipelineRun.created_at < cutoff))
+            )
+            .values(status='interrupted', current_agent=None, finished_at=now)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def _run_heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                with self._app.app_context():
+                    self.beat()
+                    self.reap_stale()
+            except Exception as e:
+                logger.warning('Pipeline heartbeat failed: %s', e)
+
+    def start(self, case: Case, agents: list, requested_by: str = None, force: bool = False):
+        """
+        Create a queued run for a case and submit it. Forced runs recompute every stage.
+
+        An identical run that is still queued or running, in any process, is
+        returned instead of starting another one. New runs are subject to the analysis quotas.
+
+        Returns:
+            (run, coalesced)
+
+        Raises:
+            QuotaExceeded: The case or investigator has no runs left
+        """
+        fingerprint = run_fingerprint(case, agents, force)
+        with self._lock:
+            active = active_run(case.id, fingerprint)
+            if active is not None:
+                return active, True
+
+            check_quota(case.id, requested_by)
+            run = PipelineRun(
+                case_id=case.id,
+                agents=json.dumps(agents),
+                status='queued',
+                stages=json.dumps([{'agent_type': agent_type, 'status': 'pending'} for agent_type in agents]),
+                input_fingerprint=fingerprint,
+                requested_by=requested_by,
+                created_at=datetime.utcnow()
+            )
+            try:
+                insert_run(run)
+            except RunInProgress as e:
+                return e.run, True
+        self.claim(run)  # Takes the lock itself
+        db.session.commit()
+        self._executor.submit(self._execute, run.id, force)
+        return run, False
+
+    def _execute(self, run_id: int, force: bool = False):
+        with self._app.app_context():
+            try:
+                self.execute(run_id, force)
+            except Exception as e:
+                logger.exception('Pipeline run %s failed', run_id)
+                db.session.rollback()
+                run = db.session.get(PipelineRun, run_id)
+                if run is not None:
+                    run.status = 'failed'
+                    run.error = str(e)
+                    run.current_agent = None
+                    run.finished_at = datetime.utcnow()
+                    db.session.commit()
+                    feed.publish(run.case_id, 'pipeline.completed', {'run_id': run.id, 'status': run.status})
+            finally:
+                self.release(run_id)
+
+    def execute(self, run_id: int, force: bool = False):
+        """Run every stage of a run in order. Must run inside an app context."""
+        run = db.session.get(PipelineRun, run_id)
+        case = db.session.get(Case, run.case_id) if run is not None else None
+        if case is None:
+            return
+
+        agents = json.loads(run.agents)
+        stages = json.loads(run.stages)
+        run.status = 'running'
+        run.started_at = datetime.utcnow()
+        db.session.commit()
+        feed.publish(case.id, 'pipeline.started', {'run_id': run.id, 'agents': agents})
+
+        case_data, evidence_list = build_inputs(case)
+        outputs = stored_outputs(case)
+        for stage in stages:
+            agent_type = stage['agent_type']
+            run.current_agent = agent_type
+            stage.update(status='running', started_at=datetime.utcnow().isoformat())
+            run.stages = json.dumps(stages)
+            db.session.commit()
+
+            result = run_stage(case, agent_type, case_data, evidence_list, outputs, run_id=run.id, reuse=not force)
+
+            stage.update(
+                status=result.get('status', 'unknown'),
+                execution_time=result.get('execution_time', 0),
+                decision=result['decision'],
+                agent_log_id=result['agent_log_id'],
+                finished_at=datetime.utcnow().isoformat()
+            )
+            if result.get('validation'):
+                stage['validation'] = result['validation']
+            if result.get('status') == 'error':
+                stage['error'] = result.get('error')
+                run.error = f'{agent_type} failed: {result.get("error")}'
+                break
+
+        for stage in stages:
+            if stage['status'] == 'pending':
+                stage['status'] = 'skipped'
+        run.stages = json.dumps(stages)
+        run.status = 'failed' if run.error else 'completed'
+        run.current_agent = None
+        run.finished_at = datetime.utcnow()
+        if run.status == 'completed' and agents == AGENT_TYPES:
+            case.status = 'analyzed'
+        db.session.commit()
+        feed.publish(case.id, 'pipeline.completed', {'run_id': run.id, 'status': run.status, 'error': run.error})
+
+
+runner = PipelineRunner()
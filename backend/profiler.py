@@ -0,0 +1,109 @@
+"""
+Crimetryx AI - Sampling Profiler
+Opt-in stack sampling for slow requests, written as folded stacks.
+
+When PROFILE_SLOW_MS is set, one background thread samples the stacks of all
+threads that are serving requests, every PROFILE_INTERVAL_MS. Requests that
+take longer than the threshold have their samples written to PROFILE_DIR.
+The output uses the folded format ("frame;frame;frame count" per line), so
+it can be passed straight to flamegraph.pl or loaded into speedscope.
+Sampling costs nothing when disabled and little when enabled, because
+requests do not trace every call.
+
+Usage:
+    PROFILE_SLOW_MS=500 python app.py
+    flamegraph.pl profiles/<file>.folded > slow.svg
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '0'))  # 0 disables profiling
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+MAX_STACK_DEPTH = 128
+
+
+def fold_stack(frame) -> str:
+    """Folded representation of a frame's stack, outermost first."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads on a fixed interval."""
+
+    def __init__(self, slow_ms: float = PROFILE_SLOW_MS, interval_ms: float = PROFILE_INTERVAL_MS,
+                 output_dir: str = PROFILE_DIR):
+        self.slow_ms = slow_ms
+        self.interval = interval_ms / 1000.0
+        self.output_dir = output_dir
+        self._active = {}  # thread ident -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.slow_ms > 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def begin(self):
+        """Start sampling the calling thread."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ensure_started()
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, label: str, elapsed: float):
+        """
+        Stop sampling the calling thread, and write its profile if the request was slow.
+
+        Returns:
+            Path of the written profile, or None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or elapsed * 1000 < self.slow_ms:
+            return None
+        return self.dump(samples, label, elapsed)
+
+    def dump(self, samples: Counter, label: str, elapsed: float) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:80]
+        filename = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}_{slug}_{int(elapsed * 1000)}ms.folded"
+        path = os.path.join(self.output_dir, filename)
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[fold_stack(frame)] += 1
+
+
+profiler = SamplingProfiler()
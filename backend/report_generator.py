@@ -12,7 +12,8 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
-from models import Case, Evidence, AgentLog, Hypothesis
+from models import Case, Evidence, AgentLog, Hypothesis, CaseLedger
+from structured_output import repair_json
 
 
 def generate_case_report(case: Case) -> str:
@@ -161,15 +162,9 @@ def generate_case_report(case: Case) -> str:
     }
     
     def clean_json_text(text):
-        """Remove markdown code blocks and parse JSON."""
-        if not text:
-            return {}
-        # Remove markdown code blocks
-        text = text.replace('```json', '').replace('```', '').strip()
-        try:
-            return json.loads(text)
-        except:
-            return {}
+        """Parse JSON from logs written before outputs were validated (fences, trailing commas, truncation)."""
+        parsed, _ = repair_json(text)
+        return parsed if parsed is not None else {}
     
     def format_findings(data, prefix=""):
         """Format nested data as readable text."""
@@ -209,15 +204,16 @@ def generate_case_report(case: Case) -> str:
         story.append(Paragraph(agent_names.get(log.agent_type, log.agent_type), styles['SubSection']))
         story.append(Paragraph(f"<b>Status:</b> {log.status.upper()} | <b>Time:</b> {log.execution_time:.2f}s", styles['BodyJustified']))
         
-        if log.reasoning:
+        log_reasoning = log.payload('reasoning')
+        if log_reasoning:
             # Parse the reasoning JSON
-            reasoning_text = log.reasoning
+            reasoning_text = log_reasoning
             if reasoning_text.startswith('"') and reasoning_text.endswith('"'):
                 reasoning_text = reasoning_text[1:-1]
             
             # Try to extract and parse JSON
             try:
-                reasoning = json.loads(log.reasoning)
+                reasoning = json.loads(log_reasoning)
                 if isinstance(reasoning, str):
                     reasoning = clean_json_text(reasoning)
                 elif isinstance(reasoning, dict) and 'reasoning' in reasoning:
@@ -288,6 +284,14 @@ def generate_case_report(case: Case) -> str:
         ParagraphStyle(name='Disclaimer', parent=styles['Normal'], fontSize=8, textColor=colors.grey)
     ))
     
+    # Ledger root for chain-of-custody verification
+    ledger = CaseLedger.query.filter_by(case_id=case.id).first()
+    if ledger and ledger.root:
+        story.append(Paragraph(
+            f"<i>Custody ledger root: {ledger.root} ({ledger.size} entries)</i>",
+            ParagraphStyle(name='LedgerRoot', parent=styles['Normal'], fontSize=7, textColor=colors.grey)
+        ))
+    
     # Build PDF
     doc.build(story)
     
@@ -0,0 +1,257 @@
+"""
+Crimetryx AI - Risk Scoring
+Batch suspect risk scores from FIR history, MO patterns, gang affiliation and recency.
+
+Features are aggregated from case links into flat NumPy arrays and scored in
+one vectorized pass, so a full rescore of a million suspects is a few array
+operations rather than a Python loop per suspect. Scores are stored on the
+suspect row; case writes rescore only the suspects they touch.
+
+Recency is measured at scoring time, so scheduled full rescores keep it fresh.
+
+Usage:
+    python risk_scoring.py rescore [--batch-size 5000]   Rescore every suspect
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, update
+
+from models import db, Case, Suspect, case_suspects
+
+# Lower bounds of each risk level, matching the predictions page
+RISK_LEVELS = [('Low', 0.0), ('Medium', 0.4), ('High', 0.7)]
+
+CRIME_TYPES = ['Robbery', 'Fraud', 'Murder', 'Assault', 'Burglary', 'Theft']
+CRIME_SEVERITY = np.array([4.0, 1.8, 5.0, 3.5, 3.0, 2.0])  # Base severity (0-5) per crime type
+DEFAULT_SEVERITY = 2.5  # Unknown or missing crime type
+
+WEIGHTS = {
+    'fir_history': 0.35,
+    'matched_mo': 0.20,
+    'gang_affiliated': 0.15,
+    'recency': 0.30,
+}
+FIR_SCALE = 5.0  # Cases at which the FIR component reaches ~63%
+MO_SCALE = 3.0  # Distinct MO patterns at which the MO component reaches ~63%
+RECENCY_HALF_LIFE_DAYS = 90.0
+MAX_MATCHED_MO = 5  # MO patterns stored per suspect for display
+EPOCH = datetime(1970, 1, 1)  # Naive UTC timestamps are converted relative to this
+
+
+def risk_level_bounds(level: str) -> tuple:
+    """(lower, upper) score bounds for a risk level name; upper is None for the top level."""
+    names = [name for name, _ in RISK_LEVELS]
+    if level not in names:
+        raise ValueError(f'Unknown risk level: {level}')
+    index = names.index(level)
+    upper = RISK_LEVELS[index + 1][1] if index + 1 < len(RISK_LEVELS) else None
+    return RISK_LEVELS[index][1], upper
+
+
+def _unique_counts(keys):
+    """Sorted unique values and their counts (sort + diff beats np.unique on large int arrays)."""
+    keys = np.sort(keys)
+    if not keys.size:
+        return keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.diff(np.append(starts, keys.size))
+
+
+def aggregate_features(n_suspects: int, link_suspect, link_time, link_crime,
+                       mo_suspect, mo_code) -> dict:
+    """
+    Reduce case links to per-suspect feature arrays.
+
+    Args:
+        n_suspects: Number of suspects (indices are 0..n-1)
+        link_suspect: Suspect index of each case link
+        link_time: Case time of each link (POSIX seconds)
+        link_crime: Crime type code of each link (-1 if unknown)
+        mo_suspect: Suspect index of each (suspect, MO pattern) occurrence
+        mo_code: MO pattern code of each occurrence
+
+    Returns:
+        Dict of arrays: fir_count, mo_count, last_active (NaN if never active),
+        crime_code (-1 if none), plus the distinct (suspect, MO) pairs
+    """
+    link_suspect = np.asarray(link_suspect, dtype=np.int64)
+    link_crime = np.asarray(link_crime, dtype=np.int64)
+    mo_suspect = np.asarray(mo_suspect, dtype=np.int64)
+    mo_code = np.asarray(mo_code, dtype=np.int64)
+
+    fir_count = np.bincount(link_suspect, minlength=n_suspects)
+
+    last_active = np.full(n_suspects, -np.inf)
+    np.maximum.at(last_active, link_suspect, np.asarray(link_time, dtype=np.float64))
+    last_active[np.isneginf(last_active)] = np.nan
+
+    # Distinct MO patterns per suspect via unique packed (suspect, pattern) keys
+    n_mo = int(mo_code.max()) + 1 if mo_code.size else 1
+    mo_pairs, _ = _unique_counts(mo_suspect * n_mo + mo_code)
+    mo_pair_suspect = mo_pairs // n_mo
+    mo_count = np.bincount(mo_pair_suspect, minlength=n_suspects)
+
+    # Most frequent crime type per suspect: count (suspect, crime) pairs, keep each suspect's max
+    crime_code = np.full(n_suspects, -1, dtype=np.int64)
+    known = link_crime >= 0
+    if known.any():
+        n_crime = int(link_crime[known].max()) + 1
+        keys, counts = _unique_counts(link_suspect[known] * n_crime + link_crime[known])
+        suspects, crimes = keys // n_crime, keys % n_crime
+        order = np.lexsort((counts, suspects))
+        suspects, crimes = suspects[order], crimes[order]
+        last_of_group = np.append(suspects[1:] != suspects[:-1], True)
+        crime_code[suspects[last_of_group]] = crimes[last_of_group]
+
+    return {
+        'fir_count': fir_count,
+        'mo_count': mo_count,
+        'last_active': last_active,
+        'crime_code': crime_code,
+        'mo_pair_suspect': mo_pair_suspect,
+        'mo_pair_code': mo_pairs % n_mo,
+    }
+
+
+def score_features(fir_count, mo_count, gang_affiliated, days_since_active):
+    """
+    Risk score in [0, 1] for each suspect.
+
+    Each feature saturates smoothly so no single one dominates; suspects with
+    no recorded activity (NaN days) get no recency contribution.
+    """
+    fir = 1.0 - np.exp(-np.asarray(fir_count, dtype=np.float64) / FIR_SCALE)
+    mo = 1.0 - np.exp(-np.asarray(mo_count, dtype=np.float64) / MO_SCALE)
+    gang = np.asarray(gang_affiliated, dtype=np.float64)
+    days = np.clip(np.asarray(days_since_active, dtype=np.float64), 0.0, None)
+    recency = np.nan_to_num(np.exp2(-days / RECENCY_HALF_LIFE_DAYS), nan=0.0)
+    score = (WEIGHTS['fir_history'] * fir + WEIGHTS['matched_mo'] * mo
+             + WEIGHTS['gang_affiliated'] * gang + WEIGHTS['recency'] * recency)
+    return np.round(np.clip(score, 0.0, 1.0), 2)
+
+
+def severity_scores(scores, crime_code):
+    """Expected severity (0-5): crime type base severity scaled by risk."""
+    crime_code = np.asarray(crime_code, dtype=np.int64)
+    base = np.where(crime_code >= 0, CRIME_SEVERITY[np.clip(crime_code, 0, None)], DEFAULT_SEVERITY)
+    return np.round(np.clip(base * (0.75 + 0.5 * np.asarray(scores)), 0.0, 5.0), 1)
+
+
+def risk_levels(scores):
+    """Risk level name for each score."""
+    bounds = np.array([lower for _, lower in RISK_LEVELS[1:]])
+    names = np.array([name for name, _ in RISK_LEVELS])
+    return names[np.searchsorted(bounds, np.asarray(scores), side='right')]
+
+
+def _load_links(suspect_pks: list) -> tuple:
+    """Case links for the given suspects as flat arrays plus the MO vocabulary."""
+    index = {pk: i for i, pk in enumerate(suspect_pks)}
+    crime_codes = {name: code for code, name in enumerate(CRIME_TYPES)}
+    mo_vocab = {}
+    link_suspect, link_time, link_crime, mo_suspect, mo_code = [], [], [], [], []
+
+    stmt = (
+        select(case_suspects.c.suspect_id, Case.crime_type, Case.mo_patterns, Case.created_at)
+        .join(Case, Case.id == case_suspects.c.case_id)
+    )
+    # Bound the IN list for incremental rescores; full rescores read every link
+    if len(suspect_pks) <= 10000:
+        stmt = stmt.where(case_suspects.c.suspect_id.in_(suspect_pks))
+
+    for suspect_pk, crime_type, mo_patterns, created_at in db.session.execute(
+            stmt.execution_options(yield_per=10000)):
+        i = index.get(suspect_pk)
+        if i is None:
+            continue
+        link_suspect.append(i)
+        link_time.append((created_at - EPOCH).total_seconds() if created_at else np.nan)
+        link_crime.append(crime_codes.get(crime_type, -1))
+        for pattern in json.loads(mo_patterns) if mo_patterns else []:
+            mo_suspect.append(i)
+            mo_code.append(mo_vocab.setdefault(pattern, len(mo_vocab)))
+
+    return (link_suspect, link_time, link_crime, mo_suspect, mo_code), list(mo_vocab)
+
+
+def rescore_suspects(suspect_pks: list = None, now: datetime = None, batch_size: int = 5000) -> int:
+    """
+    Recompute and store risk scores.
+
+    Args:
+        suspect_pks: Suspect primary keys to rescore (all suspects if None)
+        now: Reference time for recency (defaults to utcnow)
+        batch_size: Rows per bulk UPDATE / commit
+
+    Returns:
+        Number of suspects rescored
+    """
+    now = now or datetime.utcnow()
+    query = select(Suspect.id, Suspect.gang_affiliated).order_by(Suspect.id)
+    if suspect_pks is not None:
+        if not suspect_pks:
+            return 0
+        query = query.where(Suspect.id.in_(suspect_pks))
+    rows = db.session.execute(query).all()
+    if not rows:
+        return 0
+
+    pks = [row[0] for row in rows]
+    gang = np.array([bool(row[1]) for row in rows])
+    links, mo_vocab = _load_links(pks)
+    features = aggregate_features(len(pks), *links)
+
+    days = ((now - EPOCH).total_seconds() - features['last_active']) / 86400.0
+    scores = score_features(features['fir_count'], features['mo_count'], gang, days)
+    severity = severity_scores(scores, features['crime_code'])
+
+    matched = [[] for _ in pks]
+    for i, code in zip(features['mo_pair_suspect'].tolist(), features['mo_pair_code'].tolist()):
+        if len(matched[i]) < MAX_MATCHED_MO:
+            matched[i].append(mo_vocab[code])
+
+    updates = []
+    for i, pk in enumerate(pks):
+        last_active = features['last_active'][i]
+        crime_code = features['crime_code'][i]
+        updates.append({
+            'id': pk,
+            'risk_score': float(scores[i]),
+            'severity': float(severity[i]),
+            'crime_type': CRIME_TYPES[crime_code] if crime_code >= 0 else None,
+            'fir_count': int(features['fir_count'][i]),
+            'matched_mo': json.dumps(matched[i]),
+            'last_active': None if np.isnan(last_active) else EPOCH + timedelta(seconds=float(last_active)),
+            'scored_at': now,
+        })
+        if len(updates) >= batch_size:
+            db.session.execute(update(Suspect), updates)
+            db.session.commit()
+            updates = []
+    if updates:
+        db.session.execute(update(Suspect), updates)
+        db.session.commit()
+    return len(pks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suspect risk scoring.')
+    parser.add_argument('command', choices=['rescore'])
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        count = rescore_suspects(batch_size=args.batch_size)
+    print(f'Rescored {count} suspects')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Crimetryx AI - Analysis Run Control
+Single-flight coalescing and rate quotas for agent analysis runs.
+
+Identical analyses requested at the same time share one execution: the
+first caller runs it and the others wait for its result. Identity is the
+case plus a fingerprint of the run's inputs (see pipeline.run_fingerprint),
+so a run over changed evidence is not merged with an older one.
+SingleFlight covers callers in this process; joined callers give up after
+ANALYSIS_WAIT_TIMEOUT seconds. Across processes, a unique index on the
+(case_id, input_fingerprint) of active pipeline_runs rows lets only one
+identical run be queued or running at a time.
+
+Quotas cap how many analyses can start per case and per investigator within
+ANALYSIS_QUOTA_WINDOW seconds, counted from pipeline_runs rows. Callers
+that join a running analysis do not use quota. A limit of 0 disables it.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+from models import db, PipelineRun
+
+ANALYSIS_QUOTA_WINDOW = int(os.getenv('ANALYSIS_QUOTA_WINDOW', '3600'))  # Seconds
+ANALYSIS_QUOTA_PER_CASE = int(os.getenv('ANALYSIS_QUOTA_PER_CASE', '10'))
+ANALYSIS_QUOTA_PER_INVESTIGATOR = int(os.getenv('ANALYSIS_QUOTA_PER_INVESTIGATOR', '30'))
+ANALYSIS_WAIT_TIMEOUT = float(os.getenv('ANALYSIS_WAIT_TIMEOUT', '600'))  # Seconds a joined caller waits
+
+
+class QuotaExceeded(Exception):
+    """An analysis quota is used up; retry_after is in seconds."""
+
+    def __init__(self, scope: str, limit: int, retry_after: int):
+        super().__init__(f'Analysis quota exceeded: {limit} runs per {ANALYSIS_QUOTA_WINDOW}s per {scope}')
+        self.scope = scope
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class RunInProgress(Exception):
+    """An identical run is already queued or running, possibly in another process."""
+
+    def __init__(self, run: PipelineRun):
+        super().__init__(f'Identical run {run.id} is already {run.status}')
+        self.run = run
+
+
+class WaitTimeout(Exception):
+    """A joined caller stopped waiting for the running call."""
+
+
+def check_quota(case_id: int, investigator: str = None, now: datetime = None):
+    """Raise QuotaExceeded if the case or investigator has no analysis runs left in the window."""
+    now = now or datetime.utcnow()
+    window_start = now - timedelta(seconds=ANALYSIS_QUOTA_WINDOW)
+    scopes = [('case', ANALYSIS_QUOTA_PER_CASE, PipelineRun.case_id == case_id)]
+    if investigator:
+        scopes.append(('investigator', ANALYSIS_QUOTA_PER_INVESTIGATOR, PipelineRun.requested_by == investigator))
+    for scope, limit, condition in scopes:
+        if not limit:
+            continue
+        count, oldest = db.session.execute(
+            db.select(db.func.count(PipelineRun.id), db.func.min(PipelineRun.created_at))
+            .where(condition, PipelineRun.created_at >= window_start)
+        ).one()
+        if count >= limit:
+            retry_after = max(1, int((oldest - window_start).total_seconds()) + 1)
+            raise QuotaExceeded(scope, limit, retry_after)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key get its result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout: float = None):
+        """
+        Run fn() for key, or wait for the call already running for it.
+
+        Returns:
+            (result, shared) where shared is True for callers that joined
+
+        Raises:
+            WaitTimeout: A joined caller waited longer than timeout seconds
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise WaitTimeout(f'Still running after {timeout:g}s')
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
@@ -0,0 +1,142 @@
+"""
+Crimetryx AI - Scene Watcher
+Server-side tracking of KIRI Engine photogrammetry jobs.
+
+Rather than every open browser tab polling /scene-status, one background
+thread checks the cases that are still processing and publishes scene.status
+on the change feed when their status changes. When a job completes, the model
+is downloaded into the file store, the case is marked ready, scene.ready is
+published and the case's scene video moves to the cold storage tier.
+The watcher thread and /scene-status requests may sync the same case; the
+download is serialized per case (and the case row locked where the database
+supports it), so only the first caller to see the completion stores the model.
+"""
+
+import os
+import logging
+import threading
+
+from models import db, Case
+from change_feed import feed
+from storage import store as file_store
+
+logger = logging.getLogger(__name__)
+
+SCENE_POLL_INTERVAL = float(os.getenv('SCENE_POLL_INTERVAL', '10'))  # Seconds between KIRI status checks
+FINAL_STATUSES = ('completed', 'failed')
+
+
+class SceneWatcher:
+    """Polls KIRI Engine for processing cases and publishes status changes."""
+
+    def __init__(self, service, interval: float = SCENE_POLL_INTERVAL):
+        self.service = service
+        self.interval = interval
+        self._app = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._watching = set()
+        self._case_locks = {}
+        self._last_status = {}
+        self._thread = None
+
+    def start(self, app):
+        """Start the background thread and resume watching cases left processing."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._app = app
+            with app.app_context():
+                pending = db.session.execute(
+                    db.select(Case.id).where(Case.status == 'processing', Case.scene_task_id.isnot(None))
+                ).scalars().all()
+            self._watching.update(pending)
+            self._thread = threading.Thread(target=self._run, name='scene-watcher', daemon=True)
+            self._thread.start()
+
+    def watch(self, case_id: int):
+        """Track a case until its scene job completes or fails."""
+        with self._lock:
+            self._watching.add(case_id)
+        self._wake.set()
+
+    def sync(self, case: Case) -> dict:
+        """
+        Check a case's scene job once and apply the result.
+
+        Publishes scene.status when the status changes, and downloads the
+        model and publishes scene.ready on completion.
+
+        Returns:
+            The KIRI status result, plus model_path once the model is stored
+        """
+        if not case.scene_task_id:
+            return {'status': 'not_started'}
+
+        result = self.service.get_status(case.scene_task_id)
+        if not result['success']:
+            return result
+
+        status = result['status']
+        if self._last_status.get(case.id) != status:
+            self._last_status[case.id] = status
+            feed.publish(case.id, 'scene.status', {'task_id': case.scene_task_id, 'status': status})
+
+        if status == 'completed' and not case.scene_model_path:
+            error = self._store_model(case)
+            if error:
+                return dict(result, error=error)
+
+        if status in FINAL_STATUSES:
+            with self._lock:
+                self._watching.discard(case.id)
+                self._case_locks.pop(case.id, None)
+            self._last_status.pop(case.id, None)
+        if case.scene_model_path:
+            result['model_path'] = case.scene_model_path
+        return result
+
+    def _case_lock(self, case_id: int) -> threading.Lock:
+        with self._lock:
+            return self._case_locks.setdefault(case_id, threading.Lock())
+
+    def _store_model(self, case: Case):
+        """Download and store the model of a completed job unless another caller already has; returns an error."""
+        with self._case_lock(case.id):
+            db.session.refresh(case, with_for_update=True)
+            if case.scene_model_path:
+                db.session.commit()
+                return None
+            download_result = self.service.download_model(case.scene_task_id, self._app.config['MODELS_FOLDER'])
+            if not download_result['success']:
+                db.session.rollback()
+                return download_result.get('error')
+            case.scene_model_path = os.path.basename(download_result['zip_path'])
+            file_store.put('models', case.scene_model_path, download_result['zip_path'], case_id=case.id,
+                           content_type='application/zip')
+            case.status = 'ready'
+            db.session.commit()
+        feed.publish(case.id, 'scene.ready', {'model_path': case.scene_model_path})
+        try:
+            file_store.archive('uploads', case.id)
+        except Exception as e:
+            logger.warning('Could not archive scene video for case %s: %s', case.id, e)
+        return None
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                case_ids = list(self._watching)
+            for case_id in case_ids:
+                try:
+                    with self._app.app_context():
+                        case = db.session.get(Case, case_id)
+                        if case is None:
+                            with self._lock:
+                                self._watching.discard(case_id)
+                            continue
+                        self.sync(case)
+                except Exception as e:
+                    logger.warning('Scene status check failed for case %s: %s', case_id, e)
@@ -0,0 +1,379 @@
+"""
+Crimetryx AI - Full-Text Search
+Ranked, prefix-aware search over evidence notes, hypotheses and agent findings.
+
+Searchable text is written to search_documents in the same transaction as
+the row it describes, so the index never drifts from the data. The database
+does the indexing:
+  - SQLite: an external-content FTS5 table kept in sync by triggers, ranked
+    with bm25 and with prefix indexes for short prefixes
+  - PostgreSQL: a generated tsvector column with a GIN index, ranked with
+    ts_rank_cd
+Other databases fall back to unranked substring matching.
+
+Filters (case status, evidence type, document type, case) are part of the
+SQL that matches, so counts, facets and pages always cover every match.
+
+Usage:
+    python search_index.py rebuild   Re-index every evidence item, hypothesis and agent log
+"""
+
+import re
+import sys
+import json
+import argparse
+
+from sqlalchemy import text
+
+from models import db, Evidence, Hypothesis, AgentLog, Blob, SearchDocument
+from blob_store import decode
+
+DOC_TYPES = ['evidence', 'hypothesis', 'agent_log']
+SNIPPET_TOKENS = 12
+FACETS = (('case_status', 'c.status'), ('evidence_type', 'd.evidence_type'), ('doc_type', 'd.doc_type'))
+
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title, body, content='search_documents', content_rowid='id',
+        tokenize='porter unicode61', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE OF title, body ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+POSTGRES_SCHEMA = [
+    """ALTER TABLE search_documents ADD COLUMN IF NOT EXISTS tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(title, '') || ' ' || body)) STORED""",
+    'CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)',
+]
+
+
+def create_search_schema(connection):
+    """Create the dialect-specific index structures on a connection if they are missing."""
+    for statement in {'sqlite': SQLITE_SCHEMA, 'postgresql': POSTGRES_SCHEMA}.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+
+def ensure_search_schema(engine):
+    """Create the dialect-specific index structures if they are missing."""
+    with engine.begin() as connection:
+        create_search_schema(connection)
+
+
+# =============================================================================
+# Indexing
+# =============================================================================
+
+def flatten_text(value) -> str:
+    """All string values in a JSON-like structure, in order."""
+    parts = []
+
+    def walk(item):
+        if isinstance(item, str):
+            parts.append(item)
+        elif isinstance(item, dict):
+            for child in item.values():
+                walk(child)
+        elif isinstance(item, (list, tuple)):
+            for child in item:
+                walk(child)
+
+    walk(value)
+    return '\n'.join(parts)
+
+
+def index_document(doc_type: str, ref_id: int, case_id: int, body: str,
+                   title: str = None, evidence_type: str = None):
+    """
+    Insert or replace the searchable text for one row.
+
+    Call inside the session that writes the row; the caller commits.
+    """
+    doc = SearchDocument.query.filter_by(doc_type=doc_type, ref_id=ref_id).first()
+    if not body:
+        if doc is not None:
+            db.session.delete(doc)
+        return
+    if doc is None:
+        doc = SearchDocument(doc_type=doc_type, ref_id=ref_id)
+        db.session.add(doc)
+    doc.case_id = case_id
+    doc.title = title
+    doc.body = body
+    doc.evidence_type = evidence_type
+
+
+def remove_document(doc_type: str, ref_id: int):
+    SearchDocument.query.filter_by(doc_type=doc_type, ref_id=ref_id).delete(synchronize_session=False)
+
+
+def remove_case_documents(case_id: int, doc_type: str = None):
+    """Drop a case's documents (optionally of one type) before the rows go."""
+    query = SearchDocument.query.filter_by(case_id=case_id)
+    if doc_type:
+        query = query.filter_by(doc_type=doc_type)
+    query.delete(synchronize_session=False)
+
+
+def evidence_document(evidence_id: str, evidence_type: str, notes: str) -> tuple:
+    """(title, body) of an evidence item."""
+    type_words = (evidence_type or '').replace('_', ' ')
+    return evidence_id, f'{type_words}\n{notes or ""}'.strip()
+
+
+def hypothesis_document(scenario_id: str, description: str, timeline: str) -> tuple:
+    """(title, body) of a hypothesis; timeline is its stored JSON."""
+    timeline = json.loads(timeline) if timeline else []
+    return f'Scenario {scenario_id}', '\n'.join(filter(None, [description, flatten_text(timeline)]))
+
+
+def index_evidence(evidence: Evidence):
+    title, body = evidence_document(evidence.evidence_id, evidence.evidence_type, evidence.notes)
+    index_document('evidence', evidence.id, evidence.case_id, body, title, evidence.evidence_type)
+
+
+def index_hypothesis(hypothesis: Hypothesis):
+    title, body = hypothesis_document(hypothesis.scenario_id, hypothesis.description, hypothesis.timeline)
+    index_document('hypothesis', hypothesis.id, hypothesis.case_id, body, title)
+
+
+def index_agent_log(log: AgentLog, output):
+    """Index an agent's findings from its (decoded) output."""
+    index_document('agent_log', log.id, log.case_id, flatten_text(output), log.agent_type)
+
+
+def _source_documents(connection, batch_size: int):
+    """(doc_type, ref_id, case_id, title, body, evidence_type) for every source row, in id order per type."""
+    sources = (
+        ('evidence', db.select(Evidence.id, Evidence.case_id, Evidence.evidence_id, Evidence.evidence_type,
+                               Evidence.notes), Evidence.id),
+        ('hypothesis', db.select(Hypothesis.id, Hypothesis.case_id, Hypothesis.scenario_id, Hypothesis.description,
+                                 Hypothesis.timeline), Hypothesis.id),
+        ('agent_log', db.select(AgentLog.id, AgentLog.case_id, AgentLog.agent_type, AgentLog.outputs, Blob.codec,
+                                Blob.data).outerjoin(Blob, Blob.digest == AgentLog.outputs_ref), AgentLog.id),
+    )
+    for doc_type, query, id_column in sources:
+        last_id = 0
+        while True:
+            rows = connection.execute(query.where(id_column > last_id).order_by(id_column).limit(batch_size)).all()
+            if not rows:
+                break
+            for row in rows:
+                if doc_type == 'evidence':
+                    title, body = evidence_document(row[2], row[3], row[4])
+                    yield doc_type, row[0], row[1], title, body, row[3]
+                elif doc_type == 'hypothesis':
+                    yield (doc_type, row[0], row[1], *hypothesis_document(row[2], row[3], row[4]), None)
+                else:
+                    outputs = decode(row[4], row[5]) if row[4] is not None else row[3]
+                    yield doc_type, row[0], row[1], row[2], flatten_text(json.loads(outputs) if outputs else None), None
+            last_id = rows[-1][0]
+
+
+def rebuild(connection, batch_size: int = 1000) -> int:
+    """
+    Re-index every evidence item, hypothesis and agent log over one connection.
+
+    Only the columns the documents are built from are read, so migration
+    0006 can run it against the schema of that revision.
+
+    Returns:
+        Number of documents written
+    """
+    connection.execute(db.delete(SearchDocument))
+    count = 0
+    batch = []
+    for doc_type, ref_id, case_id, title, body, evidence_type in _source_documents(connection, batch_size):
+        if body:
+            batch.append({'doc_type': doc_type, 'ref_id': ref_id, 'case_id': case_id, 'title': title,
+                          'body': body, 'evidence_type': evidence_type})
+        if len(batch) >= batch_size:
+            connection.execute(db.insert(SearchDocument), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        connection.execute(db.insert(SearchDocument), batch)
+        count += len(batch)
+    return count
+
+
+# =============================================================================
+# Queries
+# =============================================================================
+
+def parse_query(query: str) -> list:
+    """
+    Split a query into (words, prefix) terms.
+
+    Quoted text is a phrase; a trailing * on a word makes it a prefix search.
+    """
+    terms = []
+    for phrase, word in _QUERY_RE.findall(query or ''):
+        words = _WORD_RE.findall((phrase or word).lower())
+        if words:
+            terms.append((words, bool(word) and word.endswith('*')))
+    return terms
+
+
+def _fts5_query(terms: list) -> str:
+    return ' '.join('"' + ' '.join(words) + '"' + ('*' if prefix else '') for words, prefix in terms)
+
+
+def _tsquery(terms: list) -> str:
+    parts = []
+    for words, prefix in terms:
+        if prefix:
+            words = words[:-1] + [words[-1] + ':*']
+        parts.append('(' + ' <-> '.join(words) + ')')
+    return ' & '.join(parts)
+
+
+def _backend() -> str:
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        exists = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'")).first()
+        return 'fts5' if exists else 'like'
+    if dialect == 'postgresql':
+        return 'tsvector'
+    return 'like'
+
+
+def _match_sql(backend: str, terms: list, params: dict) -> tuple:
+    """
+    SQL for matching documents: a subquery yielding (id, rank), plus the rank order.
+
+    Matching runs first in its own subquery so the text index drives the
+    plan; the filters are joined onto the matches.
+    """
+    if backend == 'fts5':
+        params['match'] = _fts5_query(terms)
+        return ('SELECT rowid AS id, bm25(search_fts, 2.0, 1.0) AS rank '
+                'FROM search_fts WHERE search_fts MATCH :match', 'ASC')
+    if backend == 'tsvector':
+        params['match'] = _tsquery(terms)
+        return ("SELECT id, ts_rank_cd(tsv, q) AS rank "
+                "FROM search_documents, to_tsquery('english', :match) AS q WHERE tsv @@ q", 'DESC')
+    conditions = []
+    for i, (words, _) in enumerate(terms):
+        conditions.append(f'lower(body) LIKE :term{i}')
+        params[f'term{i}'] = '%' + ' '.join(words) + '%'
+    return f"SELECT id, id AS rank FROM search_documents WHERE {' AND '.join(conditions)}", 'DESC'
+
+
+def _snippets(backend: str, ids: list, params: dict) -> dict:
+    """Highlighted snippets for one page of results."""
+    if not ids:
+        return {}
+    id_list = ', '.join(str(int(i)) for i in ids)
+    if backend == 'fts5':
+        sql = (f"SELECT rowid, snippet(search_fts, 1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}) "
+               f'FROM search_fts WHERE search_fts MATCH :match AND rowid IN ({id_list})')
+    elif backend == 'tsvector':
+        sql = ("SELECT id, ts_headline('english', body, to_tsquery('english', :match), "
+               f"'StartSel=<mark>, StopSel=</mark>, MaxWords={SNIPPET_TOKENS * 2}, MinWords={SNIPPET_TOKENS}') "
+               f'FROM search_documents WHERE id IN ({id_list})')
+    else:
+        sql = f'SELECT id, substr(body, 1, 200) FROM search_documents WHERE id IN ({id_list})'
+    return dict(db.session.execute(text(sql), params).all())
+
+
+def search(query: str, case_status: str = None, evidence_type: str = None, doc_type: str = None,
+           case_id: int = None, offset: int = 0, limit: int = 20) -> dict:
+    """
+    Ranked full-text search with facet counts.
+
+    Args:
+        query: Words, "quoted phrases" and prefix* terms (all must match)
+        case_status, evidence_type, doc_type, case_id: Optional filters
+        offset, limit: Paging over the ranked results
+
+    Returns:
+        Dict with total, results (with highlighted snippets) and facets by
+        case status, evidence type and document type, all over the filtered
+        matches.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return {'query': query, 'total': 0, 'results': [], 'facets': {}}
+
+    backend = _backend()
+    params = {'limit': limit, 'offset': offset}
+    matches, direction = _match_sql(backend, terms, params)
+
+    where = 'd.id = m.id AND c.id = d.case_id'
+    for column, name, value in (('c.status', 'case_status', case_status),
+                                ('d.evidence_type', 'evidence_type', evidence_type),
+                                ('d.doc_type', 'doc_type', doc_type), ('d.case_id', 'case_id', case_id)):
+        if value is not None:
+            where += f' AND {column} = :{name}'
+            params[name] = value
+    # CROSS JOIN keeps SQLite's join order: matches first
+    filtered = f'FROM ({matches}) m CROSS JOIN search_documents d CROSS JOIN cases c WHERE {where}'
+
+    # The total and every facet come from one grouped count over the filtered matches
+    total = 0
+    facets = {facet: {} for facet, _ in FACETS}
+    columns = ', '.join(column for _, column in FACETS)
+    for row in db.session.execute(text(f'SELECT {columns}, COUNT(*) {filtered} GROUP BY {columns}'), params):
+        total += row[-1]
+        for (facet, _), value in zip(FACETS, row):
+            if value is not None:
+                facets[facet][value] = facets[facet].get(value, 0) + row[-1]
+
+    page = db.session.execute(text(
+        f'SELECT d.id, d.doc_type, d.ref_id, d.case_id, c.case_id AS case_code, c.status, '
+        f'd.evidence_type, d.title, m.rank {filtered} '
+        f'ORDER BY m.rank {direction}, d.id LIMIT :limit OFFSET :offset'
+    ), params).mappings().all()
+    snippets = _snippets(backend, [row['id'] for row in page], params)
+
+    return {
+        'query': query,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'ranked': backend != 'like',
+        'results': [{
+            'doc_type': row['doc_type'],
+            'ref_id': row['ref_id'],
+            'case_id': row['case_id'],
+            'case_code': row['case_code'],
+            'case_status': row['status'],
+            'evidence_type': row['evidence_type'],
+            'title': row['title'],
+            'snippet': snippets.get(row['id']),
+            'score': round(abs(float(row['rank'] or 0)), 4) if backend != 'like' else None
+        } for row in page],
+        'facets': facets
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search index maintenance.')
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            create_search_schema(connection)
+            count = rebuild(connection, args.batch_size)
+    print(f'Indexed {count} documents')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
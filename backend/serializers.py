@@ -0,0 +1,217 @@
+"""
+Crimetryx AI - Serializers
+Fast JSON encoding for list and detail endpoints.
+
+The to_dict path loads full ORM objects, builds a dict per row field by field,
+parses stored JSON text with json.loads, and then Flask's encoder walks the
+whole structure again. This path does less work:
+- selects only the needed columns as plain tuples;
+- encodes them with orjson when it is installed, which writes datetimes as
+  ISO 8601 natively;
+- splices columns that already hold JSON text into the output as they are,
+  without parsing them and encoding them again;
+- encodes arrays in batches, so large lists can be streamed.
+
+The payloads match the shape of the corresponding to_dict methods.
+"""
+
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from models import db, Case, Evidence, AgentLog, Hypothesis, Suspect, case_suspects
+
+try:
+    import orjson
+except ImportError:  # Standard library fallback produces the same output, only slower
+    orjson = None
+
+BATCH_SIZE = 500  # Rows encoded per streamed chunk
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(value) -> bytes:
+        """Encode a value as compact JSON bytes."""
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+else:
+    def dumps(value) -> bytes:
+        """Encode a value as compact JSON bytes."""
+        return json.dumps(value, default=_default, separators=(',', ':')).encode()
+
+
+def encode_row(fields: dict, raw: dict = None) -> bytes:
+    """
+    Encode a JSON object from plain fields plus fields already holding JSON text.
+
+    Raw values are trusted to be valid JSON (they were written with json.dumps);
+    None falls back to the given default text.
+    """
+    body = dumps(fields)
+    if not raw:
+        return body
+    parts = [body[:-1]]
+    for name, (text, default) in raw.items():
+        parts.append(b',"%s":%s' % (name.encode(), (text or default).encode()))
+    parts.append(b'}')
+    return b''.join(parts)
+
+
+def json_array(rows, encode, batch_size: int = BATCH_SIZE):
+    """Yield a JSON array of encoded rows in chunks of batch_size rows."""
+    yield b'['
+    batch = []
+    first = True
+    for row in rows:
+        batch.append(encode(row))
+        if len(batch) >= batch_size:
+            yield (b'' if first else b',') + b','.join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield (b'' if first else b',') + b','.join(batch)
+    yield b']'
+
+
+# =============================================================================
+# Row encoders (column lists and encoders are kept side by side)
+# =============================================================================
+
+CASE_COLUMNS = (Case.id, Case.case_id, Case.location, Case.date, Case.investigator, Case.status,
+                Case.crime_type, Case.scene_model_path, Case.created_at, Case.updated_at, Case.mo_patterns)
+
+
+def encode_case(row) -> bytes:
+    return encode_row({
+        'id': row[0], 'case_id': row[1], 'location': row[2], 'date': row[3], 'investigator': row[4],
+        'status': row[5], 'crime_type': row[6], 'scene_model_path': row[7],
+        'created_at': row[8], 'updated_at': row[9]
+    }, {'mo_patterns': (row[10], '[]')})
+
+
+EVIDENCE_COLUMNS = (Evidence.id, Evidence.evidence_id, Evidence.case_id, Evidence.evidence_type,
+                    Evidence.x, Evidence.y, Evidence.z, Evidence.notes, Evidence.photo_path,
+                    Evidence.hash, Evidence.created_at, Evidence.created_by, Evidence.measurements)
+
+
+def encode_evidence(row) -> bytes:
+    return encode_row({
+        'id': row[0], 'evidence_id': row[1], 'case_id': row[2], 'type': row[3],
+        'coordinates': {'x': row[4], 'y': row[5], 'z': row[6]},
+        'notes': row[7], 'photo_path': row[8], 'hash': row[9],
+        'created_at': row[10], 'created_by': row[11]
+    }, {
+        'measurements': (row[12], 'null')
+    })
+
+
+HYPOTHESIS_COLUMNS = (Hypothesis.id, Hypothesis.case_id, Hypothesis.scenario_id, Hypothesis.description,
+                      Hypothesis.confidence, Hypothesis.created_at, Hypothesis.timeline,
+                      Hypothesis.supporting_agents, Hypothesis.contradictions)
+
+
+def encode_hypothesis(row) -> bytes:
+    return encode_row({
+        'id': row[0], 'case_id': row[1], 'scenario_id': row[2], 'description': row[3],
+        'confidence': row[4], 'created_at': row[5]
+    }, {
+        'timeline': (row[6], '[]'),
+        'supporting_agents': (row[7], '[]'),
+        'contradictions': (row[8], '[]')
+    })
+
+
+AGENT_LOG_COLUMNS = (AgentLog.id, AgentLog.case_id, AgentLog.agent_type, AgentLog.status,
+                     AgentLog.execution_time, AgentLog.hash, AgentLog.created_at,
+                     AgentLog.inputs, AgentLog.inputs_ref, AgentLog.reasoning, AgentLog.reasoning_ref,
+                     AgentLog.outputs, AgentLog.outputs_ref,
+                     AgentLog.input_fingerprint, AgentLog.decision, AgentLog.reused_log_id)
+
+
+def encode_agent_log(row) -> bytes:
+    from blob_store import get_blob
+
+    def payload(text, ref):
+        return get_blob(ref) if ref else text
+
+    return encode_row({
+        'id': row[0], 'case_id': row[1], 'agent_type': row[2], 'status': row[3],
+        'reasoning': payload(row[9], row[10]),
+        'execution_time': row[4], 'hash': row[5], 'input_fingerprint': row[13], 'decision': row[14],
+        'reused_log_id': row[15], 'created_at': row[6]
+    }, {
+        'inputs': (payload(row[7], row[8]), 'null'),
+        'outputs': (payload(row[11], row[12]), 'null')
+    })
+
+
+SUSPECT_COLUMNS = (Suspect.id, Suspect.suspect_id, Suspect.name, Suspect.location, Suspect.likely_weapon,
+                   Suspect.gang_affiliated, Suspect.created_at, Suspect.crime_type, Suspect.risk_score,
+                   Suspect.severity, Suspect.fir_count, Suspect.last_active, Suspect.scored_at,
+                   Suspect.matched_mo)
+
+
+def encode_suspect(row) -> bytes:
+    return encode_row({
+        'id': row[0], 'suspect_id': row[1], 'name': row[2], 'location': row[3], 'likely_weapon': row[4],
+        'gang_affiliated': row[5], 'created_at': row[6], 'crime_type': row[7], 'risk_score': row[8],
+        'severity': row[9], 'fir_count': row[10], 'last_active': row[11], 'scored_at': row[12]
+    }, {'matched_mo': (row[13], '[]')})
+
+
+# =============================================================================
+# Resources
+# =============================================================================
+
+def _rows(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+
+def cases_json():
+    """All cases, newest first, as JSON chunks."""
+    return json_array(_rows(select(*CASE_COLUMNS).order_by(Case.created_at.desc())), encode_case)
+
+
+def evidence_json(case_id: int):
+    """Evidence for a case as JSON chunks."""
+    stmt = select(*EVIDENCE_COLUMNS).where(Evidence.case_id == case_id).order_by(Evidence.id)
+    return json_array(_rows(stmt), encode_evidence)
+
+
+def agent_logs_json(case_id: int):
+    """Agent logs for a case, oldest first, as JSON chunks."""
+    stmt = select(*AGENT_LOG_COLUMNS).where(AgentLog.case_id == case_id).order_by(AgentLog.created_at)
+    return json_array(_rows(stmt), encode_agent_log)
+
+
+def suspects_json(stmt=None):
+    """Suspects (all, ordered by suspect ID, unless a statement over SUSPECT_COLUMNS is given) as JSON chunks."""
+    if stmt is None:
+        stmt = select(*SUSPECT_COLUMNS).order_by(Suspect.suspect_id)
+    return json_array(_rows(stmt), encode_suspect)
+
+
+def case_detail_json(case_id: int):
+    """A case with its evidence, agent logs, hypotheses and suspect IDs, or None if it does not exist."""
+    row = db.session.execute(select(*CASE_COLUMNS).where(Case.id == case_id)).first()
+    if row is None:
+        return None
+    hypotheses = select(*HYPOTHESIS_COLUMNS).where(Hypothesis.case_id == case_id).order_by(Hypothesis.id)
+    suspects = db.session.execute(
+        select(Suspect.suspect_id).join(case_suspects, case_suspects.c.suspect_id == Suspect.id)
+        .where(case_suspects.c.case_id == case_id)
+    ).scalars().all()
+    return [
+        encode_case(row)[:-1],
+        b',"evidence":', *evidence_json(case_id),
+        b',"agent_logs":', *agent_logs_json(case_id),
+        b',"hypotheses":', *json_array(_rows(hypotheses), encode_hypothesis),
+        b',"suspects":', dumps(suspects),
+        b'}'
+    ]
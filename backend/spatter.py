@@ -0,0 +1,285 @@
+"""
+Crimetryx AI - Bloodstain Spatter Analysis
+Impact angles, back-projected trajectories and area of origin from stain measurements.
+
+Stains are evidence items with ellipse measurements (see parse_measurements).
+For each stain:
+- impact angle: alpha = asin(width / length);
+- travel direction: the long axis direction `direction` (degrees) in the
+  plane of the surface the stain is on, given by its outward `normal`;
+- trajectory: the straight line back from the stain, rising off the surface
+  at alpha against the direction of travel.
+
+Stains are grouped by their `pattern` label and each group is solved with
+vectorized least squares:
+- area of convergence: the point on the floor (x, z) closest to all
+  trajectories projected onto it;
+- area of origin: the 3D point closest to all trajectories, with the
+  tangent-method height (distance to convergence * tan(alpha)) alongside.
+Stains far off the fitted origin (more than OUTLIER_FACTOR times the median
+residual) are dropped and the group is fitted again once.
+
+Straight-line trajectories ignore gravity and drag, so origin heights are an
+upper bound. Scene coordinates are meters with y up. Hundreds of stains
+solve in a few milliseconds.
+
+Results are stored per case as SpatterAnalysis rows, recorded in the case
+ledger, and reused until the stain measurements change. The agents receive
+them as measured facts (see facts()).
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+from models import db, Case, Evidence, SpatterAnalysis
+from ledger import record_entry
+
+OUTLIER_FACTOR = float(os.getenv('SPATTER_OUTLIER_FACTOR', '3'))
+MIN_OUTLIER_RESIDUAL = 0.05  # Meters; residuals below this are never outliers
+FLOOR_NORMAL = (0.0, 1.0, 0.0)
+SOLVER_VERSION = 1  # Part of the input hash, so stored results are recomputed when the solver changes
+
+
+def parse_measurements(data) -> dict:
+    """
+    Validate stain measurements posted with an evidence item.
+
+    Fields: width and length of the stain ellipse (any unit, only the ratio
+    is used), direction (degrees, direction of travel along the long axis,
+    counter-clockwise from the surface's reference axis, see surface_axes),
+    optional normal (outward surface normal, floor by default) and optional
+    pattern (group label for stains from one event).
+
+    Raises:
+        ValueError: If a field is missing or out of range
+    """
+    if not isinstance(data, dict):
+        raise ValueError('measurements must be an object')
+    try:
+        width = float(data['width'])
+        length = float(data['length'])
+        direction = float(data['direction']) % 360
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('measurements need numeric width, length and direction')
+    if width <= 0 or length < width:
+        raise ValueError('measurements need 0 < width <= length')
+    normal = data.get('normal', FLOOR_NORMAL)
+    try:
+        normal = [float(v) for v in normal]
+    except (TypeError, ValueError):
+        raise ValueError('normal must be three numbers')
+    if len(normal) != 3 or not any(normal):
+        raise ValueError('normal must be a non-zero vector of three numbers')
+    measurements = {'width': width, 'length': length, 'direction': direction, 'normal': normal}
+    if data.get('pattern'):
+        measurements['pattern'] = str(data['pattern'])[:50]
+    return measurements
+
+
+def surface_axes(normals: np.ndarray):
+    """
+    In-plane axes (u, v) for unit surface normals.
+
+    u is world +x projected onto the surface, or world +z for surfaces facing
+    along x; v = normal x u. On the floor, u is +x and v is -z.
+    """
+    reference = np.where(np.abs(normals[:, :1]) > 0.9, [[0.0, 0.0, 1.0]], [[1.0, 0.0, 0.0]])
+    u = reference - np.einsum('ij,ij->i', reference, normals)[:, None] * normals
+    u /= np.linalg.norm(u, axis=1, keepdims=True)
+    v = np.cross(normals, u)
+    return u, v
+
+
+def trajectories(width: np.ndarray, length: np.ndarray, direction: np.ndarray, normals: np.ndarray):
+    """
+    Impact angles (radians) and unit directions pointing back along each droplet's flight.
+    """
+    normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+    alpha = np.arcsin(np.clip(width / length, 0.0, 1.0))
+    u, v = surface_axes(normals)
+    gamma = np.radians(direction)
+    travel = np.cos(gamma)[:, None] * u + np.sin(gamma)[:, None] * v
+    back = -np.cos(alpha)[:, None] * travel + np.sin(alpha)[:, None] * normals
+    return alpha, back
+
+
+def closest_point(points: np.ndarray, directions: np.ndarray, weights: np.ndarray = None):
+    """
+    Least-squares point nearest to lines through points along unit directions.
+
+    Minimizes sum w_i |(I - d_i d_i^T)(x - p_i)|^2. Returns (point, residuals),
+    or (None, None) if the lines are (nearly) parallel.
+    """
+    dim = points.shape[1]
+    weights = np.ones(len(points)) if weights is None else weights
+    projectors = np.eye(dim)[None] - np.einsum('ni,nj->nij', directions, directions)
+    a = np.einsum('n,nij->ij', weights, projectors)
+    b = np.einsum('n,nij,nj->i', weights, projectors, points)
+    if np.linalg.eigvalsh(a)[0] < 1e-9 * max(weights.sum(), 1.0):
+        return None, None
+    point = np.linalg.solve(a, b)
+    residuals = np.linalg.norm(np.einsum('nij,nj->ni', projectors, point - points), axis=1)
+    return point, residuals
+
+
+def back_projection_offsets(positions: np.ndarray, directions: np.ndarray, point: np.ndarray) -> np.ndarray:
+    """Perpendicular offsets from each line to a point."""
+    offsets = point - positions
+    return offsets - np.einsum('ni,ni->n', offsets, directions)[:, None] * directions
+
+
+def solve_group(positions: np.ndarray, width: np.ndarray, length: np.ndarray, direction: np.ndarray,
+                normals: np.ndarray) -> dict:
+    """Fit one spatter pattern; arrays are per stain."""
+    alpha, back = trajectories(width, length, direction, normals)
+    used = np.ones(len(positions), dtype=bool)
+    origin, residuals = closest_point(positions, back)
+    if origin is not None and len(positions) >= 4:
+        limit = max(OUTLIER_FACTOR * float(np.median(residuals)), MIN_OUTLIER_RESIDUAL)
+        inliers = residuals <= limit
+        if 3 <= inliers.sum() < len(positions):
+            refit, _ = closest_point(positions[inliers], back[inliers])
+            if refit is not None:
+                origin, used = refit, inliers
+                residuals = np.linalg.norm(back_projection_offsets(positions, back, origin), axis=1)
+
+    # Area of convergence: trajectories projected onto the floor plane (x, z)
+    flat = back[:, [0, 2]]
+    flat_norm = np.linalg.norm(flat, axis=1)
+    flat_ok = used & (flat_norm > 1e-6)
+    convergence = None
+    tangent_height = None
+    if flat_ok.sum() >= 2:
+        convergence, _ = closest_point(positions[flat_ok][:, [0, 2]], flat[flat_ok] / flat_norm[flat_ok, None])
+    if convergence is not None:
+        floor = used & (np.abs(normals[:, 1] / np.linalg.norm(normals, axis=1)) > 0.9)
+        if floor.any():
+            distances = np.linalg.norm(positions[floor][:, [0, 2]] - convergence, axis=1)
+            tangent_height = float(np.median(positions[floor, 1] + distances * np.tan(alpha[floor])))
+
+    result = {
+        'stain_count': int(len(positions)),
+        'used': int(used.sum()),
+        'origin': None,
+        'convergence': None if convergence is None else {'x': float(convergence[0]), 'z': float(convergence[1])},
+        'tangent_height': tangent_height,
+        'rms_residual': None,
+        'impact_angles': np.degrees(alpha).round(2).tolist(),
+        'residuals': None,
+        'outliers': (~used).tolist()
+    }
+    if origin is not None:
+        result['origin'] = {'x': float(origin[0]), 'y': float(origin[1]), 'z': float(origin[2])}
+        result['rms_residual'] = float(np.sqrt(np.mean(residuals[used] ** 2)))
+        result['residuals'] = residuals.round(4).tolist()
+    return result
+
+
+def solve(stains: list) -> dict:
+    """
+    Solve every pattern in a list of stains.
+
+    Args:
+        stains: dicts with evidence_id, x, y, z and the fields of parse_measurements
+
+    Returns:
+        dict with per-pattern results, each listing its stains' impact
+        angles and residuals
+    """
+    groups = {}
+    for stain in stains:
+        groups.setdefault(stain.get('pattern') or 'default', []).append(stain)
+
+    patterns = []
+    for pattern, members in sorted(groups.items()):
+        positions = np.array([(s['x'], s['y'], s['z']) for s in members], dtype=np.float64)
+        width = np.array([s['width'] for s in members], dtype=np.float64)
+        length = np.array([s['length'] for s in members], dtype=np.float64)
+        direction = np.array([s['direction'] for s in members], dtype=np.float64)
+        normals = np.array([s.get('normal') or FLOOR_NORMAL for s in members], dtype=np.float64)
+        fit = solve_group(positions, width, length, direction, normals)
+        residuals = fit.pop('residuals')
+        angles = fit.pop('impact_angles')
+        outliers = fit.pop('outliers')
+        fit['pattern'] = pattern
+        fit['stains'] = [
+            {'evidence_id': s['evidence_id'], 'impact_angle': angles[i],
+             'residual': residuals[i] if residuals else None, 'outlier': outliers[i]}
+            for i, s in enumerate(members)
+        ]
+        patterns.append(fit)
+    return {'method': 'straight-line', 'solver_version': SOLVER_VERSION, 'patterns': patterns}
+
+
+def case_stains(case: Case) -> list:
+    """Measured stains of a case, in evidence order."""
+    rows = db.session.execute(
+        db.select(Evidence.evidence_id, Evidence.x, Evidence.y, Evidence.z, Evidence.measurements)
+        .where(Evidence.case_id == case.id, Evidence.measurements.isnot(None))
+        .order_by(Evidence.id)
+    ).all()
+    stains = []
+    for evidence_id, x, y, z, measurements in rows:
+        stains.append(dict(json.loads(measurements), evidence_id=evidence_id, x=x, y=y, z=z))
+    return stains
+
+
+def stains_hash(stains: list) -> str:
+    """Identity of a set of stains for the current solver; stored analyses are keyed by it."""
+    return hashlib.sha256(
+        json.dumps({'solver': SOLVER_VERSION, 'stains': stains}, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def latest_analysis(case: Case):
+    """
+    The case's spatter analysis for its current stains, solving and storing it if needed.
+
+    Returns None when the case has no measured stains. A new analysis is
+    added and recorded in the ledger; the caller commits.
+    """
+    stains = case_stains(case)
+    if not stains:
+        return None
+    input_hash = stains_hash(stains)
+    analysis = SpatterAnalysis.query.filter_by(case_id=case.id, input_hash=input_hash) \
+        .order_by(SpatterAnalysis.id.desc()).first()
+    if analysis is not None:
+        return analysis
+
+    analysis = SpatterAnalysis(
+        case_id=case.id,
+        input_hash=input_hash,
+        stain_count=len(stains),
+        result=json.dumps(solve(stains)),
+        created_at=datetime.utcnow()
+    )
+    analysis.generate_hash()
+    db.session.add(analysis)
+    db.session.flush()
+    record_entry(case.id, 'spatter_analysis', analysis.id, analysis.hash)
+    return analysis
+
+
+def facts(analysis) -> dict:
+    """Compact form of an analysis for agent prompts."""
+    if analysis is None:
+        return None
+    result = json.loads(analysis.result)
+    return {
+        'method': 'Numerical straight-line trajectory fit (ignores gravity, so origin heights are upper bounds)',
+        'patterns': [{
+            'pattern': p['pattern'],
+            'stains_used': p['used'],
+            'area_of_origin': p['origin'],
+            'area_of_convergence': p['convergence'],
+            'tangent_method_height': p['tangent_height'],
+            'rms_residual_m': p['rms_residual'],
+            'impact_angles_deg': {s['evidence_id']: s['impact_angle'] for s in p['stains']},
+            'outliers': [s['evidence_id'] for s in p['stains'] if s['outlier']]
+        } for p in result['patterns']]
+    }
@@ -0,0 +1,490 @@
+"""
+Crimetryx AI - Tiered File Storage
+Content-addressed storage for scene videos, 3D models and reports, with hot/cold tiers and retention.
+
+Files are stored by the SHA-256 of their content and looked up by
+(namespace, name), e.g. ('models', '<task>.zip'), so the same content stored
+under several names is kept once. Each stored object has a hot copy on local
+disk (STORAGE_ROOT), a cold copy in the cold backend, or both. The cold
+backend is chosen by STORAGE_COLD_BACKEND:
+
+- local: a directory (STORAGE_COLD_PATH), e.g. an archive mount;
+- s3: any S3-compatible service (STORAGE_S3_BUCKET, with STORAGE_S3_ENDPOINT
+  for MinIO and the like), through boto3;
+- unset: no cold tier, everything stays hot.
+
+sweep() runs every STORAGE_SWEEP_INTERVAL seconds in the background (or
+`python storage.py sweep`) and keeps local disk use bounded:
+1. derived files (models, reports) past their RETENTION are forgotten;
+2. objects no name refers to any more are deleted from both tiers;
+3. hot copies not read for STORAGE_HOT_DAYS, then the least recently read
+   while the hot tier is over STORAGE_HOT_MAX_BYTES, move to the cold tier.
+
+Evidentiary originals (raw scene videos) are never forgotten or replaced;
+they are recorded in the case ledger when stored and outlive their case:
+deleting a case detaches them (case_id NULL) instead of deleting them. A cold copy's size is checked before a hot copy is dropped, and copies
+brought back from the cold tier are checked against their hash before use.
+
+Usage:
+    python storage.py sweep                   Apply retention and tiering now
+    python storage.py import                  Adopt files left in uploads/, models_3d/ and reports/
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import time
+import tempfile
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from models import db, Case, StoredObject, StoredFile
+from ledger import record_entry
+
+logger = logging.getLogger(__name__)
+
+HOT_DAYS = float(os.getenv('STORAGE_HOT_DAYS', '14'))  # Unread this long, hot copies move to the cold tier
+HOT_MAX_BYTES = int(os.getenv('STORAGE_HOT_MAX_BYTES', str(50 * 1024 ** 3)))
+SWEEP_INTERVAL = float(os.getenv('STORAGE_SWEEP_INTERVAL', '3600'))  # Seconds; 0 disables the background sweep
+ACCESS_RESOLUTION = timedelta(hours=1)  # Reads closer together than this do not update last_accessed_at
+CHUNK_SIZE = 1024 * 1024
+
+# Derived files per namespace: the newest `keep` of each case are kept, older ones for `days`
+RETENTION = {
+    'models': {'keep': 1, 'days': int(os.getenv('MODEL_RETENTION_DAYS', '7'))},
+    'reports': {'keep': int(os.getenv('REPORT_RETENTION_COUNT', '3')), 'days': int(os.getenv('REPORT_RETENTION_DAYS', '30'))},
+}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_key(sha256: str) -> str:
+    return f'objects/{sha256[:2]}/{sha256}'
+
+
+class LocalBackend:
+    """Objects as files under a directory."""
+
+    name = 'local'
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def size(self, key: str):
+        """Stored size in bytes, or None if the object is missing."""
+        path = self.path(key)
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def put(self, key: str, source_path: str):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(handle)
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str, dest_path: str):
+        shutil.copyfile(self.path(key), dest_path)
+
+    def delete(self, key: str):
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+
+class S3Backend:
+    """Objects in an S3-compatible bucket, through a boto3 client (created on first use)."""
+
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', client=None, endpoint_url: str = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError('STORAGE_COLD_BACKEND=s3 requires boto3')
+            self._client = boto3.client('s3', endpoint_url=self.endpoint_url)
+        return self._client
+
+    def size(self, key: str):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return head['ContentLength']
+
+    def put(self, key: str, source_path: str):
+        self.client.upload_file(source_path, self.bucket, self.prefix + key)
+
+    def get(self, key: str, dest_path: str):
+        self.client.download_file(self.bucket, self.prefix + key, dest_path)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def build_cold_backend():
+    """Cold tier selected by STORAGE_COLD_BACKEND (local, s3 or unset for none)."""
+    kind = os.getenv('STORAGE_COLD_BACKEND', '').lower()
+    if not kind:
+        return None
+    if kind == 'local':
+        path = os.getenv('STORAGE_COLD_PATH')
+        if not path:
+            raise ValueError('STORAGE_COLD_BACKEND=local requires STORAGE_COLD_PATH')
+        return LocalBackend(path)
+    if kind == 's3':
+        bucket = os.getenv('STORAGE_S3_BUCKET')
+        if not bucket:
+            raise ValueError('STORAGE_COLD_BACKEND=s3 requires STORAGE_S3_BUCKET')
+        return S3Backend(bucket, os.getenv('STORAGE_S3_PREFIX', ''), endpoint_url=os.getenv('STORAGE_S3_ENDPOINT') or None)
+    raise ValueError(f'Unknown STORAGE_COLD_BACKEND: {kind}')
+
+
+class FileStore:
+    """Named, content-addressed files on a hot local tier and an optional cold tier."""
+
+    def __init__(self, interval: float = SWEEP_INTERVAL):
+        self.interval = interval
+        self.hot = None
+        self.cold = None
+        self._app = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app, cold=None):
+        """Open the tiers and start the background sweep."""
+        self._app = app
+        root = os.getenv('STORAGE_ROOT') or os.path.join(os.path.dirname(__file__), 'storage')
+        self.hot = LocalBackend(root)
+        self.cold = cold if cold is not None else build_cold_backend()
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='storage-sweep', daemon=True)
+            self._thread.start()
+
+    def hot_path(self, sha256: str) -> str:
+        return self.hot.path(object_key(sha256))
+
+    def put(self, namespace: str, name: str, source_path: str, case_id: int = None, original: bool = False,
+            content_type: str = None) -> StoredFile:
+        """
+        Store a file under a name, moving it into the hot tier.
+
+        Content already stored is kept once and the source is removed. A
+        derived file may be replaced by a new version under the same name;
+        an original may not. Originals of a case are recorded in its ledger.
+        When the source is already gone because a concurrent put of the same
+        name moved it in, that stored file is returned.
+
+        Raises:
+            ValueError: If the name already holds a different original
+            FileNotFoundError: If the source is missing and the name is not stored
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            ref = StoredFile.query.filter_by(namespace=namespace, name=name).first()
+            if not os.path.exists(source_path):
+                if ref is not None:
+                    return ref
+                raise FileNotFoundError(source_path)
+            sha256 = file_sha256(source_path)
+            size = os.path.getsize(source_path)
+            if ref is not None and ref.original and ref.sha256 != sha256:
+                raise ValueError(f'{namespace}/{name} is an original and cannot be replaced')
+
+            obj = db.session.get(StoredObject, sha256)
+            if obj is None:
+                obj = StoredObject(sha256=sha256, size_bytes=size, hot=False, cold=False, created_at=now)
+                db.session.add(obj)
+            path = self.hot_path(sha256)
+            if obj.hot and os.path.exists(path):
+                try:
+                    os.remove(source_path)
+                except FileNotFoundError:
+                    pass
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                try:
+                    shutil.move(source_path, path)
+                except FileNotFoundError:
+                    # Moved in by another process between the hash and the move
+                    if not os.path.exists(path):
+                        raise
+                obj.hot = True
+            obj.last_accessed_at = now
+
+            recorded = ref is not None and ref.original
+            if ref is None:
+                ref = StoredFile(namespace=namespace, name=name)
+                db.session.add(ref)
+            ref.sha256 = sha256
+            ref.case_id = case_id
+            ref.original = recorded or original
+            ref.content_type = content_type
+            ref.created_at = now
+            db.session.flush()
+            if original and case_id is not None and not recorded:
+                record_entry(case_id, 'stored_file', ref.id, sha256)
+            db.session.commit()
+        return ref
+
+    def path(self, namespace: str, name: str):
+        """
+        Local path of a stored file, brought back from the cold tier if needed.
+
+        Returns None for an unknown name.
+        """
+        ref = StoredFile.query.filter_by(namespace=namespace, name=name).first()
+        if ref is None:
+            return None
+        obj = db.session.get(StoredObject, ref.sha256)
+        path = self.hot_path(obj.sha256)
+        if not obj.hot or not os.path.exists(path):
+            self._promote(obj)
+        now = datetime.utcnow()
+        if obj.last_accessed_at is None or now - obj.last_accessed_at > ACCESS_RESOLUTION:
+            obj.last_accessed_at = now
+        db.session.commit()
+        return path
+
+    def forget(self, namespace: str, name: str) -> bool:
+        """
+        Drop a derived file's name; its content is deleted by the next sweep if unused.
+
+        Raises:
+            ValueError: If the file is an original
+        """
+        ref = StoredFile.query.filter_by(namespace=namespace, name=name).first()
+        if ref is None:
+            return False
+        if ref.original:
+            raise ValueError(f'{namespace}/{name} is an original and cannot be removed')
+        db.session.delete(ref)
+        db.session.commit()
+        return True
+
+    def release_case(self, case_id: int):
+        """
+        Before a case is deleted: drop its derived files' names and keep its originals without a case.
+
+        The derived content is deleted by the next sweep if unused. The caller commits.
+        """
+        for ref in StoredFile.query.filter_by(case_id=case_id).all():
+            if ref.original:
+                ref.case_id = None
+            else:
+                db.session.delete(ref)
+
+    def archive(self, namespace: str, case_id: int) -> int:
+        """Move a case's files in a namespace to the cold tier now (e.g. scene videos once reconstructed)."""
+        if self.cold is None:
+            return 0
+        objects = StoredObject.query.join(StoredFile, StoredFile.sha256 == StoredObject.sha256).filter(
+            StoredFile.namespace == namespace, StoredFile.case_id == case_id, StoredObject.hot.is_(True)
+        ).all()
+        for obj in objects:
+            self._demote(obj)
+        db.session.commit()
+        return len(objects)
+
+    def _promote(self, obj: StoredObject):
+        if not obj.cold or self.cold is None:
+            raise FileNotFoundError(f'Stored object {obj.sha256} has no readable copy')
+        path = self.hot_path(obj.sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(handle)
+        try:
+            self.cold.get(object_key(obj.sha256), tmp_path)
+            if file_sha256(tmp_path) != obj.sha256:
+                raise IOError(f'Cold copy of {obj.sha256} does not match its hash')
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        obj.hot = True
+
+    def _demote(self, obj: StoredObject):
+        key = object_key(obj.sha256)
+        if not obj.cold or self.cold.size(key) != obj.size_bytes:
+            self.cold.put(key, self.hot_path(obj.sha256))
+            if self.cold.size(key) != obj.size_bytes:
+                raise IOError(f'Cold copy of {obj.sha256} is incomplete')
+            obj.cold = True
+        self.hot.delete(key)
+        obj.hot = False
+
+    def sweep(self, now: datetime = None) -> dict:
+        """Apply retention, delete unreferenced objects and move idle hot copies to the cold tier."""
+        now = now or datetime.utcnow()
+        summary = {'forgotten': 0, 'deleted': 0, 'deleted_bytes': 0, 'archived': 0, 'archived_bytes': 0}
+
+        # 1. Retention for derived files; a case's current model is always kept
+        in_use = {'models': set(db.session.execute(
+            db.select(Case.scene_model_path).where(Case.scene_model_path.isnot(None))
+        ).scalars())}
+        for namespace, policy in RETENTION.items():
+            cutoff = now - timedelta(days=policy['days'])
+            refs = StoredFile.query.filter_by(namespace=namespace, original=False) \
+                .order_by(StoredFile.case_id, StoredFile.created_at.desc(), StoredFile.id.desc()).all()
+            seen = {}
+            for ref in refs:
+                seen[ref.case_id] = seen.get(ref.case_id, 0) + 1
+                if seen[ref.case_id] > policy['keep'] and ref.created_at < cutoff \
+                        and ref.name not in in_use.get(namespace, ()):
+                    db.session.delete(ref)
+                    summary['forgotten'] += 1
+        db.session.commit()
+
+        # 2. Objects no name refers to
+        unused = StoredObject.query.filter(
+            ~db.exists().where(StoredFile.sha256 == StoredObject.sha256)
+        ).all()
+        for obj in unused:
+            key = object_key(obj.sha256)
+            self.hot.delete(key)
+            if obj.cold and self.cold is not None:
+                self.cold.delete(key)
+            summary['deleted'] += 1
+            summary['deleted_bytes'] += obj.size_bytes
+            db.session.delete(obj)
+        db.session.commit()
+
+        # 3. Idle hot copies, then the least recently read while over the hot limit
+        if self.cold is not None:
+            idle_before = now - timedelta(days=HOT_DAYS)
+            hot_bytes = db.session.query(db.func.coalesce(db.func.sum(StoredObject.size_bytes), 0)) \
+                .filter(StoredObject.hot.is_(True)).scalar()
+            candidates = StoredObject.query.filter(StoredObject.hot.is_(True)) \
+                .order_by(StoredObject.last_accessed_at, StoredObject.sha256).all()
+            for obj in candidates:
+                if hot_bytes <= HOT_MAX_BYTES and obj.last_accessed_at >= idle_before:
+                    break
+                try:
+                    self._demote(obj)
+                except Exception as e:
+                    logger.warning('Could not move %s to the cold tier: %s', obj.sha256, e)
+                    continue
+                db.session.commit()
+                hot_bytes -= obj.size_bytes
+                summary['archived'] += 1
+                summary['archived_bytes'] += obj.size_bytes
+
+        summary.update(self.usage())
+        return summary
+
+    def usage(self) -> dict:
+        """Stored bytes per tier and per namespace."""
+        tiers = {}
+        for hot, cold, count, size in db.session.query(
+            StoredObject.hot, StoredObject.cold, db.func.count(), db.func.coalesce(db.func.sum(StoredObject.size_bytes), 0)
+        ).group_by(StoredObject.hot, StoredObject.cold):
+            for tier, present in (('hot', hot), ('cold', cold)):
+                if present:
+                    tiers.setdefault(tier, {'objects': 0, 'bytes': 0})
+                    tiers[tier]['objects'] += count
+                    tiers[tier]['bytes'] += int(size)
+        namespaces = {}
+        for namespace, original, count, size in db.session.query(
+            StoredFile.namespace, StoredFile.original, db.func.count(), db.func.sum(StoredObject.size_bytes)
+        ).join(StoredObject, StoredObject.sha256 == StoredFile.sha256).group_by(StoredFile.namespace, StoredFile.original):
+            entry = namespaces.setdefault(namespace, {'files': 0, 'originals': 0, 'bytes': 0})
+            entry['files'] += count
+            entry['originals'] += count if original else 0
+            entry['bytes'] += int(size or 0)
+        return {
+            'cold_backend': self.cold.name if self.cold is not None else None,
+            'hot': tiers.get('hot', {'objects': 0, 'bytes': 0}),
+            'cold': tiers.get('cold', {'objects': 0, 'bytes': 0}),
+            'namespaces': namespaces
+        }
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self._app.app_context():
+                    summary = self.sweep()
+                if summary['forgotten'] or summary['deleted'] or summary['archived']:
+                    logger.info('Storage sweep: %s', json.dumps(summary))
+            except Exception as e:
+                logger.warning('Storage sweep failed: %s', e)
+
+    def import_legacy(self, app) -> dict:
+        """
+        Adopt files written before this store: case models, reports and scene videos.
+
+        Videos are stored as originals; files that match no case are left alone.
+        """
+        counts = {'models': 0, 'reports': 0, 'uploads': 0}
+        cases = {case.case_id: case for case in Case.query.all()}
+        models = {case.scene_model_path: case for case in cases.values() if case.scene_model_path}
+
+        models_dir = app.config['MODELS_FOLDER']
+        for name in sorted(os.listdir(models_dir)):
+            if name in models and os.path.isfile(os.path.join(models_dir, name)):
+                self.put('models', name, os.path.join(models_dir, name), case_id=models[name].id,
+                         content_type='application/zip')
+                counts['models'] += 1
+
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+        if os.path.isdir(reports_dir):
+            for name in sorted(os.listdir(reports_dir)):
+                match = re.match(r'CrimetryxAI_Report_(.+)_\d{8}_\d{6}\.pdf$', name)
+                if match and match.group(1) in cases:
+                    self.put('reports', name, os.path.join(reports_dir, name), case_id=cases[match.group(1)].id,
+                             content_type='application/pdf')
+                    counts['reports'] += 1
+
+        uploads_dir = app.config['UPLOAD_FOLDER']
+        by_id = {case.id: case for case in cases.values()}
+        for name in sorted(os.listdir(uploads_dir)):
+            match = re.match(r'case_(\d+)_', name)
+            if match and int(match.group(1)) in by_id and os.path.isfile(os.path.join(uploads_dir, name)):
+                self.put('uploads', name, os.path.join(uploads_dir, name), case_id=int(match.group(1)), original=True)
+                counts['uploads'] += 1
+        return counts
+
+
+store = FileStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiered file storage maintenance.')
+    parser.add_argument('command', choices=['sweep', 'import'])
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        result = store.sweep() if args.command == 'sweep' else store.import_legacy(app)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Crimetryx AI - Structured Agent Output
+Per-agent JSON schemas, local repair of malformed JSON, and fragment re-asks.
+
+Agents request JSON mode with their schema (see llm_providers). A response
+that still fails goes through the following steps, each tried only when the
+previous one was not enough:
+1. Local repair, which costs nothing: strip markdown fences and surrounding
+   prose, drop trailing commas, close output cut off at max_tokens, and
+   coerce numeric strings in number fields.
+2. A re-ask for only the top-level fields that are missing or invalid, with
+   a fragment schema and a small max_tokens. The rest of the output is kept,
+   and a re-asked field only replaces the original if it is valid.
+3. Invalid items of array fields are dropped and the valid ones kept. Fields
+   that are still invalid are replaced by an empty value of their type, so
+   downstream agents never receive malformed input.
+
+Each step taken is recorded in the result's 'validation' entry.
+"""
+
+import os
+import copy
+import json
+
+STRUCTURED_REASK = os.getenv('STRUCTURED_REASK', '1').lower() in ('1', 'true', 'yes')
+REASK_MAX_TOKENS = int(os.getenv('STRUCTURED_REASK_MAX_TOKENS', '1500'))
+MAX_TRUNCATION_CUTS = 400  # Cut points tried when closing truncated output
+
+_STRING = {'type': 'string'}
+_NUMBER = {'type': 'number'}
+_STRINGS = {'type': 'array', 'items': _STRING}
+
+SCHEMAS = {
+    'scene_interpreter': {
+        'type': 'object',
+        'required': ['entry_exit_points', 'spatial_observations'],
+        'properties': {
+            'entry_exit_points': {'type': 'array', 'items': {
+                'type': 'object', 'required': ['location', 'type'],
+                'properties': {'location': _STRING, 'type': _STRING, 'coordinates': {'type': 'object'}}
+            }},
+            'visibility_analysis': {'type': 'array', 'items': {'type': 'object'}},
+            'distance_constraints': {'type': 'array', 'items': {'type': 'object'}},
+            'spatial_observations': _STRINGS,
+            'reasoning': _STRING
+        }
+    },
+    'evidence_reasoner': {
+        'type': 'object',
+        'required': ['evidence_analysis'],
+        'properties': {
+            'evidence_analysis': {'type': 'array', 'items': {
+                'type': 'object', 'required': ['evidence_id', 'findings'],
+                'properties': {'evidence_id': _STRING, 'type': _STRING, 'findings': _STRINGS,
+                               'inferred_direction': _STRING, 'consistency_score': _NUMBER}
+            }},
+            'pattern_correlations': {'type': 'array', 'items': {'type': 'object'}},
+            'anomalies': {'type': 'array', 'items': {'type': 'object'}},
+            'reasoning': _STRING
+        }
+    },
+    'timeline_builder': {
+        'type': 'object',
+        'required': ['scenarios'],
+        'properties': {
+            'scenarios': {'type': 'array', 'minItems': 1, 'items': {
+                'type': 'object', 'required': ['scenario_id', 'title', 'confidence', 'timeline'],
+                'properties': {
+                    'scenario_id': _STRING, 'title': _STRING, 'confidence': _NUMBER,
+                    'timeline': {'type': 'array', 'items': {
+                        'type': 'object', 'required': ['event'],
+                        'properties': {'sequence': _NUMBER, 'event': _STRING, 'estimated_time': _STRING}
+                    }},
+                    'supporting_evidence': _STRINGS, 'key_assumptions': _STRINGS, 'summary': _STRING
+                }
+            }},
+            'reasoning': _STRING
+        }
+    },
+    'hypothesis_challenger': {
+        'type': 'object',
+        'required': ['challenges'],
+        'properties': {
+            'challenges': {'type': 'array', 'items': {
+                'type': 'object', 'required': ['scenario_id', 'revised_confidence', 'contradictions'],
+                'properties': {
+                    'scenario_id': _STRING, 'revised_confidence': _NUMBER, 'verdict': _STRING,
+                    'contradictions': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }},
+            'cross_scenario_conflicts': {'type': 'array', 'items': {'type': 'object'}},
+            'overall_assessment': _STRING,
+            'reasoning': _STRING
+        }
+    },
+}
+
+EMPTY = {'array': list, 'object': dict, 'string': str}
+
+
+# =============================================================================
+# Local repair
+# =============================================================================
+
+def strip_wrapping(text: str) -> str:
+    """Drop markdown fences and any prose before the first '{' and after the last '}'."""
+    start = text.find('{')
+    if start < 0:
+        return text
+    end = text.rfind('}')
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, outside strings."""
+    out = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ',':
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ('}', ']'):
+                continue
+        out.append(ch)
+    return ''.join(out)
+
+
+def close_truncated(text: str):
+    """
+    Parse JSON that was cut off, keeping as much complete content as possible.
+
+    Tries cut points from the end backwards: after each complete value, the
+    text up to the cut is closed with the brackets still open there.
+    """
+    stack = []
+    cuts = []  # (index, open brackets at that point)
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            cuts.append((i + 1, tuple(stack)))
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+            cuts.append((i + 1, tuple(stack)))
+        elif ch == ',':
+            cuts.append((i, tuple(stack)))
+    for index, open_brackets in reversed(cuts[-MAX_TRUNCATION_CUTS:]):
+        candidate = strip_trailing_commas(text[:index].rstrip().rstrip(',') + ''.join(reversed(open_brackets)))
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def repair_json(text: str):
+    """
+    Parse model output as JSON, repairing it locally if needed.
+
+    Returns:
+        (parsed value or None, list of repairs applied)
+    """
+    if not text:
+        return None, []
+    try:
+        return json.loads(text), []
+    except ValueError:
+        pass
+    fixes = []
+    unwrapped = strip_wrapping(text.strip())
+    if unwrapped != text.strip():
+        fixes.append('unwrapped')
+    cleaned = strip_trailing_commas(unwrapped)
+    if cleaned != unwrapped:
+        fixes.append('trailing_commas')
+    try:
+        return json.loads(cleaned), fixes
+    except ValueError:
+        pass
+    closed = close_truncated(cleaned)
+    if closed is not None:
+        return closed, fixes + ['closed_truncated']
+    return None, fixes
+
+
+# =============================================================================
+# Validation
+# =============================================================================
+
+def check(value, schema: dict, path: str, errors: list, fixes: list):
+    """Validate value against a schema subset (type, required, properties, items, minItems), coercing numbers."""
+    expected = schema.get('type')
+    if expected == 'number':
+        if isinstance(value, str):
+            try:
+                value = float(value.strip().rstrip('%'))
+                fixes.append(f'coerced {path}')
+            except ValueError:
+                pass
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append((path, 'expected a number'))
+    elif expected == 'string':
+        if not isinstance(value, str):
+            errors.append((path, 'expected a string'))
+    elif expected == 'array':
+        if not isinstance(value, list):
+            errors.append((path, 'expected an array'))
+            return value
+        if len(value) < schema.get('minItems', 0):
+            errors.append((path, f'expected at least {schema["minItems"]} items'))
+        if 'items' in schema:
+            value = [check(item, schema['items'], f'{path}[{i}]', errors, fixes) for i, item in enumerate(value)]
+    elif expected == 'object':
+        if not isinstance(value, dict):
+            errors.append((path, 'expected an object'))
+            return value
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append((f'{path}.{key}' if path else key, 'missing'))
+        for key, subschema in schema.get('properties', {}).items():
+            if key in value:
+                value[key] = check(value[key], subschema, f'{path}.{key}' if path else key, errors, fixes)
+    return value
+
+
+def invalid_fields(errors: list) -> list:
+    """Top-level fields that have errors."""
+    fields = []
+    for path, _ in errors:
+        field = path.split('.')[0].split('[')[0]
+        if field and field not in fields:
+            fields.append(field)
+    return fields
+
+
+def field_errors(field: str, errors: list) -> list:
+    return [(path, message) for path, message in errors if path.split('.')[0].split('[')[0] == field]
+
+
+def drop_invalid_items(data: dict, schema: dict, field: str, errors: list) -> bool:
+    """
+    Keep the items of an array field that have no errors.
+
+    Returns:
+        True if the field is valid afterwards
+    """
+    value = data.get(field)
+    if schema['properties'].get(field, {}).get('type') != 'array' or not isinstance(value, list):
+        return False
+    bad = set()
+    for path, _ in field_errors(field, errors):
+        if not path.startswith(field + '['):
+            return False  # The array itself is wrong, not one of its items
+        bad.add(int(path[len(field) + 1:path.index(']')]))
+    kept = [item for i, item in enumerate(value) if i not in bad]
+    remaining = []
+    kept = check(kept, schema['properties'][field], field, remaining, [])
+    if remaining:
+        return False
+    data[field] = kept
+    return True
+
+
+def fragment_schema(schema: dict, fields: list) -> dict:
+    return {
+        'type': 'object',
+        'required': [field for field in fields if field in schema.get('required', [])],
+        'properties': {field: schema['properties'][field] for field in fields if field in schema['properties']}
+    }
+
+
+def reask_messages(messages: list, schema: dict, fields: list, errors: list) -> list:
+    """The original request plus a request for just the invalid fields."""
+    problems = '; '.join(f'{path}: {message}' for path, message in errors[:20])
+    return list(messages) + [{'role': 'user', 'content': (
+        f'Part of your previous answer was missing or invalid ({problems}). '
+        f'Respond ONLY with a JSON object containing exactly these fields: {", ".join(fields)}, '
+        f'matching this JSON schema:\n{json.dumps(fragment_schema(schema, fields))}'
+    )}]
+
+
+def structure(agent: str, text: str, messages: list, reask=None):
+    """
+    Turn an agent's raw completion into schema-valid output.
+
+    Args:
+        agent: Agent type, selecting the schema
+        text: Raw completion text
+        messages: The messages that produced it, reused for a re-ask
+        reask: Optional callable(messages, schema, max_tokens) returning raw
+            text for a fragment re-ask
+
+    Returns:
+        (output dict, validation report)
+    """
+    schema = SCHEMAS[agent]
+    report = {'repairs': [], 'reasked': [], 'errors': []}
+
+    data, repairs = repair_json(text)
+    report['repairs'].extend(repairs)
+    if not isinstance(data, dict):
+        data = {'reasoning': text} if text and not text.lstrip().startswith(('{', '`')) else {}
+        report['repairs'].append('unparseable')
+
+    errors = []
+    data = check(data, schema, '', errors, report['repairs'])
+    fields = invalid_fields(errors)
+
+    if fields and reask is not None and STRUCTURED_REASK:
+        fragment = fragment_schema(schema, fields)
+        try:
+            reply, reply_repairs = repair_json(reask(reask_messages(messages, schema, fields, errors), fragment,
+                                                     REASK_MAX_TOKENS))
+        except Exception as e:
+            reply, reply_repairs = None, [f'reask failed: {e}']
+        report['repairs'].extend(reply_repairs)
+        report['reasked'] = fields
+        if isinstance(reply, dict):
+            for field in fields:
+                if field not in reply:
+                    continue
+                # A re-asked field replaces the original only if it is valid as a whole
+                candidate, candidate_errors = copy.deepcopy(reply[field]), []
+                candidate = check(candidate, schema['properties'].get(field, {}), field, candidate_errors,
+                                  report['repairs'])
+                if not candidate_errors:
+                    data[field] = candidate
+        errors = []
+        data = check(data, schema, '', errors, report['repairs'])
+        fields = invalid_fields(errors)
+
+    for field in fields:
+        if drop_invalid_items(data, schema, field, errors):
+            report['repairs'].append(f'dropped invalid items of {field}')
+            continue
+        field_type = schema['properties'].get(field, {}).get('type')
+        if field_type in EMPTY:
+            data[field] = EMPTY[field_type]()
+        else:
+            data.pop(field, None)
+    report['errors'] = [f'{path}: {message}' for path, message in errors]
+    return data, report
@@ -0,0 +1,67 @@
+"""
+Shared fixtures. The app is imported once against a throwaway SQLite
+database and storage root, with background sweeps disabled.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp(prefix='crimetryx-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP, 'test.db')
+os.environ['STORAGE_ROOT'] = os.path.join(TMP, 'storage')
+os.environ['STORAGE_SWEEP_INTERVAL'] = '0'
+os.environ['STORAGE_COLD_BACKEND'] = ''
+sys.path.insert(0, BACKEND)
+sys.path.insert(1, os.path.join(os.path.dirname(BACKEND), 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def make_case(client):
+    """Create a case, optionally with evidence items, and return its JSON."""
+    def make(evidence=0, **fields):
+        data = dict({'location': 'Test Location', 'investigator': 'tester', 'crime_type': 'Robbery'}, **fields)
+        response = client.post('/api/cases', json=data)
+        assert response.status_code == 201, response.get_data(as_text=True)
+        case = response.get_json()
+        for i in range(evidence):
+            response = client.post(f"/api/cases/{case['id']}/evidence",
+                                    json={'type': 'fingerprint', 'x': i, 'y': 0, 'z': 1, 'notes': f'item {i}'})
+            assert response.status_code == 201, response.get_data(as_text=True)
+        return case
+    return make
+
+
+@pytest.fixture
+def llm():
+    """Route the agents to an offline Groq stub; call with StubGroq options."""
+    from agents import router
+    from llm_providers import GroqProvider
+    from stubs import StubGroq
+
+    def use(**options):
+        stub = StubGroq(**options)
+        router.set_provider('groq', GroqProvider(client=stub))
+        return stub
+    return use
@@ -0,0 +1,116 @@
+import pytest
+
+from models import Hypothesis
+
+
+def hypothesis_ids(app, case_id):
+    with app.app_context():
+        return sorted(h.scenario_id for h in Hypothesis.query.filter_by(case_id=case_id))
+
+
+def test_failed_analysis_keeps_hypotheses(app, client, make_case, llm):
+    case = make_case(evidence=2)
+    llm(scenarios=2)
+    assert client.post(f"/api/cases/{case['id']}/analyze").status_code == 200
+    assert hypothesis_ids(app, case['id']) == ['A', 'B']
+
+    llm(error_rate=1.0)
+    response = client.post(f"/api/cases/{case['id']}/analyze")
+    assert response.status_code == 200
+    assert response.get_json()['error']
+    assert hypothesis_ids(app, case['id']) == ['A', 'B']
+
+
+def test_reanalysis_updates_hypotheses_in_place(app, client, make_case, llm):
+    case = make_case(evidence=2)
+    llm(scenarios=3)
+    client.post(f"/api/cases/{case['id']}/analyze")
+    llm(scenarios=2)
+    client.post(f"/api/cases/{case['id']}/analyze")
+    assert hypothesis_ids(app, case['id']) == ['A', 'B']
+
+
+def test_failed_timeline_stage_keeps_hypotheses(app, client, make_case, llm, ctx):
+    from models import db, Case
+    from pipeline import build_inputs, stored_outputs, run_stage
+
+    case = make_case(evidence=2)
+    llm(scenarios=2)
+    client.post(f"/api/cases/{case['id']}/analyze")
+
+    llm(error_rate=1.0)
+    row = db.session.get(Case, case["id"])
+    case_data, evidence_list = build_inputs(row)
+    result = run_stage(row, 'timeline_builder', case_data, evidence_list, stored_outputs(row))
+    assert result['status'] == 'error'
+    assert hypothesis_ids(app, case['id']) == ['A', 'B']
+
+
+def test_analysis_without_evidence_does_not_use_demo_evidence(app, client, make_case, llm, ctx):
+    from models import db, Case
+    from pipeline import build_inputs, DEMO_EVIDENCE
+
+    case = make_case()
+    row = db.session.get(Case, case['id'])
+    assert build_inputs(row)[1] == []
+    assert build_inputs(row, demo=True)[1] == DEMO_EVIDENCE
+
+
+def test_fingerprint_is_read_only_and_stored_on_analyze_runs(app, client, make_case, llm, ctx):
+    from models import db, Case, PipelineRun, SpatterAnalysis
+    from pipeline import run_fingerprint, AGENT_TYPES
+
+    case = make_case()
+    for i in range(3):
+        client.post(f"/api/cases/{case['id']}/evidence", json={
+            'type': 'bloodstain_spatter', 'x': i, 'y': 0, 'z': 1,
+            'measurements': {'width': 1, 'length': 2, 'direction': 90 + i}
+        })
+    row = db.session.get(Case, case['id'])
+    fingerprint = run_fingerprint(row, AGENT_TYPES, force=True)
+    assert SpatterAnalysis.query.filter_by(case_id=case['id']).count() == 0
+
+    llm(scenarios=1)
+    assert client.post(f"/api/cases/{case['id']}/analyze").status_code == 200
+    run = PipelineRun.query.filter_by(case_id=case['id']).one()
+    assert run.input_fingerprint == fingerprint
+
+
+def test_identical_active_run_in_another_process_is_refused(app, client, make_case, llm, ctx):
+    from datetime import datetime
+    from models import db, Case, PipelineRun
+    from pipeline import run_fingerprint, insert_run, AGENT_TYPES
+    from run_control import RunInProgress
+
+    case = make_case(evidence=1)
+    fingerprint = run_fingerprint(db.session.get(Case, case['id']), AGENT_TYPES, force=True)
+    other = PipelineRun(case_id=case['id'], agents='[]', status='running', input_fingerprint=fingerprint,
+                        heartbeat_at=datetime.utcnow(), created_at=datetime.utcnow())
+    db.session.add(other)
+    db.session.commit()
+    try:
+        duplicate = PipelineRun(case_id=case['id'], agents='[]', status='queued', input_fingerprint=fingerprint)
+        with pytest.raises(RunInProgress) as raised:
+            insert_run(duplicate)
+        assert raised.value.run.id == other.id
+
+        llm(scenarios=1)
+        response = client.post(f"/api/cases/{case['id']}/analyze")
+        assert response.status_code == 409
+        assert response.get_json()['run']['id'] == other.id
+    finally:
+        db.session.get(PipelineRun, other.id).status = 'completed'
+        db.session.commit()
+
+
+def test_agent_logs_are_recorded_in_ledger(app, client, make_case, llm, ctx):
+    from ledger import audit_ledgers
+    from pipeline import save_agent_log
+    from models import db
+
+    case = make_case(evidence=1)
+    llm(scenarios=1)
+    client.post(f"/api/cases/{case['id']}/analyze")
+    save_agent_log(case['id'], 'load_test', {'status': 'completed', 'output': {}}, '{}')
+    db.session.commit()
+    assert audit_ledgers([case['id']])['results'][case['id']]['valid']
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import blob_store
+from models import db, Blob, AgentLog
+from blob_store import put_blob, get_blob, sweep_blobs, blob_digest, decode, encode
+
+
+def test_payloads_round_trip_and_deduplicate(ctx):
+    text = 'reasoning ' * 100
+    digest = put_blob(text)
+    assert put_blob(text) == digest == blob_digest(text)
+    db.session.commit()
+    assert Blob.query.filter_by(digest=digest).count() == 1
+    assert get_blob(digest) == text
+    assert decode(*encode(b'short')) == 'short'
+
+
+def test_rolled_back_payload_is_not_cached(ctx):
+    text = 'rolled back payload'
+    digest = put_blob(text)
+    db.session.rollback()
+    assert digest not in blob_store._cache
+    with pytest.raises(KeyError):
+        get_blob(digest)
+
+    # A later write of the same payload still stores it
+    assert put_blob(text) == digest
+    db.session.commit()
+    assert digest in blob_store._cache
+    assert db.session.get(Blob, digest) is not None
+
+
+def test_deleting_a_case_collects_its_payloads(client, make_case, llm, ctx):
+    case = make_case(evidence=1)
+    llm(scenarios=1)
+    client.post(f"/api/cases/{case['id']}/analyze")
+    refs = set()
+    for log in AgentLog.query.filter_by(case_id=case['id']):
+        refs.update([log.inputs_ref, log.reasoning_ref, log.outputs_ref])
+    shared = {ref for ref in refs
+              if AgentLog.query.filter(AgentLog.case_id != case['id'], AgentLog.outputs_ref == ref).count()}
+    db.session.commit()
+
+    assert client.delete(f"/api/cases/{case['id']}").status_code == 200
+    remaining = {blob.digest for blob in Blob.query.filter(Blob.digest.in_(refs))}
+    assert remaining <= shared
+
+
+def test_sweep_keeps_referenced_and_recent_blobs(make_case, ctx):
+    case = make_case()
+    kept = put_blob('still referenced payload')
+    log = AgentLog(case_id=case['id'], agent_type='scene_interpreter', status='completed', outputs_ref=kept)
+    recent = put_blob('orphan written just now')
+    old = put_blob('orphan from long ago')
+    db.session.add(log)
+    db.session.flush()
+    db.session.get(Blob, old).created_at = datetime.utcnow() - timedelta(days=1)
+    db.session.commit()
+
+    sweep_blobs()
+    assert db.session.get(Blob, old) is None
+    assert db.session.get(Blob, recent) is not None
+    assert db.session.get(Blob, kept) is not None
+    db.session.delete(log)
+    db.session.commit()
@@ -0,0 +1,64 @@
+import numpy as np
+
+import case_similarity
+from case_similarity import SimilarityIndex, case_vector, spatial_signature
+
+
+def vector(types, points, texts=()):
+    return case_vector(types, np.array(points, dtype=float), list(texts))
+
+
+def test_spatial_signature_ignores_translation_and_rotation():
+    points = np.array([[0, 0, 0], [1, 0, 2], [3, 0, 1], [2, 1, 4]], dtype=float)
+    angle = np.pi / 3
+    rotation = np.array([[np.cos(angle), 0, -np.sin(angle)], [0, 1, 0], [np.sin(angle), 0, np.cos(angle)]])
+    moved = points @ rotation.T + [5, 0, -2]
+    assert np.allclose(spatial_signature(points), spatial_signature(moved))
+
+
+def test_similar_ranks_the_closest_case_first(monkeypatch):
+    index = SimilarityIndex()
+    base = vector(['weapon_knife', 'bloodstain_pool'], [[0, 0, 0], [1, 0, 1]], ['stabbing kitchen'])
+    index.set_case(1, base)
+    index.set_case(2, vector(['weapon_knife', 'bloodstain_pool'], [[0, 0, 0], [1, 0, 1.1]], ['stabbing kitchen']))
+    index.set_case(3, vector(['document', 'fingerprint'], [[0, 0, 0], [9, 0, 9]], ['forged cheque']))
+
+    exact = index.similar(1, k=2)
+    assert exact['exact'] and [r['case_id'] for r in exact['results']] == [2, 3]
+    assert exact['results'][0]['similarity'] > 0.95
+
+    monkeypatch.setattr(case_similarity, 'BRUTE_FORCE_MAX', 0)
+    probed = index.similar(1, k=1)
+    assert probed['results'][0]['case_id'] == 2
+
+
+def test_removed_case_is_not_returned_and_its_row_is_reused():
+    index = SimilarityIndex()
+    for case_id in (1, 2, 3):
+        index.set_case(case_id, vector(['fingerprint'], [[case_id, 0, 0]]))
+    index.remove_case(2)
+    assert index.similar(2) is None
+    assert 2 not in [r['case_id'] for r in index.similar(1)['results']]
+    index.set_case(4, vector(['fingerprint'], [[4, 0, 0]]))
+    assert index.stats()['cases'] == 3
+    assert index._next_row == 3
+
+
+def test_sync_picks_up_changes_from_other_processes(client, make_case, ctx):
+    index = SimilarityIndex()
+    index.load()
+
+    # Written through the app, whose own index is a different instance (another worker)
+    case = make_case(evidence=2)
+    assert index.similar(case['id']) is None
+    index.sync(force=True)
+    row = index._row_of[case['id']]
+    before = index._vectors[row].copy()
+
+    client.post(f"/api/cases/{case['id']}/evidence", json={'type': 'weapon_knife', 'x': 5, 'y': 0, 'z': 5})
+    index.sync(force=True)
+    assert not np.allclose(index._vectors[row], before)
+
+    client.delete(f"/api/cases/{case['id']}")
+    index.sync(force=True)
+    assert index.similar(case['id']) is None
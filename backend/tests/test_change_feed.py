@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+import change_feed
+from change_feed import ChangeFeed, MemoryBroker, PostgresBroker, build_broker
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return [(event['id'], event['type']) for event in events]
+
+
+def test_events_fan_out_to_case_and_all_case_subscribers():
+    feed = ChangeFeed()
+    one, two, everything = feed.subscribe(1), feed.subscribe(2), feed.subscribe()
+    seen = []
+    feed.add_listener(seen.append)
+
+    feed.publish(1, 'case.created', {'id': 1})
+    feed.publish(2, 'evidence.created')
+    assert drain(one) == [(1, 'case.created')]
+    assert drain(two) == [(2, 'evidence.created')]
+    assert drain(everything) == [(1, 'case.created'), (2, 'evidence.created')]
+    assert [event['id'] for event in seen] == [1, 2]
+
+    feed.unsubscribe(one)
+    feed.publish(1, 'case.updated')
+    assert drain(one) == []
+    assert feed.stats() == {'subscribers': 2, 'last_event_id': 3, 'broker': 'MemoryBroker'}
+    with pytest.raises(ValueError):
+        feed.publish(1, 'case.exploded')
+
+
+def test_subscribe_resumes_after_last_event_id():
+    feed = ChangeFeed()
+    for event_type in ('case.created', 'evidence.created', 'evidence.updated'):
+        feed.publish(7, event_type)
+    feed.publish(8, 'case.created')
+
+    assert drain(feed.subscribe(7, last_event_id=1)) == [(2, 'evidence.created'), (3, 'evidence.updated')]
+    assert drain(feed.subscribe(last_event_id=2)) == [(3, 'evidence.updated'), (4, 'case.created')]
+    assert drain(feed.subscribe(7, last_event_id=4)) == []
+    # An ID this worker never issued cannot be resumed
+    assert drain(feed.subscribe(7, last_event_id=99)) == [(4, 'resync')]
+
+
+def test_resume_past_dropped_history_resyncs(monkeypatch):
+    monkeypatch.setattr(change_feed, 'HISTORY_SIZE', 2)
+    feed = ChangeFeed()
+    for _ in range(4):
+        feed.publish(1, 'evidence.created')
+    assert drain(feed.subscribe(1, last_event_id=1)) == [(4, 'resync')]
+    assert drain(feed.subscribe(1, last_event_id=3)) == [(4, 'evidence.created')]
+
+
+def test_stream_formats_events_and_resyncs_on_overflow(monkeypatch):
+    feed = ChangeFeed()
+    subscription = feed.subscribe(1)
+    feed.publish(1, 'case.created', {'id': 1})
+    stream = feed.stream(subscription, heartbeat=0.01)
+    assert next(stream) == 'retry: 3000\n\n'
+    frame = next(stream)
+    assert frame.startswith('id: 1\nevent: case.created\ndata: ')
+    assert json.loads(frame.split('data: ', 1)[1])['data'] == {'id': 1}
+    assert next(stream) == ': heartbeat\n\n'
+
+    subscription.overflowed = True
+    assert next(stream) == 'event: resync\ndata: null\n\n'
+    with pytest.raises(StopIteration):
+        next(stream)
+    assert feed.stats()['subscribers'] == 0
+
+
+def test_build_broker(monkeypatch):
+    monkeypatch.delenv('CHANGE_FEED_BROKER', raising=False)
+    assert isinstance(build_broker('sqlite:///x.db'), MemoryBroker)
+
+    monkeypatch.setenv('CHANGE_FEED_BROKER', 'postgres')
+    broker = build_broker('postgresql+psycopg2://user:secret@db/crimetryx')
+    assert isinstance(broker, PostgresBroker)
+    assert broker.dsn == 'postgresql://user:secret@db/crimetryx'
+    with pytest.raises(ValueError):
+        build_broker('sqlite:///x.db')
+
+    monkeypatch.setenv('CHANGE_FEED_BROKER', 'redis')
+    with pytest.raises(ValueError):
+        build_broker('sqlite:///x.db')
+
+
+def test_events_endpoint_resumes_from_last_event_id(client, make_case):
+    case = make_case(evidence=2)
+    created = next(event['id'] for event in change_feed.feed._history[case['id']] if event['type'] == 'case.created')
+
+    response = client.get(f"/api/cases/{case['id']}/events", headers={'Last-Event-ID': str(created)},
+                          buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks) == b'retry: 3000\n\n'
+    frames = [next(chunks).decode() for _ in range(2)]
+    response.close()
+    assert [frame.split('\n')[:2] for frame in frames] == [
+        [f'id: {created + 1}', 'event: evidence.created'],
+        [f'id: {created + 2}', 'event: evidence.created'],
+    ]
@@ -0,0 +1,55 @@
+import numpy as np
+
+from evidence_spatial import SpatialIndex, Region, query, morton_codes_3d
+
+
+def make_index(count=500, seed=3):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(-20, 20, size=(count, 3))
+    rows = [(i + 1, f'EV-{i + 1}', 1, 'blood' if i % 3 else 'fiber', *map(float, p), '', None, 'h', None, 't', None)
+            for i, p in enumerate(points)]
+    return SpatialIndex('v1', rows), points
+
+
+def returned(result):
+    return len(result['items']) + sum(c['count'] for c in result['clusters'])
+
+
+def test_morton_codes_interleave_axes():
+    codes = morton_codes_3d(np.array([1, 0, 0, 3]), np.array([0, 1, 0, 3]), np.array([0, 0, 1, 3]))
+    assert codes.tolist() == [1, 2, 4, 63]
+
+
+def test_query_matches_brute_force_inside_box_and_frustum():
+    index, points = make_index()
+    bbox = (-5, -10, -20, 10, 10, 0)
+    planes = [(1, 0, 0, 0)] + [(0, 0, 0, 1)] * 5  # x >= 0, other planes always satisfied
+    result = query(index, Region(bbox, planes), limit=10000, level=10)
+    inside = (np.all((points >= bbox[:3]) & (points <= bbox[3:]), axis=1) & (points[:, 0] >= 0))
+    assert result['matched'] == returned(result) == int(inside.sum())
+    assert sorted(item['id'] for item in result['items']) == (np.nonzero(inside)[0] + 1).tolist()
+
+    fibers = query(index, types=['fiber'], limit=10000, level=10)
+    assert {item['type'] for item in fibers['items']} == {'fiber'}
+    assert fibers['matched'] == sum(1 for i in range(len(points)) if i % 3 == 0)
+
+
+def test_distant_evidence_is_clustered_and_limit_is_respected():
+    index, points = make_index()
+    near = query(index, camera=(0, 0, 0), lod=0.01, limit=10000)
+    far = query(index, camera=(0, 0, 5000), lod=0.01, limit=10000)
+    assert len(far['clusters']) > 0 and len(far['items']) < len(near['items'])
+    assert returned(near) == returned(far) == len(points)
+
+    capped = query(index, camera=(0, 0, 0), lod=0.01, limit=50)
+    assert len(capped['items']) <= 50
+    assert returned(capped) == len(points)
+
+
+def test_spatial_endpoint_validates_and_filters(client, make_case):
+    case = make_case(evidence=6)
+    url = f"/api/cases/{case['id']}/evidence/spatial"
+    result = client.get(url, query_string={'bbox': '1.5,-1,0,4.5,1,2'}).get_json()
+    assert sorted(item['coordinates']['x'] for item in result['items']) == [2, 3, 4]
+    assert client.get(url, query_string={'bbox': '1,2,3'}).status_code == 400
+    assert client.get('/api/cases/999999/evidence/spatial').status_code == 404
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from hedging import Hedger, HEDGES, HEDGE_MIN_SAMPLES
+from llm_providers import make_response
+
+
+def hedges(agent, outcome):
+    return HEDGES._values.get((agent, outcome), 0)
+
+
+def warmed(key, **options):
+    """An enabled hedger whose latency history for key is all 1 ms, so slower calls hedge."""
+    hedger = Hedger(enabled=True, percentile=0.5, **options)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        hedger.tracker(key).record(0.001)
+    return hedger
+
+
+def scripted(*steps):
+    """fn whose n-th call sleeps steps[n][0] seconds, then returns or raises steps[n][1]."""
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            delay, outcome = steps[len(calls)]
+            calls.append(outcome)
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return make_response(outcome)
+    fn.calls = calls
+    return fn
+
+
+def test_disabled_hedger_calls_once():
+    fn = scripted((0.0, '{"a": 1}'))
+    assert Hedger(enabled=False).call('hedge-off', 'k', fn).choices[0].message.content == '{"a": 1}'
+    assert len(fn.calls) == 1
+
+
+def test_slow_call_is_hedged_and_the_first_valid_response_wins():
+    hedger = warmed('k', budget=0, burst=1)
+    fn = scripted((0.5, '{"from": "primary"}'), (0.0, '{"from": "hedge"}'))
+    response = hedger.call('hedge-win', 'k', fn)
+    assert response.choices[0].message.content == '{"from": "hedge"}'
+    assert hedges('hedge-win', 'hedge_won') == 1
+
+    # An invalid hedge response does not beat a valid primary
+    hedger = warmed('k', budget=0, burst=1)
+    fn = scripted((0.05, '{"from": "primary"}'), (0.0, 'not json'))
+    assert hedger.call('hedge-invalid', 'k', fn).choices[0].message.content == '{"from": "primary"}'
+    assert hedges('hedge-invalid', 'primary_won') == 1
+
+
+def test_budget_limits_hedges():
+    hedger = warmed('k', budget=0.5, burst=1)
+    slow = scripted((0.05, '{}'), (0.0, '{}'), (0.05, '{}'), (0.05, '{}'), (0.0, '{}'))
+    hedger.call('hedge-budget', 'k', slow)  # Spends the one saved-up credit
+    hedger.call('hedge-budget', 'k', slow)  # Earns half a credit: not enough, waits for the primary
+    assert hedges('hedge-budget', 'skipped_budget') == 1
+    hedger.tracker('k').record(0.001)
+    hedger.call('hedge-budget', 'k', slow)  # A second half credit pays for another hedge
+    assert len(slow.calls) == 5
+    assert hedges('hedge-budget', 'hedge_won') + hedges('hedge-budget', 'primary_won') == 2
+
+
+def test_failed_hedge_returns_invalid_response_or_raises_the_primary_error():
+    hedger = warmed('k', budget=0, burst=2)
+    fn = scripted((0.05, 'not json'), (0.0, RuntimeError('hedge failed')))
+    assert hedger.call('hedge-fail', 'k', fn).choices[0].message.content == 'not json'
+
+    fn = scripted((0.05, RuntimeError('primary failed')), (0.0, RuntimeError('hedge failed')))
+    with pytest.raises(RuntimeError, match='primary failed'):
+        hedger.call('hedge-fail', 'k', fn)
+    assert hedges('hedge-fail', 'failed') == 2
@@ -0,0 +1,45 @@
+from http_cache import ResponseCache
+
+
+def test_lru_evicts_by_entries_and_bytes_and_rejects_stale_versions():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put(('case', 1), 'v1', b'aaaa')
+    cache.put(('case', 2), 'v1', b'bbbb')
+    assert cache.get(('case', 1), 'v1') == b'aaaa'
+    assert cache.get(('case', 1), 'v2') is None
+
+    cache.put(('case', 3), 'v1', b'cccc')  # Case 2 is least recently used
+    assert cache.get(('case', 2), 'v1') is None
+    cache.put(('case', 4), 'v1', b'dddddddd')  # 12 bytes with either neighbour, so both go
+    assert cache.stats()['entries'] == 1
+    cache.put(('case', 5), 'v1', b'x' * 11)
+    assert cache.get(('case', 5), 'v1') is None
+
+    cache.put(('cases', None), 'v1', b'list')
+    cache.invalidate(4)
+    assert cache.stats() == {'entries': 0, 'bytes': 0, 'hits': 1, 'misses': 3}
+
+
+def test_case_detail_revalidates_until_the_case_changes(client, make_case):
+    case = make_case()
+    url = f"/api/cases/{case['id']}"
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post(f"/api/cases/{case['id']}/evidence",
+                json={'type': 'fingerprint', 'x': 0, 'y': 0, 'z': 0})
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert len(changed.get_json()['evidence']) == 1
+
+
+def test_resource_deleted_after_its_version_was_read_is_not_found(app):
+    from http_cache import cached_json
+
+    with app.test_request_context('/api/cases/1'):
+        response, status = cached_json('case', 'v-deleted', lambda: None, case_id=-1)
+    assert status == 404 and response.get_json() == {'error': 'Not found'}
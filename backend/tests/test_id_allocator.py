@@ -0,0 +1,42 @@
+import threading
+
+from models import db, Evidence
+from id_allocator import allocate, next_evidence_id, release_scope, _max_suffix
+
+
+def test_max_suffix_ignores_other_prefixes():
+    assert _max_suffix(['E-001', 'E-012', 'X-099', None, 'E-abc'], 'E-') == 12
+
+
+def test_concurrent_allocations_are_unique(app):
+    values = []
+    lock = threading.Lock()
+
+    def take():
+        with app.app_context():
+            for _ in range(10):
+                value = allocate('test:concurrent')
+                with lock:
+                    values.append(value)
+
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert sorted(values) == list(range(1, 41))
+
+
+def test_evidence_ids_seed_from_existing_rows(make_case, ctx):
+    case = make_case(evidence=2)
+    release_scope(f"evidence:{case['id']}")
+    db.session.commit()
+    assert next_evidence_id(case['id']) == 'E-003'
+    numbers = sorted(e.evidence_id for e in Evidence.query.filter_by(case_id=case['id']))
+    assert numbers == ['E-001', 'E-002']
+
+
+def test_evidence_ids_are_numbered_per_case(client, make_case):
+    first, second = make_case(evidence=1), make_case(evidence=1)
+    ids = [client.get(f"/api/cases/{case['id']}/evidence").get_json()[0]['evidence_id'] for case in (first, second)]
+    assert ids == ['E-001', 'E-001']
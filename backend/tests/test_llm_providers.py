@@ -0,0 +1,99 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import agents
+from llm_providers import (Router, GroqProvider, LocalProvider, LlamaCppProvider, FixtureProvider,
+                           FIXTURE_OUTPUTS, DEFAULT_MODELS, parse_routes)
+from stubs import StubGroq
+
+
+def test_routes_override_the_default_per_agent():
+    routes = parse_routes(' scene_interpreter=local:qwen-3b , timeline_builder=fixture ')
+    assert routes == {'scene_interpreter': ('local', 'qwen-3b'), 'timeline_builder': ('fixture', None)}
+    with pytest.raises(ValueError):
+        parse_routes('scene_interpreter=openai:gpt')
+
+    router = Router('groq', 'llama-3.1-8b-instant', routes)
+    assert router.route('scene_interpreter') == ('local', 'qwen-3b')
+    assert router.route('timeline_builder') == ('fixture', DEFAULT_MODELS['fixture'])
+    assert router.route('evidence_reasoner') == ('groq', 'llama-3.1-8b-instant')
+    assert Router('fixture').route('evidence_reasoner') == ('fixture', 'fixture')
+    with pytest.raises(ValueError):
+        Router('openai')
+
+
+def test_agents_use_their_routed_provider_and_report_unavailable_ones(monkeypatch):
+    router = Router('groq', routes={'scene_interpreter': ('fixture', None), 'timeline_builder': ('llama_cpp', None)})
+    stub = StubGroq(scenarios=1)
+    router.set_provider('groq', GroqProvider(client=stub))
+    router.set_provider('llama_cpp', LlamaCppProvider(model_path='/nonexistent/model.gguf'))
+    monkeypatch.setattr(agents, 'router', router)
+
+    scene = agents.scene_interpreter({'case_id': 'C-1'}, [])
+    assert scene['status'] == 'completed'
+    assert scene['output']['entry_exit_points'] == FIXTURE_OUTPUTS['scene_interpreter']['entry_exit_points']
+    assert stub.calls == 0
+    assert agents.evidence_reasoner(scene['output'], [])['status'] == 'completed'
+    assert stub.calls == 1
+
+    timeline = agents.timeline_builder(scene['output'], {})
+    assert timeline['status'] == 'error'
+    assert timeline['error'] in ('llama-cpp-python is not installed', 'LLAMA_MODEL_PATH does not point at a model file')
+    assert agents.model_for('timeline_builder') == f"llama_cpp:{DEFAULT_MODELS['llama_cpp']}"
+
+
+def test_groq_without_a_key_is_unavailable(monkeypatch):
+    from llm_providers import ProviderUnavailable
+    monkeypatch.delenv('GROQ_API_KEY', raising=False)
+    with pytest.raises(ProviderUnavailable):
+        GroqProvider().complete('scene_interpreter', 'm', [{'role': 'user', 'content': 'hi'}])
+
+
+def test_fixture_outputs_can_be_overridden_from_a_file(tmp_path):
+    path = tmp_path / 'fixtures.json'
+    path.write_text(json.dumps({'scene_interpreter': {'reasoning': 'from file'}}))
+    provider = FixtureProvider(path=str(path), latency_ms=0)
+    response = provider.complete('scene_interpreter', 'fixture', [{'role': 'user', 'content': 'two words'}])
+    assert json.loads(response.choices[0].message.content) == {'reasoning': 'from file'}
+    assert response.usage.prompt_tokens == 2
+    other = provider.complete('timeline_builder', 'fixture', [])
+    assert json.loads(other.choices[0].message.content) == FIXTURE_OUTPUTS['timeline_builder']
+
+
+def test_local_provider_speaks_openai_chat_completions():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            requests_seen.append((self.path, self.headers.get('Authorization'), body))
+            reply = json.dumps({'choices': [{'message': {'content': '{"ok": true}'}}],
+                                'usage': {'prompt_tokens': 7, 'completion_tokens': 3}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        provider = LocalProvider(base_url=f'http://127.0.0.1:{server.server_port}/v1/', api_key='secret', timeout=5)
+        schema = {'type': 'object'}
+        response = provider.complete('scene_interpreter', 'qwen-3b', [{'role': 'user', 'content': 'hi'}],
+                                     schema=schema, temperature=0.2)
+    finally:
+        server.shutdown()
+    assert response.choices[0].message.content == '{"ok": true}'
+    assert (response.usage.prompt_tokens, response.usage.completion_tokens) == (7, 3)
+    path, authorization, body = requests_seen[0]
+    assert path == '/v1/chat/completions' and authorization == 'Bearer secret'
+    assert body['model'] == 'qwen-3b' and body['temperature'] == 0.2
+    assert body['response_format'] == {'type': 'json_object', 'schema': schema}
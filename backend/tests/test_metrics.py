@@ -0,0 +1,68 @@
+import re
+import time
+from types import SimpleNamespace
+
+from metrics import Counter, Histogram, Registry, LLM_REQUESTS, LLM_TOKENS, record_llm_call
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? -?[0-9.e+-]+$')
+
+
+def test_counter_and_histogram_render():
+    registry = Registry()
+    counter = registry.register(Counter('jobs', 'Jobs run.', ['queue']))
+    histogram = registry.register(Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0)))
+    counter.inc(queue='b')
+    counter.inc(2, queue='a')
+    counter.inc(queue='b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render() == '\n'.join([
+        '# HELP jobs_total Jobs run.',
+        '# TYPE jobs_total counter',
+        'jobs_total{queue="a"} 2',
+        'jobs_total{queue="b"} 2',
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        'latency_seconds_count 3',
+        'latency_seconds_sum 5.55',
+    ]) + '\n'
+
+
+def test_label_values_are_escaped():
+    counter = Counter('escaped', 'Escaping.', ['value'])
+    counter.inc(value='a "quoted"\\path\nnext')
+    assert list(counter.samples()) == ['escaped_total{value="a \\"quoted\\"\\\\path\\nnext"} 1']
+
+
+def test_record_llm_call_counts_outcomes_and_tokens():
+    labels = {'agent': 'metrics-test', 'provider': 'stub', 'model': 'm'}
+    response = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+    record_llm_call(started=time.perf_counter(), response=response, **labels)
+    record_llm_call(started=time.perf_counter(), error=True, **labels)
+    assert LLM_REQUESTS._values[('metrics-test', 'stub', 'm', 'ok')] == 1
+    assert LLM_REQUESTS._values[('metrics-test', 'stub', 'm', 'error')] == 1
+    assert LLM_TOKENS._values[('metrics-test', 'stub', 'm', 'prompt')] == 12
+    assert LLM_TOKENS._values[('metrics-test', 'stub', 'm', 'completion')] == 3
+
+
+def test_metrics_endpoint_exposes_request_metrics(client, make_case):
+    case = make_case()
+    client.get(f"/api/cases/{case['id']}")
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert all(line.startswith('# ') or SAMPLE.match(line) for line in lines), lines
+    assert '# TYPE crimetryx_http_request_duration_seconds histogram' in lines
+    route = 'method="GET",route="/api/cases/<int:case_id>",status="200"'
+    count = next(line for line in lines
+                 if line.startswith(f'crimetryx_http_request_duration_seconds_count{{{route}}}'))
+    assert int(count.rsplit(' ', 1)[1]) >= 1
+    assert any(line.startswith('crimetryx_db_queries_per_request_count{route="/api/cases/<int:case_id>"}')
+               for line in lines)
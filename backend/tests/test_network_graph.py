@@ -0,0 +1,81 @@
+import numpy as np
+
+from network_graph import NetworkGraph, node_key
+from network_layout import warm_start
+
+
+def labels(graph, node_type):
+    return {node['label'] for node in graph.search_nodes(node_type, limit=10_000)['nodes']}
+
+
+def test_removed_case_prunes_orphaned_nodes():
+    graph = NetworkGraph()
+    graph.loaded = True
+    graph.set_case(1, [('suspect:S1', 'location:Dock', 'ACTIVE_IN'), ('suspect:S1', 'crimeType:Theft', 'COMMITTED')])
+    graph.set_case(2, [('suspect:S2', 'location:Dock', 'ACTIVE_IN')])
+
+    graph.remove_case(1)
+    assert labels(graph, 'suspect') == {'S2'}
+    assert graph.resolve(node_key('crimeType', 'Theft')) is None
+    assert graph.stats()['nodes'] == 2
+
+    graph._build_snapshot()
+    assert graph.node_keys == ['location:Dock', 'suspect:S2']
+    result = graph.neighbors('location:Dock')
+    assert result['edges'] == [{'from': 'suspect:S2', 'to': 'location:Dock', 'label': 'ACTIVE_IN', 'weight': 1}]
+    assert graph.shortest_path('suspect:S2', 'location:Dock')['length'] == 1
+
+    graph.set_case(3, [('suspect:S3', 'location:Dock', 'ACTIVE_IN')])
+    assert graph.neighbors('location:Dock')['total'] == 2
+
+
+def test_unchanged_case_does_not_bump_version():
+    graph = NetworkGraph()
+    edges = [('suspect:S1', 'location:Dock', 'ACTIVE_IN')]
+    graph.set_case(1, edges)
+    version = graph.version
+    graph.set_case(1, list(edges))
+    assert graph.version == version
+
+
+def test_sync_picks_up_changes_from_other_processes(client, make_case, ctx):
+    graph = NetworkGraph()
+    graph.load()
+
+    # Written through the app, whose own graph is a different instance (another worker)
+    case = make_case(location='Sync Wharf', crime_type='Smuggling', suspects=['SG-SYNC-1'])
+    assert 'Sync Wharf' not in labels(graph, 'location')
+    graph.sync(force=True)
+    assert 'Sync Wharf' in labels(graph, 'location')
+    assert 'SG-SYNC-1' in labels(graph, 'suspect')
+
+    client.put(f"/api/cases/{case['id']}", json={'location': 'Sync Quay'})
+    graph.sync(force=True)
+    assert 'Sync Quay' in labels(graph, 'location')
+    assert 'Sync Wharf' not in labels(graph, 'location')
+
+    client.delete(f"/api/cases/{case['id']}")
+    graph.sync(force=True)
+    assert case['id'] not in graph.case_ids
+    assert 'Sync Quay' not in labels(graph, 'location')
+    assert 'SG-SYNC-1' not in labels(graph, 'suspect')
+    assert 'location:Sync Quay' not in graph.export()['node_keys']
+
+
+def test_warm_start_matches_nodes_by_key():
+    previous = {'node_keys': ['a', 'b', 'c'], 'positions': np.array([[0.1, 0.1], [0.5, 0.5], [0.9, 0.9]])}
+    pos = warm_start(previous, ['c', 'a', 'd'], np.array([0]), np.array([2]))
+    assert np.allclose(pos[0], [0.9, 0.9])
+    assert np.allclose(pos[1], [0.1, 0.1])
+    assert np.allclose(pos[2], [0.9, 0.9], atol=0.1)
+
+
+def test_evidence_routes_refuse_evidence_of_another_case(client, make_case):
+    owner, other = make_case(evidence=1), make_case()
+    evidence_id = client.get(f"/api/cases/{owner['id']}/evidence").get_json()[0]['id']
+
+    url = f"/api/cases/{other['id']}/evidence/{evidence_id}"
+    assert client.put(url, json={'type': 'weapon_knife'}).status_code == 404
+    assert client.delete(url).status_code == 404
+    evidence = client.get(f"/api/cases/{owner['id']}/evidence").get_json()
+    assert [(e['id'], e['type']) for e in evidence] == [(evidence_id, 'fingerprint')]
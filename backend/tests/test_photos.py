@@ -0,0 +1,80 @@
+import io
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from photo_ingest import processor
+from photo_processing import perceptual_hash, hamming_distances, render_derivatives
+
+
+def scene_image(width=800, height=600, seed=5):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(small).resize((width, height), Image.BICUBIC)
+
+
+def jpeg_bytes(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def test_perceptual_hash_tolerates_resizing_and_recompression():
+    image = scene_image()
+    original = perceptual_hash(image)
+    altered = Image.open(io.BytesIO(jpeg_bytes(image.resize((400, 300)).filter(ImageFilter.GaussianBlur(1)), 40)))
+    different = perceptual_hash(scene_image(seed=6))
+    distances = hamming_distances(original, [perceptual_hash(altered), different, original])
+    assert distances[0] <= 6 and distances[1] > 16 and distances[2] == 0
+    assert hamming_distances(original, []).tolist() == []
+
+
+def test_render_derivatives_respects_exif_orientation(tmp_path):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees: stored landscape, shown portrait
+    path = tmp_path / 'photo.jpg'
+    scene_image(2000, 1000).save(path, 'JPEG', exif=exif)
+
+    result = render_derivatives(str(path), str(tmp_path / 'derived'))
+    assert (result['format'], result['width'], result['height']) == ('JPEG', 1000, 2000)
+    assert {name: (d['width'], d['height']) for name, d in result['derivatives'].items()} == {
+        'preview': (800, 1600), 'small': (320, 640), 'thumb': (128, 256)
+    }
+    assert len(result['phash']) == 16
+    assert (tmp_path / 'derived' / 'thumb.jpg').stat().st_size == result['derivatives']['thumb']['bytes']
+
+
+def test_upload_deduplicates_and_finds_near_duplicates(app, client, make_case, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(processor, 'root', str(tmp_path / 'photos'))
+    (tmp_path / 'photos' / 'incoming').mkdir(parents=True)
+
+    def render_now(photo):
+        # Run the worker function in-process instead of in the pool
+        future = Future()
+        future.set_result(render_derivatives(processor.original_path(photo.sha256, photo.extension),
+                                             processor.derived_dir(photo.sha256)))
+        processor._finish(photo.id, future)
+    monkeypatch.setattr(processor, 'submit', render_now)
+
+    case = make_case()
+    url = f"/api/cases/{case['id']}/photos"
+    image = scene_image()
+    first = jpeg_bytes(image)
+    uploaded = client.post(url, data={'photos': [(io.BytesIO(first), 'a.jpg'),
+                                                 (io.BytesIO(jpeg_bytes(image, 50)), 'b.jpeg'),
+                                                 (io.BytesIO(first), 'a-copy.JPG')]})
+    assert uploaded.status_code == 202
+    photos = uploaded.get_json()
+    assert [p['duplicate'] for p in photos] == [False, False, True]
+    assert photos[2]['id'] == photos[0]['id']
+
+    detail = client.get(f"/api/photos/{photos[0]['id']}").get_json()
+    assert detail['status'] == 'ready'
+    assert [p['id'] for p in detail['near_duplicates']] == [photos[1]['id']]
+    assert client.get(f"/photos/{detail['sha256']}/thumb.jpg").status_code == 200
+    assert client.get(f"/photos/{detail['sha256']}/../secret").status_code == 404
+
+    rejected = client.post(url, data={'photos': [(io.BytesIO(b'x'), 'notes.txt')]})
+    assert rejected.status_code == 400
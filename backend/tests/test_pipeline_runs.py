@@ -0,0 +1,110 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+from models import db, PipelineRun
+from pipeline import runner, STALE_AFTER
+
+
+def active_run(case_id, worker_id, heartbeat_at):
+    run = PipelineRun(case_id=case_id, agents=json.dumps(['scene_interpreter']), status='running',
+                      stages='[]', worker_id=worker_id, heartbeat_at=heartbeat_at,
+                      created_at=datetime.utcnow() - timedelta(hours=1))
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+def test_only_runs_with_stale_heartbeats_are_interrupted(make_case, ctx):
+    case = make_case()
+    live = active_run(case['id'], 'other-host:1:live', datetime.utcnow())
+    stale = active_run(case['id'], 'other-host:2:gone', datetime.utcnow() - STALE_AFTER * 2)
+
+    runner.reap_stale()
+    db.session.expire_all()
+    assert db.session.get(PipelineRun, live.id).status == 'running'
+    assert db.session.get(PipelineRun, stale.id).status == 'interrupted'
+
+
+def test_claimed_runs_keep_beating(make_case, ctx):
+    case = make_case()
+    run = active_run(case['id'], None, datetime.utcnow() - STALE_AFTER * 2)
+    runner.claim(run)
+    db.session.commit()
+    try:
+        run.heartbeat_at = datetime.utcnow() - STALE_AFTER * 2
+        db.session.commit()
+        runner.beat()
+        runner.reap_stale()
+        db.session.expire_all()
+        run = db.session.get(PipelineRun, run.id)
+        assert run.status == 'running'
+        assert run.worker_id == runner.worker_id
+    finally:
+        runner.release(run.id)
+
+
+def wait_for_run(client, run_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        run = client.get(f'/api/pipeline-runs/{run_id}').get_json()
+        if run['status'] not in ('queued', 'running'):
+            return run
+        time.sleep(0.05)
+    raise AssertionError(f'run {run_id} still {run["status"]}')
+
+
+def test_pipeline_run_endpoint_completes(client, make_case, llm):
+    case = make_case(evidence=2)
+    llm(scenarios=2)
+    response = client.post(f"/api/cases/{case['id']}/pipeline-runs", json={})
+    assert response.status_code == 202
+    run = wait_for_run(client, response.get_json()['id'])
+    assert run['status'] == 'completed'
+    assert [stage['status'] for stage in run['stages']] == ['completed'] * len(run['stages'])
+
+
+def run_decisions(case_id, force=False):
+    """Execute a full run in this thread and return each stage's decision."""
+    from pipeline import AGENT_TYPES
+    run = PipelineRun(case_id=case_id, agents=json.dumps(AGENT_TYPES), status='queued',
+                      stages=json.dumps([{'agent_type': a, 'status': 'pending'} for a in AGENT_TYPES]),
+                      created_at=datetime.utcnow())
+    db.session.add(run)
+    db.session.commit()
+    runner.execute(run.id, force)
+    run = db.session.get(PipelineRun, run.id)
+    assert run.status == 'completed'
+    return {stage['agent_type']: stage['decision'] for stage in json.loads(run.stages)}
+
+
+def test_runs_reuse_unchanged_stages_and_recompute_changed_ones(client, make_case, llm, ctx):
+    case = make_case(evidence=2)
+    stub = llm(scenarios=2)
+    assert set(run_decisions(case['id']).values()) == {'computed'}
+    calls = stub.calls
+
+    assert set(run_decisions(case['id']).values()) == {'reused'}
+    assert stub.calls == calls
+
+    evidence_id = client.get(f"/api/cases/{case['id']}/evidence").get_json()[0]['id']
+    client.put(f"/api/cases/{case['id']}/evidence/{evidence_id}", json={'notes': 'Smudged on the left edge'})
+    # The stub answers the same for the new evidence, so only the agents reading evidence run again
+    assert run_decisions(case['id']) == {'scene_interpreter': 'computed', 'evidence_reasoner': 'computed',
+                                         'timeline_builder': 'reused', 'hypothesis_challenger': 'reused'}
+    assert set(run_decisions(case['id'], force=True).values()) == {'computed'}
+
+
+def test_analyze_keeps_later_runs_incremental(client, make_case, llm, ctx):
+    from models import AgentLog
+
+    case = make_case(evidence=2)
+    stub = llm(scenarios=2)
+    assert client.post(f"/api/cases/{case['id']}/analyze").status_code == 200
+    logs = AgentLog.query.filter_by(case_id=case['id']).all()
+    assert len(logs) == 4
+    assert all(log.input_fingerprint and log.decision == 'computed' for log in logs)
+
+    calls = stub.calls
+    assert set(run_decisions(case['id']).values()) == {'reused'}
+    assert stub.calls == calls
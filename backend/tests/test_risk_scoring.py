@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from risk_scoring import (
+    RECENCY_HALF_LIFE_DAYS, WEIGHTS, aggregate_features, risk_level_bounds, risk_levels, score_features,
+)
+
+
+def test_aggregate_features_reduces_links_per_suspect():
+    features = aggregate_features(
+        3,
+        link_suspect=[0, 0, 0, 1],
+        link_time=[10.0, 30.0, 20.0, 5.0],
+        link_crime=[1, 4, 1, -1],
+        mo_suspect=[0, 0, 0, 1],
+        mo_code=[0, 0, 2, 1],
+    )
+    assert features['fir_count'].tolist() == [3, 1, 0]
+    assert features['mo_count'].tolist() == [2, 1, 0]
+    assert features['last_active'][:2].tolist() == [30.0, 5.0]
+    assert np.isnan(features['last_active'][2])
+    assert features['crime_code'].tolist() == [1, -1, -1]  # Most frequent known crime type
+    pairs = sorted(zip(features['mo_pair_suspect'].tolist(), features['mo_pair_code'].tolist()))
+    assert pairs == [(0, 0), (0, 2), (1, 1)]
+
+
+def test_aggregate_features_with_no_links():
+    features = aggregate_features(2, [], [], [], [], [])
+    assert features['fir_count'].tolist() == [0, 0]
+    assert features['mo_count'].tolist() == [0, 0]
+    assert np.isnan(features['last_active']).all()
+    assert features['crime_code'].tolist() == [-1, -1]
+
+
+def test_score_features():
+    scores = score_features(
+        fir_count=[0, 0, 1000, 0],
+        mo_count=[0, 0, 1000, 0],
+        gang_affiliated=[False, True, True, False],
+        days_since_active=[np.nan, np.nan, -1.0, RECENCY_HALF_LIFE_DAYS],
+    )
+    assert scores.tolist() == [0.0, WEIGHTS['gang_affiliated'], 1.0, round(WEIGHTS['recency'] / 2, 2)]
+
+
+def test_risk_levels_match_bounds():
+    assert risk_levels([0.0, 0.39, 0.4, 0.69, 0.7, 1.0]).tolist() == [
+        'Low', 'Low', 'Medium', 'Medium', 'High', 'High']
+    assert risk_level_bounds('Medium') == (0.4, 0.7)
+    assert risk_level_bounds('High') == (0.7, None)
+    with pytest.raises(ValueError):
+        risk_level_bounds('Extreme')
+
+
+def test_predictions_rank_rescored_suspects(client, make_case):
+    make_case(suspects=['RSK-A', 'RSK-B'], crime_type='Fraud', mo_patterns=['forged cheque', 'fake id'])
+    make_case(suspects=['RSK-A'], crime_type='Fraud', mo_patterns=['forged cheque'])
+    response = client.post('/api/suspects', json={'suspect_id': 'RSK-C', 'gang_affiliated': True})
+    assert response.status_code == 201
+
+    items = client.get('/api/predictions?q=RSK-').get_json()['items']
+    assert [s['suspect_id'] for s in items] == ['RSK-A', 'RSK-B', 'RSK-C']
+    a, b, c = items
+    assert (a['fir_count'], a['crime_type']) == (2, 'Fraud')
+    assert sorted(a['matched_mo']) == ['fake id', 'forged cheque']
+    assert a['risk_score'] == score_features(2, 2, False, 0.0).item()
+    assert b['risk_score'] == score_features(1, 2, False, 0.0).item()
+    assert (c['fir_count'], c['last_active'], c['risk_score']) == (0, None, WEIGHTS['gang_affiliated'])
+
+    medium = client.get('/api/predictions?q=RSK-&risk_level=Medium').get_json()
+    assert [s['suspect_id'] for s in medium['items']] == ['RSK-A', 'RSK-B']
+    assert client.get('/api/predictions?risk_level=Extreme').status_code == 400
@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from run_control import SingleFlight, WaitTimeout
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    leader = {}
+    thread = threading.Thread(target=lambda: leader.update(value=flight.do('key', work)))
+    thread.start()
+    started.wait(5)
+    joined = {}
+    follower = threading.Thread(target=lambda: joined.update(value=flight.do('key', work)))
+    follower.start()
+    release.set()
+    thread.join(5)
+    follower.join(5)
+    assert leader['value'] == ('result', False)
+    assert joined['value'] == ('result', True)
+    assert len(calls) == 1
+
+
+def test_single_flight_follower_times_out():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    thread = threading.Thread(target=lambda: flight.do('key', lambda: (started.set(), release.wait(5))))
+    thread.start()
+    started.wait(5)
+    try:
+        with pytest.raises(WaitTimeout):
+            flight.do('key', lambda: None, timeout=0.05)
+    finally:
+        release.set()
+        thread.join(5)
@@ -0,0 +1,66 @@
+from search_index import parse_query, _fts5_query, _tsquery
+
+
+def test_parse_query_handles_phrases_and_prefixes():
+    terms = parse_query('"blunt force" knif* Window')
+    assert terms == [(['blunt', 'force'], False), (['knif'], True), (['window'], False)]
+    assert _fts5_query(terms) == '"blunt force" "knif"* "window"'
+    assert _tsquery(terms) == '(blunt <-> force) & (knif:*) & (window)'
+
+
+def post_evidence(client, case_id, notes, evidence_type='fingerprint'):
+    response = client.post(f'/api/cases/{case_id}/evidence',
+                           json={'type': evidence_type, 'x': 0, 'y': 0, 'z': 0, 'notes': notes})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_search_matches_filters_and_forgets_deleted_evidence(client, make_case):
+    case = make_case()
+    kept = post_evidence(client, case['id'], 'Partial zorblatt print on the balcony door', 'fingerprint')
+    gone = post_evidence(client, case['id'], 'Zorblatt fibres under the sofa', 'fiber')
+
+    result = client.get('/api/search', query_string={'q': 'zorblat*'}).get_json()
+    assert result['total'] == 2
+    assert result['facets']['evidence_type'] == {'fingerprint': 1, 'fiber': 1}
+
+    phrase = client.get('/api/search', query_string={'q': '"zorblatt print"'}).get_json()
+    assert [r['ref_id'] for r in phrase['results']] == [kept['id']]
+    filtered = client.get('/api/search', query_string={'q': 'zorblatt', 'evidence_type': 'fiber'}).get_json()
+    assert [r['ref_id'] for r in filtered['results']] == [gone['id']]
+
+    client.delete(f"/api/cases/{case['id']}/evidence/{gone['id']}")
+    result = client.get('/api/search', query_string={'q': 'zorblatt'}).get_json()
+    assert [r['ref_id'] for r in result['results']] == [kept['id']]
+    assert client.get('/api/search').status_code == 400
+
+
+def test_migration_indexes_existing_rows(app, client, make_case, ctx):
+    from models import db, SearchDocument
+    from migrate import load_revisions
+
+    case = make_case()
+    post_evidence(client, case['id'], 'Quibbleton residue on the sill')
+    SearchDocument.query.delete()
+    db.session.commit()
+    assert client.get('/api/search', query_string={'q': 'quibbleton'}).get_json()['total'] == 0
+
+    migration = next(module for module in load_revisions() if module.revision == '0006')
+    with db.engine.begin() as connection:
+        migration.upgrade(connection)
+    assert client.get('/api/search', query_string={'q': 'quibbleton'}).get_json()['total'] == 1
+
+
+def test_filters_apply_before_paging(client, make_case):
+    old = make_case()
+    post_evidence(client, old['id'], 'Vellichor smear', 'document')
+    new = make_case()
+    for i in range(30):
+        post_evidence(client, new['id'], f'Vellichor trace {i}')
+
+    result = client.get('/api/search', query_string={'q': 'vellichor', 'case_id': old['id'], 'limit': 5}).get_json()
+    assert result['total'] == 1 and result['results'][0]['case_id'] == old['id']
+    result = client.get('/api/search', query_string={'q': 'vellichor', 'evidence_type': 'document'}).get_json()
+    assert result['facets']['evidence_type'] == {'document': 1}
+    paged = client.get('/api/search', query_string={'q': 'vellichor', 'limit': 10, 'offset': 25}).get_json()
+    assert paged['total'] == 31 and len(paged['results']) == 6
@@ -0,0 +1,61 @@
+import json
+
+from models import db, AgentLog, Case, Evidence, Hypothesis, Suspect
+from serializers import case_detail_json, encode_row, json_array
+
+
+def test_encode_row_splices_raw_json():
+    row = encode_row({'id': 1, 'when': None}, {'tags': ('["a"]', '[]'), 'extra': (None, 'null')})
+    assert json.loads(row) == {'id': 1, 'when': None, 'tags': ['a'], 'extra': None}
+    assert encode_row({'id': 1}) == b'{"id":1}'
+
+
+def test_json_array_batches():
+    chunks = list(json_array(range(5), lambda n: str(n).encode(), batch_size=2))
+    assert chunks == [b'[', b'0,1', b',2,3', b',4', b']']
+    assert b''.join(json_array([], lambda n: n)) == b'[]'
+
+
+def test_case_detail_matches_to_dict(app, client, make_case, llm):
+    case = make_case(evidence=2, suspects=['SER-1', 'SER-2'], mo_patterns=['glass cutter'])
+    llm(scenarios=2)
+    assert client.post(f"/api/cases/{case['id']}/analyze").status_code == 200
+    client.post('/api/suspects', json={'suspect_id': 'SER-3', 'name': 'Unlinked', 'gang_affiliated': True})
+
+    with app.app_context():
+        # A legacy row with inline payloads instead of blob references
+        db.session.add(AgentLog(case_id=case['id'], agent_type='legacy', status='completed',
+                                inputs='{"a": 1}', reasoning='inline', outputs='[1, 2]'))
+        db.session.commit()
+
+        record = db.session.get(Case, case['id'])
+        evidence = Evidence.query.filter_by(case_id=record.id).order_by(Evidence.id).all()
+        logs = AgentLog.query.filter_by(case_id=record.id).order_by(AgentLog.created_at).all()
+        hypotheses = Hypothesis.query.filter_by(case_id=record.id).order_by(Hypothesis.id).all()
+        expected = dict(
+            record.to_dict(),
+            evidence=[e.to_dict() for e in evidence],
+            agent_logs=[log.to_dict() for log in logs],
+            hypotheses=[h.to_dict() for h in hypotheses],
+            suspects=['SER-1', 'SER-2'],
+        )
+        detail = json.loads(b''.join(case_detail_json(record.id)))
+        suspects = {s.suspect_id: s.to_dict() for s in Suspect.query.filter(Suspect.suspect_id.like('SER-%'))}
+
+    assert len(expected['evidence']) == 2 and len(expected['hypotheses']) == 2
+    assert expected['agent_logs'][-1]['outputs'] == [1, 2]
+    detail['suspects'].sort()
+    assert detail == expected
+
+    listed = next(c for c in client.get('/api/cases').get_json() if c['id'] == case['id'])
+    assert listed == {key: expected[key] for key in listed}
+    assert set(listed) | {'evidence', 'agent_logs', 'hypotheses', 'suspects'} == set(expected)
+    assert client.get(f"/api/cases/{case['id']}/evidence").get_json() == expected['evidence']
+    assert client.get(f"/api/cases/{case['id']}/agent-logs").get_json() == expected['agent_logs']
+    streamed = {s['suspect_id']: s for s in client.get('/api/suspects').get_json()
+                if s['suspect_id'].startswith('SER-')}
+    assert streamed == suspects
+
+
+def test_missing_case_detail_is_none(ctx):
+    assert case_detail_json(10 ** 9) is None
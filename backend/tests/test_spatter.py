@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from spatter import parse_measurements, solve
+
+ORIGIN = (0.5, 1.2, -0.3)
+
+
+def floor_stain(i, x, z, origin=ORIGIN, pattern=None):
+    """A floor stain whose trajectory passes exactly through origin."""
+    dx, dz = x - origin[0], z - origin[2]
+    distance = math.hypot(dx, dz)
+    # Floor axes are u = +x and v = -z (see surface_axes)
+    direction = math.degrees(math.atan2(-dz, dx))
+    width = math.sin(math.atan2(origin[1], distance))
+    stain = {'evidence_id': f'EV-{i}', 'x': x, 'y': 0.0, 'z': z,
+             'width': width, 'length': 1.0, 'direction': direction % 360}
+    if pattern:
+        stain['pattern'] = pattern
+    return stain
+
+
+RING = [(2.0, 0.0), (0.0, 1.5), (-1.0, -1.5), (1.5, -2.0), (-1.5, 0.5), (1.0, 1.0)]
+
+
+def test_parse_measurements_validates_and_defaults_to_the_floor():
+    parsed = parse_measurements({'width': '2', 'length': 4, 'direction': 370, 'pattern': 'cast-off'})
+    assert parsed == {'width': 2.0, 'length': 4.0, 'direction': 10.0, 'normal': [0.0, 1.0, 0.0],
+                      'pattern': 'cast-off'}
+    for bad in ({'width': 1, 'length': 2}, {'width': 3, 'length': 2, 'direction': 0},
+                {'width': 1, 'length': 2, 'direction': 0, 'normal': [0, 0, 0]}, []):
+        with pytest.raises(ValueError):
+            parse_measurements(bad)
+
+
+def test_solve_recovers_origin_convergence_and_tangent_height():
+    stains = [floor_stain(i, x, z) for i, (x, z) in enumerate(RING)]
+    pattern = solve(stains)['patterns'][0]
+    assert pattern['used'] == len(RING)
+    assert pattern['origin'] == pytest.approx({'x': ORIGIN[0], 'y': ORIGIN[1], 'z': ORIGIN[2]}, abs=1e-6)
+    assert pattern['convergence'] == pytest.approx({'x': ORIGIN[0], 'z': ORIGIN[2]}, abs=1e-6)
+    assert pattern['tangent_height'] == pytest.approx(ORIGIN[1], abs=1e-6)
+    assert pattern['rms_residual'] < 1e-6
+
+
+def test_solve_drops_outliers_and_groups_patterns():
+    stains = [floor_stain(i, x, z) for i, (x, z) in enumerate(RING)]
+    stains.append(floor_stain(99, 3.0, 3.0, origin=(-4.0, 0.5, 2.0)))
+    stains += [floor_stain(100 + i, x, z, origin=(0, 2, 0), pattern='second') for i, (x, z) in enumerate(RING[:3])]
+    default, second = solve(stains)['patterns']
+    assert [s['evidence_id'] for s in default['stains'] if s['outlier']] == ['EV-99']
+    assert default['origin'] == pytest.approx({'x': ORIGIN[0], 'y': ORIGIN[1], 'z': ORIGIN[2]}, abs=1e-6)
+    assert second['pattern'] == 'second' and second['origin']['y'] == pytest.approx(2.0, abs=1e-6)
+
+
+def test_spatter_endpoint_reuses_the_stored_analysis(client, make_case):
+    case = make_case()
+    url = f"/api/cases/{case['id']}/spatter-analysis"
+    assert client.post(url).status_code == 400
+    for stain in (floor_stain(i, x, z) for i, (x, z) in enumerate(RING[:4])):
+        measurements = {k: stain[k] for k in ('width', 'length', 'direction')}
+        client.post(f"/api/cases/{case['id']}/evidence",
+                    json={'type': 'blood', 'x': stain['x'], 'y': 0, 'z': stain['z'], 'measurements': measurements})
+
+    first = client.post(url)
+    assert first.status_code == 201
+    assert first.get_json()['result']['patterns'][0]['origin']['y'] == pytest.approx(ORIGIN[1], abs=1e-6)
+    again = client.post(url)
+    assert again.status_code == 200 and again.get_json()['id'] == first.get_json()['id']
+    assert client.get(url).get_json()['id'] == first.get_json()['id']
@@ -0,0 +1,150 @@
+import os
+import threading
+
+import pytest
+
+from models import db, StoredFile, StoredObject
+from storage import FileStore, S3Backend, file_sha256, object_key
+from stubs import StubS3, StubKiri
+
+
+@pytest.fixture
+def store(app, ctx):
+    file_store = FileStore(interval=0)
+    file_store.init_app(app, cold=S3Backend('bucket', client=StubS3()))
+    return file_store
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(name, content):
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+    return write
+
+
+def test_put_keeps_identical_content_once(store, write):
+    first = store.put('reports', 'a.pdf', write('a.pdf', b'same report'), content_type='application/pdf')
+    second_source = write('b.pdf', b'same report')
+    second = store.put('reports', 'b.pdf', second_source)
+    assert first.sha256 == second.sha256
+    assert not os.path.exists(second_source)
+    assert db.session.get(StoredObject, first.sha256).hot
+    with open(store.path('reports', 'b.pdf'), 'rb') as f:
+        assert f.read() == b'same report'
+
+
+def test_put_returns_stored_file_when_source_is_already_gone(store, write):
+    source = write('gone.zip', b'model')
+    ref = store.put('models', 'gone.zip', source)
+    assert store.put('models', 'gone.zip', source).id == ref.id
+    with pytest.raises(FileNotFoundError):
+        store.put('models', 'never-stored.zip', source)
+
+
+def test_original_cannot_be_replaced_or_forgotten(store, write, make_case):
+    case = make_case()
+    store.put('uploads', 'video.mp4', write('v1.mp4', b'original'), case_id=case['id'], original=True)
+    with pytest.raises(ValueError):
+        store.put('uploads', 'video.mp4', write('v2.mp4', b'edited'), case_id=case['id'])
+    with pytest.raises(ValueError):
+        store.forget('uploads', 'video.mp4')
+
+
+def test_sweep_deletes_objects_no_name_refers_to(store, write):
+    ref = store.put('reports', 'old.pdf', write('old.pdf', b'forgotten report'))
+    sha256 = ref.sha256
+    assert store.forget('reports', 'old.pdf')
+    summary = store.sweep()
+    assert summary['deleted'] >= 1
+    assert db.session.get(StoredObject, sha256) is None
+    assert not os.path.exists(store.hot_path(sha256))
+
+
+def test_archive_and_promote_round_trip(store, write, make_case):
+    case = make_case()
+    ref = store.put('uploads', 'scene.mp4', write('scene.mp4', b'video bytes'), case_id=case['id'], original=True)
+    assert store.archive('uploads', case['id']) == 1
+    obj = db.session.get(StoredObject, ref.sha256)
+    assert obj.cold and not obj.hot
+    assert not os.path.exists(store.hot_path(ref.sha256))
+
+    path = store.path('uploads', 'scene.mp4')
+    assert file_sha256(path) == ref.sha256
+    assert db.session.get(StoredObject, ref.sha256).hot
+
+
+def test_corrupt_cold_copy_is_not_promoted(store, write, make_case):
+    case = make_case()
+    ref = store.put('uploads', 'bad.mp4', write('bad.mp4', b'pristine video'), case_id=case['id'], original=True)
+    store.archive('uploads', case['id'])
+    store.cold.client.objects[('bucket', object_key(ref.sha256))] = b'tampered video'
+    with pytest.raises(IOError):
+        store.path('uploads', 'bad.mp4')
+    assert not os.path.exists(store.hot_path(ref.sha256))
+
+
+def test_concurrent_scene_sync_stores_model_once(app, make_case, tmp_path, monkeypatch):
+    import app as app_module
+    from models import Case
+
+    kiri = StubKiri(checks_to_complete=1, model_bytes=1024)
+    downloads = []
+    download_model = kiri.download_model
+
+    def counted_download(task_id, output_dir):
+        downloads.append(task_id)
+        return download_model(task_id, output_dir)
+
+    kiri.download_model = counted_download
+    watcher = app_module.scene_watcher
+    monkeypatch.setattr(watcher, 'service', kiri)
+    monkeypatch.setitem(app.config, 'MODELS_FOLDER', str(tmp_path))
+
+    case = make_case()
+    with app.app_context():
+        row = db.session.get(Case, case['id'])
+        row.scene_task_id = 'stubrace'
+        row.status = 'processing'
+        db.session.commit()
+
+    results, errors = [], []
+
+    def sync():
+        try:
+            with app.app_context():
+                results.append(watcher.sync(db.session.get(Case, case['id'])))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=sync) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert errors == []
+    assert downloads == ['stubrace']
+    assert {result['model_path'] for result in results} == {'stubrace.zip'}
+    with app.app_context():
+        assert StoredFile.query.filter_by(namespace='models', name='stubrace.zip').count() == 1
+
+
+def test_deleting_a_case_keeps_its_originals(store, write, client, make_case):
+    case = make_case()
+    original = store.put('uploads', 'scene-kept.mp4', write('scene.mp4', b'raw scene video'),
+                         case_id=case['id'], original=True)
+    derived = store.put('reports', 'case-report.pdf', write('report.pdf', b'derived report'), case_id=case['id'])
+    original_sha, derived_sha = original.sha256, derived.sha256
+
+    assert client.delete(f"/api/cases/{case['id']}").status_code == 200
+    store.sweep()
+    db.session.expire_all()
+    kept = StoredFile.query.filter_by(namespace='uploads', name='scene-kept.mp4').one()
+    assert kept.original and kept.case_id is None
+    assert db.session.get(StoredObject, original_sha) is not None
+    with open(store.path('uploads', 'scene-kept.mp4'), 'rb') as f:
+        assert f.read() == b'raw scene video'
+    assert StoredFile.query.filter_by(namespace='reports', name='case-report.pdf').first() is None
+    assert db.session.get(StoredObject, derived_sha) is None
@@ -0,0 +1,63 @@
+import json
+
+from structured_output import structure
+
+
+def scenario(scenario_id, **overrides):
+    item = {'scenario_id': scenario_id, 'title': f'Scenario {scenario_id}', 'confidence': 0.5,
+            'timeline': [{'event': 'Entry'}]}
+    item.update(overrides)
+    return item
+
+
+def test_valid_output_passes_unchanged():
+    text = json.dumps({'scenarios': [scenario('A'), scenario('B')]})
+    data, report = structure('timeline_builder', text, [])
+    assert [s['scenario_id'] for s in data['scenarios']] == ['A', 'B']
+    assert report['errors'] == [] and report['reasked'] == []
+
+
+def test_local_repair_of_fenced_truncated_output():
+    text = '```json\n{"scenarios": [' + json.dumps(scenario('A')) + ', {"scenario_id": "B", "tit'
+    data, report = structure('timeline_builder', text, [])
+    assert [s['scenario_id'] for s in data['scenarios']] == ['A']
+    assert 'closed_truncated' in report['repairs']
+
+
+def test_invalid_item_is_dropped_and_valid_items_kept():
+    broken = scenario('B')
+    del broken['title']
+    text = json.dumps({'scenarios': [scenario('A'), broken, scenario('C')]})
+    data, report = structure('timeline_builder', text, [])
+    assert [s['scenario_id'] for s in data['scenarios']] == ['A', 'C']
+    assert 'dropped invalid items of scenarios' in report['repairs']
+
+
+def test_invalid_reask_reply_does_not_replace_partially_valid_field():
+    broken = scenario('B')
+    del broken['title']
+    text = json.dumps({'scenarios': [scenario('A'), broken]})
+    asked = []
+
+    def reask(messages, schema, max_tokens):
+        asked.append(schema)
+        return json.dumps({'scenarios': [{'scenario_id': 'B'}]})  # Still invalid
+
+    data, report = structure('timeline_builder', text, [], reask=reask)
+    assert asked and report['reasked'] == ['scenarios']
+    assert [s['scenario_id'] for s in data['scenarios']] == ['A']
+
+
+def test_valid_reask_reply_replaces_field():
+    broken = scenario('B')
+    del broken['title']
+    text = json.dumps({'scenarios': [scenario('A'), broken]})
+    reply = json.dumps({'scenarios': [scenario('A'), scenario('B')]})
+    data, _ = structure('timeline_builder', text, [], reask=lambda messages, schema, max_tokens: reply)
+    assert [s['scenario_id'] for s in data['scenarios']] == ['A', 'B']
+
+
+def test_wrong_type_field_is_emptied():
+    data, report = structure('timeline_builder', json.dumps({'scenarios': 'none'}), [])
+    assert data['scenarios'] == []
+    assert report['errors']
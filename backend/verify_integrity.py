@@ -0,0 +1,243 @@
+"""
+Crimetryx AI - Bulk Integrity Verification
+Recomputes evidence and agent log hashes for every row and reports mismatches.
+
+Rows are streamed from the database in batches through a server-side cursor
+and hashed in a process pool. Only a bounded number of batches are in flight
+at once, so memory stays flat regardless of table size.
+
+Usage:
+    python verify_integrity.py [--batch-size 5000] [--workers 4] [--output report.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from models import evidence_hash, agent_log_hash
+from blob_store import decode, blob_digest
+
+
+def _legacy_coordinate(value):
+    """Coordinates posted as JSON integers were hashed before the float cast."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def check_evidence_batch(rows: list) -> tuple:
+    """
+    Recompute hashes for a batch of evidence rows.
+
+    Rows hashed before insert (older releases) have no created_at in the hash
+    and may carry integer coordinates, so those forms are accepted as legacy.
+
+    Returns:
+        (rows checked, list of mismatch dicts, legacy match count)
+    """
+    mismatches = []
+    legacy = 0
+    for row_id, evidence_id, case_id, evidence_type, x, y, z, notes, measurements, created_at, stored in rows:
+        if evidence_hash(evidence_id, case_id, evidence_type, x, y, z, notes, created_at, measurements) == stored:
+            continue
+        lx, ly, lz = _legacy_coordinate(x), _legacy_coordinate(y), _legacy_coordinate(z)
+        if stored in (
+            evidence_hash(evidence_id, case_id, evidence_type, x, y, z, notes, None),
+            evidence_hash(evidence_id, case_id, evidence_type, lx, ly, lz, notes, None),
+            evidence_hash(evidence_id, case_id, evidence_type, lx, ly, lz, notes, created_at),
+        ):
+            legacy += 1
+            continue
+        mismatches.append({
+            'table': 'evidence',
+            'id': row_id,
+            'case_id': case_id,
+            'evidence_id': evidence_id,
+            'stored_hash': stored
+        })
+    return len(rows), mismatches, legacy
+
+
+def _resolve_payload(text, ref, codec, data):
+    """
+    Get payload text from its blob (if referenced) or the legacy column.
+
+    Returns:
+        (text, problem) where problem describes a missing or corrupt blob
+    """
+    if not ref:
+        return text, None
+    if data is None:
+        return None, f'blob {ref} missing'
+    try:
+        text = decode(codec, data)
+    except Exception as e:
+        return None, f'blob {ref} unreadable: {e}'
+    if blob_digest(text) != ref:
+        return text, f'blob {ref} content does not match its digest'
+    return text, None
+
+
+def check_agent_log_batch(rows: list) -> tuple:
+    """
+    Recompute hashes for a batch of agent log rows, decoding blob payloads.
+
+    Returns:
+        (rows checked, list of mismatch dicts, legacy match count)
+    """
+    mismatches = []
+    legacy = 0
+    for row in rows:
+        row_id, case_id, agent_type, created_at, stored = row[:5]
+        payloads = []
+        problems = []
+        for offset in (5, 9, 13):
+            text, problem = _resolve_payload(*row[offset:offset + 4])
+            payloads.append(text)
+            if problem:
+                problems.append(problem)
+
+        inputs, reasoning, outputs = payloads
+        if not problems:
+            if agent_log_hash(agent_type, inputs, reasoning, outputs, created_at) == stored:
+                continue
+            if agent_log_hash(agent_type, inputs, reasoning, outputs, None) == stored:
+                legacy += 1
+                continue
+        mismatches.append({
+            'table': 'agent_logs',
+            'id': row_id,
+            'case_id': case_id,
+            'agent_type': agent_type,
+            'stored_hash': stored,
+            'problems': problems
+        })
+    return len(rows), mismatches, legacy
+
+
+def stream_batches(connection, statement, batch_size: int):
+    """Yield lists of plain tuples using a server-side cursor."""
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def verify_table(executor, connection, statement, check_fn, batch_size: int,
+                 max_in_flight: int, report) -> dict:
+    """Fan batches of one table out to the pool and collect results."""
+    stats = {'rows': 0, 'mismatches': 0, 'legacy': 0}
+    pending = set()
+
+    def drain(futures):
+        for future in futures:
+            checked, mismatches, legacy = future.result()
+            stats['rows'] += checked
+            stats['mismatches'] += len(mismatches)
+            stats['legacy'] += legacy
+            for mismatch in mismatches:
+                report.write(json.dumps(mismatch) + '\n')
+
+    for batch in stream_batches(connection, statement, batch_size):
+        pending.add(executor.submit(check_fn, batch))
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            drain(done)
+
+    done, _ = wait(pending)
+    drain(done)
+    return stats
+
+
+def run_verification(engine, batch_size: int = 5000, workers: int = None,
+                     output_path: str = None) -> dict:
+    """
+    Verify every evidence and agent log hash.
+
+    Args:
+        engine: SQLAlchemy engine to read from
+        batch_size: Rows per cursor fetch and per worker task
+        workers: Process pool size (defaults to CPU count)
+        output_path: JSON Lines file receiving one line per mismatch
+
+    Returns:
+        Summary dict with row counts, mismatch counts and throughput
+    """
+    from models import Evidence, AgentLog, Blob
+
+    workers = workers or os.cpu_count() or 1
+    if output_path is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        output_path = os.path.join(reports_dir, f"integrity_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+    evidence_stmt = select(
+        Evidence.id, Evidence.evidence_id, Evidence.case_id, Evidence.evidence_type,
+        Evidence.x, Evidence.y, Evidence.z, Evidence.notes, Evidence.measurements, Evidence.created_at, Evidence.hash
+    ).order_by(Evidence.id)
+    # Compressed blob bytes are shipped to the workers and decoded there
+    inputs_blob, reasoning_blob, outputs_blob = aliased(Blob), aliased(Blob), aliased(Blob)
+    log_stmt = (
+        select(
+            AgentLog.id, AgentLog.case_id, AgentLog.agent_type, AgentLog.created_at, AgentLog.hash,
+            AgentLog.inputs, AgentLog.inputs_ref, inputs_blob.codec, inputs_blob.data,
+            AgentLog.reasoning, AgentLog.reasoning_ref, reasoning_blob.codec, reasoning_blob.data,
+            AgentLog.outputs, AgentLog.outputs_ref, outputs_blob.codec, outputs_blob.data
+        )
+        .outerjoin(inputs_blob, inputs_blob.digest == AgentLog.inputs_ref)
+        .outerjoin(reasoning_blob, reasoning_blob.digest == AgentLog.reasoning_ref)
+        .outerjoin(outputs_blob, outputs_blob.digest == AgentLog.outputs_ref)
+        .order_by(AgentLog.id)
+    )
+
+    start_time = time.time()
+    summary = {}
+    with open(output_path, 'w') as report, ProcessPoolExecutor(max_workers=workers) as executor:
+        with engine.connect() as connection:
+            summary['evidence'] = verify_table(
+                executor, connection, evidence_stmt, check_evidence_batch,
+                batch_size, workers * 2, report
+            )
+        with engine.connect() as connection:
+            summary['agent_logs'] = verify_table(
+                executor, connection, log_stmt, check_agent_log_batch,
+                batch_size, workers * 2, report
+            )
+
+    elapsed = time.time() - start_time
+    total_rows = summary['evidence']['rows'] + summary['agent_logs']['rows']
+    summary.update({
+        'total_rows': total_rows,
+        'total_mismatches': summary['evidence']['mismatches'] + summary['agent_logs']['mismatches'],
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        'report_path': output_path
+    })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify evidence and agent log hashes.')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per batch')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', default=None, help='Mismatch report path (JSON Lines)')
+    args = parser.parse_args()
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        summary = run_verification(db.engine, args.batch_size, args.workers, args.output)
+
+    print(json.dumps(summary, indent=2))
+    return 1 if summary['total_mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Crimetryx AI - Backend Hot Path Benchmarks
+End-to-end timings for the main read and write paths, run offline.
+
+The suite builds a synthetic dataset (see synthetic.py) and replaces Groq
+and KIRI Engine with stubs (see stubs.py). It then drives the Flask app
+through its test client and measures:
+- get_cases and get_case, cold and cached, plus 304 revalidation;
+- evidence inserts through the API;
+- a full agent analysis run;
+- PDF report generation;
+- 3D model serving.
+
+Results are written as JSON. Pass a previous run with --baseline to compare
+p50 times and exit non-zero if any of them regressed by more than
+--tolerance.
+
+Usage:
+    python benchmarks/hot_paths.py --cases 2000 --evidence-per-case 200 --output bench.json
+    python benchmarks/hot_paths.py --baseline bench.json --output bench_new.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..', 'backend')
+
+
+def summarize(timings: list, items: int = 1) -> dict:
+    """Latency percentiles in milliseconds, plus throughput in items per second."""
+    ordered = sorted(timings)
+    total = sum(ordered)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {
+        'runs': len(ordered),
+        'p50_ms': round(pick(0.50) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'mean_ms': round(total / len(ordered) * 1000, 3),
+        'items_per_second': round(items * len(ordered) / total, 1) if total else None
+    }
+
+
+def timed(fn, repeats: int, check=None) -> list:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+        if check is not None:
+            check(result)
+    return timings
+
+
+def expect(status: int):
+    def check(response):
+        assert response.status_code == status, (response.status_code, response.get_data(as_text=True)[:200])
+    return check
+
+
+def run_suite(args) -> dict:
+    import app as app_module
+    import agents
+    from app import app
+    from http_cache import cache as response_cache
+    from llm_providers import GroqProvider, PROVIDERS
+    from stubs import StubGroq, StubKiri
+    from synthetic import generate
+
+    stub_groq = StubGroq(latency_ms=args.groq_latency_ms, completion_tokens=args.groq_tokens, seed=args.seed)
+    stub_kiri = StubKiri(checks_to_complete=1, model_bytes=args.model_kb * 1024)
+    for name in PROVIDERS:  # Whatever the routing, every agent gets the stub
+        agents.router.set_provider(name, GroqProvider(client=stub_groq))
+    app_module.kiri_service = stub_kiri
+    app_module.scene_watcher.service = stub_kiri
+
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    results = {}
+
+    with app.app_context():
+        dataset = generate(args.cases, args.evidence_per_case, seed=args.seed)
+    first_pk, last_pk = dataset['case_pks']
+    sample_pks = [rng.randint(first_pk, last_pk) for _ in range(args.repeats)]
+
+    # Case list: cold rebuilds the body, warm is served from the response cache
+    def cold_cases():
+        response_cache.invalidate()
+        return client.get('/api/cases')
+    results['get_cases_cold'] = summarize(timed(cold_cases, args.repeats, expect(200)))
+    results['get_cases_warm'] = summarize(timed(lambda: client.get('/api/cases'), args.repeats, expect(200)))
+    etag = client.get('/api/cases').headers['ETag']
+    results['get_cases_304'] = summarize(timed(
+        lambda: client.get('/api/cases', headers={'If-None-Match': etag}), args.repeats, expect(304)))
+
+    # Case detail with all evidence
+    pks = iter(sample_pks * 2)
+    def cold_case():
+        response_cache.invalidate()
+        return client.get(f'/api/cases/{next(pks)}')
+    results['get_case_cold'] = summarize(timed(cold_case, args.repeats, expect(200)))
+    results['get_case_warm'] = summarize(timed(
+        lambda: client.get(f'/api/cases/{sample_pks[0]}'), args.repeats, expect(200)))
+
+    # Evidence writes through the API (hash, ledger, search index, graph refresh)
+    insert_case = client.post('/api/cases', json={'location': 'Bench', 'investigator': 'bench'}).get_json()['id']
+    counter = iter(range(10 ** 9))
+    def insert_evidence():
+        n = next(counter)
+        return client.post(f'/api/cases/{insert_case}/evidence', json={
+            'type': 'fingerprint', 'x': n * 0.01, 'y': 1.0, 'z': 0.5, 'notes': f'bench item {n}', 'created_by': 'bench'
+        })
+    results['evidence_insert'] = summarize(timed(insert_evidence, args.inserts, expect(201)))
+
+    # Full agent pipeline with the stubbed LLM
+    results['run_full_analysis'] = summarize(timed(
+        lambda: client.post(f'/api/cases/{insert_case}/analyze'), args.analysis_runs, expect(200)))
+    results['run_full_analysis']['groq_calls'] = stub_groq.calls
+
+    # PDF report for the analyzed case
+    reports_dir = os.path.join(BACKEND_DIR, 'reports')
+    existing_reports = set(os.listdir(reports_dir)) if os.path.isdir(reports_dir) else set()
+    results['generate_case_report'] = summarize(timed(
+        lambda: client.get(f'/api/cases/{insert_case}/report'), args.report_runs, expect(200)))
+    for name in set(os.listdir(reports_dir)) - existing_reports:
+        os.remove(os.path.join(reports_dir, name))
+
+    # Model serving: stub scene job, then full and conditional downloads
+    video_path = os.path.join(app.config['UPLOAD_FOLDER'], 'bench_scene.mp4')
+    with open(video_path, 'wb') as f:
+        f.write(b'\0' * 1024)
+    with open(video_path, 'rb') as f:
+        client.post(f'/api/cases/{insert_case}/upload-scene', data={'video': (f, 'bench_scene.mp4')})
+    model_path = client.get(f'/api/cases/{insert_case}/scene-status').get_json()['model_path']
+    results['model_serve_api'] = summarize(timed(
+        lambda: client.get(f'/api/cases/{insert_case}/model'), args.repeats, expect(200)), args.model_kb / 1024)
+    results['model_serve_static'] = summarize(timed(
+        lambda: client.get(f'/models/{model_path}'), args.repeats, expect(200)), args.model_kb / 1024)
+    model_etag = client.get(f'/api/cases/{insert_case}/model').headers['ETag']
+    results['model_serve_304'] = summarize(timed(
+        lambda: client.get(f'/api/cases/{insert_case}/model', headers={'If-None-Match': model_etag}),
+        args.repeats, expect(304)))
+    for name in (os.path.join(app.config['MODELS_FOLDER'], model_path), video_path,
+                 os.path.join(app.config['UPLOAD_FOLDER'], f'case_{insert_case}_bench_scene.mp4')):
+        if os.path.exists(name):
+            os.remove(name)
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1],
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'dataset': dataset,
+        'results': results
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """p50 changes per benchmark; entries above tolerance are marked as regressions."""
+    rows = []
+    for name, stats in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or not before.get('p50_ms'):
+            continue
+        ratio = stats['p50_ms'] / before['p50_ms']
+        rows.append({'benchmark': name, 'baseline_p50_ms': before['p50_ms'], 'p50_ms': stats['p50_ms'],
+                     'ratio': round(ratio, 3), 'regression': ratio > 1 + tolerance})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backend hot path benchmarks.')
+    parser.add_argument('--database-url', default='sqlite:////tmp/crimetryx_bench.db')
+    parser.add_argument('--keep-database', action='store_true', help='Reuse an existing benchmark database')
+    parser.add_argument('--cases', type=int, default=1000)
+    parser.add_argument('--evidence-per-case', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--inserts', type=int, default=200)
+    parser.add_argument('--analysis-runs', type=int, default=5)
+    parser.add_argument('--report-runs', type=int, default=3)
+    parser.add_argument('--groq-latency-ms', type=float, default=0.0)
+    parser.add_argument('--groq-tokens', type=int, default=400, help='Completion tokens per stub Groq call')
+    parser.add_argument('--model-kb', type=int, default=4096, help='Size of the stub 3D model')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--baseline', default=None, help='Previous results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p50 slowdown before flagging')
+    parser.add_argument('--output', default=None, help='Write JSON results to this path')
+    args = parser.parse_args()
+
+    if args.database_url.startswith('sqlite:///') and not args.keep_database:
+        path = args.database_url[len('sqlite:///'):]
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    # Configure before the app module reads the environment
+    os.environ['DATABASE_URL'] = args.database_url
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.append(BENCH_DIR)  # After the backend: benchmark script names shadow backend modules
+
+    result = run_suite(args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            result['comparison'] = compare(result, json.load(f), args.tolerance)
+        regressions = [row['benchmark'] for row in result['comparison'] if row['regression']]
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    if regressions:
+        print(f'Regressions beyond {args.tolerance:.0%}: {", ".join(regressions)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Crimetryx AI - Risk Scoring Benchmark
+Times the vectorized feature aggregation and scoring over synthetic suspects.
+
+Case links and MO pattern occurrences are generated directly as arrays, so
+the numbers cover the NumPy scoring path only (no database I/O).
+
+Usage:
+    python benchmarks/risk_scoring.py --suspects 1000000 --links-per-suspect 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def generate(suspects: int, links_per_suspect: float, mo_per_link: float, mo_vocab: int, seed: int) -> dict:
+    """Synthetic link arrays in the shape aggregate_features expects."""
+    from risk_scoring import CRIME_TYPES
+
+    rng = np.random.default_rng(seed)
+    n_links = int(suspects * links_per_suspect)
+    n_mo = int(n_links * mo_per_link)
+    now = time.time()
+    return {
+        'n_suspects': suspects,
+        'link_suspect': rng.integers(0, suspects, n_links),
+        'link_time': now - rng.exponential(180 * 86400, n_links),
+        'link_crime': rng.integers(-1, len(CRIME_TYPES), n_links),
+        'mo_suspect': rng.integers(0, suspects, n_mo),
+        'mo_code': rng.zipf(1.5, n_mo) % mo_vocab,
+        'gang': rng.random(suspects) < 0.15,
+        'now': now,
+    }
+
+
+def run_benchmark(suspects: int, links_per_suspect: float, mo_per_link: float,
+                  mo_vocab: int, repeats: int, seed: int) -> dict:
+    from risk_scoring import aggregate_features, score_features, severity_scores, risk_levels
+
+    data = generate(suspects, links_per_suspect, mo_per_link, mo_vocab, seed)
+    timings = {'aggregate': [], 'score': [], 'severity': [], 'levels': []}
+    for _ in range(repeats):
+        started = time.perf_counter()
+        features = aggregate_features(
+            data['n_suspects'], data['link_suspect'], data['link_time'], data['link_crime'],
+            data['mo_suspect'], data['mo_code']
+        )
+        timings['aggregate'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        days = (data['now'] - features['last_active']) / 86400.0
+        scores = score_features(features['fir_count'], features['mo_count'], data['gang'], days)
+        timings['score'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        severity_scores(scores, features['crime_code'])
+        timings['severity'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        levels = risk_levels(scores)
+        timings['levels'].append(time.perf_counter() - started)
+
+    best = {stage: round(min(values), 4) for stage, values in timings.items()}
+    total = sum(best.values())
+    names, counts = np.unique(levels, return_counts=True)
+    return {
+        'suspects': suspects,
+        'links': int(data['link_suspect'].size),
+        'mo_occurrences': int(data['mo_suspect'].size),
+        'repeats': repeats,
+        'best_seconds': best,
+        'total_seconds': round(total, 4),
+        'suspects_per_second': round(suspects / total, 1) if total > 0 else None,
+        'risk_level_counts': dict(zip(names.tolist(), counts.tolist())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Risk scoring benchmark.')
+    parser.add_argument('--suspects', type=int, default=1000000)
+    parser.add_argument('--links-per-suspect', type=float, default=3.0)
+    parser.add_argument('--mo-per-link', type=float, default=2.0)
+    parser.add_argument('--mo-vocab', type=int, default=500, help='Distinct MO patterns')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=None, help='Write JSON results to this path')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+
+    result = run_benchmark(args.suspects, args.links_per_suspect, args.mo_per_link,
+                           args.mo_vocab, args.repeats, args.seed)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
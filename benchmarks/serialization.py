@@ -0,0 +1,142 @@
+"""
+Crimetryx AI - Serialization Benchmark
+Compares the fast column/tuple serializers against jsonify([x.to_dict() ...]).
+
+Synthetic cases, evidence, agent logs and suspects are bulk-inserted into
+the configured database. Each list payload is then encoded both ways inside
+a request context, and the two outputs are checked to decode to the same
+JSON. HTTP overhead is excluded, so the numbers cover query plus encoding.
+
+Usage:
+    python benchmarks/serialization.py --database-url sqlite:////tmp/crx_serial.db --rows 20000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def seed(rows: int, seed_value: int) -> int:
+    """Insert rows of each resource; returns the case holding the evidence and agent logs."""
+    from sqlalchemy import insert
+    from models import db, Case, Evidence, AgentLog, Suspect
+
+    rng = random.Random(seed_value)
+    now = datetime(2026, 1, 1)
+    types = ['bloodstain_spatter', 'fingerprint', 'weapon_knife', 'footprint', 'dna_sample']
+    patterns = ['forced_entry', 'night', 'window', 'weapon_knife', 'vehicle', 'disguise']
+
+    db.session.execute(insert(Case), [{
+        'case_id': f'BENCH-{i:07d}', 'location': f'Sector {i % 97}', 'date': (now - timedelta(days=i % 900)).date(),
+        'investigator': 'bench', 'status': 'active', 'crime_type': rng.choice(['Robbery', 'Fraud', 'Theft']),
+        'mo_patterns': json.dumps(rng.sample(patterns, 2)), 'created_at': now - timedelta(minutes=i),
+        'updated_at': now
+    } for i in range(rows)])
+    case_pk = db.session.execute(db.select(Case.id).order_by(Case.id)).scalars().first()
+
+    db.session.execute(insert(Evidence), [{
+        'evidence_id': f'E-{i + 1:06d}', 'case_id': case_pk, 'evidence_type': rng.choice(types),
+        'x': rng.uniform(-5, 5), 'y': rng.uniform(0, 3), 'z': rng.uniform(-5, 5),
+        'notes': f'Synthetic evidence item {i}', 'hash': f'{i:064x}', 'created_at': now, 'created_by': 'bench'
+    } for i in range(rows)])
+
+    output = json.dumps({'observations': [f'observation {n}' for n in range(20)], 'confidence': 0.8})
+    db.session.execute(insert(AgentLog), [{
+        'case_id': case_pk, 'agent_type': 'scene_interpreter', 'status': 'completed',
+        'inputs': json.dumps({'case_id': f'BENCH-{i}'}), 'reasoning': output, 'outputs': output,
+        'execution_time': 1.5, 'hash': f'{i:064x}', 'created_at': now + timedelta(seconds=i)
+    } for i in range(max(rows // 10, 1))])
+
+    db.session.execute(insert(Suspect), [{
+        'suspect_id': f'S{i:07d}', 'name': f'Suspect {i}', 'location': f'Sector {i % 97}',
+        'likely_weapon': 'knife', 'gang_affiliated': i % 7 == 0, 'created_at': now,
+        'crime_type': 'Robbery', 'risk_score': round(rng.random(), 2), 'severity': 3.0, 'fir_count': i % 5,
+        'matched_mo': json.dumps(rng.sample(patterns, 3)), 'last_active': now, 'scored_at': now
+    } for i in range(rows)])
+    db.session.commit()
+    return case_pk
+
+
+def _time(fn, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def run_benchmark(rows: int, repeats: int, seed_value: int) -> dict:
+    from flask import jsonify
+    from app import app
+    from models import db, Case, Evidence, AgentLog, Suspect
+    import serializers
+
+    with app.app_context():
+        case_pk = seed(rows, seed_value)
+
+    resources = {
+        'cases': (lambda: Case.query.order_by(Case.created_at.desc()).all(),
+                  serializers.cases_json),
+        'evidence': (lambda: Evidence.query.filter_by(case_id=case_pk).order_by(Evidence.id).all(),
+                     lambda: serializers.evidence_json(case_pk)),
+        'agent_logs': (lambda: AgentLog.query.filter_by(case_id=case_pk).order_by(AgentLog.created_at).all(),
+                       lambda: serializers.agent_logs_json(case_pk)),
+        'suspects': (lambda: Suspect.query.order_by(Suspect.suspect_id).all(),
+                     serializers.suspects_json),
+    }
+
+    results = {}
+    with app.test_request_context():
+        for name, (load, fast) in resources.items():
+            db.session.expunge_all()
+            baseline, baseline_body = _time(lambda: jsonify([x.to_dict() for x in load()]).get_data(), repeats)
+            db.session.expunge_all()
+            optimized, fast_body = _time(lambda: b''.join(fast()), repeats)
+            count = len(json.loads(fast_body))
+            results[name] = {
+                'rows': count,
+                'to_dict_jsonify_seconds': round(baseline, 4),
+                'fast_path_seconds': round(optimized, 4),
+                'to_dict_rows_per_second': round(count / baseline) if baseline else None,
+                'fast_rows_per_second': round(count / optimized) if optimized else None,
+                'speedup': round(baseline / optimized, 2) if optimized else None,
+                'bytes': len(fast_body),
+                'equivalent': json.loads(fast_body) == json.loads(baseline_body)
+            }
+
+    return {
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1],
+        'encoder': 'orjson' if serializers.orjson else 'json',
+        'resources': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serialization benchmark.')
+    parser.add_argument('--database-url', default='sqlite:////tmp/crimetryx_serial.db')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=None, help='Write JSON results to this path')
+    args = parser.parse_args()
+
+    # Configure before the app module reads the environment
+    os.environ['DATABASE_URL'] = args.database_url
+    sys.path.insert(0, BACKEND_DIR)
+
+    result = run_benchmark(args.rows, args.repeats, args.seed)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Crimetryx AI - Benchmark Stubs
+Offline stand-ins for the Groq, KIRI Engine and S3 APIs.
+
+StubGroq matches the part of the Groq client the agents use
+(chat.completions.create). It sleeps for a configurable latency and returns
+one JSON document that satisfies every agent's prompt, padded to the
+requested number of completion tokens. StubKiri matches KiriEngineService:
+jobs complete after a set number of status checks, and the model is a
+synthetic zip of a given size. StubS3 matches the part of a boto3 S3 client
+the cold storage tier uses, keeping objects in memory.
+"""
+
+import os
+import io
+import json
+import time
+import random
+import zipfile
+from types import SimpleNamespace
+
+
+class StubGroq:
+    """Groq client stub with configurable latency and completion size."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, completion_tokens: int = 400,
+                 scenarios: int = 3, error_rate: float = 0.0, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.completion_tokens = completion_tokens
+        self.scenarios = scenarios
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _content(self) -> str:
+        ids = [chr(ord('A') + i) for i in range(self.scenarios)]
+        words = ' '.join(f'token{i}' for i in range(self.completion_tokens))
+        return json.dumps({
+            'entry_exit_points': [{'location': 'Door', 'coordinates': {'x': 0, 'y': 0, 'z': 0}, 'type': 'entry'}],
+            'spatial_observations': ['Synthetic observation'],
+            'evidence_analysis': [{'evidence_id': 'E-001', 'findings': ['Synthetic'], 'consistency_score': 0.7}],
+            'scenarios': [{
+                'scenario_id': scenario_id,
+                'title': f'Scenario {scenario_id}',
+                'timeline': [{'time': 'T+0', 'event': 'Entry'}, {'time': 'T+5', 'event': 'Exit'}],
+                'confidence': 0.5,
+                'supporting_evidence': ['E-001']
+            } for scenario_id in ids],
+            'challenges': [{
+                'scenario_id': scenario_id,
+                'revised_confidence': round(0.3 + 0.1 * i, 2),
+                'contradictions': []
+            } for i, scenario_id in enumerate(ids)],
+            'reasoning': words
+        })
+
+    def create(self, model=None, messages=None, **kwargs):
+        self.calls += 1
+        delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise RuntimeError('Stub Groq error')
+        prompt = ' '.join(m.get('content', '') for m in messages or [])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self._content()))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt.split()), completion_tokens=self.completion_tokens)
+        )
+
+
+class StubKiri:
+    """KiriEngineService stub: jobs complete after a fixed number of status checks."""
+
+    def __init__(self, checks_to_complete: int = 2, model_bytes: int = 1024 * 1024, latency_ms: float = 0.0):
+        self.checks_to_complete = checks_to_complete
+        self.model_bytes = model_bytes
+        self.latency_ms = latency_ms
+        self._checks = {}
+
+    def _wait(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def upload_video(self, video_path: str, **kwargs) -> dict:
+        self._wait()
+        if not os.path.exists(video_path):
+            return {'success': False, 'error': 'Video file not found'}
+        task_id = f'stub{len(self._checks):06d}{int(time.time() * 1000) % 100000:05d}'
+        self._checks[task_id] = 0
+        return {'success': True, 'task_id': task_id, 'message': 'Video uploaded successfully'}
+
+    def get_status(self, task_id: str) -> dict:
+        self._wait()
+        self._checks[task_id] = self._checks.get(task_id, 0) + 1
+        status_code = 3 if self._checks[task_id] >= self.checks_to_complete else 2
+        return {'success': True, 'status_code': status_code,
+                'status': 'completed' if status_code == 3 else 'processing', 'task_id': task_id}
+
+    def download_model(self, task_id: str, output_dir: str = 'models') -> dict:
+        self._wait()
+        os.makedirs(output_dir, exist_ok=True)
+        zip_path = os.path.join(output_dir, f'{task_id}.zip')
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+            archive.writestr('scene.gltf', json.dumps({'asset': {'version': '2.0'}}))
+            archive.writestr('scene.bin', os.urandom(self.model_bytes))
+        with open(zip_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        return {'success': True, 'zip_path': zip_path, 'task_id': task_id}
+
+
+class StubS3Error(Exception):
+    """Shaped like botocore's ClientError."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class StubS3:
+    """In-memory S3 client stub (head_object, upload_file, download_file, delete_object)."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.objects = {}
+
+    def _wait(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self._wait()
+        if (Bucket, Key) not in self.objects:
+            raise StubS3Error('404')
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str):
+        self._wait()
+        with open(Filename, 'rb') as f:
+            self.objects[(Bucket, Key)] = f.read()
+
+    def download_file(self, Bucket: str, Key: str, Filename: str):
+        self._wait()
+        if (Bucket, Key) not in self.objects:
+            raise StubS3Error('404')
+        with open(Filename, 'wb') as f:
+            f.write(self.objects[(Bucket, Key)])
+
+    def delete_object(self, Bucket: str, Key: str):
+        self._wait()
+        self.objects.pop((Bucket, Key), None)
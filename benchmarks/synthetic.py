@@ -0,0 +1,145 @@
+"""
+Crimetryx AI - Synthetic Case Generator
+Bulk-inserts reproducible cases, evidence, suspects and case links for benchmarks.
+
+Rows go in through Core bulk inserts, with hashes computed the same way
+the models compute them, so the generated data looks like data written
+through the API. The same seed always produces the same dataset.
+
+Usage (standalone, against DATABASE_URL):
+    python benchmarks/synthetic.py --cases 2000 --evidence-per-case 200
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+EVIDENCE_TYPES = ['bloodstain_spatter', 'bloodstain_pool', 'fingerprint', 'footprint', 'weapon_knife',
+                  'weapon_blunt', 'dna_sample', 'fiber', 'hair', 'glass_fragment']
+CRIME_TYPES = ['Robbery', 'Fraud', 'Murder', 'Assault', 'Burglary', 'Theft']
+MO_PATTERNS = ['forced_entry', 'night', 'window', 'weapon_knife', 'vehicle', 'disguise', 'accomplice', 'alarm_cut']
+LOCATIONS = [f'Sector {i}' for i in range(50)]
+
+
+def generate(cases: int, evidence_per_case: int, suspects: int = None, seed: int = 7,
+             batch_size: int = 20000) -> dict:
+    """
+    Insert a synthetic dataset. Must run inside an app context.
+
+    Args:
+        cases: Number of cases
+        evidence_per_case: Evidence items per case
+        suspects: Number of suspects (defaults to cases // 4), each linked to 1-3 cases
+        seed: Random seed
+        batch_size: Rows per bulk insert
+
+    Returns:
+        Counts and the inserted case primary key range
+    """
+    from sqlalchemy import insert, select, func
+    from models import db, Case, Evidence, Suspect, case_suspects, evidence_hash
+
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1)
+    suspects = cases // 4 if suspects is None else suspects
+    offset = db.session.execute(select(func.count(Case.id))).scalar()
+
+    def flush(model, rows):
+        if rows:
+            db.session.execute(insert(model), rows)
+            rows.clear()
+
+    started = time.perf_counter()
+    rows = []
+    for i in range(cases):
+        created = base + timedelta(minutes=i)
+        rows.append({
+            'case_id': f'SYN-{offset + i:07d}', 'location': rng.choice(LOCATIONS),
+            'date': created.date(), 'investigator': 'synthetic', 'status': 'active',
+            'crime_type': rng.choice(CRIME_TYPES), 'mo_patterns': json.dumps(rng.sample(MO_PATTERNS, 2)),
+            'created_at': created, 'updated_at': created
+        })
+        if len(rows) >= batch_size:
+            flush(Case, rows)
+    flush(Case, rows)
+    case_pks = db.session.execute(
+        select(Case.id).where(Case.case_id.like('SYN-%')).order_by(Case.id)
+    ).scalars().all()[-cases:] if cases else []
+
+    for case_pk in case_pks:
+        for n in range(evidence_per_case):
+            evidence_id = f'E-{n + 1:03d}'
+            evidence_type = rng.choice(EVIDENCE_TYPES)
+            x, y, z = round(rng.uniform(-6, 6), 3), round(rng.uniform(0, 3), 3), round(rng.uniform(-6, 6), 3)
+            notes = f'Synthetic {evidence_type.replace("_", " ")} near {rng.choice(["door", "window", "bed", "desk"])}'
+            created = base + timedelta(seconds=n)
+            rows.append({
+                'evidence_id': evidence_id, 'case_id': case_pk, 'evidence_type': evidence_type,
+                'x': x, 'y': y, 'z': z, 'notes': notes, 'created_by': 'synthetic', 'created_at': created,
+                'hash': evidence_hash(evidence_id, case_pk, evidence_type, x, y, z, notes, created)
+            })
+            if len(rows) >= batch_size:
+                flush(Evidence, rows)
+    flush(Evidence, rows)
+
+    suspect_offset = db.session.execute(select(func.count(Suspect.id))).scalar()
+    for i in range(suspects):
+        rows.append({
+            'suspect_id': f'SYN{suspect_offset + i:07d}', 'name': f'Synthetic Suspect {i}',
+            'location': rng.choice(LOCATIONS), 'likely_weapon': rng.choice(['knife', 'blunt', 'none']),
+            'gang_affiliated': rng.random() < 0.15, 'created_at': base
+        })
+        if len(rows) >= batch_size:
+            flush(Suspect, rows)
+    flush(Suspect, rows)
+    suspect_pks = db.session.execute(
+        select(Suspect.id).where(Suspect.suspect_id.like('SYN%')).order_by(Suspect.id)
+    ).scalars().all()[-suspects:] if suspects else []
+
+    links = set()
+    for suspect_pk in suspect_pks:
+        for case_pk in rng.sample(case_pks, min(len(case_pks), rng.randint(1, 3))):
+            links.add((case_pk, suspect_pk))
+    for case_pk, suspect_pk in links:
+        rows.append({'case_id': case_pk, 'suspect_id': suspect_pk})
+        if len(rows) >= batch_size:
+            db.session.execute(insert(case_suspects), rows)
+            rows.clear()
+    if rows:
+        db.session.execute(insert(case_suspects), rows)
+    db.session.commit()
+
+    return {
+        'cases': len(case_pks),
+        'evidence': len(case_pks) * evidence_per_case,
+        'suspects': len(suspect_pks),
+        'case_links': len(links),
+        'case_pks': [case_pks[0], case_pks[-1]] if case_pks else [],
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic case generator.')
+    parser.add_argument('--cases', type=int, default=1000)
+    parser.add_argument('--evidence-per-case', type=int, default=100)
+    parser.add_argument('--suspects', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+
+    with app.app_context():
+        result = generate(args.cases, args.evidence_per_case, args.suspects, args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import {
     Upload,
@@ -75,8 +75,6 @@ const CaseSetupPage = () => {
             if (response.ok) {
                 setProgress(100);
                 setStatus('processing');
-                // Start polling for processing status
-                pollProcessingStatus();
             } else {
                 throw new Error('Upload failed');
             }
@@ -95,28 +93,39 @@ const CaseSetupPage = () => {
         }
     };
 
-    const pollProcessingStatus = async () => {
-        const checkStatus = async () => {
+    // Processing updates are pushed by the server on the case event stream
+    useEffect(() => {
+        if (status !== 'processing') return undefined;
+
+        const source = new EventSource(`/api/cases/${caseId}/events`);
+        source.addEventListener('scene.status', (e) => {
+            const { data } = JSON.parse(e.data);
+            if (data.status === 'failed') {
+                setStatus('error');
+                setError('Processing failed. Please try again.');
+                source.close();
+            }
+        });
+        source.addEventListener('scene.ready', () => {
+            setStatus('ready');
+            source.close();
+        });
+        // The scene may have finished before the stream opened
+        source.onopen = async () => {
             try {
-                const response = await fetch(`/api/cases/${caseId}/scene-status`);
+                const response = await fetch(`/api/cases/${caseId}`);
                 const data = await response.json();
-
-                if (data.status === 'completed') {
+                if (data.status === 'ready') {
                     setStatus('ready');
-                } else if (data.status === 'failed') {
-                    setStatus('error');
-                    setError('Processing failed. Please try again.');
-                } else {
-                    setTimeout(checkStatus, 2000);
+                    source.close();
                 }
             } catch (err) {
-                // Demo: simulate ready
-                setStatus('ready');
+                // Keep waiting for events
             }
         };
 
-        checkStatus();
-    };
+        return () => source.close();
+    }, [status, caseId]);
 
     const formatFileSize = (bytes) => {
         if (bytes < 1024) return bytes + ' B';
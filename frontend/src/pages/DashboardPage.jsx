@@ -198,6 +198,32 @@ const DashboardPage = () => {
         fetchCases();
     }, []);
 
+    // Keep the list current from the all-cases event stream instead of re-fetching
+    useEffect(() => {
+        const source = new EventSource('/api/events');
+        const upsertCase = (e) => {
+            const item = JSON.parse(e.data).data;
+            setCases(prev => prev.some(c => c.id === item.id)
+                ? prev.map(c => c.id === item.id ? { ...c, ...item } : c)
+                : [item, ...prev]);
+        };
+        const setStatus = (status) => (e) => {
+            const { case_id: id } = JSON.parse(e.data);
+            setCases(prev => prev.map(c => c.id === id ? { ...c, status } : c));
+        };
+        source.addEventListener('case.created', upsertCase);
+        source.addEventListener('case.updated', upsertCase);
+        source.addEventListener('case.deleted', (e) => {
+            const { case_id: id } = JSON.parse(e.data);
+            setCases(prev => prev.filter(c => c.id !== id));
+        });
+        source.addEventListener('scene.ready', setStatus('ready'));
+        source.addEventListener('analysis.completed', setStatus('analyzed'));
+        source.addEventListener('resync', fetchCases);
+
+        return () => source.close();
+    }, []);
+
     const fetchCases = async () => {
         try {
             const response = await fetch('/api/cases');
@@ -243,7 +269,7 @@ const DashboardPage = () => {
 
             if (response.ok) {
                 const newCase = await response.json();
-                setCases([newCase, ...cases]);
+                setCases(prev => [newCase, ...prev.filter(c => c.id !== newCase.id)]);
                 navigate(`/case/${newCase.id}/setup`);
             }
         } catch (err) {
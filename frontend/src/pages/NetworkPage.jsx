@@ -65,11 +65,39 @@ const DEMO_EDGES = [
     { from: 'MO02', to: 'MO01', label: 'RELATED_TO' }
 ];
 
+// Size in pixels of the server layout's unit square at zoom 1
+const WORLD_SIZE = 600;
+const FILTER_TYPES = {
+    'Suspects': 'suspect',
+    'Locations': 'location',
+    'Crime Types': 'crimeType',
+    'Patterns': 'moPattern'
+};
+
+// Tiles covering the visible part of the unit square at a tile zoom level
+const getVisibleTiles = (zoom, pan, width, height) => {
+    const tileZoom = Math.min(16, Math.max(0, Math.floor(Math.log2(zoom)) + 1));
+    const count = 2 ** tileZoom;
+    const toTile = (px, offset) =>
+        Math.min(count - 1, Math.max(0, Math.floor(((px - offset) / zoom / WORLD_SIZE) * count)));
+    const tiles = [];
+    for (let x = toTile(0, pan.x); x <= toTile(width, pan.x); x++) {
+        for (let y = toTile(0, pan.y); y <= toTile(height, pan.y); y++) {
+            tiles.push({ z: tileZoom, x, y });
+        }
+    }
+    return tiles;
+};
+
 const NetworkPage = () => {
     const navigate = useNavigate();
     const canvasRef = useRef(null);
     const [nodes, setNodes] = useState(DEMO_NODES);
-    const [edges] = useState(DEMO_EDGES);
+    const [edges, setEdges] = useState(DEMO_EDGES);
+    const [clusters, setClusters] = useState([]);
+    const [serverLayout, setServerLayout] = useState(false);
+    const [pan, setPan] = useState({ x: 0, y: 0 });
+    const [panning, setPanning] = useState(null);
     const [selectedNode, setSelectedNode] = useState(null);
     const [showLabels, setShowLabels] = useState(true);
     const [showRelations, setShowRelations] = useState(true);
@@ -80,26 +108,80 @@ const NetworkPage = () => {
 
     const filterOptions = ['All', 'Suspects', 'Locations', 'Crime Types', 'Patterns'];
 
+    // Use the server layout when the backend has a graph; otherwise keep demo data
+    useEffect(() => {
+        fetch('/api/network/layout')
+            .then(res => res.ok ? res.json() : null)
+            .then(status => setServerLayout(Boolean(status && status.graph_version && status.node_count)))
+            .catch(() => setServerLayout(false));
+    }, []);
+
+    // Fetch only the tiles in view; large tiles come back as clusters
+    useEffect(() => {
+        if (!serverLayout || !canvasRef.current) return;
+        const { clientWidth, clientHeight } = canvasRef.current;
+        const typeParam = filter === 'All' ? '' : `?type=${FILTER_TYPES[filter]}`;
+        const tiles = getVisibleTiles(zoom, pan, clientWidth, clientHeight);
+        let cancelled = false;
+
+        const timer = setTimeout(async () => {
+            try {
+                const results = await Promise.all(tiles.map(({ z, x, y }) =>
+                    fetch(`/api/network/layout/tiles/${z}/${x}/${y}${typeParam}`)
+                        .then(res => res.status === 200 ? res.json() : null)
+                ));
+                if (cancelled) return;
+                const tileNodes = [];
+                const tileEdges = [];
+                const tileClusters = [];
+                results.filter(Boolean).forEach(tile => {
+                    (tile.nodes || []).forEach(n =>
+                        tileNodes.push({ ...n, x: n.x * WORLD_SIZE, y: n.y * WORLD_SIZE }));
+                    (tile.edges || []).forEach(e => tileEdges.push(e));
+                    (tile.clusters || []).forEach(c =>
+                        tileClusters.push({ ...c, x: c.x * WORLD_SIZE, y: c.y * WORLD_SIZE }));
+                });
+                setNodes(tileNodes);
+                setEdges(tileEdges);
+                setClusters(tileClusters);
+            } catch (err) {
+                console.error('Failed to fetch network tiles:', err);
+            }
+        }, 150);
+
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [serverLayout, zoom, pan, filter]);
+
     const getFilteredNodes = () => {
         if (filter === 'All') return nodes;
-        const typeMap = {
-            'Suspects': 'suspect',
-            'Locations': 'location',
-            'Crime Types': 'crimeType',
-            'Patterns': 'moPattern'
-        };
-        return nodes.filter(n => n.type === typeMap[filter]);
+        return nodes.filter(n => n.type === FILTER_TYPES[filter]);
     };
 
     const getFilteredEdges = () => {
+        // Server edges carry endpoint positions, so they can reach off-screen nodes
+        if (serverLayout) return edges;
         const visibleNodeIds = getFilteredNodes().map(n => n.id);
         return edges.filter(e =>
             visibleNodeIds.includes(e.from) && visibleNodeIds.includes(e.to)
         );
     };
 
+    const getEdgeEnds = (edge) => {
+        if (edge.points) {
+            return [
+                { x: edge.points[0] * WORLD_SIZE, y: edge.points[1] * WORLD_SIZE },
+                { x: edge.points[2] * WORLD_SIZE, y: edge.points[3] * WORLD_SIZE }
+            ];
+        }
+        return [nodes.find(n => n.id === edge.from), nodes.find(n => n.id === edge.to)];
+    };
+
     const handleMouseDown = (e, nodeId) => {
         e.preventDefault();
+        e.stopPropagation();
         const node = nodes.find(n => n.id === nodeId);
         if (node) {
             setDragging(nodeId);
@@ -110,6 +192,10 @@ const NetworkPage = () => {
         }
     };
 
+    const handleCanvasMouseDown = (e) => {
+        setPanning({ x: e.clientX - pan.x, y: e.clientY - pan.y });
+    };
+
     const handleMouseMove = (e) => {
         if (dragging) {
             setNodes(prev => prev.map(n =>
@@ -117,15 +203,19 @@ const NetworkPage = () => {
                     ? { ...n, x: (e.clientX - offset.x) / zoom, y: (e.clientY - offset.y) / zoom }
                     : n
             ));
+        } else if (panning) {
+            setPan({ x: e.clientX - panning.x, y: e.clientY - panning.y });
         }
     };
 
     const handleMouseUp = () => {
         setDragging(null);
+        setPanning(null);
     };
 
     const resetLayout = () => {
-        setNodes(DEMO_NODES);
+        if (!serverLayout) setNodes(DEMO_NODES);
+        setPan({ x: 0, y: 0 });
         setZoom(1);
     };
 
@@ -196,8 +286,9 @@ const NetworkPage = () => {
                             border: '3px solid var(--manila-dark)',
                             position: 'relative',
                             overflow: 'hidden',
-                            cursor: dragging ? 'grabbing' : 'grab'
+                            cursor: dragging || panning ? 'grabbing' : 'grab'
                         }}
+                        onMouseDown={handleCanvasMouseDown}
                         onMouseMove={handleMouseMove}
                         onMouseUp={handleMouseUp}
                         onMouseLeave={handleMouseUp}
@@ -211,9 +302,9 @@ const NetworkPage = () => {
                             height: '100%',
                             pointerEvents: 'none'
                         }}>
+                            <g transform={`translate(${pan.x}, ${pan.y})`}>
                             {showRelations && getFilteredEdges().map((edge, idx) => {
-                                const fromNode = nodes.find(n => n.id === edge.from);
-                                const toNode = nodes.find(n => n.id === edge.to);
+                                const [fromNode, toNode] = getEdgeEnds(edge);
                                 if (!fromNode || !toNode) return null;
 
                                 const midX = (fromNode.x + toNode.x) / 2 * zoom;
@@ -245,8 +336,39 @@ const NetworkPage = () => {
                                     </g>
                                 );
                             })}
+                            </g>
                         </svg>
 
+                        {/* Clusters (server layout, zoomed out) */}
+                        {clusters.map((cluster, idx) => {
+                            const size = Math.min(80, 16 + Math.sqrt(cluster.count) * 2);
+                            return (
+                                <div
+                                    key={`cluster-${idx}`}
+                                    title={Object.entries(cluster.types)
+                                        .map(([type, count]) => `${NODE_TYPES[type]?.label || type}: ${count}`)
+                                        .join('\n')}
+                                    style={{
+                                        position: 'absolute',
+                                        left: cluster.x * zoom + pan.x - size / 2,
+                                        top: cluster.y * zoom + pan.y - size / 2,
+                                        width: size,
+                                        height: size,
+                                        borderRadius: '50%',
+                                        background: 'var(--manila-dark)',
+                                        opacity: 0.8,
+                                        display: 'flex',
+                                        alignItems: 'center',
+                                        justifyContent: 'center',
+                                        fontSize: '0.7rem',
+                                        fontFamily: 'var(--font-mono)'
+                                    }}
+                                >
+                                    {cluster.count}
+                                </div>
+                            );
+                        })}
+
                         {/* Nodes */}
                         {getFilteredNodes().map(node => {
                             const config = NODE_TYPES[node.type];
@@ -257,8 +379,8 @@ const NetworkPage = () => {
                                     key={node.id}
                                     style={{
                                         position: 'absolute',
-                                        left: node.x * zoom - size / 2,
-                                        top: node.y * zoom - size / 2,
+                                        left: node.x * zoom + pan.x - size / 2,
+                                        top: node.y * zoom + pan.y - size / 2,
                                         width: size,
                                         height: size,
                                         borderRadius: '50%',
@@ -289,8 +411,8 @@ const NetworkPage = () => {
                                     key={`label-${node.id}`}
                                     style={{
                                         position: 'absolute',
-                                        left: node.x * zoom,
-                                        top: node.y * zoom + size / 2 + 8,
+                                        left: node.x * zoom + pan.x,
+                                        top: node.y * zoom + pan.y + size / 2 + 8,
                                         transform: 'translateX(-50%)',
                                         fontSize: '0.75rem',
                                         fontFamily: 'var(--font-mono)',
@@ -364,7 +486,7 @@ const NetworkPage = () => {
                             <input
                                 type="range"
                                 min="0.5"
-                                max="2"
+                                max={serverLayout ? 64 : 2}
                                 step="0.1"
                                 value={zoom}
                                 onChange={(e) => setZoom(parseFloat(e.target.value))}
@@ -114,6 +114,20 @@ const getRiskLevel = (score) => {
     return 'Low';
 };
 
+// Map a /api/predictions item onto the shape the cards expect
+const fromPrediction = (item) => ({
+    id: item.suspect_id,
+    location: item.location || 'Unknown',
+    crimeType: item.crime_type || 'Unknown',
+    likelyWeapon: item.likely_weapon || 'Unknown',
+    riskScore: item.risk_score,
+    severity: item.severity,
+    gangAffiliated: item.gang_affiliated,
+    matchedMO: item.matched_mo,
+    firHistory: item.fir_count,
+    lastActive: item.last_active ? item.last_active.slice(0, 10) : 'Unknown'
+});
+
 const getRiskColor = (score) => {
     if (score >= 0.7) return '#ef4444';
     if (score >= 0.4) return '#f59e0b';
@@ -419,12 +433,33 @@ const PredictionsPage = () => {
     const [filteredSuspects, setFilteredSuspects] = useState(DEMO_SUSPECTS);
     const [selectedSuspect, setSelectedSuspect] = useState(null);
     const [loading, setLoading] = useState(false);
+    const [liveData, setLiveData] = useState(false);
 
     useEffect(() => {
         filterSuspects();
     }, [searchQuery, crimeTypeFilter, riskLevelFilter]);
 
-    const filterSuspects = () => {
+    const filterSuspects = async () => {
+        const params = new URLSearchParams({ limit: '100' });
+        if (searchQuery) params.set('q', searchQuery);
+        if (crimeTypeFilter !== 'All Crime Types') params.set('crime_type', crimeTypeFilter);
+        if (riskLevelFilter !== 'All Risk Levels') params.set('risk_level', riskLevelFilter);
+
+        try {
+            const response = await fetch(`/api/predictions?${params}`);
+            if (response.ok) {
+                const data = await response.json();
+                // Until the backend has scored suspects, fall through to the demo list
+                if (data.total > 0 || liveData) {
+                    setLiveData(true);
+                    setFilteredSuspects(data.items.map(fromPrediction));
+                    return;
+                }
+            }
+        } catch (err) {
+            console.error('Failed to fetch predictions:', err);
+        }
+
         let filtered = [...DEMO_SUSPECTS];
 
         if (searchQuery) {
@@ -448,10 +483,7 @@ const PredictionsPage = () => {
 
     const handleSearch = () => {
         setLoading(true);
-        setTimeout(() => {
-            filterSuspects();
-            setLoading(false);
-        }, 500);
+        filterSuspects().finally(() => setLoading(false));
     };
 
     const handleLinkToScene = (suspect) => {
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef, Suspense } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { Canvas } from '@react-three/fiber';
+import { Canvas, useFrame, useThree } from '@react-three/fiber';
 import { OrbitControls, Environment, useGLTF, Html, GizmoHelper, GizmoViewport } from '@react-three/drei';
 import * as THREE from 'three';
 import {
@@ -252,6 +252,96 @@ const EvidenceMarker3D = ({ position, type, id, selected, onClick }) => {
     );
 };
 
+// Aggregate of distant evidence in 3D, sized by item count
+const EvidenceCluster3D = ({ cluster }) => {
+    const [topType] = Object.entries(cluster.types).sort((a, b) => b[1] - a[1])[0];
+    const config = EVIDENCE_TYPES[topType] || EVIDENCE_TYPES.other;
+    const { center } = cluster;
+
+    return (
+        <mesh position={[center.x, center.y + 0.3, center.z]}>
+            <sphereGeometry args={[0.15 + 0.08 * Math.log2(cluster.count), 16, 16]} />
+            <meshStandardMaterial color={config.color} transparent opacity={0.6} />
+            <Html
+                center
+                style={{
+                    color: 'white',
+                    fontSize: '10px',
+                    fontFamily: 'monospace',
+                    fontWeight: 600,
+                    pointerEvents: 'none'
+                }}
+            >
+                {cluster.count}
+            </Html>
+        </mesh>
+    );
+};
+
+// Above this many items, markers are loaded for the current view only
+const SPATIAL_THRESHOLD = 500;
+
+// Evidence in the camera's view: individual markers up close, clusters further away
+const ViewportEvidence = ({ caseId, revision, selectedEvidence, onSelect }) => {
+    const { camera } = useThree();
+    const [view, setView] = useState({ items: [], clusters: [] });
+    const lastMatrix = useRef(null);
+    const timer = useRef(null);
+
+    const load = async () => {
+        camera.updateMatrixWorld();
+        const frustum = new THREE.Frustum().setFromProjectionMatrix(
+            new THREE.Matrix4().multiplyMatrices(camera.projectionMatrix, camera.matrixWorldInverse)
+        );
+        const planes = frustum.planes.flatMap(p => [p.normal.x, p.normal.y, p.normal.z, p.constant]);
+        const params = new URLSearchParams({
+            frustum: planes.map(v => v.toFixed(4)).join(','),
+            camera: camera.position.toArray().map(v => v.toFixed(3)).join(',')
+        });
+        try {
+            const response = await fetch(`/api/cases/${caseId}/evidence/spatial?${params}`);
+            if (response.ok) {
+                setView(await response.json());
+            }
+        } catch (err) {
+            console.error('Failed to fetch evidence for view:', err);
+        }
+    };
+
+    // Refetch once the camera has stopped moving
+    useFrame(() => {
+        const matrix = camera.matrixWorld.elements.join(',');
+        if (matrix !== lastMatrix.current) {
+            lastMatrix.current = matrix;
+            clearTimeout(timer.current);
+            timer.current = setTimeout(load, 250);
+        }
+    });
+
+    useEffect(() => {
+        load();
+        return () => clearTimeout(timer.current);
+    }, [caseId, revision]);
+
+    return (
+        <group>
+            {view.items.map(item => (
+                <EvidenceMarker3D
+                    key={item.id}
+                    id={item.evidence_id || item.id}
+                    position={item.coordinates}
+                    type={item.type}
+                    selected={selectedEvidence === item.id}
+                    onClick={() => onSelect(item.id)}
+                />
+            ))}
+            {view.clusters.map(cluster => (
+                <EvidenceCluster3D key={cluster.cell} cluster={cluster} />
+            ))}
+        </group>
+    );
+};
+
 // Fallback scene when no model - Realistic crime scene bedroom
 const FallbackScene = ({ onClick }) => {
     return (
@@ -406,6 +496,94 @@ const LoadingModel = () => (
     </Html>
 );
 
+// Photos of one evidence item; thumbnails appear once the server has rendered them
+const EvidencePhotos = ({ evidenceId }) => {
+    const { caseId } = useParams();
+    const [photos, setPhotos] = useState([]);
+    const [uploading, setUploading] = useState(false);
+
+    const fetchPhotos = async () => {
+        try {
+            const response = await fetch(`/api/cases/${caseId}/photos?evidence_id=${evidenceId}`);
+            if (response.ok) {
+                setPhotos(await response.json());
+            }
+        } catch (error) {
+            console.error('Failed to fetch photos:', error);
+        }
+    };
+
+    useEffect(() => {
+        fetchPhotos();
+    }, [caseId, evidenceId]);
+
+    // Poll while any photo is still being processed
+    useEffect(() => {
+        if (!photos.some(photo => photo.status === 'processing')) return;
+        const timer = setTimeout(fetchPhotos, 1500);
+        return () => clearTimeout(timer);
+    }, [photos]);
+
+    const handleUpload = async (e) => {
+        const files = Array.from(e.target.files || []);
+        e.target.value = '';
+        if (files.length === 0) return;
+        const form = new FormData();
+        files.forEach(file => form.append('photos', file));
+        form.append('evidence_id', evidenceId);
+        setUploading(true);
+        try {
+            const response = await fetch(`/api/cases/${caseId}/photos`, { method: 'POST', body: form });
+            if (!response.ok) {
+                alert((await response.json()).error || 'Upload failed');
+            }
+            await fetchPhotos();
+        } catch (error) {
+            console.error('Failed to upload photos:', error);
+        } finally {
+            setUploading(false);
+        }
+    };
+
+    return (
+        <div style={{ marginTop: '12px' }}>
+            <label className="btn btn-secondary btn-sm" style={{ cursor: 'pointer' }}>
+                <Camera size={12} /> {uploading ? 'Uploading...' : 'Add Photos'}
+                <input type="file" accept="image/*" multiple hidden onChange={handleUpload} disabled={uploading} />
+            </label>
+            {photos.length > 0 && (
+                <div style={{ display: 'flex', flexWrap: 'wrap', gap: '6px', marginTop: '8px' }}>
+                    {photos.map(photo => (
+                        <a key={photo.id} href={photo.urls.preview || photo.urls.original} target="_blank" rel="noreferrer">
+                            {photo.urls.thumb ? (
+                                <img
+                                    src={photo.urls.thumb}
+                                    alt={photo.original_name}
+                                    loading="lazy"
+                                    style={{ width: 64, height: 64, objectFit: 'cover', borderRadius: '2px' }}
+                                />
+                            ) : (
+                                <div style={{
+                                    width: 64,
+                                    height: 64,
+                                    display: 'flex',
+                                    alignItems: 'center',
+                                    justifyContent: 'center',
+                                    fontSize: '0.6rem',
+                                    color: 'var(--text-muted)',
+                                    border: '1px dashed var(--border-subtle)'
+                                }}>
+                                    {photo.status}
+                                </div>
+                            )}
+                        </a>
+                    ))}
+                </div>
+            )}
+        </div>
+    );
+};
+
 // Evidence Panel
 const EvidencePanel = ({
     evidence,
@@ -590,6 +768,7 @@ const EvidencePanel = ({
                             Delete
                         </button>
                     </div>
+                    <EvidencePhotos evidenceId={selected.id} />
                     {selected.hash && (
                         <div style={{
                             marginTop: '12px',
@@ -626,6 +805,36 @@ const SceneViewerPage = () => {
         fetchEvidence();
     }, [caseId]);
 
+    // Insert or merge by id, so our own writes and their echoed events don't duplicate
+    const upsertEvidence = (item) => {
+        setEvidence(prev => prev.some(e => e.id === item.id)
+            ? prev.map(e => e.id === item.id ? { ...e, ...item } : e)
+            : [...prev, item]);
+    };
+
+    // Apply changes from other investigators as they happen
+    useEffect(() => {
+        const source = new EventSource(`/api/cases/${caseId}/events`);
+        const onEvidence = (e) => upsertEvidence(JSON.parse(e.data).data);
+        source.addEventListener('evidence.created', onEvidence);
+        source.addEventListener('evidence.updated', onEvidence);
+        source.addEventListener('evidence.deleted', (e) => {
+            const { id } = JSON.parse(e.data).data;
+            setEvidence(prev => prev.filter(item => item.id !== id));
+            setSelectedEvidence(prev => (prev && prev.id === id ? null : prev));
+        });
+        source.addEventListener('scene.ready', (e) => {
+            setModelUrl(`/models/${JSON.parse(e.data).data.model_path}`);
+        });
+        // Missed events can no longer be replayed; start from a fresh copy
+        source.addEventListener('resync', () => {
+            fetchCaseData();
+            fetchEvidence();
+        });
+
+        return () => source.close();
+    }, [caseId]);
+
     const fetchCaseData = async () => {
         try {
             const response = await fetch(`/api/cases/${caseId}`);
@@ -692,7 +901,7 @@ const SceneViewerPage = () => {
 
             if (response.ok) {
                 const data = await response.json();
-                setEvidence([...evidence, data]);
+                upsertEvidence(data);
             } else {
                 setEvidence([...evidence, newEvidence]);
             }
@@ -777,7 +986,14 @@ const SceneViewerPage = () => {
                             {/* Use KIRI model if available, otherwise use demo scene.gltf */}
                             <SceneModel url={modelUrl || DEMO_MODEL_URL} onClick={handleSceneClick} />
 
-                            {evidence.map(item => (
+                            {evidence.length > SPATIAL_THRESHOLD ? (
+                                <ViewportEvidence
+                                    caseId={caseId}
+                                    revision={evidence}
+                                    selectedEvidence={selectedEvidence}
+                                    onSelect={setSelectedEvidence}
+                                />
+                            ) : evidence.map(item => (
                                 <EvidenceMarker3D
                                     key={item.id}
                                     id={item.evidence_id || item.id}
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
+import { useAuth } from '../App';
 import {
     ArrowLeft,
     Play,
@@ -505,6 +506,7 @@ const ScenarioComparison = ({ hypotheses }) => {
 const WorkflowCanvasPage = () => {
     const { caseId } = useParams();
     const navigate = useNavigate();
+    const { user } = useAuth();
 
     const [agentStatuses, setAgentStatuses] = useState({
         scene_interpreter: 'idle',
@@ -517,6 +519,7 @@ const WorkflowCanvasPage = () => {
     const [hypotheses, setHypotheses] = useState([]);
     const [selectedAgent, setSelectedAgent] = useState(null);
     const [isRunningAll, setIsRunningAll] = useState(false);
+    const [runId, setRunId] = useState(null);
 
     // Agent positions for the workflow graph - adjusted for larger cards
     const agentPositions = {
@@ -565,18 +568,124 @@ const WorkflowCanvasPage = () => {
         }
     };
 
+    // Mirror a server-side pipeline run into the canvas
+    const applyRun = useCallback((run) => {
+        const stageStatus = { pending: 'idle', skipped: 'idle', running: 'running', completed: 'completed', error: 'error' };
+        run.stages.forEach(stage => {
+            setAgentStatuses(prev => ({ ...prev, [stage.agent_type]: stageStatus[stage.status] || 'idle' }));
+            if (stage.output) {
+                setAgentResults(prev => ({
+                    ...prev,
+                    [stage.agent_type]: { status: stage.status, execution_time: stage.execution_time, output: stage.output }
+                }));
+                if (stage.agent_type === 'timeline_builder' && stage.output.scenarios) {
+                    setHypotheses(stage.output.scenarios);
+                }
+            }
+        });
+    }, []);
+
+    const fetchRun = useCallback(async (id) => {
+        const response = await fetch(`/api/pipeline-runs/${id}`);
+        const run = await response.json();
+        applyRun(run);
+        return run;
+    }, [applyRun]);
+
+    // Reattach to a run that is still going, e.g. after a reload
+    useEffect(() => {
+        const loadActiveRun = async () => {
+            try {
+                const response = await fetch(`/api/cases/${caseId}/pipeline-runs?limit=1`);
+                const [latest] = await response.json();
+                if (latest && (latest.status === 'queued' || latest.status === 'running')) {
+                    setIsRunningAll(true);
+                    setRunId(latest.id);
+                }
+            } catch (err) {
+                // No run history available
+            }
+        };
+        loadActiveRun();
+    }, [caseId]);
+
+    useEffect(() => {
+        if (!runId) return undefined;
+
+        const source = new EventSource(`/api/cases/${caseId}/events`);
+        const finish = async () => {
+            source.close();
+            try {
+                await fetchRun(runId);
+            } finally {
+                setRunId(null);
+                setIsRunningAll(false);
+            }
+        };
+
+        source.addEventListener('agent.started', (e) => {
+            const { data } = JSON.parse(e.data);
+            if (data.run_id !== runId) return;
+            setAgentStatuses(prev => ({ ...prev, [data.agent_type]: 'running' }));
+        });
+        source.addEventListener('agent.completed', (e) => {
+            const { data } = JSON.parse(e.data);
+            if (data.run_id !== runId) return;
+            fetchRun(runId).catch(() => {});
+        });
+        source.addEventListener('pipeline.completed', (e) => {
+            const { data } = JSON.parse(e.data);
+            if (data.run_id === runId) finish();
+        });
+        // Catch up on stages that finished before the stream opened
+        source.onopen = async () => {
+            try {
+                const run = await fetchRun(runId);
+                if (run.status !== 'queued' && run.status !== 'running') finish();
+            } catch (err) {
+                // Keep waiting for events
+            }
+        };
+
+        return () => source.close();
+    }, [runId, caseId, fetchRun]);
+
     const runFullAnalysis = async () => {
         setIsRunningAll(true);
 
-        // Run agents in sequence
+        // The server runs the agents in sequence and keeps going if this page is closed
         const agentOrder = ['scene_interpreter', 'evidence_reasoner', 'timeline_builder', 'hypothesis_challenger'];
 
-        for (const agentId of agentOrder) {
-            await runAgent(agentId);
-            await new Promise(resolve => setTimeout(resolve, 500));
+        try {
+            const response = await fetch(`/api/cases/${caseId}/pipeline-runs`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    ...(user?.investigator_id ? { 'X-Investigator-Id': user.investigator_id } : {})
+                },
+                body: JSON.stringify({ agents: agentOrder })
+            });
+            if (response.status === 429) {
+                // Analysis quota used up: don't fall back to running agents one by one
+                const { error } = await response.json();
+                alert(`${error}. Try again in ${response.headers.get('Retry-After')} seconds.`);
+                setIsRunningAll(false);
+                return;
+            }
+            if (!response.ok) {
+                throw new Error('Pipeline run could not be started');
+            }
+            const run = await response.json();
+            applyRun(run);
+            setRunId(run.id);
+        } catch (err) {
+            // Demo: run agents one by one
+            for (const agentId of agentOrder) {
+                await runAgent(agentId);
+                await new Promise(resolve => setTimeout(resolve, 500));
+            }
+            setIsRunningAll(false);
         }
-
-        setIsRunningAll(false);
     };
 
     const getDemoOutput = (agentId) => {